@@ -5,11 +5,13 @@ from slowapi.util import get_remote_address
 
 from app.schemas import OCRRequest, OCRResponse, OCRErrorResponse
 from app.services.gemini_service import gemini_service
-from app.core.errors import OCRError
+from app.services.ocr_cache_service import build_ocr_cache_service
+from app.core.errors import ImageProcessingError, OCRError
 from app.core.constants import ERROR_INTERNAL
 
 router = APIRouter()
 limiter = Limiter(key_func=get_remote_address)
+ocr_cache_service = build_ocr_cache_service(gemini_service)
 
 
 @router.post(
@@ -33,6 +35,9 @@ async def extract_text_from_image(
     - For single image: provide 'image' field
     - For multiple images: provide 'images' field (max 10 images)
 
+    Results are cached per page by image content and options; from_cache is
+    true when no page needed a Gemini call.
+
     Args:
         request: FastAPI request object (used for rate limiting)
         ocr_request: OCR request containing image data and options
@@ -47,7 +52,7 @@ async def extract_text_from_image(
         # Check if multiple images or single image
         if ocr_request.images is not None:
             # Multiple images
-            text, sentences, confidence, processing_time = gemini_service.extract_text_from_multiple_images(
+            text, sentences, confidence, processing_time, cached_pages = await ocr_cache_service.extract_text_from_multiple_images(
                 images_data=ocr_request.images,
                 exclude_annotations=ocr_request.options.exclude_annotations,
                 language=ocr_request.options.language,
@@ -56,21 +61,32 @@ async def extract_text_from_image(
             page_count = len(ocr_request.images)
         else:
             # Single image
-            text, sentences, confidence, processing_time = gemini_service.extract_text(
+            text, sentences, confidence, processing_time, from_cache = await ocr_cache_service.extract_text(
                 image_data=ocr_request.image,
                 exclude_annotations=ocr_request.options.exclude_annotations,
                 language=ocr_request.options.language
             )
             page_count = 1
+            cached_pages = int(from_cache)
 
         return OCRResponse(
             text=text,
             sentences=sentences,
             confidence=confidence,
             processing_time=processing_time,
-            page_count=page_count
+            page_count=page_count,
+            from_cache=cached_pages == page_count,
+            cached_pages=cached_pages
         )
 
+    except ImageProcessingError as e:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": e.error_code,
+                "message": e.message
+            }
+        )
     except OCRError as e:
         import traceback
         print(f"OCR Error: {e.message}")
@@ -93,3 +109,13 @@ async def extract_text_from_image(
                 "message": f"Internal server error: {str(e)}"
             }
         )
+
+
+@router.get("/ocr-cache-stats")
+async def get_ocr_cache_stats():
+    """
+    OCR result cache hit/miss counters per tier (memory, disk, shared backend)
+
+    Counters are per worker process and reset on restart.
+    """
+    return ocr_cache_service.stats()
@@ -1,21 +1,87 @@
 """TTS API endpoints"""
 from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import Response, JSONResponse
+from fastapi.responses import Response, JSONResponse, StreamingResponse
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
 from app.schemas import TTSRequest, TTSErrorResponse, TTSResponse
 from app.services import openai_service
 from app.services.audio_cache_service import AudioCacheService
+from app.services.cache_prewarm_service import build_cache_prewarm_service
 from app.core.errors import TTSGenerationError
-from app.core.constants import ERROR_INTERNAL
+from app.core.constants import ERROR_INTERNAL, ERROR_NOT_FOUND, ERROR_TTS_FAILED
+from typing import Any, AsyncIterator, Dict
 import base64
+import json
 
 router = APIRouter()
 limiter = Limiter(key_func=get_remote_address)
 
 # Audio cache service instance
 audio_cache_service = AudioCacheService()
+cache_prewarm_service = build_cache_prewarm_service(audio_cache_service)
+
+# Response media type per audio format
+MEDIA_TYPES = {
+    "opus": "audio/opus",
+    "mp3": "audio/mpeg",
+    "aac": "audio/aac",
+    "flac": "audio/flac"
+}
+
+
+async def _resume_audio_stream(first_chunk: bytes, audio_stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Yield the prefetched first chunk, then the rest of the upstream stream
+
+    Once the first byte is sent the 200 status is committed, so a later
+    failure can't become an error response. The error is re-raised instead,
+    which makes the server abort the chunked response without its final
+    chunk: clients see a failed transfer rather than a truncated file that
+    looks complete.
+    """
+    yield first_chunk
+    try:
+        async for chunk in audio_stream:
+            yield chunk
+    except TTSGenerationError as e:
+        print(f"TTS stream aborted after first byte: {e.message}")
+        raise
+
+
+# Incremental formats for /tts-with-timings-separated (chosen via Accept)
+EVENT_STREAM_MEDIA_TYPE = "text/event-stream"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _format_event(event: Dict[str, Any], media_type: str) -> str:
+    """Encode one event as an SSE message or an NDJSON line"""
+    if media_type == EVENT_STREAM_MEDIA_TYPE:
+        payload = {key: value for key, value in event.items() if key != "event"}
+        return f"event: {event['event']}\ndata: {json.dumps(payload)}\n\n"
+    return json.dumps(event) + "\n"
+
+
+async def _resume_event_stream(
+    first_event: Dict[str, Any],
+    events: AsyncIterator[Dict[str, Any]],
+    media_type: str
+) -> AsyncIterator[str]:
+    """
+    Encode the prefetched first event, then the remaining events
+
+    Failures after the first event are sent as a final "error" event
+    (the 200 status is already committed).
+    """
+    try:
+        yield _format_event(first_event, media_type)
+        async for event in events:
+            yield _format_event(event, media_type)
+    except Exception as e:
+        print(f"TTS separated stream failed after first event: {str(e)}")
+        error_code = e.error_code if isinstance(e, TTSGenerationError) else ERROR_INTERNAL
+        message = e.message if isinstance(e, TTSGenerationError) else f"Internal server error: {str(e)}"
+        yield _format_event({"event": "error", "error": error_code, "message": message}, media_type)
 
 
 @router.post(
@@ -24,7 +90,7 @@ audio_cache_service = AudioCacheService()
     responses={
         200: {
             "content": {"audio/opus": {}},
-            "description": "Audio file in Opus format"
+            "description": "Audio file in Opus format (chunked when stream=true)"
         },
         400: {"model": TTSErrorResponse},
         422: {"model": TTSErrorResponse},
@@ -45,31 +111,49 @@ async def generate_speech_from_text(
         tts_request: TTS request containing text, voice, and format options
 
     Returns:
-        Audio file in the requested format
+        Audio file in the requested format. With stream=true, audio chunks are
+        sent as they arrive from OpenAI (chunked transfer); errors before the
+        first chunk are reported normally, later errors abort the transfer.
 
     Raises:
         HTTPException: For various error conditions (400, 422, 429, 500)
     """
     try:
         # Debug: Log request
-        print(f"TTS Request received - Text length: {len(tts_request.text)}, Voice: {tts_request.voice}, Format: {tts_request.format}")
+        print(f"TTS Request received - Text length: {len(tts_request.text)}, Voice: {tts_request.voice}, Format: {tts_request.format}, Stream: {tts_request.stream}")
+
+        # Determine media type based on format
+        media_type = MEDIA_TYPES.get(tts_request.format, "audio/opus")
+
+        if tts_request.stream:
+            audio_stream = openai_service.stream_speech_async(
+                text=tts_request.text,
+                voice=tts_request.voice,
+                format=tts_request.format
+            )
 
-        # Standard generation (always returns binary audio)
-        audio_data = openai_service.generate_speech(
+            # Wait for the first chunk before committing to a 200, so validation
+            # and upstream errors still map to regular error responses
+            try:
+                first_chunk = await audio_stream.__anext__()
+            except StopAsyncIteration:
+                raise TTSGenerationError(
+                    "OpenAI TTS returned no audio",
+                    error_code=ERROR_TTS_FAILED
+                )
+
+            return StreamingResponse(
+                _resume_audio_stream(first_chunk, audio_stream),
+                media_type=media_type
+            )
+
+        # Standard generation (returns the whole file at once)
+        audio_data = await openai_service.generate_speech_async(
             text=tts_request.text,
             voice=tts_request.voice,
             format=tts_request.format
         )
 
-        # Determine media type based on format
-        media_type_map = {
-            "opus": "audio/opus",
-            "mp3": "audio/mpeg",
-            "aac": "audio/aac",
-            "flac": "audio/flac"
-        }
-        media_type = media_type_map.get(tts_request.format, "audio/opus")
-
         return Response(
             content=audio_data,
             media_type=media_type
@@ -145,7 +229,7 @@ async def generate_speech_with_timings(
         print(f"TTS with timings - Sentences: {len(tts_request.sentences)}, Voice: {tts_request.voice}, Format: {tts_request.format}")
 
         # Generate speech with timings
-        audio_data, sentence_timings, total_duration = openai_service.generate_speech_with_timings(
+        audio_data, sentence_timings, total_duration = await openai_service.generate_speech_with_timings_async(
             sentences=tts_request.sentences,
             voice=tts_request.voice,
             format=tts_request.format
@@ -199,8 +283,8 @@ async def generate_speech_with_timings(
     response_model=None,
     responses={
         200: {
-            "content": {"application/json": {}},
-            "description": "JSON with separated audio segments"
+            "content": {"application/json": {}, "text/event-stream": {}, "application/x-ndjson": {}},
+            "description": "JSON with separated audio segments, or per-sentence events"
         },
         400: {"model": TTSErrorResponse},
         422: {"model": TTSErrorResponse},
@@ -219,8 +303,14 @@ async def generate_speech_separated(
     This endpoint returns an array of audio segments (one per sentence),
     allowing for precise control over individual sentence playback.
 
+    With "Accept: text/event-stream" (SSE) or "Accept: application/x-ndjson",
+    one "segment" event ({index, duration, audio_url | audio_data}) is sent per
+    sentence as soon as it is ready, in completion order, followed by a
+    "done" summary event (or an "error" event if generation fails midway).
+
     Returns:
-        JSON with array of audio segments (each sentence = separate audio file)
+        JSON with array of audio segments (each sentence = separate audio file),
+        or an incremental event stream (see above)
     """
     try:
         # Validate sentences
@@ -235,6 +325,28 @@ async def generate_speech_separated(
 
         print(f"TTS separated - Sentences: {len(tts_request.sentences)}, Voice: {tts_request.voice}, Format: {tts_request.format}")
 
+        accept = request.headers.get("accept", "")
+        stream_media_type = next(
+            (media_type for media_type in (EVENT_STREAM_MEDIA_TYPE, NDJSON_MEDIA_TYPE) if media_type in accept),
+            None
+        )
+        if stream_media_type:
+            events = audio_cache_service.stream_segments(
+                text=tts_request.text,
+                sentences=tts_request.sentences,
+                voice=tts_request.voice,
+                format=tts_request.format
+            )
+
+            # Wait for the first event so early failures become regular error responses
+            first_event = await events.__anext__()
+
+            return StreamingResponse(
+                _resume_event_stream(first_event, events, stream_media_type),
+                media_type=stream_media_type,
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+
         # Try to get from cache or generate new audio
         cache_result = await audio_cache_service.generate_or_get_cached(
             text=tts_request.text,
@@ -247,13 +359,13 @@ async def generate_speech_separated(
         if 'audio_urls' in cache_result:
             # Supabase enabled: Return URLs
             print(f"[TTS] Returning audio URLs (from_cache={cache_result['from_cache']})")
-            return JSONResponse(content={
+            content = {
                 "audio_urls": cache_result['audio_urls'],
                 "durations": cache_result['durations'],
                 "total_duration": cache_result['total_duration'],
                 "from_cache": cache_result['from_cache'],
                 "format": tts_request.format
-            })
+            }
         else:
             # Supabase disabled: Fallback to binary blobs (backward compatibility)
             print(f"[TTS] Supabase not configured, returning base64 blobs")
@@ -264,11 +376,19 @@ async def generate_speech_separated(
                 }
                 for blob, duration in zip(cache_result['audio_blobs'], cache_result['durations'])
             ]
-            return JSONResponse(content={
+            content = {
                 "audio_segments": audio_segments,
                 "total_duration": cache_result['total_duration'],
                 "format": tts_request.format
-            })
+            }
+
+        # Generation stats (freshly generated audio only): sentence-level cache
+        # hit ratio and upstream TTS calls saved by that cache, de-duplication and batching
+        for key in ('sentence_hit_ratio', 'upstream_calls_saved'):
+            if key in cache_result:
+                content[key] = cache_result[key]
+
+        return JSONResponse(content=content)
 
     except TTSGenerationError as e:
         import traceback
@@ -294,3 +414,54 @@ async def generate_speech_separated(
                 "message": f"Internal server error: {str(e)}"
             }
         )
+
+
+@router.get("/tts-cache-stats")
+async def get_cache_stats():
+    """
+    Audio cache hit/miss counters per tier (memory, disk, supabase)
+
+    Counters are per worker process and reset on restart.
+    """
+    return audio_cache_service.cache_stats()
+
+
+@router.get("/tts-prewarm-stats")
+async def get_prewarm_stats():
+    """
+    Backlog and throughput of cache pre-warming from the materials table
+
+    Throughput counters are for this worker process; the backlog is shared.
+    """
+    if cache_prewarm_service is None:
+        return {"running": False, "backlog": None}
+    return await cache_prewarm_service.stats()
+
+
+@router.get("/tts-cache-files/{path:path}")
+async def get_cache_file(path: str):
+    """
+    Cached audio of the sqlite and memory cache backends
+
+    Their segment URLs point here (settings.cache_files_base_url); Supabase
+    serves its own from Storage. Files are content-addressed, so they can be
+    cached indefinitely.
+    """
+    backend = audio_cache_service.backend
+    try:
+        data = await backend.get_blob(path) if backend is not None else None
+    except ValueError:  # Path outside the store
+        data = None
+
+    if data is None:
+        raise HTTPException(
+            status_code=404,
+            detail={"error": ERROR_NOT_FOUND, "message": "Cached audio not found"}
+        )
+
+    extension = path.rsplit(".", 1)[-1]
+    return Response(
+        content=data,
+        media_type=MEDIA_TYPES.get(extension, "application/octet-stream"),
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
@@ -44,10 +44,65 @@ class Settings(BaseSettings):
     # Rate Limiting
     rate_limit_per_hour: int = 100
 
+    # OCR
+    ocr_page_concurrency: int = 4  # Max pages of one multi-page request sent to Gemini at once
+    ocr_cache_memory_mb: int = 8  # In-process LRU of OCR results (0 disables)
+    ocr_cache_dir: str = ".cache/ocr"  # On-disk store of OCR results
+    ocr_cache_disk_mb: int = 64  # Disk budget, least recently used results evicted (0 disables)
+    ocr_cache_shared: bool = True  # Also share results through the cache backend (ocr_cache table)
+    ocr_near_duplicate_threshold: float = 0.2  # Retakes of a page within this fraction of differing hash bits reuse its result (0 disables)
+    ocr_near_duplicate_hash_size: int = 16  # Perceptual page hash grid (2 * size^2 bits)
+    ocr_near_duplicate_index_size: int = 10_000  # Page hashes kept per worker for near-duplicate lookup
+
+    # TTS Generation
+    tts_max_concurrency: int = 4  # Max in-flight OpenAI TTS requests per process
+    tts_compressed_splicing: bool = False  # Join mp3/opus without decode/re-encode
+    tts_chunk_max_chars: int = 4000  # Long text is split into chunks (OpenAI limit: 4096)
+    tts_sentence_batching: bool = False  # Synthesize runs of short sentences in one call
+    tts_batch_max_chars: int = 40  # Sentences up to this length can be batched
+    tts_batch_max_sentences: int = 6  # Max sentences per batched call
+
+    # Local Audio Cache (in front of Supabase; also used without it)
+    local_cache_memory_mb: int = 64  # In-process LRU for metadata and short clips (0 disables)
+    local_cache_memory_max_item_kb: int = 256  # Larger clips skip the memory tier
+    local_cache_dir: str = ".cache/tts"  # On-disk store
+    local_cache_disk_mb: int = 1024  # Disk budget, least recently used files evicted (0 disables)
+    local_cache_metadata_ttl_seconds: int = 300  # Local copies of shared-cache URLs expire (eviction waits this long before deleting files)
+    cache_lease_ttl_seconds: int = 120  # Generation lease lifetime (taken over after a crash)
+    cache_lease_wait_seconds: int = 60  # Max wait for another worker's generation
+    storage_upload_concurrency: int = 8  # Max parallel shared-cache file uploads per process
+    access_stats_flush_seconds: float = 30  # How often buffered cache hit counts are written
+    cache_legacy_key_lookup: bool = True  # Also look up (and migrate) pre-canonicalization keys
+    cache_filter_capacity: int = 100_000  # Known-document Bloom filter size (grows with the table)
+    cache_filter_error_rate: float = 0.01  # Target false-positive rate
+    cache_filter_refresh_seconds: int = 600  # Rebuild period (picks up other workers' inserts)
+
+    # Shared Audio Cache Backend
+    cache_backend: str = "supabase"  # supabase, sqlite (workers on one host), memory (one process) or none
+    cache_store_dir: str = ".cache/tts-store"  # sqlite backend: database and audio files
+    cache_files_base_url: str = "/api/tts-cache-files"  # sqlite/memory backends: URL prefix audio is served under
+
+    # Shared Audio Cache Eviction
+    cache_budget_mb: int = 0  # Total audio_cache.file_size_bytes to keep (0 disables eviction)
+    cache_eviction_interval_seconds: int = 3600  # Background eviction period, one worker per period (0: CLI only; keep above LOCAL_CACHE_METADATA_TTL_SECONDS)
+    cache_eviction_half_life_hours: float = 72  # Recency half-life of the LRU/LFU eviction score
+    cache_eviction_batch_size: int = 100  # Rows / storage objects per delete request
+    cache_gc_grace_seconds: int = 3600  # Min age before a sentence no document uses is collected
+
+    # Audio Cache Pre-warming (generate audio for materials before the first play)
+    prewarm_interval_seconds: int = 0  # Pause between passes over materials (0: CLI only)
+    prewarm_chars_per_minute: int = 20_000  # TTS budget shared by all pre-warming (characters)
+    prewarm_batch_size: int = 20  # Materials fetched per query
+    prewarm_voice: str = "nova"  # Voice and format the app requests by default
+    prewarm_format: str = "mp3"
+    prewarm_checkpoint_path: str = ".cache/prewarm-checkpoint.json"  # Resume point of the current pass
+
     # Image Processing
     max_image_size_mb: int = 10
     max_image_dimension: int = 2000
     image_quality: int = 85
+    image_crop_to_text: bool = True  # Crop page photos to the text region before OCR
+    image_deskew: bool = False  # Also straighten small rotations (+-5 degrees) of the text
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -10,9 +10,63 @@ OPENAI_TTS_VOICE = "nova"
 OPENAI_TTS_SPEED = 1.0
 OPENAI_TTS_FORMAT = "mp3"  # Changed from opus due to ffmpeg compatibility
 
+# Gemini API (OCR)
+GEMINI_OCR_MODEL = "gemini-2.5-flash"
+OCR_PROMPT_VERSION = 1  # Bump when the OCR prompt or response parsing changes (invalidates cached results)
+
+# Decoded PCM layout (OpenAI TTS outputs 24kHz mono)
+TTS_SAMPLE_RATE = 24000
+TTS_CHANNELS = 1
+TTS_SAMPLE_WIDTH = 2  # 16-bit
+TTS_SENTENCE_GAP_MS = 200  # Silence inserted between sentences in combined audio
+
+# Sentence batching (short sentences synthesized in one call, split on silence)
+TTS_BATCH_MIN_SILENCE_MS = 150  # Shortest pause treated as a sentence boundary
+TTS_BATCH_SILENCE_THRESH_DB = 16  # Silence = quieter than the batch's average by this much
+TTS_BATCH_EDGE_SILENCE_MS = 50  # Silence kept at each end of a split clip
+TTS_BATCH_DURATION_TOLERANCE = 2.0  # Max ratio between a clip's actual and expected length
+
+# Audio cache generation lease (cross-worker de-duplication)
+CACHE_LEASE_POLL_SECONDS = 0.5  # How often a waiting worker re-checks the cache
+CACHE_EVICTION_LEASE_KEY = "cache-eviction"  # Lease held by the worker running background eviction
+
+# Audio cache key format (bump to stop matching keys built by older code)
+CACHE_KEY_VERSION = 2
+
+# Shared audio cache storage
+AUDIO_BUCKET = "audio-files"  # Supabase Storage bucket (public) holding cached audio
+CACHE_SCAN_PAGE_SIZE = 1000  # Rows per request when scanning cache tables (filter load, eviction)
+
+# Audio cache pre-warming
+PREWARM_LEASE_KEY = "prewarm:materials"  # audio_cache_leases key held by the worker that pre-warms
+PREWARM_BURST_SECONDS = 10  # Budget that can be saved up while idle (seconds of the rate)
+
 # Image Processing
 SUPPORTED_IMAGE_TYPES = ["image/jpeg", "image/png"]
 IMAGE_COMPRESSION_FORMAT = "JPEG"
+IMAGE_GRAYSCALE_SAMPLE_SIZE = 128  # Side of the thumbnail the colour check looks at
+IMAGE_GRAYSCALE_MAX_CHROMA = 24  # Max channel spread (0-255) of a grey pixel (JPEG noise, tinted paper)
+IMAGE_GRAYSCALE_MAX_COLOR_RATIO = 0.01  # Pages with more coloured pixels than this stay in colour
+
+# Page cropping (text region detection before OCR)
+PAGE_CROP_ANALYSIS_SIZE = 400  # Longer side of the downsampled analysis image (px)
+PAGE_CROP_BLOCK_SIZE = 8  # Side of the blocks edge density is measured in (analysis px)
+PAGE_CROP_MIN_GRADIENT = 3.0  # Min mean |dx| and |dy| (0-255) of a text block
+PAGE_CROP_MIN_PROFILE = 0.15  # Rows/columns with fewer text blocks than this fraction of the peak are ignored
+PAGE_CROP_MIN_TEXT_AREA = 0.01  # Fewer text blocks than this fraction: don't trust the region
+PAGE_CROP_PADDING = 0.02  # Padding around the text region (fraction of width/height)
+PAGE_CROP_MIN_SAVING = 0.1  # Skip crops that remove less than this fraction of the pixels
+DESKEW_MAX_ANGLE = 5.0  # Largest rotation deskew corrects (degrees)
+DESKEW_ANGLE_STEP = 0.5  # Search resolution (degrees)
+DESKEW_MIN_ANGLE = 0.5  # Smaller estimated skews are left alone
+
+# Perceptual page hash (near-duplicate detection of page photos)
+PAGE_HASH_WORKING_SIZE = 1000  # Longer side the photo is reduced to before hashing (px)
+PAGE_HASH_BLUR_RADIUS = 10  # Neighbourhood ink is compared against (working px)
+PAGE_HASH_INK_CONTRAST = 24  # Ink is darker than its neighbourhood by this much (0-255)
+PAGE_HASH_MAX_INK = 0.5  # Rows/columns with more ink than this fraction are edges or shadows, not text
+PAGE_HASH_MIN_INK_PROFILE = 0.3  # Rows/columns with less ink than this fraction of the peak are trimmed
+PAGE_HASH_LINE_BLUR = 0.015  # Blur radius before hashing (fraction of the text height)
 
 # Response Times (seconds)
 OCR_TIMEOUT = 30
@@ -26,3 +80,4 @@ ERROR_OCR_FAILED = "ocr_failed"
 ERROR_TTS_FAILED = "tts_failed"
 ERROR_RATE_LIMIT = "rate_limit_exceeded"
 ERROR_INTERNAL = "internal_error"
+ERROR_NOT_FOUND = "not_found"
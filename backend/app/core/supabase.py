@@ -8,7 +8,7 @@ Supabase統合モジュール
 """
 
 from typing import Optional
-from supabase import create_client, Client
+from supabase import create_client, acreate_client, Client, AsyncClient
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.core.config import settings
@@ -27,6 +27,11 @@ supabase_admin: Optional[Client] = None
 # 匿名キーはRLS制限が適用される、クライアント側でも使用可能
 supabase_anon: Optional[Client] = None
 
+# Supabaseクライアント（サービスロール、非同期）
+# 非同期ルートからイベントループをブロックせずに使用する
+# acreate_client はコルーチンのため、初回利用時に生成（get_supabase_admin_async）
+supabase_admin_async: Optional[AsyncClient] = None
+
 # 環境変数のチェックと初期化
 if SUPABASE_URL and SUPABASE_SERVICE_KEY:
     supabase_admin = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
@@ -138,6 +143,29 @@ def get_supabase_admin() -> Client:
     return supabase_admin
 
 
+async def get_supabase_admin_async() -> AsyncClient:
+    """
+    Supabase管理クライアント（非同期版）を取得（RLS無視）
+
+    使用例:
+    supabase = await get_supabase_admin_async()
+    result = await supabase.table("materials").select("*").execute()
+    """
+    global supabase_admin_async
+
+    if not is_supabase_configured():
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Supabaseが設定されていません",
+        )
+
+    if supabase_admin_async is None:
+        supabase_admin_async = await acreate_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+        print("[OK] Supabase async admin client initialized")
+
+    return supabase_admin_async
+
+
 def get_supabase_anon() -> Client:
     """
     Supabase匿名クライアントを取得（RLS適用）
@@ -177,3 +205,25 @@ def get_storage_bucket(bucket_name: str):
             detail="Supabaseが設定されていません",
         )
     return supabase_admin.storage.from_(bucket_name)
+
+
+def get_public_url(bucket_name: str, path: str) -> str:
+    """
+    公開バケット内のファイルの公開URLを組み立てる（通信なし）
+
+    使用例:
+    url = get_public_url("audio-files", "cache/sentences/abc.mp3")
+    """
+    return f"{SUPABASE_URL.rstrip('/')}/storage/v1/object/public/{bucket_name}/{path}"
+
+
+async def get_storage_bucket_async(bucket_name: str):
+    """
+    Supabase Storageバケットを取得（非同期版）
+
+    使用例:
+    bucket = await get_storage_bucket_async("audio-files")
+    await bucket.upload("file.mp3", file_data)
+    """
+    supabase = await get_supabase_admin_async()
+    return supabase.storage.from_(bucket_name)
@@ -1,4 +1,7 @@
 """FastAPI application entry point"""
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import Limiter, _rate_limit_exceeded_handler
@@ -7,16 +10,39 @@ from slowapi.errors import RateLimitExceeded
 
 from app.core.config import settings
 from app.api.routes import ocr, tts
+from app.services.cache_eviction_service import build_cache_eviction_service
 
 # Initialize rate limiter
 limiter = Limiter(key_func=get_remote_address)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Background cache maintenance: access statistics (also flushed on shutdown), known-document filter, eviction, pre-warming"""
+    backend = tts.audio_cache_service.backend
+    tasks = [asyncio.create_task(tts.audio_cache_service.run_access_stats_flusher())]
+    if backend is not None:
+        tasks.append(asyncio.create_task(tts.audio_cache_service.run_known_documents_refresher()))
+    if settings.cache_budget_mb > 0 and settings.cache_eviction_interval_seconds > 0 and backend is not None:
+        eviction = build_cache_eviction_service(backend, local_cache=tts.audio_cache_service.local_cache)
+        tasks.append(asyncio.create_task(eviction.run_periodically(settings.cache_eviction_interval_seconds)))
+    if settings.prewarm_interval_seconds > 0 and tts.cache_prewarm_service is not None:
+        tasks.append(asyncio.create_task(tts.cache_prewarm_service.run_periodically(settings.prewarm_interval_seconds)))
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        await tts.audio_cache_service.flush_access_stats()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="TTS API",
     description="OCR and Text-to-Speech API",
     version="0.1.0",
     debug=settings.debug,
+    lifespan=lifespan,
 )
 
 # Add rate limiter to app state
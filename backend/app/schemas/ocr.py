@@ -74,6 +74,14 @@ class OCRResponse(BaseModel):
         default=1,
         description="Number of pages processed"
     )
+    from_cache: bool = Field(
+        default=False,
+        description="Whether every page was served from the OCR cache (no Gemini call)"
+    )
+    cached_pages: int = Field(
+        default=0,
+        description="Number of pages served from the OCR cache"
+    )
 
 
 class OCRErrorResponse(BaseModel):
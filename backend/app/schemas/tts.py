@@ -23,6 +23,10 @@ class TTSRequest(BaseModel):
         default=None,
         description="Optional list of sentences for precise timing (from OCR)"
     )
+    stream: bool = Field(
+        default=False,
+        description="Stream audio chunks as they are synthesized (/api/tts only)"
+    )
 
 
 class SentenceTiming(BaseModel):
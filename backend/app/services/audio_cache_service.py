@@ -1,19 +1,185 @@
-"""音声キャッシュサービス（Supabase Storage統合）"""
-from typing import List, Optional, Dict, Any
+"""音声キャッシュサービス（共有キャッシュはSupabase・SQLite等のバックエンド）"""
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple
+import asyncio
+import base64
+import functools
 import hashlib
 import os
+import socket
+import time
 from datetime import datetime
-from app.core.supabase import get_supabase_admin, get_storage_bucket, is_supabase_configured
+from app.core.config import settings
+from app.core.constants import (
+    OPENAI_TTS_MODEL,
+    OPENAI_TTS_SPEED,
+    CACHE_LEASE_POLL_SECONDS,
+    CACHE_KEY_VERSION,
+)
+from app.services.cache_backends import build_cache_backend
 from app.services.openai_service import OpenAIService
+from app.utils.audio_probe import get_audio_duration_us
+from app.utils.bloom_filter import BloomFilter
+from app.utils.local_cache import CacheTier, DiskCache, MemoryLRUCache, TieredCache
+from app.utils.single_flight import SingleFlight
+from app.utils.text_canonical import CANONICALIZATION_VERSION, canonicalize_text
+
+
+# アップロード並列数の制限（イベントループごと）
+_upload_semaphore: Optional[asyncio.Semaphore] = None
+_upload_semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_upload_semaphore() -> asyncio.Semaphore:
+    """プロセス内の同時アップロード数を制限するセマフォを取得"""
+    global _upload_semaphore, _upload_semaphore_loop
+
+    loop = asyncio.get_running_loop()
+    if _upload_semaphore is None or _upload_semaphore_loop is not loop:
+        _upload_semaphore = asyncio.Semaphore(settings.storage_upload_concurrency)
+        _upload_semaphore_loop = loop
+    return _upload_semaphore
+
+
+def build_local_cache() -> TieredCache:
+    """
+    設定からローカルキャッシュ（メモリLRU → ディスク）を構築
+
+    容量0のティアは無効
+    """
+    tiers: List[CacheTier] = []
+    if settings.local_cache_memory_mb > 0:
+        tiers.append(MemoryLRUCache(
+            max_bytes=settings.local_cache_memory_mb * 1024 * 1024,
+            max_item_bytes=settings.local_cache_memory_max_item_kb * 1024
+        ))
+    if settings.local_cache_disk_mb > 0:
+        tiers.append(DiskCache(
+            directory=settings.local_cache_dir,
+            max_bytes=settings.local_cache_disk_mb * 1024 * 1024
+        ))
+    return TieredCache(tiers)
 
 
 class AudioCacheService:
-    """音声キャッシュサービス（全ユーザー共有でコスト削減）"""
+    """
+    音声キャッシュサービス（全ユーザー共有でコスト削減）
+
+    2段階のキャッシュ:
+    - 教材単位（audio_cache）: 全文・文分割が完全一致した場合の高速パス
+    - 文単位（sentence_audio_cache）: 文ごとの音声。誤字修正や別教材で
+      同じ文が出てきた場合も、変わっていない文は再生成しない
+
+    共有キャッシュ（メタデータと音声ファイル）はbackend（Supabase・
+    SQLite+ファイル・メモリ、settings.cache_backendで選択）に保存する。
+    その前にプロセスローカルのキャッシュ（メモリLRU → ディスク）を置く。
+    ローカルキャッシュには文ごとの音声そのものも保存するため、共有
+    キャッシュなしでもキャッシュが効く。
+
+    ローカルキャッシュのキー:
+    - doc:{cache_key}: 教材単位のメタデータ（URL・長さ）
+    - sentence:{sentence_hash}: 文単位のメタデータ（URL・長さ・サイズ）
+    - clip:{sentence_hash}: 文の音声バイナリ
+
+    共有キャッシュのURLを持つエントリは settings.local_cache_metadata_ttl_seconds
+    で期限切れになる（他ワーカーがキャッシュ削除したURLを返し続けない）。
+
+    同じ教材への同時リクエストは1回の生成にまとめる（プロセス内は
+    実行中の生成を共有、ワーカー間は生成リースで調整）。
+
+    ヒット時のアクセス統計（access_count, last_accessed_at）はメモリに
+    溜めて定期的にまとめて書き込む（応答は書き込みを待たない）。
+
+    キャッシュキーは正規化したテキストから作る（Unicode正規化・空白・
+    引用符の違いで別キャッシュにしない）。正規化前の旧キーで登録された
+    エントリはヒット時に新キーへ移行する。
+
+    登録済みtext_hashのBloomフィルタを持ち、確実にミスする教材は
+    audio_cacheを問い合わせない。フィルタは起動時に全件読み込み、
+    登録時に追加し、定期的に作り直す（他ワーカーの登録・削除を反映）。
+    """
 
     def __init__(self):
         """Initialize audio cache service"""
         self.openai_service = OpenAIService()
-        self.supabase_configured = is_supabase_configured()
+        self.backend = build_cache_backend()  # 共有キャッシュ（Noneならローカルのみ）
+        self.local_cache = build_local_cache()
+        self.shared_hits = 0
+        self.shared_misses = 0
+        # 登録済みtext_hashのBloomフィルタ（読み込み前はNone = 常に問い合わせる）
+        self._known_documents: Optional[BloomFilter] = None
+        self._known_documents_added: Optional[List[str]] = None  # 再読み込み中の登録分
+        self.filter_skips = 0  # フィルタで問い合わせを省略した回数
+        self.filter_false_positives = 0  # フィルタを通過したがミスだった回数
+        self.canonicalized_requests = 0  # 正規化でテキストが変わったリクエスト数
+        self.canonicalized_hits = 0  # そのうち教材単位キャッシュにヒットした数
+        self.legacy_hits = 0  # 旧キーでヒットした数（新キーへ移行済み）
+        self._single_flight = SingleFlight()
+        self._lease_owner = f"{socket.gethostname()}:{os.getpid()}"
+        # 未書き込みのアクセス統計 {text_hash: [ヒット数, 最終アクセス日時]}
+        self._pending_access: Dict[str, List[Any]] = {}
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """ティアごとのヒット/ミス数（メモリ → ディスク → 共有キャッシュ（バックエンド名））"""
+        stats = self.local_cache.stats()
+        if self.backend is not None:
+            stats[self.backend.name] = {'hits': self.shared_hits, 'misses': self.shared_misses}
+        if self._known_documents is not None:
+            # 実測の誤検出率: 存在しない教材のうちフィルタを通過した割合
+            absent = self.filter_skips + self.filter_false_positives
+            stats['filter'] = {
+                **self._known_documents.stats(),
+                'skips': self.filter_skips,
+                'false_positives': self.filter_false_positives,
+                'measured_false_positive_rate': self.filter_false_positives / absent if absent else 0.0
+            }
+        stats['keys'] = {
+            'version': f"{CACHE_KEY_VERSION}.{CANONICALIZATION_VERSION}",
+            'canonicalized_requests': self.canonicalized_requests,
+            'canonicalized_hits': self.canonicalized_hits,
+            'legacy_hits': self.legacy_hits
+        }
+        return stats
+
+    async def load_known_documents(self) -> int:
+        """
+        audio_cacheのtext_hashを全件読み込み、Bloomフィルタを作り直す
+
+        読み込み完了後に差し替える（読み込み中は旧フィルタを使う）。
+
+        Returns:
+            読み込んだ件数
+        """
+        self._known_documents_added = []
+        try:
+            hashes = await self.backend.list_document_hashes()
+
+            known = BloomFilter(
+                capacity=max(settings.cache_filter_capacity, 2 * len(hashes)),
+                error_rate=settings.cache_filter_error_rate
+            )
+            for text_hash in hashes + self._known_documents_added:
+                known.add(text_hash)
+            self._known_documents = known
+            return len(hashes)
+        finally:
+            self._known_documents_added = None
+
+    async def run_known_documents_refresher(self) -> None:
+        """起動時にフィルタを読み込み、settings.cache_filter_refresh_seconds ごとに作り直す（キャンセルまで）"""
+        while True:
+            try:
+                count = await self.load_known_documents()
+                print(f"[AudioCache] Bloomフィルタ読み込み: {count}件 ({self._known_documents.memory_bytes} bytes)")
+            except Exception as e:
+                print(f"[AudioCache] Bloomフィルタ読み込みエラー: {e}")
+            await asyncio.sleep(settings.cache_filter_refresh_seconds)
+
+    def _note_known_document(self, cache_key: str) -> None:
+        """登録したtext_hashをフィルタに追加"""
+        if self._known_documents is not None:
+            self._known_documents.add(cache_key)
+        if self._known_documents_added is not None:
+            self._known_documents_added.append(cache_key)
 
     def generate_cache_key(
         self,
@@ -25,6 +191,9 @@ class AudioCacheService:
         """
         キャッシュキー生成（SHA-256ハッシュ）
 
+        テキストは正規化してからハッシュする。キー形式・正規化の
+        バージョンとTTSモデル・速度も含める
+
         Args:
             text: 全文テキスト
             sentences: 文の配列
@@ -34,18 +203,68 @@ class AudioCacheService:
         Returns:
             SHA-256ハッシュ（64文字）
         """
-        # キャッシュキー = SHA-256(text + sentences + voice + format)
         # sentencesも含めることで、同じtextでも文分割が異なる場合は別キャッシュとする
+        sentences_str = '||'.join(canonicalize_text(sentence) for sentence in sentences)
+        data = (
+            f"v{CACHE_KEY_VERSION}.{CANONICALIZATION_VERSION}||{canonicalize_text(text)}||{sentences_str}"
+            f"||{voice}||{format}||{OPENAI_TTS_MODEL}||{OPENAI_TTS_SPEED}"
+        )
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def _legacy_cache_key(self, text: str, sentences: List[str], voice: str, format: str) -> str:
+        """旧形式の教材キャッシュキー（正規化なし、モデル・速度なし）"""
         sentences_str = '||'.join(sentences)
         data = f"{text}||{sentences_str}||{voice}||{format}"
         return hashlib.sha256(data.encode('utf-8')).hexdigest()
 
+    def generate_sentence_cache_key(
+        self,
+        sentence: str,
+        voice: str,
+        format: str
+    ) -> str:
+        """
+        文単位のキャッシュキー生成（SHA-256ハッシュ）
+
+        モデル・速度も含めることで、TTS設定の変更後に古い音声を返さない
+
+        Args:
+            sentence: 文
+            voice: 音声
+            format: 音声形式
+
+        Returns:
+            SHA-256ハッシュ（64文字）
+        """
+        data = (
+            f"v{CACHE_KEY_VERSION}.{CANONICALIZATION_VERSION}||{canonicalize_text(sentence)}"
+            f"||{voice}||{format}||{OPENAI_TTS_MODEL}||{OPENAI_TTS_SPEED}"
+        )
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def _legacy_sentence_keys(self, sentences: List[str], voice: str, format: str) -> Dict[str, str]:
+        """
+        旧形式の文単位キャッシュキー（正規化なし）
+
+        Returns:
+            {新キー: 旧キー}（旧キー検索が無効なら空）
+        """
+        if not settings.cache_legacy_key_lookup:
+            return {}
+        legacy_keys = {}
+        for sentence in sentences:
+            data = f"{sentence}||{voice}||{format}||{OPENAI_TTS_MODEL}||{OPENAI_TTS_SPEED}"
+            legacy_key = hashlib.sha256(data.encode('utf-8')).hexdigest()
+            legacy_keys.setdefault(self.generate_sentence_cache_key(sentence, voice, format), legacy_key)
+        return legacy_keys
+
     async def get_cached_audio(
         self,
         text: str,
         sentences: List[str],
         voice: str,
-        format: str
+        format: str,
+        use_filter: bool = True
     ) -> Optional[Dict[str, Any]]:
         """
         キャッシュ検索
@@ -55,6 +274,8 @@ class AudioCacheService:
             sentences: 文の配列
             voice: 音声
             format: 音声形式
+            use_filter: Bloomフィルタで問い合わせを省略するか（他ワーカーの
+                登録を待つ場合はFalse: その登録はまだフィルタにない）
 
         Returns:
             キャッシュヒット時: {
@@ -65,123 +286,481 @@ class AudioCacheService:
             }
             キャッシュミス時: None
         """
-        if not self.supabase_configured:
+        cache_key = self.generate_cache_key(text, sentences, voice, format)
+        canonicalized = (
+            canonicalize_text(text) != text
+            or any(canonicalize_text(sentence) != sentence for sentence in sentences)
+        )
+        if canonicalized:
+            self.canonicalized_requests += 1
+
+        cached_data = await self._lookup_document(cache_key, use_filter)
+
+        if cached_data is None and settings.cache_legacy_key_lookup:
+            # 正規化前の旧キーで登録された教材 → 新キーへ移行
+            legacy_key = self._legacy_cache_key(text, sentences, voice, format)
+            cached_data = await self._lookup_document(legacy_key, use_filter, count_misses=False)
+            if cached_data is not None:
+                self.legacy_hits += 1
+                await self._migrate_document_key(legacy_key, cache_key, cached_data)
+
+        if cached_data is None:
             return None
 
-        try:
-            cache_key = self.generate_cache_key(text, sentences, voice, format)
-            supabase = get_supabase_admin()
-
-            # audio_cacheテーブルから検索
-            response = supabase.table('audio_cache') \
-                .select('*') \
-                .eq('text_hash', cache_key) \
-                .single() \
-                .execute()
-
-            if response.data:
-                # キャッシュヒット
-                cache_data = response.data
-
-                # アクセスカウント更新
-                supabase.table('audio_cache') \
-                    .update({
-                        'access_count': cache_data['access_count'] + 1,
-                        'last_accessed_at': datetime.utcnow().isoformat()
-                    }) \
-                    .eq('id', cache_data['id']) \
-                    .execute()
+        # アクセスカウント更新（後でまとめて書き込む）
+        self._record_access(cache_key)
+        if canonicalized:
+            self.canonicalized_hits += 1
+        return cached_data
 
-                return {
-                    'segment_urls': cache_data['segment_urls'],
-                    'durations': cache_data['durations'],
-                    'total_duration': cache_data['total_duration'],
-                    'sentences': cache_data['sentences']
-                }
+    async def _lookup_document(
+        self,
+        cache_key: str,
+        use_filter: bool,
+        count_misses: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """教材単位キャッシュをキーで検索（ローカル → Bloomフィルタ → 共有キャッシュ）"""
+        # ローカルキャッシュ（メモリ → ディスク）
+        local_data = await asyncio.to_thread(self.local_cache.get_json, f"doc:{cache_key}")
+        if local_data and not self._local_entry_expired(local_data):
+            local_data.pop('cached_at', None)
+            return local_data
+
+        if self.backend is None:
+            return None
 
+        # Bloomフィルタにない → 確実に未登録（問い合わせない）
+        filtered = use_filter and self._known_documents is not None
+        if filtered and cache_key not in self._known_documents:
+            if count_misses:
+                self.filter_skips += 1
+                self.shared_misses += 1
             return None
+
+        try:
+            cache_data = await self.backend.get_document(cache_key)
         except Exception as e:
+            if count_misses:
+                self._count_document_miss(filtered)
             print(f"[AudioCache] キャッシュ検索エラー: {e}")
             return None
 
-    async def save_to_cache(
+        if cache_data is None:
+            if count_misses:
+                self._count_document_miss(filtered)
+            return None
+
+        # キャッシュヒット
+        self.shared_hits += 1
+        return await self._cache_document_locally(
+            cache_key,
+            cache_data['segment_urls'],
+            cache_data['durations'],
+            cache_data['total_duration'],
+            cache_data['sentences']
+        )
+
+    async def _migrate_document_key(self, legacy_key: str, cache_key: str, cache_data: Dict[str, Any]) -> None:
+        """
+        旧キーの教材を新キーへ移行（audio_cacheの行はtext_hashを書き換える）
+
+        行のid・アクセス統計・materialsからの参照はそのまま。新キーの行が
+        既にある場合（他ワーカーが生成済み）は何もしない
+        """
+        await self._cache_document_locally(
+            cache_key,
+            cache_data['segment_urls'],
+            cache_data['durations'],
+            cache_data['total_duration'],
+            cache_data['sentences']
+        )
+        if self.backend is None:
+            return
+
+        try:
+            await self.backend.rename_document(legacy_key, cache_key)
+            self._note_known_document(cache_key)
+        except Exception as e:
+            print(f"[AudioCache] キャッシュキー移行エラー: {e}")
+
+    def _count_document_miss(self, filtered: bool) -> None:
+        """共有キャッシュのミスを記録（フィルタを通過していれば誤検出）"""
+        self.shared_misses += 1
+        if filtered:
+            self.filter_false_positives += 1
+
+    def _record_access(self, cache_key: str) -> None:
+        """教材単位キャッシュのヒットを記録（書き込みはflush_access_statsで）"""
+        pending = self._pending_access.setdefault(cache_key, [0, None])
+        pending[0] += 1
+        pending[1] = datetime.utcnow().isoformat()
+
+    async def flush_access_stats(self) -> int:
+        """
+        溜まったアクセス統計をaudio_cacheにまとめて書き込む
+
+        全教材分を1回の書き込みで加算する（読み取り→書き込みではないので
+        並行ワーカーでも正確）。失敗した分は次回に持ち越す。
+
+        Returns:
+            書き込んだ教材数
+        """
+        if not self._pending_access:
+            return 0
+
+        pending, self._pending_access = self._pending_access, {}
+        if self.backend is None:
+            return 0
+
+        try:
+            await self.backend.increment_access(
+                list(pending.keys()),
+                [count for count, _ in pending.values()],
+                [accessed_at for _, accessed_at in pending.values()]
+            )
+            return len(pending)
+        except Exception as e:
+            print(f"[AudioCache] アクセス統計の書き込みエラー（次回に再試行）: {e}")
+            for cache_key, (count, accessed_at) in pending.items():
+                current = self._pending_access.setdefault(cache_key, [0, accessed_at])
+                current[0] += count
+                current[1] = max(current[1], accessed_at)
+            return 0
+
+    async def run_access_stats_flusher(self) -> None:
+        """settings.access_stats_flush_seconds ごとにアクセス統計を書き込む（キャンセルまで）"""
+        while True:
+            await asyncio.sleep(settings.access_stats_flush_seconds)
+            await self.flush_access_stats()
+
+    @staticmethod
+    async def _measure_duration(audio_bytes: bytes, format: str) -> float:
+        """
+        音声の長さ（秒）を測定
+
+        ヘッダー解析に失敗するとffmpegでデコードする（ブロッキング）ため別スレッドで実行。
+        測定できない場合は0.0（OpenAIService._get_audio_durationと同じ）。
+        """
+        try:
+            return (await asyncio.to_thread(get_audio_duration_us, audio_bytes, format)) / 1_000_000
+        except Exception as e:
+            print(f"[AudioCache] 音声長の測定エラー: {e}")
+            return 0.0
+
+    async def _cache_document_locally(
         self,
-        text: str,
-        sentences: List[str],
-        voice: str,
-        format: str,
-        audio_blobs: List[bytes],
+        cache_key: str,
+        segment_urls: List[str],
         durations: List[float],
-        total_duration: float
-    ) -> bool:
+        total_duration: float,
+        sentences: List[str]
+    ) -> Dict[str, Any]:
+        """教材単位のメタデータをローカルキャッシュに保存し、そのまま返す"""
+        cache_data = {
+            'segment_urls': segment_urls,
+            'durations': durations,
+            'total_duration': total_duration,
+            'sentences': sentences
+        }
+        await asyncio.to_thread(self.local_cache.set_json, f"doc:{cache_key}", {**cache_data, 'cached_at': time.time()})
+        return cache_data
+
+    @staticmethod
+    def _local_entry_expired(entry: Dict[str, Any]) -> bool:
         """
-        音声をSupabase Storageに保存し、キャッシュに登録
+        共有キャッシュのURLを持つローカルエントリの期限切れ判定
+
+        他ワーカーのキャッシュ削除（cache_eviction_service）はこのワーカーの
+        メモリ層を消せないため、URLは settings.local_cache_metadata_ttl_seconds
+        で期限切れにして共有キャッシュに問い合わせ直す（削除側はこの時間だけ
+        待ってからファイルを消す）。
+        """
+        return time.time() - entry.get('cached_at', 0) >= settings.local_cache_metadata_ttl_seconds
+
+    async def get_cached_sentences(
+        self,
+        sentence_keys: List[str],
+        legacy_keys: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        文単位キャッシュ検索（ローカル → 共有キャッシュ、共有キャッシュは1クエリでまとめて検索）
+
+        旧キーも同じクエリで検索し、ヒットした旧キーの行は新キーへ移行する
 
         Args:
-            text: 全文テキスト
-            sentences: 文の配列
+            sentence_keys: 文単位キャッシュキーの配列（重複可）
+            legacy_keys: {新キー: 旧キー}（_legacy_sentence_keys）
+
+        Returns:
+            ヒットした文のみ {sentence_hash: {'audio_url': str または None,
+                                              'duration': float, 'size': int,
+                                              'audio': bytes（ローカルのみのとき）}}
+        """
+        unique_keys = list(dict.fromkeys(sentence_keys))
+        cached_sentences = await asyncio.to_thread(self._get_local_sentences, unique_keys)
+
+        remaining = [key for key in unique_keys if key not in cached_sentences]
+        # 旧キー → 新キー（新キーと同じ旧キーは除く）
+        renames = {
+            legacy_keys[key]: key
+            for key in remaining
+            if legacy_keys and legacy_keys.get(key, key) != key
+        }
+        if self.backend is None or not remaining:
+            return cached_sentences
+
+        try:
+            rows = await self.backend.get_sentences(remaining + list(renames))
+
+            remote_sentences = {}
+            migrated = {}
+            for row in rows:
+                sentence_key = renames.get(row['sentence_hash'], row['sentence_hash'])
+                if row['sentence_hash'] in renames:
+                    if sentence_key in remote_sentences:
+                        continue  # 新キーの行が優先
+                    migrated[row['sentence_hash']] = sentence_key
+                remote_sentences[sentence_key] = {
+                    'audio_url': row['audio_url'],
+                    'duration': row['duration'],
+                    'size': row['file_size_bytes']
+                }
+            self.shared_hits += len(remote_sentences)
+            self.shared_misses += len(remaining) - len(remote_sentences)
+
+            await asyncio.to_thread(self._set_local_sentences, remote_sentences)
+            cached_sentences.update(remote_sentences)
+            if migrated:
+                self.legacy_hits += len(migrated)
+                await self._migrate_sentence_keys(migrated)
+        except Exception as e:
+            self.shared_misses += len(remaining)
+            print(f"[AudioCache] 文キャッシュ検索エラー: {e}")
+
+        return cached_sentences
+
+    async def _migrate_sentence_keys(self, renames: Dict[str, str]) -> None:
+        """旧キーの文単位キャッシュ行のsentence_hashを新キーに書き換える（音声ファイルはそのまま）"""
+        results = await asyncio.gather(*(
+            self.backend.rename_sentence(legacy_key, sentence_key)
+            for legacy_key, sentence_key in renames.items()
+        ), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                # 新キーの行が既にある場合など（旧キーの行は残り、いずれ削除される）
+                print(f"[AudioCache] 文キャッシュキー移行エラー: {result}")
+
+    def _get_local_sentences(self, sentence_keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """ローカルキャッシュから文単位のエントリを取得（URLがなければ音声も）"""
+        cached_sentences = {}
+        for sentence_key in sentence_keys:
+            cached = self.local_cache.get_json(f"sentence:{sentence_key}")
+            if cached is None:
+                continue
+            if cached.get('audio_url'):
+                if self._local_entry_expired(cached):
+                    continue  # 共有キャッシュで確認し直す
+                cached.pop('cached_at', None)
+            else:
+                audio = self.local_cache.get(f"clip:{sentence_key}")
+                if audio is None:
+                    continue
+                cached['audio'] = audio
+            cached_sentences[sentence_key] = cached
+        return cached_sentences
+
+    def _set_local_sentences(
+        self,
+        sentences: Dict[str, Dict[str, Any]],
+        audio_by_key: Optional[Dict[str, bytes]] = None
+    ) -> None:
+        """文単位のメタデータ（と音声）をローカルキャッシュに保存"""
+        for sentence_key, cached in sentences.items():
+            entry = {
+                'audio_url': cached.get('audio_url'),
+                'duration': cached['duration'],
+                'size': cached['size']
+            }
+            if entry['audio_url']:
+                entry['cached_at'] = time.time()
+            self.local_cache.set_json(f"sentence:{sentence_key}", entry)
+            if audio_by_key and sentence_key in audio_by_key:
+                self.local_cache.set(f"clip:{sentence_key}", audio_by_key[sentence_key])
+
+    async def _save_sentences(
+        self,
+        new_sentences: Dict[str, Tuple[str, bytes, float]],
+        voice: str,
+        format: str
+    ) -> Dict[str, str]:
+        """
+        文ごとの音声をアップロードし、文単位キャッシュに登録
+
+        アップロードは並列（プロセス全体でsettings.storage_upload_concurrency件まで）。
+        1件でも失敗したら残りは中止する。
+
+        Args:
+            new_sentences: {sentence_hash: (文, 音声バイナリ, 長さ（秒）)}
             voice: 音声
             format: 音声形式
-            audio_blobs: 音声バイナリ配列
-            durations: 各文の長さ（秒）
-            total_duration: 合計長さ（秒）
 
         Returns:
-            保存成功: True
-            保存失敗: False
+            {sentence_hash: 公開URL}
         """
-        if not self.supabase_configured:
-            return False
-
+        tasks = [
+            asyncio.create_task(self._save_sentence(
+                sentence_key, sentence, audio_blob, duration, voice, format
+            ))
+            for sentence_key, (sentence, audio_blob, duration) in new_sentences.items()
+        ]
         try:
-            cache_key = self.generate_cache_key(text, sentences, voice, format)
-            supabase = get_supabase_admin()
-            bucket = get_storage_bucket('audio-files')
-
-            # Supabase Storageに各文の音声をアップロード
-            segment_urls = []
-            total_size = 0
-
-            for i, audio_blob in enumerate(audio_blobs):
-                # ファイル名: {cache_key}_segment_{i}.{format}
-                file_path = f"cache/{cache_key}_segment_{i}.{format}"
-
-                # Supabase Storageにアップロード
-                bucket.upload(
-                    file_path,
-                    audio_blob,
-                    file_options={
-                        "content-type": f"audio/{format}",
-                        "cache-control": "max-age=31536000"  # 1年間キャッシュ
-                    }
-                )
+            urls = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        return dict(zip(new_sentences.keys(), urls))
+
+    async def _save_sentence(
+        self,
+        sentence_key: str,
+        sentence: str,
+        audio_blob: bytes,
+        duration: float,
+        voice: str,
+        format: str
+    ) -> str:
+        """
+        1文の音声をアップロードし、文単位キャッシュに登録
+
+        Returns:
+            公開URL
+        """
+        public_url = await self._upload_sentence(sentence_key, audio_blob, format)
+
+        # 同じ文を別リクエストが同時に登録した場合は先勝ち（内容は同一）
+        await self.backend.insert_sentence({
+            'sentence_hash': sentence_key,
+            'sentence': sentence,
+            'voice': voice,
+            'format': format,
+            'audio_url': public_url,
+            'duration': duration,
+            'file_size_bytes': len(audio_blob),
+            'created_at': datetime.utcnow().isoformat()
+        })
+
+        await asyncio.to_thread(self._set_local_sentences, {
+            sentence_key: {'audio_url': public_url, 'duration': duration, 'size': len(audio_blob)}
+        })
+        return public_url
+
+    async def _upload_sentence(
+        self,
+        sentence_key: str,
+        audio_blob: bytes,
+        format: str
+    ) -> str:
+        """
+        1文の音声を共有キャッシュにアップロードし、公開URLを返す
+
+        Args:
+            sentence_key: 文単位キャッシュキー
+            audio_blob: 音声バイナリ
+            format: 音声形式
 
-                # 公開URL取得
-                public_url = bucket.get_public_url(file_path)
-                segment_urls.append(public_url)
-                total_size += len(audio_blob)
-
-            # audio_cacheテーブルに保存
-            supabase.table('audio_cache').insert({
-                'text_hash': cache_key,
-                'segment_urls': segment_urls,
-                'durations': durations,
-                'sentences': sentences,
-                'format': format,
-                'voice': voice,
-                'total_duration': total_duration,
-                'file_size_bytes': total_size,
-                'access_count': 1,
-                'created_at': datetime.utcnow().isoformat(),
-                'last_accessed_at': datetime.utcnow().isoformat()
-            }).execute()
-
-            print(f"[AudioCache] キャッシュ保存成功: {cache_key} ({len(segment_urls)} segments, {total_size} bytes)")
+        Returns:
+            公開URL
+        """
+        # ファイル名: sentences/{sentence_hash}.{format}（内容アドレス指定）
+        file_path = f"cache/sentences/{sentence_key}.{format}"
+
+        # アップロード（同じ文は同じ内容なので上書き可）
+        async with _get_upload_semaphore():
+            return await self.backend.put_blob(file_path, audio_blob, f"audio/{format}")
+
+    async def _acquire_lease(self, cache_key: str) -> bool:
+        """
+        教材の生成リースを取得（他ワーカーが生成中ならFalse）
+
+        共有キャッシュがあればそのリース（audio_cache_leases）、なければ
+        ローカルキャッシュ（同じディレクトリを共有するワーカー間）で調整する。
+        期限切れのリース（保持者の異常終了）は引き継ぐ。リース操作自体が
+        失敗した場合は生成を止めない（True）。
+        """
+        ttl = settings.cache_lease_ttl_seconds
+        if self.backend is None:
+            return await asyncio.to_thread(self.local_cache.try_lease, f"doc:{cache_key}", ttl)
+
+        try:
+            return await self.backend.try_lease(cache_key, self._lease_owner, ttl)
+        except Exception as e:
+            print(f"[AudioCache] リース取得エラー（リースなしで生成）: {e}")
             return True
 
+    async def _release_lease(self, cache_key: str) -> None:
+        """教材の生成リースを解放"""
+        if self.backend is None:
+            await asyncio.to_thread(self.local_cache.release_lease, f"doc:{cache_key}")
+            return
+
+        try:
+            await self.backend.release_lease(cache_key, self._lease_owner)
         except Exception as e:
-            print(f"[AudioCache] キャッシュ保存エラー: {e}")
-            return False
+            # 解放できなくても期限切れで引き継がれる
+            print(f"[AudioCache] リース解放エラー: {e}")
+
+    async def _insert_cache_row(
+        self,
+        cache_key: str,
+        sentences: List[str],
+        voice: str,
+        format: str,
+        segment_urls: List[str],
+        durations: List[float],
+        total_duration: float,
+        total_size: int
+    ) -> None:
+        """audio_cacheテーブルにキャッシュ情報を登録（他ワーカーが登録済みなら何もしない）"""
+        await self.backend.insert_document({
+            'text_hash': cache_key,
+            'segment_urls': segment_urls,
+            'durations': durations,
+            'sentences': sentences,
+            'format': format,
+            'voice': voice,
+            'total_duration': total_duration,
+            'file_size_bytes': total_size,
+            'access_count': 1,
+            'created_at': datetime.utcnow().isoformat(),
+            'last_accessed_at': datetime.utcnow().isoformat()
+        })
+        self._note_known_document(cache_key)
+
+    def _missing_sentences(
+        self,
+        sentences: List[str],
+        sentence_keys: List[str],
+        cached_sentences: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, str]:
+        """
+        文単位キャッシュにない文（重複は1つにまとめる、出現順）
+
+        Returns:
+            {sentence_hash: 文}
+        """
+        missing = {}
+        for sentence_key, sentence in zip(sentence_keys, sentences):
+            if sentence_key not in cached_sentences:
+                missing.setdefault(sentence_key, sentence)
+        return missing
+
+    def _sentence_hit_ratio(self, sentence_keys: List[str], cached_sentences: Dict[str, Dict[str, Any]]) -> float:
+        """文単位キャッシュのヒット率（文の出現数ベース）を計算してログ出力"""
+        hits = sum(1 for sentence_key in sentence_keys if sentence_key in cached_sentences)
+        hit_ratio = hits / len(sentence_keys) if sentence_keys else 0.0
+        print(f"[AudioCache] 文キャッシュ: {hits}/{len(sentence_keys)} ヒット ({hit_ratio:.0%})")
+        return hit_ratio
 
     async def generate_or_get_cached(
         self,
@@ -193,6 +772,9 @@ class AudioCacheService:
         """
         キャッシュ検索 → ヒット時は返却、ミス時は生成して保存
 
+        教材単位でミスした場合も、文単位キャッシュにある文は再利用し、
+        ない文だけを生成する（同じ文が複数回出てきても生成は1回）
+
         Args:
             text: 全文テキスト
             sentences: 文の配列
@@ -202,10 +784,12 @@ class AudioCacheService:
         Returns:
             {
                 'from_cache': bool,  # キャッシュヒット時True
-                'audio_urls': [...],  # 音声URL配列（Supabase Storage）
+                'audio_urls': [...],  # 音声URL配列（共有キャッシュ）
                 'durations': [...],
                 'total_duration': float,
-                'sentences': [...]
+                'sentences': [...],
+                'sentence_hit_ratio': float,  # 生成時のみ（文単位キャッシュのヒット率）
+                'upstream_calls_saved': int  # 生成時のみ（文キャッシュ・重複・短文バッチで節約したTTS呼び出し数）
             }
         """
         # 1. キャッシュ検索
@@ -213,54 +797,334 @@ class AudioCacheService:
 
         if cached_data:
             # キャッシュヒット
-            return {
-                'from_cache': True,
-                'audio_urls': cached_data['segment_urls'],
-                'durations': cached_data['durations'],
-                'total_duration': cached_data['total_duration'],
-                'sentences': cached_data['sentences']
-            }
+            return self._cache_hit_result(cached_data)
+
+        # 2. 同じ教材の同時リクエストは1回の生成にまとめる
+        cache_key = self.generate_cache_key(text, sentences, voice, format)
+        return await self._single_flight.run(
+            f"doc:{cache_key}",
+            functools.partial(self._generate_with_lease, text, sentences, voice, format, cache_key)
+        )
+
+    def _cache_hit_result(self, cached_data: Dict[str, Any]) -> Dict[str, Any]:
+        """教材単位キャッシュのヒットをgenerate_or_get_cachedの戻り値に変換"""
+        return {
+            'from_cache': True,
+            'audio_urls': cached_data['segment_urls'],
+            'durations': cached_data['durations'],
+            'total_duration': cached_data['total_duration'],
+            'sentences': cached_data['sentences']
+        }
+
+    async def _generate_with_lease(
+        self,
+        text: str,
+        sentences: List[str],
+        voice: str,
+        format: str,
+        cache_key: str
+    ) -> Dict[str, Any]:
+        """
+        生成リースを取得して生成する（ワーカー間の重複生成を防ぐ）
 
-        # 2. キャッシュミス → OpenAI TTS生成
-        print(f"[AudioCache] キャッシュミス → TTS生成開始")
+        他ワーカーがリースを保持している間は、キャッシュ登録されるまで
+        ポーリングで待つ。待ち時間が上限を超えたら自分で生成する。
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.cache_lease_wait_seconds
+        waited = False
 
-        # 文ごとにTTS生成（既存のOpenAIService使用）
-        audio_blobs = []
-        durations = []
+        while not await self._acquire_lease(cache_key):
+            # 他ワーカーが生成中 → 完了（キャッシュ登録）を待つ
+            if loop.time() >= deadline:
+                print(f"[AudioCache] リース待ちタイムアウト → 生成: {cache_key}")
+                return await self._generate_and_cache(text, sentences, voice, format)
 
-        for sentence in sentences:
-            audio_bytes = self.openai_service.generate_speech(sentence, voice, format)
-            audio_blobs.append(audio_bytes)
+            waited = True
+            await asyncio.sleep(CACHE_LEASE_POLL_SECONDS)
+            cached_data = await self.get_cached_audio(text, sentences, voice, format, use_filter=False)
+            if cached_data:
+                return self._cache_hit_result(cached_data)
+
+        try:
+            if waited:
+                # リース解放の直前に他ワーカーがキャッシュ登録している場合
+                cached_data = await self.get_cached_audio(text, sentences, voice, format, use_filter=False)
+                if cached_data:
+                    return self._cache_hit_result(cached_data)
 
-            # 長さ測定（pydub使用）
-            # FIXME: pydubで正確な長さ測定（現在は概算）
-            # 仮: mp3形式で128kbps想定 → 約16KB/秒
-            duration_estimate = len(audio_bytes) / (16 * 1024)
-            durations.append(duration_estimate)
+            return await self._generate_and_cache(text, sentences, voice, format)
+        finally:
+            await self._release_lease(cache_key)
 
+    async def _generate_and_cache(
+        self,
+        text: str,
+        sentences: List[str],
+        voice: str,
+        format: str
+    ) -> Dict[str, Any]:
+        """
+        教材単位でミスした教材を文単位キャッシュから組み立て、足りない文を生成して保存
+
+        Returns:
+            generate_or_get_cachedと同じ形式
+        """
+        # 2. 教材単位でミス → 文単位キャッシュ検索
+        sentence_keys = [self.generate_sentence_cache_key(sentence, voice, format) for sentence in sentences]
+        cached_sentences = await self.get_cached_sentences(
+            sentence_keys, self._legacy_sentence_keys(sentences, voice, format)
+        )
+        sentence_hit_ratio = self._sentence_hit_ratio(sentence_keys, cached_sentences)
+
+        # 3. ミスした文だけOpenAI TTS生成（並列、設定時は短文をまとめて1回で生成）
+        missing = self._missing_sentences(sentences, sentence_keys, cached_sentences)
+        print(f"[AudioCache] キャッシュミス → TTS生成開始（{len(missing)}文）")
+
+        # ローカルキャッシュのヒット分は音声そのものがある
+        audio_by_key: Dict[str, bytes] = {
+            key: cached['audio'] for key, cached in cached_sentences.items() if 'audio' in cached
+        }
+        upstream_calls = 0
+        if missing:
+            audio_blobs, upstream_calls = await self.openai_service.synthesize_sentences_batched_async(
+                list(missing.values()), voice, format
+            )
+            audio_by_key.update(zip(missing.keys(), audio_blobs))
+        upstream_calls_saved = len(sentences) - upstream_calls
+
+        # 長さ測定（ヘッダー解析、失敗時のみffmpegでデコード）
+        duration_by_key = {key: cached['duration'] for key, cached in cached_sentences.items()}
+        measured = await asyncio.gather(*(
+            self._measure_duration(audio_by_key[sentence_key], format) for sentence_key in missing
+        ))
+        duration_by_key.update(zip(missing.keys(), measured))
+
+        durations = [duration_by_key[key] for key in sentence_keys]
         total_duration = sum(durations)
 
-        # 3. Supabaseキャッシュに保存
-        await self.save_to_cache(text, sentences, voice, format, audio_blobs, durations, total_duration)
+        # 生成した文はローカルキャッシュに保存（共有キャッシュなしでも再利用できる）
+        await asyncio.to_thread(self._set_local_sentences, {
+            key: {'duration': duration_by_key[key], 'size': len(audio_by_key[key])} for key in missing
+        }, audio_by_key)
+
+        # 4. URLのない文を共有キャッシュの文単位キャッシュに保存し、教材単位キャッシュにも登録
+        sentence_urls = {key: cached['audio_url'] for key, cached in cached_sentences.items() if cached.get('audio_url')}
+        if self.backend is not None:
+            try:
+                new_sentences = {
+                    key: (sentence, audio_by_key[key], duration_by_key[key])
+                    for key, sentence in zip(sentence_keys, sentences)
+                    if key not in sentence_urls
+                }
+                sentence_urls.update(await self._save_sentences(new_sentences, voice, format))
+
+                segment_urls = [sentence_urls[key] for key in sentence_keys]
+                sizes = {key: cached['size'] for key, cached in cached_sentences.items()}
+                sizes.update({key: len(audio_bytes) for key, audio_bytes in audio_by_key.items()})
+                total_size = sum(sizes[key] or 0 for key in sentence_keys)
+
+                cache_key = self.generate_cache_key(text, sentences, voice, format)
+                await self._insert_cache_row(
+                    cache_key, sentences, voice, format,
+                    segment_urls, durations, total_duration, total_size
+                )
+                await self._cache_document_locally(cache_key, segment_urls, durations, total_duration, sentences)
+                print(f"[AudioCache] キャッシュ保存成功: {cache_key} ({len(segment_urls)} segments, {total_size} bytes)")
+
+                return {
+                    'from_cache': not missing,  # 全文がキャッシュ済みならTrue
+                    'audio_urls': segment_urls,
+                    'durations': durations,
+                    'total_duration': total_duration,
+                    'sentences': sentences,
+                    'sentence_hit_ratio': sentence_hit_ratio,
+                    'upstream_calls_saved': upstream_calls_saved
+                }
+            except Exception as e:
+                print(f"[AudioCache] キャッシュ保存エラー: {e}")
+
+        # フォールバック（キャッシュ保存失敗時）
+        # 共有キャッシュなしの時は、バイナリを直接返す（後方互換性）
+        # 共有キャッシュのみにある文（URLのみ）は、その文も生成する
+        absent = {key: sentence for key, sentence in zip(sentence_keys, sentences) if key not in audio_by_key}
+        if absent:
+            audio_blobs = await self.openai_service.synthesize_sentences_async(list(absent.values()), voice, format)
+            audio_by_key.update(zip(absent.keys(), audio_blobs))
+
+        return {
+            'from_cache': not missing,
+            'audio_blobs': [audio_by_key[key] for key in sentence_keys],  # バイナリデータ
+            'durations': durations,
+            'total_duration': total_duration,
+            'sentences': sentences,
+            'sentence_hit_ratio': sentence_hit_ratio,
+            'upstream_calls_saved': upstream_calls_saved
+        }
+
+    async def stream_segments(
+        self,
+        text: str,
+        sentences: List[str],
+        voice: str,
+        format: str
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        文ごとの音声を準備でき次第返す（SSE/NDJSON配信用）
+
+        キャッシュヒット時は全文を順番に即時返却。ミス時は文単位キャッシュに
+        ある文を即時返却し、残りの文を並列に生成（＋共有キャッシュがあれば
+        アップロード）して完了順に返す。同じ文は1回だけ生成する。
+        全文そろったら教材単位キャッシュに登録する。
 
-        # 4. 保存後、公開URLを再取得（キャッシュから）
+        Args:
+            text: 全文テキスト
+            sentences: 文の配列
+            voice: 音声
+            format: 音声形式
+
+        Yields:
+            {'event': 'segment', 'index': int, 'duration': float,
+             'audio_url': str または 'audio_data': base64}（完了順）
+            最後に {'event': 'done', 'from_cache': bool, 'durations': [...],
+                    'total_duration': float, 'count': int, 'format': str,
+                    'sentence_hit_ratio': float（生成時のみ）}
+
+        Raises:
+            TTSGenerationError: TTS生成失敗時（残りの生成はキャンセル）
+        """
+        # 1. キャッシュ検索
         cached_data = await self.get_cached_audio(text, sentences, voice, format)
 
         if cached_data:
-            return {
-                'from_cache': False,  # 初回生成
-                'audio_urls': cached_data['segment_urls'],
+            for i, (url, duration) in enumerate(zip(cached_data['segment_urls'], cached_data['durations'])):
+                yield {'event': 'segment', 'index': i, 'duration': duration, 'audio_url': url}
+            yield {
+                'event': 'done',
+                'from_cache': True,
                 'durations': cached_data['durations'],
                 'total_duration': cached_data['total_duration'],
-                'sentences': cached_data['sentences']
+                'count': len(cached_data['segment_urls']),
+                'format': format
             }
+            return
 
-        # フォールバック（キャッシュ保存失敗時）
-        # Supabase未設定時は、バイナリを直接返す（後方互換性）
-        return {
+        # 2. 教材単位でミス → 文単位キャッシュ検索
+        sentence_keys = [self.generate_sentence_cache_key(sentence, voice, format) for sentence in sentences]
+        cached_sentences = await self.get_cached_sentences(
+            sentence_keys, self._legacy_sentence_keys(sentences, voice, format)
+        )
+        sentence_hit_ratio = self._sentence_hit_ratio(sentence_keys, cached_sentences)
+
+        # 3. 残りの文を1回ずつ並列に生成開始
+        missing = self._missing_sentences(sentences, sentence_keys, cached_sentences)
+        print(f"[AudioCache] キャッシュミス → TTS生成開始（ストリーミング、{len(missing)}文）")
+
+        cache_key = self.generate_cache_key(text, sentences, voice, format)
+        upload = self.backend is not None
+
+        # 同じ文を生成中の他リクエストがあれば、その生成を共有する
+        tasks = [
+            asyncio.create_task(self._single_flight.run(
+                f"sentence:{sentence_key}",
+                functools.partial(self._prepare_segment, sentence_key, sentence, voice, format, upload)
+            ))
+            for sentence_key, sentence in missing.items()
+        ]
+        durations = [0.0] * len(sentences)
+        segment_urls: List[Optional[str]] = [None] * len(sentences)
+        sizes: Dict[str, int] = {}
+
+        try:
+            # 文単位キャッシュのヒット分は即時返却
+            for i, sentence_key in enumerate(sentence_keys):
+                cached = cached_sentences.get(sentence_key)
+                if not cached:
+                    continue
+                durations[i] = cached['duration']
+                segment_urls[i] = cached.get('audio_url')
+                sizes[sentence_key] = cached['size'] or 0
+                if segment_urls[i]:
+                    yield {'event': 'segment', 'index': i, 'duration': cached['duration'], 'audio_url': segment_urls[i]}
+                else:
+                    # ローカルキャッシュのみ（共有キャッシュなしの時など）
+                    audio_data = base64.b64encode(cached['audio']).decode('utf-8')
+                    yield {'event': 'segment', 'index': i, 'duration': cached['duration'], 'audio_data': audio_data}
+
+            # 生成分は完了順に返す（同じ文はまとめて）
+            for next_done in asyncio.as_completed(tasks):
+                sentence_key, segment, size = await next_done
+                sizes[sentence_key] = size
+                for i, key in enumerate(sentence_keys):
+                    if key == sentence_key:
+                        durations[i] = segment['duration']
+                        segment_urls[i] = segment.get('audio_url')
+                        yield {'event': 'segment', 'index': i, **segment}
+        finally:
+            # 失敗時・クライアント切断時は残りの生成を中止
+            # （他タスクの例外は未取得警告を出さないよう回収のみ）
+            for task in tasks:
+                task.cancel()
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+        total_duration = sum(durations)
+
+        # 4. 全文アップロード済みならキャッシュ登録
+        if self.backend is not None and all(segment_urls):
+            try:
+                total_size = sum(sizes[key] for key in sentence_keys)
+                await self._insert_cache_row(
+                    cache_key, sentences, voice, format,
+                    segment_urls, durations, total_duration, total_size
+                )
+                await self._cache_document_locally(cache_key, segment_urls, durations, total_duration, sentences)
+                print(f"[AudioCache] キャッシュ保存成功: {cache_key} ({len(segment_urls)} segments, {total_size} bytes)")
+            except Exception as e:
+                print(f"[AudioCache] キャッシュ保存エラー: {e}")
+
+        yield {
+            'event': 'done',
             'from_cache': False,
-            'audio_blobs': audio_blobs,  # バイナリデータ
             'durations': durations,
             'total_duration': total_duration,
-            'sentences': sentences
+            'count': len(sentences),
+            'format': format,
+            'sentence_hit_ratio': sentence_hit_ratio
         }
+
+    async def _prepare_segment(
+        self,
+        sentence_key: str,
+        sentence: str,
+        voice: str,
+        format: str,
+        upload: bool
+    ) -> tuple:
+        """
+        1文の音声を生成し、長さ測定・文単位キャッシュへの保存（またはbase64化）する
+
+        Returns:
+            (sentence_hash, segmentイベント用の辞書（indexなし）, 音声サイズ)
+        """
+        audio_bytes = await self.openai_service.generate_speech_async(sentence, voice, format)
+        segment = {
+            'duration': await self._measure_duration(audio_bytes, format)
+        }
+
+        # ローカルキャッシュに保存（共有キャッシュなしでも再利用できる）
+        await asyncio.to_thread(self._set_local_sentences, {
+            sentence_key: {'duration': segment['duration'], 'size': len(audio_bytes)}
+        }, {sentence_key: audio_bytes})
+
+        if upload:
+            try:
+                segment['audio_url'] = await self._save_sentence(
+                    sentence_key, sentence, audio_bytes, segment['duration'], voice, format
+                )
+                return sentence_key, segment, len(audio_bytes)
+            except Exception as e:
+                # アップロード失敗時はこの文だけbase64で返す（キャッシュ登録はしない）
+                print(f"[AudioCache] アップロードエラー（{sentence_key[:8]}）: {e}")
+
+        segment['audio_data'] = base64.b64encode(audio_bytes).decode('utf-8')
+        return sentence_key, segment, len(audio_bytes)
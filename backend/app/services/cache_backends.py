@@ -0,0 +1,816 @@
+"""
+Storage backends for the shared audio cache
+
+The shared cache is document metadata (audio_cache), sentence metadata
+(sentence_audio_cache), generation leases (audio_cache_leases) and the audio
+files themselves, plus OCR results (ocr_cache). CacheBackend is what
+AudioCacheService, OCRCacheService and the eviction job talk to;
+settings.cache_backend picks the implementation:
+
+- supabase: Postgres tables and the public audio-files bucket (default)
+- sqlite: a SQLite database in WAL mode plus files in settings.cache_store_dir,
+  shared by the workers of one host; files are served by /api/tts-cache-files
+- memory: dicts in this process (tests, single-worker development)
+- none: no shared cache (local tiers only)
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from postgrest.exceptions import APIError
+from postgrest.types import CountMethod
+
+from app.core.config import settings
+from app.core.constants import AUDIO_BUCKET, CACHE_SCAN_PAGE_SIZE
+from app.core.supabase import (
+    get_supabase_admin_async,
+    get_storage_bucket_async,
+    get_public_url,
+    is_supabase_configured,
+)
+
+
+def object_path(url: str) -> Optional[str]:
+    """Storage object path of a public audio URL (None if the URL is not in the bucket)"""
+    marker = f"/object/public/{AUDIO_BUCKET}/"
+    if not url or marker not in url:
+        return None
+    return url.split(marker, 1)[1].split("?", 1)[0]
+
+
+class EvictionBackend(ABC):
+    """
+    Tables and storage the eviction job reads and deletes from
+
+    Abstract methods must be implemented (a subclass missing one can't be
+    instantiated); the others have defaults.
+    """
+
+    @abstractmethod
+    async def list_documents(self) -> List[Dict[str, Any]]:
+        """audio_cache rows: id, text_hash, segment_urls, file_size_bytes, access_count, last_accessed_at"""
+
+    @abstractmethod
+    async def referenced_document_ids(self) -> Set[str]:
+        """audio_cache ids referenced by materials"""
+
+    @abstractmethod
+    async def list_sentences(self) -> List[Dict[str, Any]]:
+        """sentence_audio_cache rows: sentence_hash, audio_url, created_at"""
+
+    @abstractmethod
+    async def delete_documents(self, ids: List[str]) -> None:
+        """Delete audio_cache rows by id"""
+
+    @abstractmethod
+    async def delete_sentences(self, sentence_hashes: List[str]) -> None:
+        """Delete sentence_audio_cache rows by sentence_hash"""
+
+    @abstractmethod
+    async def delete_objects(self, paths: List[str]) -> None:
+        """Delete files by object path (missing ones are ignored)"""
+
+    def object_path(self, url: str) -> Optional[str]:
+        """Object path of an audio URL this backend handed out (None if it is not one)"""
+        return object_path(url)
+
+    @abstractmethod
+    async def try_lease(self, text_hash: str, owner: str, ttl_seconds: float) -> bool:
+        """
+        Take the lease for text_hash (False while another owner holds an unexpired one)
+
+        Keys are document text hashes (generation) or CACHE_EVICTION_LEASE_KEY.
+        """
+
+    @abstractmethod
+    async def release_lease(self, text_hash: str, owner: str) -> None:
+        """Drop the lease if owner still holds it"""
+
+
+class CacheBackend(EvictionBackend):
+    """
+    Shared audio cache storage
+
+    Rows are dicts with the audio_cache / sentence_audio_cache columns.
+    Inserts never overwrite: when two workers register the same key, the
+    first row wins (the content is the same).
+    """
+
+    # Key of this backend's counters in AudioCacheService.cache_stats()
+    name = ""
+
+    @abstractmethod
+    async def get_document(self, text_hash: str) -> Optional[Dict[str, Any]]:
+        """audio_cache row for text_hash (None if absent)"""
+
+    @abstractmethod
+    async def insert_document(self, row: Dict[str, Any]) -> None:
+        """Insert an audio_cache row unless its text_hash exists"""
+
+    @abstractmethod
+    async def rename_document(self, old_hash: str, new_hash: str) -> None:
+        """Change a row's text_hash (raises if new_hash exists)"""
+
+    @abstractmethod
+    async def list_document_hashes(self) -> List[str]:
+        """Every text_hash in audio_cache"""
+
+    @abstractmethod
+    async def increment_access(self, hashes: List[str], counts: List[int], accessed_times: List[str]) -> None:
+        """Add counts to access_count and advance last_accessed_at, in one write"""
+
+    @abstractmethod
+    async def get_sentences(self, sentence_hashes: List[str]) -> List[Dict[str, Any]]:
+        """sentence_audio_cache rows (sentence_hash, audio_url, duration, file_size_bytes) that exist"""
+
+    @abstractmethod
+    async def insert_sentence(self, row: Dict[str, Any]) -> None:
+        """Insert a sentence_audio_cache row unless its sentence_hash exists"""
+
+    @abstractmethod
+    async def rename_sentence(self, old_hash: str, new_hash: str) -> None:
+        """Change a row's sentence_hash (raises if new_hash exists)"""
+
+    @abstractmethod
+    async def put_blob(self, path: str, data: bytes, content_type: str) -> str:
+        """Store a file (overwriting) and return its public URL"""
+
+    async def get_blob(self, path: str) -> Optional[bytes]:
+        """File contents, for backends whose files this app serves (None if absent or served elsewhere)"""
+        return None
+
+    @abstractmethod
+    async def get_ocr_result(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """ocr_cache row (text, sentences, confidence) for cache_key (None if absent)"""
+
+    @abstractmethod
+    async def insert_ocr_result(self, row: Dict[str, Any]) -> None:
+        """Insert an ocr_cache row unless its cache_key exists"""
+
+    async def list_unlinked_materials(
+        self,
+        limit: int,
+        before: Optional[Tuple[str, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        materials rows without audio (audio_cache_id is null), newest first
+
+        Rows: id, ocr_text, sentences, created_at. before is the (created_at, id)
+        of the previous page's last row. Backends without a materials table
+        have none.
+        """
+        return []
+
+    async def count_unlinked_materials(self) -> int:
+        """Number of materials without audio"""
+        return 0
+
+    async def link_material(self, material_id: str, document_id: str) -> None:
+        """Set a material's audio_cache_id (unless another worker already did; no-op without materials)"""
+
+
+class SupabaseCacheBackend(CacheBackend):
+    """The shared cache in Supabase (tables + audio-files bucket)"""
+
+    name = "supabase"
+
+    async def _select_all(
+        self,
+        table: str,
+        columns: str,
+        order_column: str,
+        filter_column: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Select every row, a page at a time (ordered so pages do not overlap)"""
+        supabase = await get_supabase_admin_async()
+        rows: List[Dict[str, Any]] = []
+        while True:
+            query = supabase.table(table).select(columns)
+            if filter_column:
+                query = query.not_.is_(filter_column, "null")
+            response = await query.order(order_column) \
+                .range(len(rows), len(rows) + CACHE_SCAN_PAGE_SIZE - 1) \
+                .execute()
+            rows.extend(response.data)
+            if len(response.data) < CACHE_SCAN_PAGE_SIZE:
+                return rows
+
+    async def get_document(self, text_hash: str) -> Optional[Dict[str, Any]]:
+        supabase = await get_supabase_admin_async()
+        try:
+            response = await supabase.table("audio_cache") \
+                .select("*") \
+                .eq("text_hash", text_hash) \
+                .single() \
+                .execute()
+        except APIError as e:
+            if e.code == "PGRST116":  # no row
+                return None
+            raise
+        return response.data or None
+
+    async def insert_document(self, row: Dict[str, Any]) -> None:
+        supabase = await get_supabase_admin_async()
+        await supabase.table("audio_cache").upsert(row, on_conflict="text_hash", ignore_duplicates=True).execute()
+
+    async def rename_document(self, old_hash: str, new_hash: str) -> None:
+        supabase = await get_supabase_admin_async()
+        await supabase.table("audio_cache").update({"text_hash": new_hash}).eq("text_hash", old_hash).execute()
+
+    async def list_document_hashes(self) -> List[str]:
+        rows = await self._select_all("audio_cache", "text_hash", "text_hash")
+        return [row["text_hash"] for row in rows]
+
+    async def increment_access(self, hashes: List[str], counts: List[int], accessed_times: List[str]) -> None:
+        # Added in the database (not read-modify-write), so concurrent workers don't lose counts
+        supabase = await get_supabase_admin_async()
+        await supabase.rpc("increment_audio_cache_access", {
+            "hashes": hashes,
+            "counts": counts,
+            "accessed_times": accessed_times
+        }).execute()
+
+    async def get_sentences(self, sentence_hashes: List[str]) -> List[Dict[str, Any]]:
+        supabase = await get_supabase_admin_async()
+        response = await supabase.table("sentence_audio_cache") \
+            .select("sentence_hash, audio_url, duration, file_size_bytes") \
+            .in_("sentence_hash", sentence_hashes) \
+            .execute()
+        return response.data or []
+
+    async def insert_sentence(self, row: Dict[str, Any]) -> None:
+        supabase = await get_supabase_admin_async()
+        await supabase.table("sentence_audio_cache") \
+            .upsert(row, on_conflict="sentence_hash", ignore_duplicates=True) \
+            .execute()
+
+    async def rename_sentence(self, old_hash: str, new_hash: str) -> None:
+        supabase = await get_supabase_admin_async()
+        await supabase.table("sentence_audio_cache") \
+            .update({"sentence_hash": new_hash}) \
+            .eq("sentence_hash", old_hash) \
+            .execute()
+
+    async def put_blob(self, path: str, data: bytes, content_type: str) -> str:
+        bucket = await get_storage_bucket_async(AUDIO_BUCKET)
+        await bucket.upload(
+            path,
+            data,
+            file_options={
+                "content-type": content_type,
+                "cache-control": "max-age=31536000",  # Content-addressed: cache for a year
+                "upsert": "true"
+            }
+        )
+        # Built from the path (no Storage API round trip)
+        return get_public_url(AUDIO_BUCKET, path)
+
+    async def try_lease(self, text_hash: str, owner: str, ttl_seconds: float) -> bool:
+        supabase = await get_supabase_admin_async()
+        now = datetime.utcnow()
+        lease = {
+            "text_hash": text_hash,
+            "owner": owner,
+            "expires_at": (now + timedelta(seconds=ttl_seconds)).isoformat()
+        }
+        try:
+            await supabase.table("audio_cache_leases").insert(lease).execute()
+            return True
+        except APIError as e:
+            if e.code != "23505":  # anything but unique_violation
+                raise
+
+        # Held: take it over only if it has expired (the holder crashed)
+        response = await supabase.table("audio_cache_leases") \
+            .update(lease) \
+            .eq("text_hash", text_hash) \
+            .lt("expires_at", now.isoformat()) \
+            .execute()
+        return bool(response.data)
+
+    async def release_lease(self, text_hash: str, owner: str) -> None:
+        supabase = await get_supabase_admin_async()
+        await supabase.table("audio_cache_leases") \
+            .delete() \
+            .eq("text_hash", text_hash) \
+            .eq("owner", owner) \
+            .execute()
+
+    async def get_ocr_result(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        supabase = await get_supabase_admin_async()
+        response = await supabase.table("ocr_cache") \
+            .select("text, sentences, confidence") \
+            .eq("cache_key", cache_key) \
+            .limit(1) \
+            .execute()
+        return response.data[0] if response.data else None
+
+    async def insert_ocr_result(self, row: Dict[str, Any]) -> None:
+        supabase = await get_supabase_admin_async()
+        await supabase.table("ocr_cache").upsert(row, on_conflict="cache_key", ignore_duplicates=True).execute()
+
+    async def list_unlinked_materials(
+        self,
+        limit: int,
+        before: Optional[Tuple[str, str]] = None
+    ) -> List[Dict[str, Any]]:
+        supabase = await get_supabase_admin_async()
+        query = supabase.table("materials") \
+            .select("id, ocr_text, sentences, created_at") \
+            .is_("audio_cache_id", "null")
+        if before:
+            # Keyset pagination on (created_at, id); values quoted for PostgREST's filter syntax
+            created_at, material_id = before
+            query = query.or_(
+                f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{material_id})'
+            )
+        response = await query.order("created_at", desc=True) \
+            .order("id", desc=True) \
+            .limit(limit) \
+            .execute()
+        return response.data or []
+
+    async def count_unlinked_materials(self) -> int:
+        supabase = await get_supabase_admin_async()
+        response = await supabase.table("materials") \
+            .select("id", count=CountMethod.exact, head=True) \
+            .is_("audio_cache_id", "null") \
+            .execute()
+        return response.count or 0
+
+    async def link_material(self, material_id: str, document_id: str) -> None:
+        supabase = await get_supabase_admin_async()
+        await supabase.table("materials") \
+            .update({"audio_cache_id": document_id}) \
+            .eq("id", material_id) \
+            .is_("audio_cache_id", "null") \
+            .execute()
+
+    async def list_documents(self) -> List[Dict[str, Any]]:
+        return await self._select_all(
+            "audio_cache", "id, text_hash, segment_urls, file_size_bytes, access_count, last_accessed_at", "id"
+        )
+
+    async def referenced_document_ids(self) -> Set[str]:
+        rows = await self._select_all("materials", "audio_cache_id", "id", filter_column="audio_cache_id")
+        return {row["audio_cache_id"] for row in rows}
+
+    async def list_sentences(self) -> List[Dict[str, Any]]:
+        return await self._select_all("sentence_audio_cache", "sentence_hash, audio_url, created_at", "sentence_hash")
+
+    async def delete_documents(self, ids: List[str]) -> None:
+        supabase = await get_supabase_admin_async()
+        await supabase.table("audio_cache").delete().in_("id", ids).execute()
+
+    async def delete_sentences(self, sentence_hashes: List[str]) -> None:
+        supabase = await get_supabase_admin_async()
+        await supabase.table("sentence_audio_cache").delete().in_("sentence_hash", sentence_hashes).execute()
+
+    async def delete_objects(self, paths: List[str]) -> None:
+        bucket = await get_storage_bucket_async(AUDIO_BUCKET)
+        await bucket.remove(paths)
+
+
+class _LocalFilesMixin:
+    """URLs for files served by this app under base_url"""
+
+    base_url: str
+
+    def _url(self, path: str) -> str:
+        return f"{self.base_url}/{path}"
+
+    def object_path(self, url: str) -> Optional[str]:
+        prefix = f"{self.base_url}/"
+        if not url or not url.startswith(prefix):
+            return None
+        return url[len(prefix):].split("?", 1)[0]
+
+
+def _check_path(path: str) -> str:
+    """Reject object paths that could escape the store (absolute, '..', empty segments)"""
+    parts = path.split("/")
+    if not path or path.startswith("/") or "\\" in path or any(part in ("", ".", "..") for part in parts):
+        raise ValueError(f"Invalid object path: {path!r}")
+    return path
+
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS audio_cache (
+    id TEXT PRIMARY KEY,
+    text_hash TEXT NOT NULL UNIQUE,
+    segment_urls TEXT NOT NULL,
+    durations TEXT NOT NULL,
+    sentences TEXT NOT NULL,
+    format TEXT,
+    voice TEXT,
+    total_duration REAL,
+    file_size_bytes INTEGER,
+    access_count INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT,
+    last_accessed_at TEXT
+);
+CREATE TABLE IF NOT EXISTS sentence_audio_cache (
+    sentence_hash TEXT PRIMARY KEY,
+    sentence TEXT,
+    voice TEXT,
+    format TEXT,
+    audio_url TEXT NOT NULL,
+    duration REAL,
+    file_size_bytes INTEGER,
+    created_at TEXT
+);
+CREATE TABLE IF NOT EXISTS audio_cache_leases (
+    text_hash TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ocr_cache (
+    cache_key TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    sentences TEXT NOT NULL,
+    confidence TEXT NOT NULL,
+    created_at TEXT
+);
+"""
+
+# audio_cache columns holding JSON arrays
+_JSON_COLUMNS = ("segment_urls", "durations", "sentences")
+
+
+class SqliteCacheBackend(_LocalFilesMixin, CacheBackend):
+    """
+    The shared cache in a SQLite database and a directory of files
+
+    Every worker process on the host opens the same database: WAL mode lets
+    readers run alongside the single writer, and writers queue on the busy
+    timeout instead of failing. Lookups go through the text_hash and
+    sentence_hash unique indexes. Each thread keeps its own connection
+    (queries run in worker threads via asyncio.to_thread).
+
+    Files are written to a temporary name and renamed into place, so a
+    reader never sees a partial file.
+
+    Args:
+        directory: Holds cache.db and files/
+        base_url: URL prefix the files are served under
+    """
+
+    name = "sqlite"
+
+    def __init__(self, directory: str, base_url: str):
+        self.directory = directory
+        self.files_dir = os.path.join(directory, "files")
+        self.db_path = os.path.join(directory, "cache.db")
+        self.base_url = base_url.rstrip("/")
+        self._local = threading.local()
+        os.makedirs(self.files_dir, exist_ok=True)
+        conn = self._connection()
+        # Persistent setting of the database file; the first worker to get here switches it
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SQLITE_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit (isolation_level=None): every statement is its own transaction
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")  # Durable at checkpoints; enough for a cache
+            self._local.conn = conn
+        return conn
+
+    async def _run(self, sql: str, params: Any = (), many: bool = False) -> List[Dict[str, Any]]:
+        def run() -> List[Dict[str, Any]]:
+            conn = self._connection()
+            if many:
+                with conn:  # One transaction for the batch
+                    conn.execute("BEGIN")
+                    conn.executemany(sql, params)
+                return []
+            return [dict(row) for row in conn.execute(sql, params).fetchall()]
+        return await asyncio.to_thread(run)
+
+    async def _changes(self, sql: str, params: Any) -> int:
+        """Run one write and return the number of rows it changed"""
+        def run() -> int:
+            return self._connection().execute(sql, params).rowcount
+        return await asyncio.to_thread(run)
+
+    @staticmethod
+    def _decode_document(row: Dict[str, Any]) -> Dict[str, Any]:
+        for column in _JSON_COLUMNS:
+            if column in row:
+                row[column] = json.loads(row[column])
+        return row
+
+    async def get_document(self, text_hash: str) -> Optional[Dict[str, Any]]:
+        rows = await self._run("SELECT * FROM audio_cache WHERE text_hash = ?", (text_hash,))
+        return self._decode_document(rows[0]) if rows else None
+
+    async def insert_document(self, row: Dict[str, Any]) -> None:
+        row = {"id": uuid.uuid4().hex, **row}
+        for column in _JSON_COLUMNS:
+            row[column] = json.dumps(row[column])
+        columns = ", ".join(row)
+        placeholders = ", ".join("?" for _ in row)
+        await self._run(
+            f"INSERT INTO audio_cache ({columns}) VALUES ({placeholders}) ON CONFLICT(text_hash) DO NOTHING",
+            tuple(row.values())
+        )
+
+    async def rename_document(self, old_hash: str, new_hash: str) -> None:
+        await self._run("UPDATE audio_cache SET text_hash = ? WHERE text_hash = ?", (new_hash, old_hash))
+
+    async def list_document_hashes(self) -> List[str]:
+        rows = await self._run("SELECT text_hash FROM audio_cache")
+        return [row["text_hash"] for row in rows]
+
+    async def increment_access(self, hashes: List[str], counts: List[int], accessed_times: List[str]) -> None:
+        await self._run(
+            "UPDATE audio_cache SET access_count = access_count + ?, "
+            "last_accessed_at = MAX(COALESCE(last_accessed_at, ''), ?) WHERE text_hash = ?",
+            list(zip(counts, accessed_times, hashes)),
+            many=True
+        )
+
+    async def get_sentences(self, sentence_hashes: List[str]) -> List[Dict[str, Any]]:
+        if not sentence_hashes:
+            return []
+        placeholders = ", ".join("?" for _ in sentence_hashes)
+        return await self._run(
+            "SELECT sentence_hash, audio_url, duration, file_size_bytes FROM sentence_audio_cache "
+            f"WHERE sentence_hash IN ({placeholders})",
+            tuple(sentence_hashes)
+        )
+
+    async def insert_sentence(self, row: Dict[str, Any]) -> None:
+        columns = ", ".join(row)
+        placeholders = ", ".join("?" for _ in row)
+        await self._run(
+            f"INSERT INTO sentence_audio_cache ({columns}) VALUES ({placeholders}) "
+            "ON CONFLICT(sentence_hash) DO NOTHING",
+            tuple(row.values())
+        )
+
+    async def rename_sentence(self, old_hash: str, new_hash: str) -> None:
+        await self._run(
+            "UPDATE sentence_audio_cache SET sentence_hash = ? WHERE sentence_hash = ?", (new_hash, old_hash)
+        )
+
+    def _file_path(self, path: str) -> str:
+        return os.path.join(self.files_dir, *_check_path(path).split("/"))
+
+    async def put_blob(self, path: str, data: bytes, content_type: str) -> str:
+        file_path = self._file_path(path)
+
+        def write() -> None:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, file_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+        await asyncio.to_thread(write)
+        return self._url(path)
+
+    async def get_blob(self, path: str) -> Optional[bytes]:
+        file_path = self._file_path(path)
+
+        def read() -> Optional[bytes]:
+            try:
+                with open(file_path, "rb") as f:
+                    return f.read()
+            except FileNotFoundError:
+                return None
+
+        return await asyncio.to_thread(read)
+
+    async def try_lease(self, text_hash: str, owner: str, ttl_seconds: float) -> bool:
+        # One statement: insert, or take over only an expired lease (atomic under SQLite's write lock)
+        now = time.time()
+        changed = await self._changes(
+            "INSERT INTO audio_cache_leases (text_hash, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(text_hash) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE audio_cache_leases.expires_at < ?",
+            (text_hash, owner, now + ttl_seconds, now)
+        )
+        return changed > 0
+
+    async def release_lease(self, text_hash: str, owner: str) -> None:
+        await self._run("DELETE FROM audio_cache_leases WHERE text_hash = ? AND owner = ?", (text_hash, owner))
+
+    async def get_ocr_result(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        rows = await self._run(
+            "SELECT text, sentences, confidence FROM ocr_cache WHERE cache_key = ?", (cache_key,)
+        )
+        return self._decode_document(rows[0]) if rows else None
+
+    async def insert_ocr_result(self, row: Dict[str, Any]) -> None:
+        row = {**row, "sentences": json.dumps(row["sentences"])}
+        columns = ", ".join(row)
+        placeholders = ", ".join("?" for _ in row)
+        await self._run(
+            f"INSERT INTO ocr_cache ({columns}) VALUES ({placeholders}) ON CONFLICT(cache_key) DO NOTHING",
+            tuple(row.values())
+        )
+
+    async def list_documents(self) -> List[Dict[str, Any]]:
+        rows = await self._run(
+            "SELECT id, text_hash, segment_urls, file_size_bytes, access_count, last_accessed_at FROM audio_cache"
+        )
+        return [self._decode_document(row) for row in rows]
+
+    async def referenced_document_ids(self) -> Set[str]:
+        # materials live only in Supabase: nothing is pinned here
+        return set()
+
+    async def list_sentences(self) -> List[Dict[str, Any]]:
+        return await self._run("SELECT sentence_hash, audio_url, created_at FROM sentence_audio_cache")
+
+    async def delete_documents(self, ids: List[str]) -> None:
+        await self._run("DELETE FROM audio_cache WHERE id = ?", [(document_id,) for document_id in ids], many=True)
+
+    async def delete_sentences(self, sentence_hashes: List[str]) -> None:
+        await self._run(
+            "DELETE FROM sentence_audio_cache WHERE sentence_hash = ?",
+            [(sentence_hash,) for sentence_hash in sentence_hashes],
+            many=True
+        )
+
+    async def delete_objects(self, paths: List[str]) -> None:
+        def remove() -> None:
+            for path in paths:
+                try:
+                    os.remove(self._file_path(path))
+                except FileNotFoundError:
+                    pass
+        await asyncio.to_thread(remove)
+
+
+class MemoryCacheBackend(_LocalFilesMixin, CacheBackend):
+    """
+    The shared cache in this process's memory (tests, single-worker development)
+
+    Args:
+        base_url: URL prefix the files are served under
+        materials: materials rows (id, ocr_text, sentences, created_at, audio_cache_id)
+    """
+
+    name = "memory"
+
+    def __init__(self, base_url: str = "/api/tts-cache-files", materials: Optional[List[Dict[str, Any]]] = None):
+        self.base_url = base_url.rstrip("/")
+        self.materials = materials or []
+        self.documents: Dict[str, Dict[str, Any]] = {}  # text_hash -> row
+        self.sentences: Dict[str, Dict[str, Any]] = {}  # sentence_hash -> row
+        self.blobs: Dict[str, bytes] = {}
+        self.leases: Dict[str, tuple] = {}  # text_hash -> (owner, expires_at)
+        self.ocr_results: Dict[str, Dict[str, Any]] = {}  # cache_key -> row
+
+    @staticmethod
+    def _rename(rows: Dict[str, Dict[str, Any]], key_column: str, old_key: str, new_key: str) -> None:
+        if old_key not in rows:
+            return
+        if new_key in rows:
+            raise ValueError(f"{key_column} already exists: {new_key}")
+        row = rows.pop(old_key)
+        row[key_column] = new_key
+        rows[new_key] = row
+
+    async def get_document(self, text_hash: str) -> Optional[Dict[str, Any]]:
+        row = self.documents.get(text_hash)
+        return dict(row) if row else None
+
+    async def insert_document(self, row: Dict[str, Any]) -> None:
+        self.documents.setdefault(row["text_hash"], {"id": uuid.uuid4().hex, **row})
+
+    async def rename_document(self, old_hash: str, new_hash: str) -> None:
+        self._rename(self.documents, "text_hash", old_hash, new_hash)
+
+    async def list_document_hashes(self) -> List[str]:
+        return list(self.documents)
+
+    async def increment_access(self, hashes: List[str], counts: List[int], accessed_times: List[str]) -> None:
+        for text_hash, count, accessed_at in zip(hashes, counts, accessed_times):
+            row = self.documents.get(text_hash)
+            if row is not None:
+                row["access_count"] = (row.get("access_count") or 0) + count
+                row["last_accessed_at"] = max(row.get("last_accessed_at") or "", accessed_at)
+
+    async def get_sentences(self, sentence_hashes: List[str]) -> List[Dict[str, Any]]:
+        columns = ("sentence_hash", "audio_url", "duration", "file_size_bytes")
+        return [
+            {column: self.sentences[key].get(column) for column in columns}
+            for key in dict.fromkeys(sentence_hashes) if key in self.sentences
+        ]
+
+    async def insert_sentence(self, row: Dict[str, Any]) -> None:
+        self.sentences.setdefault(row["sentence_hash"], dict(row))
+
+    async def rename_sentence(self, old_hash: str, new_hash: str) -> None:
+        self._rename(self.sentences, "sentence_hash", old_hash, new_hash)
+
+    async def put_blob(self, path: str, data: bytes, content_type: str) -> str:
+        self.blobs[_check_path(path)] = data
+        return self._url(path)
+
+    async def get_blob(self, path: str) -> Optional[bytes]:
+        return self.blobs.get(path)
+
+    async def try_lease(self, text_hash: str, owner: str, ttl_seconds: float) -> bool:
+        now = time.time()
+        held = self.leases.get(text_hash)
+        if held is not None and held[1] >= now:
+            return False
+        self.leases[text_hash] = (owner, now + ttl_seconds)
+        return True
+
+    async def release_lease(self, text_hash: str, owner: str) -> None:
+        if self.leases.get(text_hash, (None,))[0] == owner:
+            del self.leases[text_hash]
+
+    async def get_ocr_result(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        row = self.ocr_results.get(cache_key)
+        return {column: row[column] for column in ("text", "sentences", "confidence")} if row else None
+
+    async def insert_ocr_result(self, row: Dict[str, Any]) -> None:
+        self.ocr_results.setdefault(row["cache_key"], dict(row))
+
+    async def list_unlinked_materials(
+        self,
+        limit: int,
+        before: Optional[Tuple[str, str]] = None
+    ) -> List[Dict[str, Any]]:
+        rows = sorted(
+            (row for row in self.materials if not row.get("audio_cache_id")),
+            key=lambda row: (row["created_at"], row["id"]),
+            reverse=True
+        )
+        if before:
+            rows = [row for row in rows if (row["created_at"], row["id"]) < tuple(before)]
+        return [dict(row) for row in rows[:limit]]
+
+    async def count_unlinked_materials(self) -> int:
+        return sum(1 for row in self.materials if not row.get("audio_cache_id"))
+
+    async def link_material(self, material_id: str, document_id: str) -> None:
+        for row in self.materials:
+            if row["id"] == material_id and not row.get("audio_cache_id"):
+                row["audio_cache_id"] = document_id
+
+    async def list_documents(self) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self.documents.values()]
+
+    async def referenced_document_ids(self) -> Set[str]:
+        return {row["audio_cache_id"] for row in self.materials if row.get("audio_cache_id")}
+
+    async def list_sentences(self) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self.sentences.values()]
+
+    async def delete_documents(self, ids: List[str]) -> None:
+        ids = set(ids)
+        for text_hash in [key for key, row in self.documents.items() if row["id"] in ids]:
+            del self.documents[text_hash]
+
+    async def delete_sentences(self, sentence_hashes: List[str]) -> None:
+        for sentence_hash in sentence_hashes:
+            self.sentences.pop(sentence_hash, None)
+
+    async def delete_objects(self, paths: List[str]) -> None:
+        for path in paths:
+            self.blobs.pop(path, None)
+
+
+def build_cache_backend() -> Optional[CacheBackend]:
+    """
+    Shared cache backend chosen by settings.cache_backend
+
+    Returns:
+        The backend, or None when there is no shared cache ("none", or
+        "supabase" without Supabase credentials)
+
+    Raises:
+        ValueError: Unknown backend name
+    """
+    kind = settings.cache_backend.lower()
+    if kind == "supabase":
+        return SupabaseCacheBackend() if is_supabase_configured() else None
+    if kind == "sqlite":
+        return SqliteCacheBackend(settings.cache_store_dir, settings.cache_files_base_url)
+    if kind == "memory":
+        return MemoryCacheBackend(settings.cache_files_base_url)
+    if kind == "none":
+        return None
+    raise ValueError(f"Unknown cache backend: {settings.cache_backend!r} (supabase, sqlite, memory or none)")
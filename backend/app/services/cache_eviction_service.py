@@ -0,0 +1,365 @@
+"""
+Size-budgeted eviction of the shared audio cache and storage garbage collection
+
+Documents (audio_cache rows) are evicted until their file_size_bytes fit the
+budget, lowest score first. The score mixes recency and frequency: the access
+count decays with a half-life on time since last access, so an entry that was
+popular long ago eventually loses to one used a few times recently. Documents
+referenced by materials.audio_cache_id are never evicted.
+
+Storage objects (and sentence_audio_cache rows) are deleted once no remaining
+document references them and the sentence is older than a grace period: a
+generation running meanwhile may have just reused the sentence (or uploaded
+it, since streaming registers the document after its sentences) and be about
+to register a document that points to it.
+
+Rows are deleted first. Files are deleted only after other workers' local
+copies of the URLs have expired (settings.local_cache_metadata_ttl_seconds),
+and a file that a row registered in the meantime points to is kept. In the
+app, workers take turns through a lease: one eviction per interval.
+
+Runs against the configured cache backend (see cache_backends); only the
+Supabase backend has materials, so elsewhere nothing is pinned.
+
+Usage (from backend/):
+    python -m app.services.cache_eviction_service --dry-run
+    python -m app.services.cache_eviction_service --snapshot cache.json --budget-mb 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.core.constants import CACHE_EVICTION_LEASE_KEY
+from app.services.cache_backends import EvictionBackend, build_cache_backend
+from app.utils.local_cache import TieredCache
+
+
+def eviction_score(access_count: int, last_accessed_at: datetime, now: datetime, half_life_seconds: float) -> float:
+    """
+    LRU/LFU hybrid score (lower is evicted first)
+
+    (1 + access_count), halved for every half-life since the last access
+    """
+    age = max(0.0, (now - last_accessed_at).total_seconds())
+    return (1 + access_count) * 0.5 ** (age / half_life_seconds)
+
+
+def _parse_timestamp(value: Any) -> datetime:
+    """Parse a timestamp column as naive UTC (the tables use TIMESTAMP without time zone)"""
+    if isinstance(value, datetime):
+        parsed = value
+    elif value:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    else:
+        return datetime.min
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+class InMemoryEvictionBackend(EvictionBackend):
+    """
+    Local stand-in backend (tests and dry runs against a snapshot)
+
+    Args:
+        documents: audio_cache rows
+        materials: materials rows (only audio_cache_id is read)
+        sentences: sentence_audio_cache rows
+        objects: Storage object paths in the bucket
+    """
+
+    def __init__(
+        self,
+        documents: List[Dict[str, Any]],
+        materials: Optional[List[Dict[str, Any]]] = None,
+        sentences: Optional[List[Dict[str, Any]]] = None,
+        objects: Optional[List[str]] = None
+    ):
+        self.documents = {row["id"]: row for row in documents}
+        self.materials = materials or []
+        self.sentences = {row["sentence_hash"]: row for row in sentences or []}
+        self.objects = set(objects or [])
+        self.delete_calls: List[tuple] = []
+        self.leases: Dict[str, tuple] = {}  # key -> (owner, expires_at)
+
+    @classmethod
+    def from_snapshot(cls, path: str) -> "InMemoryEvictionBackend":
+        """Load {"documents": [...], "materials": [...], "sentences": [...], "objects": [...]} from JSON"""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("documents", []), data.get("materials"), data.get("sentences"), data.get("objects"))
+
+    async def list_documents(self) -> List[Dict[str, Any]]:
+        return list(self.documents.values())
+
+    async def referenced_document_ids(self) -> Set[str]:
+        return {row["audio_cache_id"] for row in self.materials if row.get("audio_cache_id")}
+
+    async def list_sentences(self) -> List[Dict[str, Any]]:
+        return list(self.sentences.values())
+
+    async def delete_documents(self, ids: List[str]) -> None:
+        self.delete_calls.append(("documents", list(ids)))
+        for document_id in ids:
+            self.documents.pop(document_id, None)
+
+    async def delete_sentences(self, sentence_hashes: List[str]) -> None:
+        self.delete_calls.append(("sentences", list(sentence_hashes)))
+        for sentence_hash in sentence_hashes:
+            self.sentences.pop(sentence_hash, None)
+
+    async def delete_objects(self, paths: List[str]) -> None:
+        self.delete_calls.append(("objects", list(paths)))
+        self.objects.difference_update(paths)
+
+    async def try_lease(self, text_hash: str, owner: str, ttl_seconds: float) -> bool:
+        now = datetime.utcnow().timestamp()
+        held = self.leases.get(text_hash)
+        if held is not None and held[1] > now:
+            return False
+        self.leases[text_hash] = (owner, now + ttl_seconds)
+        return True
+
+    async def release_lease(self, text_hash: str, owner: str) -> None:
+        if self.leases.get(text_hash, (None,))[0] == owner:
+            del self.leases[text_hash]
+
+
+class CacheEvictionService:
+    """
+    Enforce a byte budget on the shared audio cache
+
+    Args:
+        backend: Where the cache lives
+        budget_bytes: Target total of audio_cache.file_size_bytes
+        half_life_hours: Recency half-life of the eviction score
+        gc_grace_seconds: Minimum age of a sentence no document references before it is collected
+        batch_size: Rows / objects per delete request
+        local_cache: This process's local tiers, cleared of evicted entries
+        object_delay_seconds: Wait between deleting rows and deleting files (other
+            workers' local copies of the URLs expire meanwhile)
+    """
+
+    def __init__(
+        self,
+        backend: EvictionBackend,
+        budget_bytes: int,
+        half_life_hours: float = 72,
+        gc_grace_seconds: float = 3600,
+        batch_size: int = 100,
+        local_cache: Optional[TieredCache] = None,
+        object_delay_seconds: float = 0
+    ):
+        self.backend = backend
+        self.budget_bytes = budget_bytes
+        self.half_life_seconds = half_life_hours * 3600
+        self.gc_grace_seconds = gc_grace_seconds
+        self.batch_size = batch_size
+        self.local_cache = local_cache
+        self.object_delay_seconds = object_delay_seconds
+        self._lease_owner = f"{socket.gethostname()}:{os.getpid()}"
+
+    async def plan(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Decide what to delete without deleting anything
+
+        Returns:
+            {
+                'total_bytes': int, 'budget_bytes': int, 'remaining_bytes': int,
+                'pinned': int,                   # documents referenced by materials
+                'documents': [{'id', 'text_hash', 'file_size_bytes'}, ...],
+                'sentences': [sentence_hash, ...],
+                'objects': [path, ...]
+            }
+        """
+        now = now or datetime.utcnow()
+        documents = await self.backend.list_documents()
+        pinned = await self.backend.referenced_document_ids()
+
+        total_bytes = sum(row.get("file_size_bytes") or 0 for row in documents)
+        remaining_bytes = total_bytes
+        candidates = sorted(
+            (row for row in documents if row["id"] not in pinned),
+            key=lambda row: (
+                eviction_score(
+                    row.get("access_count") or 0,
+                    _parse_timestamp(row.get("last_accessed_at")),
+                    now,
+                    self.half_life_seconds
+                ),
+                _parse_timestamp(row.get("last_accessed_at"))
+            )
+        )
+
+        evicted = []
+        for row in candidates:
+            if remaining_bytes <= self.budget_bytes:
+                break
+            evicted.append(row)
+            remaining_bytes -= row.get("file_size_bytes") or 0
+
+        evicted_ids = {row["id"] for row in evicted}
+        kept_paths = {
+            path
+            for row in documents if row["id"] not in evicted_ids
+            for path in map(self.backend.object_path, row.get("segment_urls") or []) if path
+        }
+        evicted_paths = {
+            path
+            for row in evicted
+            for path in map(self.backend.object_path, row.get("segment_urls") or []) if path
+        }
+
+        # Sentences: collect once no kept document uses them and the grace period has passed
+        orphan_sentences = []
+        for row in await self.backend.list_sentences():
+            path = self.backend.object_path(row.get("audio_url"))
+            if path in kept_paths:
+                continue
+            age = (now - _parse_timestamp(row.get("created_at"))).total_seconds()
+            if age >= self.gc_grace_seconds:
+                orphan_sentences.append(row["sentence_hash"])
+                if path:
+                    evicted_paths.add(path)
+            elif path:
+                kept_paths.add(path)
+
+        return {
+            "total_bytes": total_bytes,
+            "budget_bytes": self.budget_bytes,
+            "remaining_bytes": remaining_bytes,
+            "pinned": len(pinned),
+            "documents": [
+                {"id": row["id"], "text_hash": row.get("text_hash"), "file_size_bytes": row.get("file_size_bytes") or 0}
+                for row in evicted
+            ],
+            "sentences": orphan_sentences,
+            "objects": sorted(evicted_paths - kept_paths),
+        }
+
+    async def run(self, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Plan and (unless dry_run) delete, in batches
+
+        Rows go first. Files follow after object_delay_seconds, so that no
+        worker still has a local copy of their URLs, minus any file a row
+        registered meanwhile points to (a generation that reused a sentence,
+        or uploaded the same sentence again).
+
+        Returns:
+            The plan (see plan()); 'objects' is what was actually deleted
+        """
+        plan = await self.plan()
+        if dry_run:
+            return plan
+
+        document_ids = [row["id"] for row in plan["documents"]]
+        for batch in self._batches(document_ids):
+            await self.backend.delete_documents(batch)
+        for batch in self._batches(plan["sentences"]):
+            await self.backend.delete_sentences(batch)
+
+        if self.local_cache is not None:
+            for row in plan["documents"]:
+                await asyncio.to_thread(self.local_cache.delete, f"doc:{row['text_hash']}")
+            for sentence_hash in plan["sentences"]:
+                await asyncio.to_thread(self.local_cache.delete, f"sentence:{sentence_hash}")
+
+        if plan["objects"]:
+            if self.object_delay_seconds > 0:
+                print(f"[CacheEviction] Rows deleted, deleting files in {self.object_delay_seconds:.0f}s")
+                await asyncio.sleep(self.object_delay_seconds)
+            referenced = await self._referenced_paths()
+            plan["objects"] = [path for path in plan["objects"] if path not in referenced]
+        for batch in self._batches(plan["objects"]):
+            await self.backend.delete_objects(batch)
+
+        return plan
+
+    async def _referenced_paths(self) -> Set[str]:
+        """Object paths the current document and sentence rows point to"""
+        urls = [url for row in await self.backend.list_documents() for url in row.get("segment_urls") or []]
+        urls += [row.get("audio_url") for row in await self.backend.list_sentences()]
+        return {path for path in map(self.backend.object_path, urls) if path}
+
+    async def run_periodically(self, interval_seconds: float) -> None:
+        """
+        Run every interval_seconds until cancelled (errors are logged and retried next time)
+
+        Every worker runs this loop; the one that takes the eviction lease
+        evicts, and keeps the lease for the interval so the others skip it.
+        """
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                if not await self.backend.try_lease(CACHE_EVICTION_LEASE_KEY, self._lease_owner, interval_seconds):
+                    continue
+                plan = await self.run()
+                print(f"[CacheEviction] {_summary(plan)}")
+            except Exception as e:
+                print(f"[CacheEviction] Eviction failed: {e}")
+
+    def _batches(self, items: List[Any]) -> List[List[Any]]:
+        return [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+
+
+def build_cache_eviction_service(
+    backend: Optional[EvictionBackend] = None,
+    budget_mb: Optional[int] = None,
+    local_cache: Optional[TieredCache] = None
+) -> CacheEvictionService:
+    """Eviction service configured from settings (settings.cache_backend by default)"""
+    return CacheEvictionService(
+        backend or build_cache_backend(),
+        budget_bytes=(settings.cache_budget_mb if budget_mb is None else budget_mb) * 1024 * 1024,
+        half_life_hours=settings.cache_eviction_half_life_hours,
+        gc_grace_seconds=settings.cache_gc_grace_seconds,
+        batch_size=settings.cache_eviction_batch_size,
+        local_cache=local_cache,
+        object_delay_seconds=settings.local_cache_metadata_ttl_seconds
+    )
+
+
+def _summary(plan: Dict[str, Any]) -> str:
+    freed = sum(row["file_size_bytes"] for row in plan["documents"])
+    return (
+        f"{plan['total_bytes']} -> {plan['remaining_bytes']} bytes (budget {plan['budget_bytes']}), "
+        f"{len(plan['documents'])} documents ({freed} bytes), {len(plan['sentences'])} sentences, "
+        f"{len(plan['objects'])} objects, {plan['pinned']} pinned"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evict the shared audio cache down to a byte budget")
+    parser.add_argument("--budget-mb", type=int, default=settings.cache_budget_mb)
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted")
+    parser.add_argument("--snapshot", help="Run against a local JSON snapshot instead of the cache backend")
+    args = parser.parse_args()
+
+    if args.budget_mb <= 0:
+        raise SystemExit("No budget set (use --budget-mb or CACHE_BUDGET_MB)")
+
+    if args.snapshot:
+        backend: Optional[EvictionBackend] = InMemoryEvictionBackend.from_snapshot(args.snapshot)
+    else:
+        backend = build_cache_backend()
+    if backend is None:
+        raise SystemExit("No shared cache backend configured (use --snapshot for a local dry run)")
+
+    service = build_cache_eviction_service(backend, budget_mb=args.budget_mb)
+    if args.snapshot:
+        service.object_delay_seconds = 0  # No workers hold copies of a snapshot's URLs
+    plan = asyncio.run(service.run(dry_run=args.dry_run))
+
+    print(("[dry run] " if args.dry_run else "") + _summary(plan))
+    for row in plan["documents"]:
+        print(f"  document {row['text_hash']} ({row['file_size_bytes']} bytes)")
+
+
+if __name__ == "__main__":
+    main()
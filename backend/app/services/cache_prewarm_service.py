@@ -0,0 +1,282 @@
+"""
+Pre-warming of the shared audio cache from the materials table
+
+Teachers save materials ahead of class, but audio used to be generated only
+when a student first pressed play. The pre-warmer walks materials without
+audio_cache_id, newest first, generates their audio through
+AudioCacheService (so sentence reuse, batching and generation leases all
+apply) and links the audio_cache row back to the material. A linked
+material is also pinned against eviction.
+
+- Budget: TTS characters are taken from a token bucket
+  (settings.prewarm_chars_per_minute). Only the worker holding the pre-warm
+  lease runs a pass, so the budget is global rather than per worker.
+- Resume: the position in the current pass is checkpointed to a file after
+  every material, and a restarted worker continues from there. When a pass
+  reaches the oldest material, the next one starts again from the newest,
+  picking up new uploads and retrying failures.
+
+Usage (from backend/):
+    python -m app.services.cache_prewarm_service               # One pass
+    python -m app.services.cache_prewarm_service --limit 10    # At most 10 materials
+    python -m app.services.cache_prewarm_service --stats       # Backlog only
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.constants import PREWARM_BURST_SECONDS, PREWARM_LEASE_KEY
+from app.services.cache_backends import CacheBackend
+from app.utils.token_bucket import TokenBucket
+
+# Per-material outcomes (also the counter names in stats())
+OUTCOMES = ("generated", "already_cached", "failed", "skipped")
+
+
+class CachePrewarmService:
+    """
+    Generate and link audio for materials that have none
+
+    Args:
+        audio_cache: AudioCacheService that generates and stores the audio
+        backend: Shared cache holding the materials table
+        budget: TTS characters
+        voice: Voice to generate with
+        format: Audio format to generate
+        batch_size: Materials fetched per query
+        checkpoint_path: File holding the current pass's position
+        lease_ttl_seconds: Lifetime of the pre-warm lease (renewed after every material)
+    """
+
+    def __init__(
+        self,
+        audio_cache,
+        backend: CacheBackend,
+        budget: TokenBucket,
+        voice: str = "nova",
+        format: str = "mp3",
+        batch_size: int = 20,
+        checkpoint_path: str = ".cache/prewarm-checkpoint.json",
+        lease_ttl_seconds: float = 120
+    ):
+        self.audio_cache = audio_cache
+        self.backend = backend
+        self.budget = budget
+        self.voice = voice
+        self.format = format
+        self.batch_size = batch_size
+        self.checkpoint_path = checkpoint_path
+        self.lease_ttl_seconds = lease_ttl_seconds
+        self.counts = {outcome: 0 for outcome in OUTCOMES}
+        self.characters = 0  # Characters taken from the budget
+        self.passes_completed = 0
+        self.running = False
+        self._active_seconds = 0.0  # Time spent in passes (throughput denominator)
+        self._pass_started: Optional[float] = None
+        self._lease_owner = f"{socket.gethostname()}:{os.getpid()}"
+
+    def _load_checkpoint(self) -> Optional[Tuple[str, str]]:
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                data = json.load(f)
+            return data["created_at"], data["id"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save_checkpoint(self, cursor: Optional[Tuple[str, str]]) -> None:
+        """Write (created_at, id) of the last material handled, or clear it at the end of a pass"""
+        if cursor is None:
+            try:
+                os.remove(self.checkpoint_path)
+            except FileNotFoundError:
+                pass
+            return
+
+        directory = os.path.dirname(self.checkpoint_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"created_at": cursor[0], "id": cursor[1]}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    async def prewarm_material(self, row: Dict[str, Any]) -> str:
+        """
+        Make sure one material's audio is cached and linked
+
+        Returns:
+            One of OUTCOMES
+        """
+        text = row.get("ocr_text") or ""
+        sentences = row.get("sentences") or []
+        if not text.strip() or not sentences:
+            return "skipped"
+
+        cache_key = self.audio_cache.generate_cache_key(text, sentences, self.voice, self.format)
+        try:
+            outcome = "already_cached"
+            document = await self.backend.get_document(cache_key)
+            if document is None:
+                # Charged for the whole material; sentences already cached are not synthesized again
+                characters = sum(len(sentence) for sentence in sentences)
+                await self.budget.acquire(characters)
+                self.characters += characters
+                await self.audio_cache.generate_or_get_cached(text, sentences, self.voice, self.format)
+                document = await self.backend.get_document(cache_key)
+                outcome = "generated"
+            if document is None:
+                raise RuntimeError("audio was generated but could not be stored")
+
+            await self.backend.link_material(row["id"], document["id"])
+            return outcome
+        except Exception as e:
+            print(f"[CachePrewarm] Material {row['id']} failed: {e}")
+            return "failed"
+
+    async def _renew_lease(self, owner: str) -> bool:
+        """Extend the lease (False if another worker took it over after it expired)"""
+        await self.backend.release_lease(PREWARM_LEASE_KEY, owner)
+        return await self.backend.try_lease(PREWARM_LEASE_KEY, owner, self.lease_ttl_seconds)
+
+    async def run_pass(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Pre-warm from the checkpoint towards the oldest material
+
+        Stops at the end of the materials (clearing the checkpoint), after
+        `limit` materials, or when another worker holds the lease.
+
+        Returns:
+            This run's counts per outcome, plus 'complete' (reached the oldest
+            material) and 'leased' (False if another worker was pre-warming)
+        """
+        result: Dict[str, Any] = {outcome: 0 for outcome in OUTCOMES}
+        result.update(complete=False, leased=False)
+
+        owner = self._lease_owner
+        if not await self.backend.try_lease(PREWARM_LEASE_KEY, owner, self.lease_ttl_seconds):
+            return result
+        result["leased"] = True
+
+        self.running = True
+        self._pass_started = time.monotonic()
+        handled = 0
+        try:
+            cursor = self._load_checkpoint()
+            while limit is None or handled < limit:
+                rows = await self.backend.list_unlinked_materials(self.batch_size, cursor)
+                if not rows:
+                    self._save_checkpoint(None)
+                    self.passes_completed += 1
+                    result["complete"] = True
+                    break
+
+                for row in rows[:None if limit is None else limit - handled]:
+                    outcome = await self.prewarm_material(row)
+                    result[outcome] += 1
+                    self.counts[outcome] += 1
+                    handled += 1
+                    cursor = (row["created_at"], row["id"])
+                    self._save_checkpoint(cursor)
+                    if not await self._renew_lease(owner):
+                        return result
+            return result
+        finally:
+            self.running = False
+            self._active_seconds += time.monotonic() - self._pass_started
+            self._pass_started = None
+            await self.backend.release_lease(PREWARM_LEASE_KEY, owner)
+
+    async def run_periodically(self, interval_seconds: float) -> None:
+        """Run a pass, then every interval_seconds until cancelled (errors are logged and retried next time)"""
+        while True:
+            try:
+                result = await self.run_pass()
+                if result["leased"]:
+                    print(f"[CachePrewarm] {_summary(result)}")
+            except Exception as e:
+                print(f"[CachePrewarm] Pre-warming failed: {e}")
+            await asyncio.sleep(interval_seconds)
+
+    async def stats(self) -> Dict[str, Any]:
+        """Backlog and throughput of this worker's pre-warming"""
+        try:
+            backlog: Optional[int] = await self.backend.count_unlinked_materials()
+        except Exception as e:
+            print(f"[CachePrewarm] Backlog count failed: {e}")
+            backlog = None
+
+        active_seconds = self._active_seconds
+        if self._pass_started is not None:
+            active_seconds += time.monotonic() - self._pass_started
+        minutes = active_seconds / 60
+        handled = sum(self.counts.values())
+        cursor = self._load_checkpoint()
+
+        return {
+            "running": self.running,
+            "backlog": backlog,
+            **self.counts,
+            "characters": self.characters,
+            "passes_completed": self.passes_completed,
+            "materials_per_minute": handled / minutes if minutes else 0.0,
+            "characters_per_minute": self.characters / minutes if minutes else 0.0,
+            "checkpoint": {"created_at": cursor[0], "id": cursor[1]} if cursor else None
+        }
+
+
+def build_cache_prewarm_service(audio_cache, backend: Optional[CacheBackend] = None) -> Optional[CachePrewarmService]:
+    """Pre-warm service configured from settings (None without a shared cache)"""
+    backend = backend or audio_cache.backend
+    if backend is None:
+        return None
+
+    rate = settings.prewarm_chars_per_minute / 60
+    return CachePrewarmService(
+        audio_cache,
+        backend,
+        TokenBucket(rate=rate, capacity=rate * PREWARM_BURST_SECONDS),
+        voice=settings.prewarm_voice,
+        format=settings.prewarm_format,
+        batch_size=settings.prewarm_batch_size,
+        checkpoint_path=settings.prewarm_checkpoint_path,
+        lease_ttl_seconds=settings.cache_lease_ttl_seconds
+    )
+
+
+def _summary(result: Dict[str, Any]) -> str:
+    counts = ", ".join(f"{result[outcome]} {outcome}" for outcome in OUTCOMES)
+    return counts + (" (pass complete)" if result["complete"] else "")
+
+
+def main():
+    from app.services.audio_cache_service import AudioCacheService
+
+    parser = argparse.ArgumentParser(description="Generate audio for materials that have none")
+    parser.add_argument("--limit", type=int, help="Stop after this many materials")
+    parser.add_argument("--stats", action="store_true", help="Only report the backlog")
+    args = parser.parse_args()
+
+    audio_cache = AudioCacheService()
+    service = build_cache_prewarm_service(audio_cache)
+    if service is None:
+        raise SystemExit("No shared cache backend configured")
+
+    async def run() -> None:
+        if not args.stats:
+            result = await service.run_pass(limit=args.limit)
+            await audio_cache.flush_access_stats()
+            if not result["leased"]:
+                print("Another worker is pre-warming")
+            else:
+                print(_summary(result))
+        print(json.dumps(await service.stats(), indent=2))
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
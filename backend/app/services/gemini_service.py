@@ -1,13 +1,16 @@
 """Gemini API service for OCR"""
+import asyncio
 import base64
 import json
 import time
-from typing import Tuple, List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 import google.generativeai as genai
 
 from app.core.config import settings
-from app.core.errors import OCRError
-from app.core.constants import ERROR_OCR_FAILED
+from app.core.errors import ImageProcessingError, OCRError, TTSError
+from app.core.constants import ERROR_OCR_FAILED, GEMINI_OCR_MODEL
+from app.utils.image_normalize import normalize_image, strip_data_url
 
 
 class GeminiService:
@@ -16,7 +19,7 @@ class GeminiService:
     def __init__(self):
         """Initialize Gemini API client"""
         genai.configure(api_key=settings.gemini_api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+        self.model = genai.GenerativeModel(GEMINI_OCR_MODEL)
 
     def extract_text(
         self,
@@ -36,101 +39,158 @@ class GeminiService:
             Tuple of (extracted_text, sentences, confidence_level, processing_time)
 
         Raises:
+            ImageProcessingError: If the image is too large or unreadable
             OCRError: If OCR processing fails
         """
         start_time = time.time()
 
         try:
-            # Clean base64 data (remove data URL prefix if present)
-            clean_image_data = self._clean_base64_data(image_data)
-
-            # Decode base64 to bytes
-            image_bytes = base64.b64decode(clean_image_data)
-
-            # Build prompt based on options
-            prompt = self._build_prompt(exclude_annotations, language)
+            contents = self._build_contents(image_data, exclude_annotations, language)
 
             # Call Gemini API
-            response = self.model.generate_content([
-                {
-                    'mime_type': self._get_media_type(image_data),
-                    'data': image_bytes
-                },
-                prompt
-            ])
-
-            # Parse JSON response
-            response_text = response.text.strip()
-
-            # Remove markdown code blocks if present
-            if response_text.startswith("```json"):
-                response_text = response_text[7:]  # Remove ```json
-            if response_text.startswith("```"):
-                response_text = response_text[3:]  # Remove ```
-            if response_text.endswith("```"):
-                response_text = response_text[:-3]  # Remove trailing ```
-
-            response_text = response_text.strip()
+            response = self.model.generate_content(contents)
 
-            # Parse JSON
-            parsed_response = json.loads(response_text)
+            return self._parse_response(response, start_time)
+
+        except ImageProcessingError:
+            raise
+        except Exception as e:
+            processing_time = time.time() - start_time
+            raise OCRError(
+                f"Gemini OCR failed: {str(e)}",
+                error_code=ERROR_OCR_FAILED
+            ) from e
 
-            # Extract sentences and full text
-            sentences = parsed_response.get("sentences", [])
-            extracted_text = " ".join(sentences)
+    async def extract_text_async(
+        self,
+        image_data: str,
+        exclude_annotations: bool = True,
+        language: str = "en"
+    ) -> Tuple[str, List[str], str, float]:
+        """
+        Async version of extract_text (does not block the event loop)
 
-            # Gemini doesn't provide explicit confidence scores
-            # We'll use "high" for successful responses
-            confidence = "high"
+        Raises:
+            ImageProcessingError: If the image is too large or unreadable
+            OCRError: If OCR processing fails
+        """
+        start_time = time.time()
 
-            processing_time = time.time() - start_time
+        try:
+            # Image normalization is CPU-bound
+            contents = await asyncio.to_thread(self._build_contents, image_data, exclude_annotations, language)
 
-            return extracted_text, sentences, confidence, processing_time
+            # Call Gemini API
+            response = await self.model.generate_content_async(contents)
 
-        except json.JSONDecodeError as e:
-            # Fallback: if JSON parsing fails, return response as plain text
-            processing_time = time.time() - start_time
-            extracted_text = response.text if 'response' in locals() else ""
-            return extracted_text, [extracted_text], "medium", processing_time
+            return self._parse_response(response, start_time)
 
+        except ImageProcessingError:
+            raise
         except Exception as e:
-            processing_time = time.time() - start_time
             raise OCRError(
                 f"Gemini OCR failed: {str(e)}",
                 error_code=ERROR_OCR_FAILED
             ) from e
 
-    def _get_media_type(self, image_data: str) -> str:
+    def _build_contents(
+        self,
+        image_data: str,
+        exclude_annotations: bool,
+        language: str
+    ) -> List[Any]:
         """
-        Determine media type from base64 data
+        Build Gemini request contents (image part + prompt)
+
+        The image is normalized first (EXIF orientation, downscaling to
+        settings.max_image_dimension, cropping to the text, grayscale, JPEG
+        re-encoding).
 
         Args:
             image_data: Base64 encoded image data
+            exclude_annotations: Whether to exclude handwritten annotations
+            language: Expected language of the text
 
         Returns:
-            Media type string (e.g., 'image/jpeg', 'image/png')
-        """
-        if image_data.startswith("data:"):
-            # Extract media type from data URL
-            media_type = image_data.split(";")[0].replace("data:", "")
-            return media_type
-        # Default to JPEG
-        return "image/jpeg"
+            Contents list for generate_content
 
-    def _clean_base64_data(self, image_data: str) -> str:
+        Raises:
+            ImageProcessingError: If the image is too large or unreadable
         """
-        Remove data URL prefix from base64 data if present
+        # Clean base64 data (remove data URL prefix if present)
+        clean_image_data = strip_data_url(image_data)
+
+        # Decode base64 to bytes
+        image_bytes = base64.b64decode(clean_image_data)
+
+        image_bytes, media_type = normalize_image(
+            image_bytes,
+            max_dimension=settings.max_image_dimension,
+            quality=settings.image_quality,
+            max_bytes=settings.max_image_size_mb * 1024 * 1024,
+            crop=settings.image_crop_to_text,
+            deskew=settings.image_deskew
+        )
+
+        # Build prompt based on options
+        prompt = self._build_prompt(exclude_annotations, language)
+
+        return [
+            {
+                'mime_type': media_type,
+                'data': image_bytes
+            },
+            prompt
+        ]
+
+    def _parse_response(
+        self,
+        response: Any,
+        start_time: float
+    ) -> Tuple[str, List[str], str, float]:
+        """
+        Parse Gemini JSON response into text and sentences
 
         Args:
-            image_data: Base64 encoded image data (possibly with data URL prefix)
+            response: Gemini API response
+            start_time: Request start time (for processing_time)
 
         Returns:
-            Clean base64 data string
+            Tuple of (extracted_text, sentences, confidence_level, processing_time)
         """
-        if image_data.startswith("data:"):
-            # Remove data URL prefix (e.g., "data:image/jpeg;base64,")
-            return image_data.split(",", 1)[1]
-        return image_data
+        # Parse JSON response
+        response_text = response.text.strip()
+
+        # Remove markdown code blocks if present
+        if response_text.startswith("```json"):
+            response_text = response_text[7:]  # Remove ```json
+        if response_text.startswith("```"):
+            response_text = response_text[3:]  # Remove ```
+        if response_text.endswith("```"):
+            response_text = response_text[:-3]  # Remove trailing ```
+
+        response_text = response_text.strip()
+
+        try:
+            # Parse JSON
+            parsed_response = json.loads(response_text)
+        except json.JSONDecodeError:
+            # Fallback: if JSON parsing fails, return response as plain text
+            processing_time = time.time() - start_time
+            extracted_text = response.text
+            return extracted_text, [extracted_text], "medium", processing_time
+
+        # Extract sentences and full text
+        sentences = parsed_response.get("sentences", [])
+        extracted_text = " ".join(sentences)
+
+        # Gemini doesn't provide explicit confidence scores
+        # We'll use "high" for successful responses
+        confidence = "high"
+
+        processing_time = time.time() - start_time
+
+        return extracted_text, sentences, confidence, processing_time
 
     def _build_prompt(self, exclude_annotations: bool, language: str) -> str:
         """
@@ -187,6 +247,9 @@ Return ONLY valid JSON. Do not include any commentary, explanation, or markdown
         """
         Extract text from multiple images using Gemini's vision capabilities
 
+        Up to settings.ocr_page_concurrency pages are processed at once. Results
+        keep page order, and a failed page is replaced by an error message.
+
         Args:
             images_data: List of base64 encoded image data
             exclude_annotations: Whether to exclude handwritten annotations
@@ -201,46 +264,153 @@ Return ONLY valid JSON. Do not include any commentary, explanation, or markdown
         """
         start_time = time.time()
 
+        def extract_page(index: int, image_data: str) -> Tuple[str, List[str]]:
+            try:
+                text, sentences, _, _ = self.extract_text(
+                    image_data=image_data,
+                    exclude_annotations=exclude_annotations,
+                    language=language
+                )
+                return text, sentences
+            except (OCRError, ImageProcessingError) as e:
+                return self._page_error(index, e)
+
         try:
-            all_sentences = []
-            extracted_texts = []
+            # Pages are processed in parallel; map() keeps them in page order
+            with ThreadPoolExecutor(
+                max_workers=self._page_concurrency(len(images_data)),
+                thread_name_prefix="ocr-page"
+            ) as executor:
+                pages = list(executor.map(extract_page, range(len(images_data)), images_data))
+
+            combined_text, all_sentences, confidence = self._combine_pages(pages, page_separator)
 
-            # Process each image sequentially
-            for i, image_data in enumerate(images_data):
+            processing_time = time.time() - start_time
+
+            return combined_text, all_sentences, confidence, processing_time
+
+        except Exception as e:
+            processing_time = time.time() - start_time
+            raise OCRError(
+                f"Gemini OCR failed for multiple images: {str(e)}",
+                error_code=ERROR_OCR_FAILED
+            ) from e
+
+    async def extract_text_from_multiple_images_async(
+        self,
+        images_data: List[str],
+        exclude_annotations: bool = True,
+        language: str = "en",
+        page_separator: str = "\n\n",
+        extract_page: Optional[Callable[..., Awaitable[Tuple[str, List[str], str, float]]]] = None
+    ) -> Tuple[str, List[str], str, float]:
+        """
+        Async version of extract_text_from_multiple_images
+
+        Up to settings.ocr_page_concurrency pages are processed at once.
+
+        Args:
+            extract_page: Replaces extract_text_async for each page (same
+                arguments and result, e.g. a cached lookup)
+
+        Raises:
+            OCRError: If OCR processing fails
+        """
+        start_time = time.time()
+        semaphore = asyncio.Semaphore(self._page_concurrency(len(images_data)))
+        extract = extract_page or self.extract_text_async
+
+        async def run_page(index: int, image_data: str) -> Tuple[str, List[str]]:
+            async with semaphore:
                 try:
-                    # Extract text from single image
-                    text, sentences, _, _ = self.extract_text(
+                    text, sentences, _, _ = await extract(
                         image_data=image_data,
                         exclude_annotations=exclude_annotations,
                         language=language
                     )
-                    extracted_texts.append(text)
-                    all_sentences.extend(sentences)
-                except OCRError as e:
-                    # If one page fails, include error message
-                    error_msg = f"[Error processing page {i + 1}: {str(e)}]"
-                    extracted_texts.append(error_msg)
-                    all_sentences.append(error_msg)
-
-            # Combine all texts with separator
-            combined_text = page_separator.join(extracted_texts)
-
-            # Confidence is "high" if at least one page succeeded
-            confidence = "high" if any(
-                not text.startswith("[Error") for text in extracted_texts
-            ) else "low"
+                    return text, sentences
+                except (OCRError, ImageProcessingError) as e:
+                    return self._page_error(index, e)
+
+        try:
+            tasks = [
+                asyncio.create_task(run_page(i, image_data))
+                for i, image_data in enumerate(images_data)
+            ]
+            try:
+                pages = list(await asyncio.gather(*tasks))
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+
+            combined_text, all_sentences, confidence = self._combine_pages(pages, page_separator)
 
             processing_time = time.time() - start_time
 
             return combined_text, all_sentences, confidence, processing_time
 
         except Exception as e:
-            processing_time = time.time() - start_time
             raise OCRError(
                 f"Gemini OCR failed for multiple images: {str(e)}",
                 error_code=ERROR_OCR_FAILED
             ) from e
 
+    def _page_concurrency(self, page_count: int) -> int:
+        """
+        Number of pages to OCR at once for one request
+
+        Args:
+            page_count: Pages in the request
+
+        Returns:
+            settings.ocr_page_concurrency, capped at the page count (at least 1)
+        """
+        return max(1, min(settings.ocr_page_concurrency, page_count))
+
+    def _page_error(self, index: int, error: TTSError) -> Tuple[str, List[str]]:
+        """
+        Stand-in text and sentences for a page that failed
+
+        Args:
+            index: Zero-based page index
+            error: Error raised for the page
+
+        Returns:
+            Tuple of (error_message, [error_message])
+        """
+        # If one page fails, include error message
+        error_msg = f"[Error processing page {index + 1}: {str(error)}]"
+        return error_msg, [error_msg]
+
+    def _combine_pages(
+        self,
+        pages: List[Tuple[str, List[str]]],
+        page_separator: str
+    ) -> Tuple[str, List[str], str]:
+        """
+        Join per-page results and derive overall confidence
+
+        Args:
+            pages: (text, sentences) for each page in order (error message for failed pages)
+            page_separator: Separator to use between pages
+
+        Returns:
+            Tuple of (combined_text, sentences, confidence_level)
+        """
+        extracted_texts = [text for text, _ in pages]
+        all_sentences = [sentence for _, sentences in pages for sentence in sentences]
+
+        # Combine all texts with separator
+        combined_text = page_separator.join(extracted_texts)
+
+        # Confidence is "high" if at least one page succeeded
+        confidence = "high" if any(
+            not text.startswith("[Error") for text in extracted_texts
+        ) else "low"
+
+        return combined_text, all_sentences, confidence
+
 
 # Global instance
 gemini_service = GeminiService()
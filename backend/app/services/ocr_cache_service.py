@@ -0,0 +1,355 @@
+"""
+OCR result cache keyed by image content and OCR options
+
+Students photograph the same textbook pages, and a re-uploaded page used to
+cost a full Gemini call every time. Results are cached per page under a key
+built from:
+
+- the SHA-256 of the decoded image bytes (the same photo uploaded as a data
+  URL or plain base64 shares one entry)
+- exclude_annotations and language (they change the prompt)
+- OCR_PROMPT_VERSION and the model (bumped or changed: old entries stop matching)
+- the image normalization settings (they change what the model sees)
+
+Tiers are the same as for audio: a process-local memory LRU and disk store
+(settings.ocr_cache_*) in front of the shared cache backend
+(settings.cache_backend, ocr_cache table). A shared hit is copied into the
+local tiers. Concurrent requests for the same page in one process share one
+Gemini call.
+
+Only clean results are cached: errors and the plain-text fallback for
+responses that were not JSON (confidence "medium") are retried next time.
+
+Near-duplicates: a retake of a page has different bytes, so on a miss the
+page's perceptual hash (app.utils.perceptual_hash) is compared with the
+pages this worker has OCR'd with the same options. A page within
+settings.ocr_near_duplicate_threshold (fraction of differing hash bits)
+reuses the nearest page's result, which is then also cached under the
+retake's own key (its re-uploads are exact hits). The index holds the last
+settings.ocr_near_duplicate_index_size pages and is not shared between
+workers; benchmarks/near_duplicate.py measures the false-match rate.
+The index is scanned: at this threshold (about 100 of 512 bits) a BK-tree
+prunes too little to beat the scan, which takes ~2ms for 10,000 pages.
+"""
+import asyncio
+import base64
+import binascii
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.constants import GEMINI_OCR_MODEL, OCR_PROMPT_VERSION
+from app.services.cache_backends import CacheBackend, build_cache_backend
+from app.utils.image_normalize import strip_data_url
+from app.utils.local_cache import CacheTier, DiskCache, MemoryLRUCache, TieredCache
+from app.utils.perceptual_hash import hamming_distance, hash_bits, image_page_hash
+from app.utils.single_flight import SingleFlight
+
+# Largest OCR result kept in the memory tier (a dense page is a few KB)
+_MEMORY_MAX_ITEM_BYTES = 64 * 1024
+
+
+class OCRCacheService:
+    """
+    Cached front of GeminiService's OCR
+
+    Args:
+        gemini: GeminiService doing the extraction
+        backend: Shared cache (None: local tiers only)
+        local_cache: Process-local tiers (None: no local caching)
+        near_duplicate_threshold: Max fraction of differing page-hash bits to reuse a result (0 disables)
+        hash_size: Page hash grid size (2 * hash_size ** 2 bits)
+        index_size: Page hashes kept for near-duplicate lookup (oldest dropped)
+    """
+
+    def __init__(
+        self,
+        gemini,
+        backend: Optional[CacheBackend] = None,
+        local_cache: Optional[TieredCache] = None,
+        near_duplicate_threshold: float = 0.0,
+        hash_size: int = 16,
+        index_size: int = 10_000
+    ):
+        self.gemini = gemini
+        self.backend = backend
+        self.local_cache = local_cache or TieredCache([])
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.hash_size = hash_size
+        self.index_size = index_size
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self.extractions = 0  # Pages sent to Gemini
+        self.coalesced = 0  # Pages that waited for an identical page already in flight
+        self.near_duplicate_hits = 0  # Pages that reused a near-duplicate's result
+        self._single_flight = SingleFlight()
+        # (options key, page hash) -> cache key, oldest first
+        self._indexed_pages: "OrderedDict[Tuple[str, int], str]" = OrderedDict()
+
+    def _decode(self, image_data: str) -> Optional[bytes]:
+        """Image bytes of base64 image data (None if not valid base64)"""
+        try:
+            return base64.b64decode(strip_data_url(image_data))
+        except (binascii.Error, ValueError):
+            return None
+
+    def _options_key(self, exclude_annotations: bool, language: str) -> str:
+        """Everything besides the image that the OCR result depends on"""
+        return "|".join([
+            f"v{OCR_PROMPT_VERSION}",
+            GEMINI_OCR_MODEL,
+            f"exclude={exclude_annotations}",
+            f"lang={language}",
+            f"dim={settings.max_image_dimension}",
+            f"quality={settings.image_quality}",
+            f"crop={settings.image_crop_to_text}",
+            f"deskew={settings.image_deskew}"
+        ])
+
+    def cache_key(self, image_data: str, exclude_annotations: bool, language: str) -> Optional[str]:
+        """
+        Cache key of one page
+
+        Args:
+            image_data: Base64 encoded image data (possibly with data URL prefix)
+            exclude_annotations: Whether handwritten annotations are excluded
+            language: Expected language of the text
+
+        Returns:
+            Hex SHA-256, or None if image_data is not valid base64
+        """
+        image_bytes = self._decode(image_data)
+        if image_bytes is None:
+            return None
+        key = f"{self._options_key(exclude_annotations, language)}|{hashlib.sha256(image_bytes).hexdigest()}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def page_hash(self, image_data: str) -> Optional[int]:
+        """Perceptual hash of one page (None if the data is not a readable image)"""
+        image_bytes = self._decode(image_data)
+        return image_page_hash(image_bytes, self.hash_size) if image_bytes is not None else None
+
+    async def _find_near_duplicate(self, options_key: str, page_hash: int) -> Optional[Dict[str, Any]]:
+        """Cached result of the nearest indexed page within the threshold"""
+        max_distance = int(self.near_duplicate_threshold * hash_bits(self.hash_size))
+        matches = []
+        for (indexed_options, indexed_hash), cache_key in self._indexed_pages.items():
+            if indexed_options == options_key:
+                distance = hamming_distance(page_hash, indexed_hash)
+                if distance <= max_distance:
+                    matches.append((distance, cache_key))
+
+        for distance, cache_key in sorted(matches):
+            result = await self._lookup(cache_key)
+            if result is not None:
+                self.near_duplicate_hits += 1
+                print(f"[OCRCache] Near-duplicate page reused ({distance} of {hash_bits(self.hash_size)} bits differ)")
+                return result
+        return None
+
+    def _index_page(self, options_key: str, page_hash: int, cache_key: str) -> None:
+        """Add a page for near-duplicate lookup (the oldest is dropped when full)"""
+        self._indexed_pages[(options_key, page_hash)] = cache_key
+        self._indexed_pages.move_to_end((options_key, page_hash))
+        while len(self._indexed_pages) > self.index_size:
+            self._indexed_pages.popitem(last=False)
+
+    async def _lookup(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Cached result (text, sentences, confidence): local tiers, then the shared cache"""
+        result = await asyncio.to_thread(self.local_cache.get_json, f"ocr:{cache_key}")
+        if result is not None or self.backend is None:
+            return result
+
+        try:
+            result = await self.backend.get_ocr_result(cache_key)
+        except Exception as e:
+            print(f"[OCRCache] Shared cache lookup failed: {e}")
+            result = None
+
+        if result is None:
+            self.shared_misses += 1
+            return None
+
+        self.shared_hits += 1
+        await asyncio.to_thread(self.local_cache.set_json, f"ocr:{cache_key}", result)
+        return result
+
+    async def _store(self, cache_key: str, result: Dict[str, Any]) -> None:
+        """Write a result to the local tiers and the shared cache (failures only logged)"""
+        await asyncio.to_thread(self.local_cache.set_json, f"ocr:{cache_key}", result)
+        if self.backend is None:
+            return
+        try:
+            await self.backend.insert_ocr_result({
+                "cache_key": cache_key,
+                **result,
+                "created_at": datetime.utcnow().isoformat()
+            })
+        except Exception as e:
+            print(f"[OCRCache] Shared cache write failed: {e}")
+
+    async def _lookup_or_extract(
+        self,
+        cache_key: str,
+        image_data: str,
+        exclude_annotations: bool,
+        language: str
+    ) -> Tuple[Dict[str, Any], bool]:
+        """(result, from_cache) for one page; runs once per key at a time"""
+        result = await self._lookup(cache_key)
+        if result is not None:
+            return result, True
+
+        options_key = self._options_key(exclude_annotations, language)
+        page_hash = None
+        if self.near_duplicate_threshold > 0:
+            # Decoding and hashing the photo is CPU-bound
+            page_hash = await asyncio.to_thread(self.page_hash, image_data)
+        if page_hash is not None:
+            result = await self._find_near_duplicate(options_key, page_hash)
+            if result is not None:
+                # Re-uploads of this retake then hit its own key directly
+                await self._store(cache_key, result)
+                self._index_page(options_key, page_hash, cache_key)
+                return result, True
+
+        self.extractions += 1
+        text, sentences, confidence, _ = await self.gemini.extract_text_async(
+            image_data=image_data,
+            exclude_annotations=exclude_annotations,
+            language=language
+        )
+        result = {"text": text, "sentences": sentences, "confidence": confidence}
+        # The plain-text fallback (response was not JSON) is worth retrying
+        if confidence == "high":
+            await self._store(cache_key, result)
+            if page_hash is not None:
+                self._index_page(options_key, page_hash, cache_key)
+        return result, False
+
+    async def extract_text(
+        self,
+        image_data: str,
+        exclude_annotations: bool = True,
+        language: str = "en"
+    ) -> Tuple[str, List[str], str, float, bool]:
+        """
+        GeminiService.extract_text_async through the cache
+
+        Args:
+            image_data: Base64 encoded image data
+            exclude_annotations: Whether to exclude handwritten annotations
+            language: Expected language of the text
+
+        Returns:
+            Tuple of (extracted_text, sentences, confidence_level, processing_time, from_cache);
+            from_cache is True when no Gemini call was made for this request
+
+        Raises:
+            ImageProcessingError: If the image is too large or unreadable
+            OCRError: If OCR processing fails
+        """
+        start_time = time.time()
+
+        # Decoding and hashing a multi-megabyte upload is CPU-bound
+        cache_key = await asyncio.to_thread(self.cache_key, image_data, exclude_annotations, language)
+        if cache_key is None:
+            # Not base64: let Gemini report the error
+            self.extractions += 1
+            text, sentences, confidence, _ = await self.gemini.extract_text_async(
+                image_data=image_data,
+                exclude_annotations=exclude_annotations,
+                language=language
+            )
+            return text, sentences, confidence, time.time() - start_time, False
+
+        joined = self._single_flight.in_flight(cache_key)
+        if joined:
+            self.coalesced += 1
+        result, from_cache = await self._single_flight.run(
+            cache_key,
+            lambda: self._lookup_or_extract(cache_key, image_data, exclude_annotations, language)
+        )
+        return (
+            result["text"],
+            list(result["sentences"]),
+            result["confidence"],
+            time.time() - start_time,
+            from_cache or joined
+        )
+
+    async def extract_text_from_multiple_images(
+        self,
+        images_data: List[str],
+        exclude_annotations: bool = True,
+        language: str = "en",
+        page_separator: str = "\n\n"
+    ) -> Tuple[str, List[str], str, float, int]:
+        """
+        GeminiService.extract_text_from_multiple_images_async with each page through the cache
+
+        Returns:
+            Tuple of (extracted_text, sentences, confidence_level, processing_time, cached_pages)
+
+        Raises:
+            OCRError: If OCR processing fails
+        """
+        cached_pages = 0
+
+        async def extract_page(
+            image_data: str,
+            exclude_annotations: bool,
+            language: str
+        ) -> Tuple[str, List[str], str, float]:
+            nonlocal cached_pages
+            text, sentences, confidence, processing_time, from_cache = await self.extract_text(
+                image_data, exclude_annotations, language
+            )
+            cached_pages += from_cache
+            return text, sentences, confidence, processing_time
+
+        text, sentences, confidence, processing_time = await self.gemini.extract_text_from_multiple_images_async(
+            images_data=images_data,
+            exclude_annotations=exclude_annotations,
+            language=language,
+            page_separator=page_separator,
+            extract_page=extract_page
+        )
+        return text, sentences, confidence, processing_time, cached_pages
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters per tier (memory, disk, shared backend) and Gemini calls"""
+        stats: Dict[str, Any] = self.local_cache.stats()
+        if self.backend is not None:
+            stats[self.backend.name] = {"hits": self.shared_hits, "misses": self.shared_misses}
+        stats["extractions"] = self.extractions
+        stats["coalesced"] = self.coalesced
+        stats["near_duplicates"] = {"hits": self.near_duplicate_hits, "indexed_pages": len(self._indexed_pages)}
+        return stats
+
+
+def build_ocr_cache_service(gemini) -> OCRCacheService:
+    """OCR cache configured from settings (tiers with size 0 are disabled)"""
+    tiers: List[CacheTier] = []
+    if settings.ocr_cache_memory_mb > 0:
+        tiers.append(MemoryLRUCache(
+            max_bytes=settings.ocr_cache_memory_mb * 1024 * 1024,
+            max_item_bytes=_MEMORY_MAX_ITEM_BYTES
+        ))
+    if settings.ocr_cache_disk_mb > 0:
+        tiers.append(DiskCache(
+            directory=settings.ocr_cache_dir,
+            max_bytes=settings.ocr_cache_disk_mb * 1024 * 1024
+        ))
+    backend = build_cache_backend() if settings.ocr_cache_shared else None
+    return OCRCacheService(
+        gemini,
+        backend,
+        TieredCache(tiers),
+        near_duplicate_threshold=settings.ocr_near_duplicate_threshold,
+        hash_size=settings.ocr_near_duplicate_hash_size,
+        index_size=settings.ocr_near_duplicate_index_size
+    )
@@ -1,12 +1,13 @@
 """OpenAI TTS service"""
-from typing import List, Tuple, Dict
-from openai import OpenAI
+from typing import AsyncIterator, List, Tuple, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from openai import OpenAI, AsyncOpenAI
+import asyncio
 from io import BytesIO
 import wave
 import struct
 import shutil
 import os
-import tempfile
 import base64
 
 # Configure environment for pydub BEFORE importing it
@@ -60,18 +61,56 @@ from app.core.config import settings
 from app.core.constants import (
     OPENAI_TTS_MODEL,
     OPENAI_TTS_SPEED,
+    TTS_SAMPLE_RATE,
+    TTS_CHANNELS,
+    TTS_SAMPLE_WIDTH,
+    TTS_SENTENCE_GAP_MS,
     ERROR_TTS_FAILED,
 )
 from app.core.errors import TTSError, TTSGenerationError
 from app.schemas.tts import SentenceTiming
+from app.utils.audio import decode_pcm, encode_pcm, concatenate_pcm
+from app.utils.audio_probe import get_audio_duration_us
+from app.utils.audio_splice import splice_audio
+from app.utils.sentence_batching import plan_sentence_batches, batch_input, split_batch_pcm
+from app.utils.text_chunking import plan_tts_chunks
+
+
+# Formats whose streams stay valid when appended byte-wise (frame-based, no container)
+APPENDABLE_STREAM_FORMATS = ("mp3", "aac")
+
+
+# Shared pool for per-sentence synthesis. Its size caps the number of
+# in-flight OpenAI TTS requests for the whole process, across requests.
+_synthesis_executor = ThreadPoolExecutor(
+    max_workers=settings.tts_max_concurrency,
+    thread_name_prefix="tts-synthesis"
+)
+
+# Async counterpart of the pool above. asyncio primitives are bound to the
+# event loop they are first used on, so the semaphore is created per loop.
+_synthesis_semaphore: Optional[asyncio.Semaphore] = None
+_synthesis_semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_synthesis_semaphore() -> asyncio.Semaphore:
+    """Get the per-process semaphore limiting in-flight async TTS requests"""
+    global _synthesis_semaphore, _synthesis_semaphore_loop
+
+    loop = asyncio.get_running_loop()
+    if _synthesis_semaphore is None or _synthesis_semaphore_loop is not loop:
+        _synthesis_semaphore = asyncio.Semaphore(settings.tts_max_concurrency)
+        _synthesis_semaphore_loop = loop
+    return _synthesis_semaphore
 
 
 class OpenAIService:
     """Service for interacting with OpenAI TTS API"""
 
     def __init__(self):
-        """Initialize OpenAI API client"""
+        """Initialize OpenAI API clients (sync for scripts, async for routes)"""
         self.client = OpenAI(api_key=settings.openai_api_key)
+        self.async_client = AsyncOpenAI(api_key=settings.openai_api_key)
 
     def generate_speech(
         self,
@@ -94,40 +133,120 @@ class OpenAIService:
             TTSGenerationError: If TTS generation fails
         """
         try:
-            # Validate voice
-            valid_voices = ["alloy", "echo", "fable", "onyx", "nova", "shimmer"]
-            if voice not in valid_voices:
-                raise TTSGenerationError(
-                    f"Invalid voice: {voice}. Must be one of {valid_voices}",
-                    error_code=ERROR_TTS_FAILED
-                )
+            self._validate_voice_and_format(voice, format)
 
-            # Validate format
-            valid_formats = ["opus", "mp3", "aac", "flac"]
-            if format not in valid_formats:
-                raise TTSGenerationError(
-                    f"Invalid format: {format}. Must be one of {valid_formats}",
-                    error_code=ERROR_TTS_FAILED
-                )
+            # Long text: synthesize provider-sized chunks concurrently, then join
+            chunks = plan_tts_chunks(text, settings.tts_chunk_max_chars)
+            if len(chunks) <= 1:
+                return self._create_speech(text, voice, format)
 
-            # Call OpenAI TTS API
-            response = self.client.audio.speech.create(
-                model=OPENAI_TTS_MODEL,
-                voice=voice,
-                input=text,
-                response_format=format,
-                speed=OPENAI_TTS_SPEED
+            audio_blobs = self.synthesize_sentences(chunks, voice, format)
+            return self._join_chunks(audio_blobs, format)
+
+        except TTSGenerationError:
+            # Re-raise TTSGenerationError as-is
+            raise
+        except Exception as e:
+            raise TTSGenerationError(
+                f"OpenAI TTS failed: {str(e)}",
+                error_code=ERROR_TTS_FAILED
+            ) from e
+
+    def _validate_voice_and_format(self, voice: str, format: str) -> None:
+        """
+        Validate voice and audio format options
+
+        Args:
+            voice: Voice to use (alloy, echo, fable, onyx, nova, shimmer)
+            format: Audio format (opus, mp3, aac, flac)
+
+        Raises:
+            TTSGenerationError: If voice or format is not supported
+        """
+        valid_voices = ["alloy", "echo", "fable", "onyx", "nova", "shimmer"]
+        if voice not in valid_voices:
+            raise TTSGenerationError(
+                f"Invalid voice: {voice}. Must be one of {valid_voices}",
+                error_code=ERROR_TTS_FAILED
+            )
+
+        valid_formats = ["opus", "mp3", "aac", "flac"]
+        if format not in valid_formats:
+            raise TTSGenerationError(
+                f"Invalid format: {format}. Must be one of {valid_formats}",
+                error_code=ERROR_TTS_FAILED
             )
 
-            # Read audio data
-            audio_data = BytesIO()
-            for chunk in response.iter_bytes():
-                audio_data.write(chunk)
+    def _create_speech(self, text: str, voice: str, format: str) -> bytes:
+        """
+        Call OpenAI TTS API for a single input and read the whole response
+
+        Args:
+            text: Text to convert to speech
+            voice: Voice to use
+            format: Audio format
+
+        Returns:
+            Audio data as bytes
+        """
+        response = self.client.audio.speech.create(
+            model=OPENAI_TTS_MODEL,
+            voice=voice,
+            input=text,
+            response_format=format,
+            speed=OPENAI_TTS_SPEED
+        )
+
+        # Read audio data
+        audio_data = BytesIO()
+        for chunk in response.iter_bytes():
+            audio_data.write(chunk)
+
+        return audio_data.getvalue()
+
+    def synthesize_sentences(
+        self,
+        sentences: List[str],
+        voice: str = "nova",
+        format: str = "opus"
+    ) -> List[bytes]:
+        """
+        Generate speech for each sentence concurrently (one API call per sentence)
+
+        Calls are fanned out on the shared synthesis pool, so at most
+        settings.tts_max_concurrency calls are in flight per process.
+        On the first failure, calls that have not started yet are cancelled.
+
+        Args:
+            sentences: List of sentences to convert to speech
+            voice: Voice to use (alloy, echo, fable, onyx, nova, shimmer)
+            format: Audio format (opus, mp3, aac, flac)
+
+        Returns:
+            Audio data per sentence, in the same order as sentences
+
+        Raises:
+            TTSGenerationError: If TTS generation fails for any sentence
+        """
+        try:
+            self._validate_voice_and_format(voice, format)
 
-            return audio_data.getvalue()
+            futures = [
+                _synthesis_executor.submit(self._create_speech, text, voice, format)
+                for text in sentences
+            ]
+            wait(futures, return_when=FIRST_EXCEPTION)
+
+            for future in futures:
+                if future.done() and not future.cancelled() and future.exception():
+                    # Hard failure: drop the work that has not started yet
+                    for other in futures:
+                        other.cancel()
+                    raise future.exception()
+
+            return [future.result() for future in futures]
 
         except TTSGenerationError:
-            # Re-raise TTSGenerationError as-is
             raise
         except Exception as e:
             raise TTSGenerationError(
@@ -135,9 +254,132 @@ class OpenAIService:
                 error_code=ERROR_TTS_FAILED
             ) from e
 
+    def synthesize_sentences_batched(
+        self,
+        sentences: List[str],
+        voice: str = "nova",
+        format: str = "opus"
+    ) -> Tuple[List[bytes], int]:
+        """
+        Generate speech per sentence, packing runs of short sentences into one call
+
+        With settings.tts_sentence_batching enabled, consecutive short
+        sentences are synthesized together and the result is split back into
+        per-sentence clips at the pauses between them. Batches whose split
+        looks unreliable are re-synthesized one sentence per call.
+
+        Args:
+            sentences: List of sentences to convert to speech
+            voice: Voice to use (alloy, echo, fable, onyx, nova, shimmer)
+            format: Audio format (opus, mp3, aac, flac)
+
+        Returns:
+            Tuple of (audio data per sentence in order, upstream calls made)
+
+        Raises:
+            TTSGenerationError: If TTS generation fails for any sentence
+        """
+        groups = self._plan_sentence_batches(sentences)
+        if len(groups) == len(sentences):
+            return self.synthesize_sentences(sentences, voice, format), len(sentences)
+
+        group_blobs = self.synthesize_sentences(self._batch_inputs(sentences, groups), voice, format)
+        audio_blobs = self._split_batches(sentences, groups, group_blobs, format)
+
+        retry = [i for i, audio_bytes in enumerate(audio_blobs) if audio_bytes is None]
+        if retry:
+            retry_blobs = self.synthesize_sentences([sentences[i] for i in retry], voice, format)
+            for i, audio_bytes in zip(retry, retry_blobs):
+                audio_blobs[i] = audio_bytes
+
+        upstream_calls = len(groups) + len(retry)
+        self._log_batching(len(sentences), upstream_calls)
+        return audio_blobs, upstream_calls
+
+    def _plan_sentence_batches(self, sentences: List[str]) -> List[List[int]]:
+        """Sentence index groups, one upstream call each (all singletons when batching is off)"""
+        if not settings.tts_sentence_batching:
+            return [[i] for i in range(len(sentences))]
+
+        return plan_sentence_batches(
+            sentences,
+            settings.tts_batch_max_chars,
+            settings.tts_batch_max_sentences
+        )
+
+    def _batch_inputs(self, sentences: List[str], groups: List[List[int]]) -> List[str]:
+        """Upstream input text per sentence group"""
+        return [
+            batch_input([sentences[i] for i in group]) if len(group) > 1 else sentences[group[0]]
+            for group in groups
+        ]
+
+    def _split_batches(
+        self,
+        sentences: List[str],
+        groups: List[List[int]],
+        group_blobs: List[bytes],
+        format: str
+    ) -> List[Optional[bytes]]:
+        """
+        Map group audio back to per-sentence audio
+
+        Returns:
+            Audio data per sentence; None for sentences of batches that
+            could not be split reliably
+        """
+        audio_blobs: List[Optional[bytes]] = [None] * len(sentences)
+
+        for group, audio_bytes in zip(groups, group_blobs):
+            if len(group) == 1:
+                audio_blobs[group[0]] = audio_bytes
+                continue
+
+            clips = self._split_batch_audio(audio_bytes, [sentences[i] for i in group], format)
+            if clips is None:
+                print(f"[TTS Batching] Unreliable split for sentences {group[0]}-{group[-1]}, synthesizing individually")
+                continue
+
+            for i, clip in zip(group, clips):
+                audio_blobs[i] = clip
+
+        return audio_blobs
+
+    def _split_batch_audio(self, audio_data: bytes, sentences: List[str], format: str) -> Optional[List[bytes]]:
+        """
+        Split the audio of one batch into per-sentence clips
+
+        Returns:
+            Encoded clip per sentence, or None if the split looks unreliable
+        """
+        try:
+            pcm = decode_pcm(audio_data, format)
+        except RuntimeError as e:
+            print(f"[TTS Batching] Could not decode batch audio: {e}")
+            return None
+
+        frame_ranges = split_batch_pcm(pcm, sentences)
+        if frame_ranges is None:
+            return None
+
+        frame_width = TTS_SAMPLE_WIDTH * TTS_CHANNELS
+        view = memoryview(pcm)
+        return [
+            encode_pcm(view[start * frame_width:end * frame_width], format)
+            for start, end in frame_ranges
+        ]
+
+    def _log_batching(self, sentence_count: int, upstream_calls: int) -> None:
+        print(
+            f"[TTS Batching] {sentence_count} sentences in {upstream_calls} upstream calls "
+            f"(saved {sentence_count - upstream_calls})"
+        )
+
     def _get_audio_duration(self, audio_data: bytes, format: str) -> float:
         """
-        Calculate audio duration from audio data using temporary file
+        Calculate audio duration from container/frame headers
+
+        Falls back to a full ffmpeg decode only when the headers can't be parsed.
 
         Args:
             audio_data: Audio file bytes
@@ -147,24 +389,7 @@ class OpenAIService:
             Duration in seconds
         """
         try:
-            from pydub import AudioSegment
-
-            # Use temporary file for more reliable ffmpeg processing
-            with tempfile.NamedTemporaryFile(suffix=f'.{format}', delete=False) as temp_file:
-                temp_path = temp_file.name
-                temp_file.write(audio_data)
-
-            try:
-                audio = AudioSegment.from_file(temp_path, format=format)
-                # Duration in milliseconds, convert to seconds
-                duration = len(audio) / 1000.0
-                return duration
-            finally:
-                # Clean up temporary file
-                try:
-                    os.unlink(temp_path)
-                except Exception:
-                    pass  # Ignore cleanup errors
+            return get_audio_duration_us(audio_data, format) / 1_000_000
 
         except Exception as e:
             # Fallback: estimate based on text length
@@ -192,22 +417,8 @@ class OpenAIService:
             TTSGenerationError: If TTS generation fails
         """
         try:
-            from pydub import AudioSegment
-
             # Validate inputs
-            valid_voices = ["alloy", "echo", "fable", "onyx", "nova", "shimmer"]
-            if voice not in valid_voices:
-                raise TTSGenerationError(
-                    f"Invalid voice: {voice}. Must be one of {valid_voices}",
-                    error_code=ERROR_TTS_FAILED
-                )
-
-            valid_formats = ["opus", "mp3", "aac", "flac"]
-            if format not in valid_formats:
-                raise TTSGenerationError(
-                    f"Invalid format: {format}. Must be one of {valid_formats}",
-                    error_code=ERROR_TTS_FAILED
-                )
+            self._validate_voice_and_format(voice, format)
 
             if not sentences or len(sentences) == 0:
                 raise TTSGenerationError(
@@ -215,119 +426,113 @@ class OpenAIService:
                     error_code=ERROR_TTS_FAILED
                 )
 
-            # Generate TTS for each sentence
-            sentence_timings = []
-            audio_segments = []
-            current_time = 0.0
-
-            # Gap between sentences in milliseconds (200ms = 0.2 seconds)
-            sentence_gap_ms = 200
-            sentence_gap_s = sentence_gap_ms / 1000.0
-
-            for sentence_text in sentences:
-                if not sentence_text.strip():
-                    continue
-
-                # Generate TTS for this sentence
-                response = self.client.audio.speech.create(
-                    model=OPENAI_TTS_MODEL,
-                    voice=voice,
-                    input=sentence_text,
-                    response_format=format,
-                    speed=OPENAI_TTS_SPEED
-                )
-
-                # Read audio data
-                audio_data = BytesIO()
-                for chunk in response.iter_bytes():
-                    audio_data.write(chunk)
-                audio_bytes = audio_data.getvalue()
-
-                # Get precise duration
-                duration = self._get_audio_duration(audio_bytes, format)
-
-                # Store timing information
-                sentence_timings.append(SentenceTiming(
-                    text=sentence_text,
-                    start_time=current_time,
-                    end_time=current_time + duration,
-                    duration=duration
-                ))
-
-                # Load audio segment using temporary file (more reliable with ffmpeg)
-                with tempfile.NamedTemporaryFile(suffix=f'.{format}', delete=False) as temp_file:
-                    temp_path = temp_file.name
-                    temp_file.write(audio_bytes)
-
-                try:
-                    segment = AudioSegment.from_file(temp_path, format=format)
-                finally:
-                    # Clean up temporary file
-                    try:
-                        os.unlink(temp_path)
-                    except Exception:
-                        pass  # Ignore cleanup errors
-
-                audio_segments.append(segment)
-                current_time += duration
-
-                # Add gap time for all sentences except the last one
-                # (We'll add the actual silence during concatenation)
-                if len(audio_segments) < len([s for s in sentences if s.strip()]):
-                    current_time += sentence_gap_s
-
-            # Combine all audio segments
-            if len(audio_segments) == 0:
+            # Skip empty sentences
+            texts = [s for s in sentences if s.strip()]
+            if len(texts) == 0:
                 raise TTSGenerationError(
                     "No valid sentences to convert",
                     error_code=ERROR_TTS_FAILED
                 )
 
-            # Create silence segment for gaps between sentences
-            silence = AudioSegment.silent(duration=sentence_gap_ms)
+            # Generate TTS for all sentences concurrently (order preserved)
+            audio_blobs = self.synthesize_sentences(texts, voice, format)
+
+            return self._combine_with_timings(texts, audio_blobs, format)
+
+        except TTSGenerationError:
+            raise
+        except Exception as e:
+            raise TTSGenerationError(
+                f"OpenAI TTS with timings failed: {str(e)}",
+                error_code=ERROR_TTS_FAILED
+            ) from e
 
-            combined_audio = audio_segments[0]
-            for segment in audio_segments[1:]:
-                # Add silence between sentences
-                combined_audio = combined_audio + silence + segment
+    def _combine_with_timings(
+        self,
+        texts: List[str],
+        audio_blobs: List[bytes],
+        format: str
+    ) -> Tuple[bytes, List[SentenceTiming], float]:
+        """
+        Combine per-sentence audio into one file and compute sentence timings
 
-            print(f"[TTS Generation] Added {sentence_gap_ms}ms silence between {len(audio_segments)-1} sentence pairs")
+        Args:
+            texts: Non-empty sentences, in playback order
+            audio_blobs: Audio data for each sentence (same order as texts)
+            format: Audio format (opus, mp3, aac, flac)
 
-            # Get the ACTUAL duration of the combined audio
-            actual_combined_duration = len(combined_audio) / 1000.0  # pydub uses milliseconds
-            estimated_total_duration = current_time
+        Returns:
+            Tuple of (combined_audio_data, sentence_timings, total_duration)
+        """
+        combined_audio_bytes, sample_ranges, total_samples, sample_rate = self._join_audio(
+            audio_blobs, format, TTS_SENTENCE_GAP_MS
+        )
 
-            print(f"[TTS Timing] Estimated total: {estimated_total_duration:.3f}s, Actual combined: {actual_combined_duration:.3f}s, Diff: {abs(actual_combined_duration - estimated_total_duration):.3f}s")
+        print(f"[TTS Generation] Added {TTS_SENTENCE_GAP_MS}ms silence between {len(texts)-1} sentence pairs")
 
-            # If there's a significant difference, adjust the timings proportionally
-            if abs(actual_combined_duration - estimated_total_duration) > 0.05:  # More than 50ms difference
-                print(f"[TTS Timing] Adjusting timestamps due to {abs(actual_combined_duration - estimated_total_duration):.3f}s difference")
-                scale_factor = actual_combined_duration / estimated_total_duration if estimated_total_duration > 0 else 1.0
+        # Timings come straight from sample/frame counts, so they match the audio exactly
+        sentence_timings = []
+        for sentence_text, (start_sample, end_sample) in zip(texts, sample_ranges):
+            start_time = start_sample / sample_rate
+            end_time = end_sample / sample_rate
+            sentence_timings.append(SentenceTiming(
+                text=sentence_text,
+                start_time=start_time,
+                end_time=end_time,
+                duration=end_time - start_time
+            ))
 
-                for timing in sentence_timings:
-                    original_start = timing.start_time
-                    original_end = timing.end_time
-                    timing.start_time = timing.start_time * scale_factor
-                    timing.end_time = timing.end_time * scale_factor
-                    timing.duration = timing.end_time - timing.start_time
-                    print(f"[TTS Timing]   Adjusted sentence: {original_start:.3f}s -> {timing.start_time:.3f}s")
+        total_duration = total_samples / sample_rate
 
-            # Export combined audio to bytes
-            output_io = BytesIO()
-            combined_audio.export(output_io, format=format)
-            combined_audio_bytes = output_io.getvalue()
+        return combined_audio_bytes, sentence_timings, total_duration
 
-            total_duration = actual_combined_duration
+    def _join_audio(
+        self,
+        audio_blobs: List[bytes],
+        format: str,
+        gap_ms: int
+    ) -> Tuple[bytes, List[Tuple[int, int]], int, int]:
+        """
+        Join audio clips into one file with gap_ms of silence between them
 
-            return combined_audio_bytes, sentence_timings, total_duration
+        Uses compressed-domain splicing when enabled and possible, otherwise
+        decodes to PCM, concatenates and re-encodes.
 
-        except TTSGenerationError:
-            raise
-        except Exception as e:
-            raise TTSGenerationError(
-                f"OpenAI TTS with timings failed: {str(e)}",
-                error_code=ERROR_TTS_FAILED
-            ) from e
+        Args:
+            audio_blobs: Audio data for each clip, in playback order
+            format: Audio format (opus, mp3, aac, flac)
+            gap_ms: Silence between clips in milliseconds
+
+        Returns:
+            Tuple of (audio_data, sample_ranges, total_samples, sample_rate)
+        """
+        if settings.tts_compressed_splicing:
+            # Join MP3 frames / Ogg pages directly (no decode, no generation loss)
+            spliced = splice_audio(audio_blobs, format, gap_ms)
+            if spliced is not None:
+                return spliced
+            print(f"[TTS Generation] Compressed splicing not possible for {format}, re-encoding")
+
+        # Decode once per clip to raw PCM
+        pcm_chunks = [decode_pcm(audio_bytes, format) for audio_bytes in audio_blobs]
+
+        # Single linear copy into one buffer; gaps are zero-filled silence
+        gap_frames = TTS_SAMPLE_RATE * gap_ms // 1000
+        combined_pcm, sample_ranges = concatenate_pcm(pcm_chunks, gap_frames)
+        del pcm_chunks
+
+        total_samples = len(combined_pcm) // (TTS_SAMPLE_WIDTH * TTS_CHANNELS)
+
+        # Encode combined audio to bytes (in memory)
+        combined_audio_bytes = encode_pcm(combined_pcm, format)
+
+        return combined_audio_bytes, sample_ranges, total_samples, TTS_SAMPLE_RATE
+
+    def _join_chunks(self, audio_blobs: List[bytes], format: str) -> bytes:
+        """Join the audio of consecutive text chunks without an added gap"""
+        audio_data, _, _, _ = self._join_audio(audio_blobs, format, gap_ms=0)
+        print(f"[TTS Generation] Joined {len(audio_blobs)} text chunks")
+        return audio_data
 
     def generate_speech_separated(
         self,
@@ -359,73 +564,351 @@ class OpenAIService:
         """
         try:
             # Validate inputs
-            valid_voices = ["alloy", "echo", "fable", "onyx", "nova", "shimmer"]
-            if voice not in valid_voices:
-                raise TTSGenerationError(
-                    f"Invalid voice: {voice}. Must be one of {valid_voices}",
-                    error_code=ERROR_TTS_FAILED
-                )
+            self._validate_voice_and_format(voice, format)
 
-            valid_formats = ["opus", "mp3", "aac", "flac"]
-            if format not in valid_formats:
+            if not sentences or len(sentences) == 0:
                 raise TTSGenerationError(
-                    f"Invalid format: {format}. Must be one of {valid_formats}",
+                    "No sentences provided",
                     error_code=ERROR_TTS_FAILED
                 )
 
+            # Generate TTS for all non-empty sentences concurrently,
+            # keeping their original indices
+            indexed_sentences = [
+                (idx, sentence_text)
+                for idx, sentence_text in enumerate(sentences)
+                if sentence_text.strip()
+            ]
+            audio_blobs, _ = self.synthesize_sentences_batched(
+                [sentence_text for _, sentence_text in indexed_sentences],
+                voice,
+                format
+            )
+
+            return self._build_separated_segments(indexed_sentences, audio_blobs, format)
+
+        except TTSGenerationError:
+            raise
+        except Exception as e:
+            raise TTSGenerationError(
+                f"OpenAI TTS separated generation failed: {str(e)}",
+                error_code=ERROR_TTS_FAILED
+            ) from e
+
+    def _build_separated_segments(
+        self,
+        indexed_sentences: List[Tuple[int, str]],
+        audio_blobs: List[bytes],
+        format: str
+    ) -> Tuple[List[Dict], float]:
+        """
+        Build per-sentence segment dicts (duration + base64 audio)
+
+        Args:
+            indexed_sentences: (original index, sentence text) pairs
+            audio_blobs: Audio data for each sentence (same order)
+            format: Audio format
+
+        Returns:
+            Tuple of (audio_segments, total_duration)
+        """
+        audio_segments = []
+        total_duration = 0.0
+
+        for (idx, sentence_text), audio_bytes in zip(indexed_sentences, audio_blobs):
+            # Get precise duration
+            duration = self._get_audio_duration(audio_bytes, format)
+
+            # Encode to base64
+            audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
+
+            # Store segment
+            audio_segments.append({
+                "index": idx,
+                "audio_base64": audio_base64,
+                "text": sentence_text,
+                "duration": duration
+            })
+
+            total_duration += duration
+
+            # Safe printing with Unicode error handling for Windows console (cp932)
+            # Replace non-encodable characters before printing
+            safe_text = sentence_text[:30].encode('ascii', errors='replace').decode('ascii')
+            print(f"[TTS Separated] Sentence {idx}: {duration:.3f}s, text: {safe_text}...")
+
+        print(f"[TTS Separated] Generated {len(audio_segments)} separate audio files, total: {total_duration:.3f}s")
+
+        return audio_segments, total_duration
+
+    # =====================================================
+    # Async API (used by FastAPI routes; never blocks the event loop)
+    # =====================================================
+
+    async def _create_speech_async(self, text: str, voice: str, format: str) -> bytes:
+        """
+        Call OpenAI TTS API for a single input without blocking the event loop
+
+        Args:
+            text: Text to convert to speech
+            voice: Voice to use
+            format: Audio format
+
+        Returns:
+            Audio data as bytes
+        """
+        async with _get_synthesis_semaphore():
+            response = await self.async_client.audio.speech.create(
+                model=OPENAI_TTS_MODEL,
+                voice=voice,
+                input=text,
+                response_format=format,
+                speed=OPENAI_TTS_SPEED
+            )
+            return await response.aread()
+
+    async def generate_speech_async(
+        self,
+        text: str,
+        voice: str = "nova",
+        format: str = "opus"
+    ) -> bytes:
+        """
+        Async version of generate_speech
+
+        Raises:
+            TTSGenerationError: If TTS generation fails
+        """
+        try:
+            self._validate_voice_and_format(voice, format)
+
+            chunks = plan_tts_chunks(text, settings.tts_chunk_max_chars)
+            if len(chunks) <= 1:
+                return await self._create_speech_async(text, voice, format)
+
+            audio_blobs = await self.synthesize_sentences_async(chunks, voice, format)
+            return await asyncio.to_thread(self._join_chunks, audio_blobs, format)
+
+        except TTSGenerationError:
+            raise
+        except Exception as e:
+            raise TTSGenerationError(
+                f"OpenAI TTS failed: {str(e)}",
+                error_code=ERROR_TTS_FAILED
+            ) from e
+
+    async def stream_speech_async(
+        self,
+        text: str,
+        voice: str = "nova",
+        format: str = "opus"
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream speech audio chunks as OpenAI produces them
+
+        The upstream request holds a synthesis slot until the stream is
+        exhausted or closed. Long text is split into chunks: the first chunk
+        is streamed live while the rest are synthesized concurrently and sent
+        in order afterwards (mp3/aac frames can simply be appended). Ogg and
+        FLAC streams can't be appended byte-wise, so for those the joined
+        file is sent as a single chunk.
+
+        Args:
+            text: Text to convert to speech
+            voice: Voice to use (alloy, echo, fable, onyx, nova, shimmer)
+            format: Audio format (opus, mp3, aac, flac)
+
+        Yields:
+            Audio data chunks, in order
+
+        Raises:
+            TTSGenerationError: If TTS generation fails (before or during streaming)
+        """
+        try:
+            self._validate_voice_and_format(voice, format)
+
+            chunks = plan_tts_chunks(text, settings.tts_chunk_max_chars) or [text]
+            if len(chunks) > 1 and format not in APPENDABLE_STREAM_FORMATS:
+                yield await self.generate_speech_async(text, voice, format)
+                return
+
+            remaining = [
+                asyncio.create_task(self._create_speech_async(chunk, voice, format))
+                for chunk in chunks[1:]
+            ]
+            try:
+                async with _get_synthesis_semaphore():
+                    async with self.async_client.audio.speech.with_streaming_response.create(
+                        model=OPENAI_TTS_MODEL,
+                        voice=voice,
+                        input=chunks[0],
+                        response_format=format,
+                        speed=OPENAI_TTS_SPEED
+                    ) as response:
+                        async for chunk in response.iter_bytes():
+                            yield chunk
+
+                for task in remaining:
+                    yield await task
+            finally:
+                for task in remaining:
+                    task.cancel()
+                    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+        except TTSGenerationError:
+            raise
+        except Exception as e:
+            raise TTSGenerationError(
+                f"OpenAI TTS stream failed: {str(e)}",
+                error_code=ERROR_TTS_FAILED
+            ) from e
+
+    async def synthesize_sentences_async(
+        self,
+        sentences: List[str],
+        voice: str = "nova",
+        format: str = "opus"
+    ) -> List[bytes]:
+        """
+        Async version of synthesize_sentences
+
+        At most settings.tts_max_concurrency calls are in flight per process.
+        On the first failure, all other calls (including in-flight ones) are cancelled.
+
+        Raises:
+            TTSGenerationError: If TTS generation fails for any sentence
+        """
+        try:
+            self._validate_voice_and_format(voice, format)
+
+            tasks = [
+                asyncio.create_task(self._create_speech_async(text, voice, format))
+                for text in sentences
+            ]
+            try:
+                return list(await asyncio.gather(*tasks))
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+
+        except TTSGenerationError:
+            raise
+        except Exception as e:
+            raise TTSGenerationError(
+                f"OpenAI TTS failed: {str(e)}",
+                error_code=ERROR_TTS_FAILED
+            ) from e
+
+    async def synthesize_sentences_batched_async(
+        self,
+        sentences: List[str],
+        voice: str = "nova",
+        format: str = "opus"
+    ) -> Tuple[List[bytes], int]:
+        """
+        Async version of synthesize_sentences_batched
+
+        Returns:
+            Tuple of (audio data per sentence in order, upstream calls made)
+
+        Raises:
+            TTSGenerationError: If TTS generation fails for any sentence
+        """
+        groups = self._plan_sentence_batches(sentences)
+        if len(groups) == len(sentences):
+            return await self.synthesize_sentences_async(sentences, voice, format), len(sentences)
+
+        group_blobs = await self.synthesize_sentences_async(self._batch_inputs(sentences, groups), voice, format)
+        audio_blobs = await asyncio.to_thread(self._split_batches, sentences, groups, group_blobs, format)
+
+        retry = [i for i, audio_bytes in enumerate(audio_blobs) if audio_bytes is None]
+        if retry:
+            retry_blobs = await self.synthesize_sentences_async([sentences[i] for i in retry], voice, format)
+            for i, audio_bytes in zip(retry, retry_blobs):
+                audio_blobs[i] = audio_bytes
+
+        upstream_calls = len(groups) + len(retry)
+        self._log_batching(len(sentences), upstream_calls)
+        return audio_blobs, upstream_calls
+
+    async def generate_speech_with_timings_async(
+        self,
+        sentences: List[str],
+        voice: str = "nova",
+        format: str = "opus"
+    ) -> Tuple[bytes, List[SentenceTiming], float]:
+        """
+        Async version of generate_speech_with_timings
+
+        Audio decoding/encoding runs in a worker thread.
+
+        Raises:
+            TTSGenerationError: If TTS generation fails
+        """
+        try:
+            self._validate_voice_and_format(voice, format)
+
             if not sentences or len(sentences) == 0:
                 raise TTSGenerationError(
                     "No sentences provided",
                     error_code=ERROR_TTS_FAILED
                 )
 
-            # Generate TTS for each sentence
-            audio_segments = []
-            total_duration = 0.0
-
-            for idx, sentence_text in enumerate(sentences):
-                if not sentence_text.strip():
-                    continue
-
-                # Generate TTS for this sentence
-                response = self.client.audio.speech.create(
-                    model=OPENAI_TTS_MODEL,
-                    voice=voice,
-                    input=sentence_text,
-                    response_format=format,
-                    speed=OPENAI_TTS_SPEED
+            texts = [s for s in sentences if s.strip()]
+            if len(texts) == 0:
+                raise TTSGenerationError(
+                    "No valid sentences to convert",
+                    error_code=ERROR_TTS_FAILED
                 )
 
-                # Read audio data
-                audio_data = BytesIO()
-                for chunk in response.iter_bytes():
-                    audio_data.write(chunk)
-                audio_bytes = audio_data.getvalue()
+            audio_blobs = await self.synthesize_sentences_async(texts, voice, format)
 
-                # Get precise duration
-                duration = self._get_audio_duration(audio_bytes, format)
+            return await asyncio.to_thread(self._combine_with_timings, texts, audio_blobs, format)
 
-                # Encode to base64
-                audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
+        except TTSGenerationError:
+            raise
+        except Exception as e:
+            raise TTSGenerationError(
+                f"OpenAI TTS with timings failed: {str(e)}",
+                error_code=ERROR_TTS_FAILED
+            ) from e
 
-                # Store segment
-                audio_segments.append({
-                    "index": idx,
-                    "audio_base64": audio_base64,
-                    "text": sentence_text,
-                    "duration": duration
-                })
+    async def generate_speech_separated_async(
+        self,
+        sentences: List[str],
+        voice: str = "nova",
+        format: str = "mp3"
+    ) -> Tuple[List[Dict], float]:
+        """
+        Async version of generate_speech_separated
 
-                total_duration += duration
+        Raises:
+            TTSGenerationError: If TTS generation fails
+        """
+        try:
+            self._validate_voice_and_format(voice, format)
 
-                # Safe printing with Unicode error handling for Windows console (cp932)
-                # Replace non-encodable characters before printing
-                safe_text = sentence_text[:30].encode('ascii', errors='replace').decode('ascii')
-                print(f"[TTS Separated] Sentence {idx}: {duration:.3f}s, text: {safe_text}...")
+            if not sentences or len(sentences) == 0:
+                raise TTSGenerationError(
+                    "No sentences provided",
+                    error_code=ERROR_TTS_FAILED
+                )
 
-            print(f"[TTS Separated] Generated {len(audio_segments)} separate audio files, total: {total_duration:.3f}s")
+            indexed_sentences = [
+                (idx, sentence_text)
+                for idx, sentence_text in enumerate(sentences)
+                if sentence_text.strip()
+            ]
+            audio_blobs, _ = await self.synthesize_sentences_batched_async(
+                [sentence_text for _, sentence_text in indexed_sentences],
+                voice,
+                format
+            )
 
-            return audio_segments, total_duration
+            return await asyncio.to_thread(
+                self._build_separated_segments, indexed_sentences, audio_blobs, format
+            )
 
         except TTSGenerationError:
             raise
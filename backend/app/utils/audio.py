@@ -0,0 +1,182 @@
+"""In-memory audio decode/encode helpers (ffmpeg over pipes, no temp files)"""
+import subprocess
+from typing import List, Tuple
+
+from pydub import AudioSegment
+from pydub.utils import get_encoder_name
+
+from app.core.constants import TTS_SAMPLE_RATE, TTS_CHANNELS, TTS_SAMPLE_WIDTH
+
+
+# ffmpeg demuxer names for the formats OpenAI TTS returns
+FFMPEG_INPUT_FORMATS = {
+    "opus": "ogg",
+    "mp3": "mp3",
+    "aac": "aac",
+    "flac": "flac",
+}
+
+# ffmpeg muxer names used when re-encoding
+FFMPEG_OUTPUT_FORMATS = {
+    "opus": "ogg",
+    "mp3": "mp3",
+    "aac": "adts",
+    "flac": "flac",
+}
+
+# ffmpeg encoders used when re-encoding PCM
+FFMPEG_ENCODERS = {
+    "opus": "libopus",
+    "mp3": "libmp3lame",
+    "aac": "aac",
+    "flac": "flac",
+}
+
+
+def _pcm_args() -> list:
+    """ffmpeg arguments describing our raw PCM layout"""
+    return [
+        "-f", "s16le",
+        "-ar", str(TTS_SAMPLE_RATE),
+        "-ac", str(TTS_CHANNELS),
+    ]
+
+
+def _run_ffmpeg(args: list, input_data: bytes) -> bytes:
+    """
+    Run ffmpeg with stdin/stdout pipes
+
+    Args:
+        args: ffmpeg arguments (without the executable)
+        input_data: Data written to stdin
+
+    Returns:
+        Data read from stdout
+
+    Raises:
+        RuntimeError: If ffmpeg fails or produces no output
+    """
+    command = [get_encoder_name(), "-hide_banner", "-loglevel", "error"] + args
+    process = subprocess.run(command, input=input_data, capture_output=True)
+
+    if process.returncode != 0 or len(process.stdout) == 0:
+        raise RuntimeError(
+            f"ffmpeg failed (code {process.returncode}): "
+            f"{process.stderr.decode(errors='ignore').strip()}"
+        )
+
+    return process.stdout
+
+
+def decode_pcm(audio_data: bytes, format: str) -> bytes:
+    """
+    Decode compressed audio to raw PCM in a single in-memory ffmpeg pass
+
+    Output is normalised to TTS_SAMPLE_RATE / TTS_CHANNELS / 16-bit so that
+    chunks can be concatenated directly.
+
+    Args:
+        audio_data: Compressed audio bytes
+        format: Audio format (opus, mp3, aac, flac)
+
+    Returns:
+        Raw little-endian PCM bytes
+    """
+    return _run_ffmpeg(
+        ["-f", FFMPEG_INPUT_FORMATS.get(format, format), "-i", "pipe:0", "-vn"]
+        + _pcm_args()
+        + ["pipe:1"],
+        audio_data
+    )
+
+
+def decode_audio(audio_data: bytes, format: str) -> Tuple[AudioSegment, float]:
+    """
+    Decode compressed audio to a PCM AudioSegment
+
+    Args:
+        audio_data: Compressed audio bytes
+        format: Audio format (opus, mp3, aac, flac)
+
+    Returns:
+        Tuple of (pcm_segment, duration_seconds)
+    """
+    pcm = decode_pcm(audio_data, format)
+
+    segment = AudioSegment(
+        data=pcm,
+        sample_width=TTS_SAMPLE_WIDTH,
+        frame_rate=TTS_SAMPLE_RATE,
+        channels=TTS_CHANNELS
+    )
+    duration = segment.frame_count() / TTS_SAMPLE_RATE
+
+    return segment, duration
+
+
+def encode_pcm(pcm: bytes, format: str) -> bytes:
+    """
+    Encode raw PCM to a compressed format in memory
+
+    Args:
+        pcm: Raw PCM (TTS_SAMPLE_RATE / TTS_CHANNELS / 16-bit); bytes or bytearray
+        format: Audio format (opus, mp3, aac, flac)
+
+    Returns:
+        Encoded audio bytes
+    """
+    return _run_ffmpeg(
+        _pcm_args()
+        + ["-i", "pipe:0", "-c:a", FFMPEG_ENCODERS.get(format, format)]
+        + ["-f", FFMPEG_OUTPUT_FORMATS.get(format, format), "pipe:1"],
+        pcm
+    )
+
+
+def encode_audio(segment: AudioSegment, format: str) -> bytes:
+    """
+    Encode a PCM segment to a compressed format in memory
+
+    Args:
+        segment: PCM audio (TTS_SAMPLE_RATE / TTS_CHANNELS / 16-bit)
+        format: Audio format (opus, mp3, aac, flac)
+
+    Returns:
+        Encoded audio bytes
+    """
+    return encode_pcm(segment.raw_data, format)
+
+
+def concatenate_pcm(chunks: List[bytes], gap_frames: int) -> Tuple[bytearray, List[Tuple[int, int]]]:
+    """
+    Join PCM chunks with silence gaps into one preallocated buffer
+
+    Each chunk is copied exactly once, so the cost is linear in the total
+    length (repeated AudioSegment "+" re-copies everything joined so far).
+
+    Args:
+        chunks: Raw PCM chunks (TTS_CHANNELS / 16-bit), in playback order
+        gap_frames: Silent frames inserted between consecutive chunks
+
+    Returns:
+        Tuple of (pcm_buffer, [(start_frame, end_frame), ...] per chunk)
+    """
+    frame_width = TTS_SAMPLE_WIDTH * TTS_CHANNELS
+    gap_bytes = gap_frames * frame_width
+    total_bytes = sum(len(chunk) for chunk in chunks) + gap_bytes * max(len(chunks) - 1, 0)
+
+    # Zero-filled, so the gaps are already silence
+    buffer = bytearray(total_bytes)
+    view = memoryview(buffer)
+    frame_ranges = []
+    offset = 0
+
+    for i, chunk in enumerate(chunks):
+        if i > 0:
+            offset += gap_bytes
+        view[offset:offset + len(chunk)] = chunk
+        frame_ranges.append((offset // frame_width, (offset + len(chunk)) // frame_width))
+        offset += len(chunk)
+
+    view.release()
+    return buffer, frame_ranges
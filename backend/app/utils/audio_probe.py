@@ -0,0 +1,492 @@
+"""
+Header-based audio duration probe (pure Python, no ffmpeg decode)
+
+Supports the formats OpenAI TTS returns:
+- mp3:  Xing/Info (+ LAME gapless delay/padding) or VBRI header, else frame walk
+- opus: Ogg final granule position minus OpusHead pre-skip
+- flac: STREAMINFO total samples, else last frame header
+- aac:  ADTS frame walk (1024 samples per raw data block)
+
+Durations are integer microseconds. get_audio_duration_us falls back to a
+full ffmpeg decode only when header parsing fails.
+"""
+import struct
+from typing import Optional
+
+from app.utils.audio import decode_audio
+
+
+# =====================================================
+# Common helpers
+# =====================================================
+
+def skip_id3v2(data: bytes) -> int:
+    """Return the offset just past a leading ID3v2 tag (0 if none)"""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    # Tag size is a 28-bit syncsafe integer
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def is_trailing_tag(data: bytes, pos: int) -> bool:
+    """True if only metadata tags (ID3v1/APE) or nothing remain at pos"""
+    rest = data[pos:]
+    return len(rest) < 4 or rest[:3] == b"TAG" or rest[:8] == b"APETAGEX"
+
+
+def _samples_to_us(samples: int, sample_rate: int) -> int:
+    """Convert a sample count to microseconds (rounded)"""
+    return (samples * 1_000_000 + sample_rate // 2) // sample_rate
+
+
+# =====================================================
+# MP3 (MPEG-1/2/2.5 Layer I/II/III)
+# =====================================================
+
+_MP3_VERSIONS = {0: "2.5", 2: "2", 3: "1"}
+_MP3_LAYERS = {1: 3, 2: 2, 3: 1}
+
+_MP3_BITRATES = {
+    ("1", 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    ("1", 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    ("1", 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    ("2", 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    ("2", 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    ("2", 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+_MP3_SAMPLE_RATES = {
+    "1": [44100, 48000, 32000],
+    "2": [22050, 24000, 16000],
+    "2.5": [11025, 12000, 8000],
+}
+
+
+def parse_mp3_frame_header(data: bytes, pos: int) -> Optional[dict]:
+    """
+    Parse an MPEG audio frame header at pos
+
+    Returns:
+        Dict with version, layer, sample_rate, channels, samples, length,
+        side_info_size (bytes after the 4-byte header), or None if invalid
+    """
+    if pos + 4 > len(data) or data[pos] != 0xFF or (data[pos + 1] & 0xE0) != 0xE0:
+        return None
+
+    b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+    version = _MP3_VERSIONS.get((b1 >> 3) & 0x03)
+    layer = _MP3_LAYERS.get((b1 >> 1) & 0x03)
+    bitrate_index = (b2 >> 4) & 0x0F
+    sample_rate_index = (b2 >> 2) & 0x03
+    if version is None or layer is None or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None  # reserved values (or free format, which we don't probe)
+
+    bitrate = _MP3_BITRATES[("1" if version == "1" else "2", layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][sample_rate_index]
+    padding = (b2 >> 1) & 0x01
+    channels = 1 if ((b3 >> 6) & 0x03) == 3 else 2
+
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 2:
+        samples = 1152
+        length = 144 * bitrate // sample_rate + padding
+    else:
+        samples = 1152 if version == "1" else 576
+        length = (144 if version == "1" else 72) * bitrate // sample_rate + padding
+
+    if version == "1":
+        side_info_size = 17 if channels == 1 else 32
+    else:
+        side_info_size = 9 if channels == 1 else 17
+
+    return {
+        "version": version,
+        "layer": layer,
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "samples": samples,
+        "length": length,
+        "side_info_size": side_info_size,
+    }
+
+
+def find_first_mp3_frame(data: bytes, start: int) -> Optional[int]:
+    """Find the first frame whose successor is also a valid frame header"""
+    pos = data.find(b"\xff", start)
+    while pos != -1 and pos + 4 <= len(data):
+        header = parse_mp3_frame_header(data, pos)
+        if header:
+            next_pos = pos + header["length"]
+            if next_pos >= len(data) or parse_mp3_frame_header(data, next_pos):
+                return pos
+        pos = data.find(b"\xff", pos + 1)
+    return None
+
+
+def parse_mp3_xing_header(data: bytes, pos: int, header: dict) -> Optional[dict]:
+    """
+    Parse a Xing/Info summary header in the frame at pos
+
+    Args:
+        data: MP3 stream
+        pos: Offset of the frame
+        header: Result of parse_mp3_frame_header for that frame
+
+    Returns:
+        Dict with tag (b"Xing"/b"Info"), frames, delay and padding (None when
+        absent; delay/padding come from the LAME/ffmpeg extension), or None
+        if the frame carries no summary header
+    """
+    # Xing/Info header (LAME, ffmpeg) lives in the first frame after the side info
+    xing = pos + 4 + header["side_info_size"]
+    tag = data[xing:xing + 4]
+    if tag not in (b"Xing", b"Info"):
+        return None
+
+    flags = struct.unpack(">I", data[xing + 4:xing + 8])[0]
+    offset = xing + 8
+    frames = None
+    if flags & 0x1:
+        frames = struct.unpack(">I", data[offset:offset + 4])[0]
+        offset += 4
+    if flags & 0x2:
+        offset += 4  # byte count
+    if flags & 0x4:
+        offset += 100  # TOC
+    if flags & 0x8:
+        offset += 4  # quality
+
+    delay = padding = None
+    # LAME/ffmpeg extension: encoder delay + padding (12 bits each)
+    if data[offset:offset + 4] in (b"LAME", b"Lavf", b"Lavc") and len(data) >= offset + 24:
+        delay_padding = int.from_bytes(data[offset + 21:offset + 24], "big")
+        delay, padding = delay_padding >> 12, delay_padding & 0xFFF
+
+    return {"tag": tag, "frames": frames, "delay": delay, "padding": padding}
+
+
+def probe_mp3_samples(data: bytes) -> Optional[tuple]:
+    """
+    Count playable samples in an MP3 stream
+
+    Returns:
+        Tuple of (samples, sample_rate), or None if the stream can't be parsed
+    """
+    pos = find_first_mp3_frame(data, skip_id3v2(data))
+    if pos is None:
+        return None
+
+    first = parse_mp3_frame_header(data, pos)
+    spf = first["samples"]
+    sample_rate = first["sample_rate"]
+
+    xing = parse_mp3_xing_header(data, pos, first)
+    if xing and xing["frames"] is not None:
+        samples = xing["frames"] * spf
+        if xing["delay"] is not None:
+            samples = max(0, samples - xing["delay"] - xing["padding"])
+        return samples, sample_rate
+
+    # VBRI header (Fraunhofer) at a fixed offset of 32 bytes after the header
+    vbri = pos + 4 + 32
+    if data[vbri:vbri + 4] == b"VBRI" and len(data) >= vbri + 18:
+        frames = struct.unpack(">I", data[vbri + 14:vbri + 18])[0]
+        return frames * spf, sample_rate
+
+    # No summary header (CBR): walk every frame
+    frames = 0
+    while pos < len(data):
+        header = parse_mp3_frame_header(data, pos)
+        if header is None:
+            if is_trailing_tag(data, pos):
+                break
+            return None
+        frames += 1
+        pos += header["length"]
+
+    return frames * spf, sample_rate
+
+
+# =====================================================
+# Ogg Opus
+# =====================================================
+
+OPUS_SAMPLE_RATE = 48000  # Opus granule positions are always at 48kHz
+
+
+def parse_ogg_page_header(data: bytes, pos: int) -> Optional[dict]:
+    """Parse the fixed part of an Ogg page header at pos"""
+    if data[pos:pos + 4] != b"OggS" or pos + 27 > len(data) or data[pos + 4] != 0:
+        return None
+    granule, serial, sequence = struct.unpack("<qII", data[pos + 6:pos + 22])
+    segments = data[pos + 26]
+    if pos + 27 + segments > len(data):
+        return None
+    segment_table = data[pos + 27:pos + 27 + segments]
+    return {
+        "header_type": data[pos + 5],
+        "granule": granule,
+        "serial": serial,
+        "sequence": sequence,
+        "header_size": 27 + segments,
+        "body_size": sum(segment_table),
+        "segment_table": segment_table,
+    }
+
+
+def probe_opus_samples(data: bytes) -> Optional[tuple]:
+    """
+    Count playable samples in an Ogg Opus stream (final granule - pre-skip)
+
+    Returns:
+        Tuple of (samples, 48000), or None if the stream can't be parsed
+    """
+    first = parse_ogg_page_header(data, 0)
+    if first is None:
+        return None
+    head = data[first["header_size"]:first["header_size"] + 19]
+    if head[:8] != b"OpusHead":
+        return None
+    pre_skip = struct.unpack("<H", head[10:12])[0]
+
+    # Walk back from the end to the last page of this stream with a granule
+    end = len(data)
+    while True:
+        pos = data.rfind(b"OggS", 0, end)
+        if pos <= 0:
+            return None
+        page = parse_ogg_page_header(data, pos)
+        if page and page["serial"] == first["serial"] and page["granule"] >= 0:
+            return max(0, page["granule"] - pre_skip), OPUS_SAMPLE_RATE
+        end = pos
+
+
+# =====================================================
+# FLAC
+# =====================================================
+
+def _crc8(data: bytes) -> int:
+    """CRC-8 (poly 0x07) as used by FLAC frame headers"""
+    crc = 0
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+
+def _read_flac_utf8(data: bytes, pos: int) -> Optional[tuple]:
+    """Decode FLAC's UTF-8-style coded number; returns (value, length)"""
+    if pos >= len(data):
+        return None
+    first = data[pos]
+    if first < 0x80:
+        return first, 1
+    length = 0
+    mask = 0x80
+    while first & mask:
+        length += 1
+        mask >>= 1
+    if length < 2 or length > 7 or pos + length > len(data):
+        return None
+    value = first & (mask - 1)
+    for byte in data[pos + 1:pos + length]:
+        if byte & 0xC0 != 0x80:
+            return None
+        value = (value << 6) | (byte & 0x3F)
+    return value, length
+
+
+def _parse_flac_frame_header(data: bytes, pos: int) -> Optional[dict]:
+    """Parse and CRC-check a FLAC frame header at pos"""
+    if pos + 5 > len(data) or data[pos] != 0xFF or (data[pos + 1] & 0xFE) != 0xF8:
+        return None
+    variable_blocksize = data[pos + 1] & 0x01
+    block_code = data[pos + 2] >> 4
+    rate_code = data[pos + 2] & 0x0F
+    if block_code == 0 or rate_code == 15 or (data[pos + 3] >> 4) > 10 or data[pos + 3] & 0x01:
+        return None
+
+    coded = _read_flac_utf8(data, pos + 4)
+    if coded is None:
+        return None
+    number, coded_length = coded
+    cursor = pos + 4 + coded_length
+
+    if block_code == 1:
+        block_size = 192
+    elif 2 <= block_code <= 5:
+        block_size = 576 << (block_code - 2)
+    elif block_code == 6:
+        block_size = data[cursor] + 1 if cursor < len(data) else 0
+        cursor += 1
+    elif block_code == 7:
+        block_size = int.from_bytes(data[cursor:cursor + 2], "big") + 1
+        cursor += 2
+    else:
+        block_size = 256 << (block_code - 8)
+
+    cursor += {12: 1, 13: 2, 14: 2}.get(rate_code, 0)
+    if cursor >= len(data) or _crc8(data[pos:cursor]) != data[cursor]:
+        return None
+
+    return {
+        "variable_blocksize": bool(variable_blocksize),
+        "number": number,
+        "block_size": block_size,
+    }
+
+
+def probe_flac_samples(data: bytes) -> Optional[tuple]:
+    """
+    Count samples in a FLAC stream (STREAMINFO, else last frame header)
+
+    Returns:
+        Tuple of (samples, sample_rate), or None if the stream can't be parsed
+    """
+    pos = skip_id3v2(data)
+    if data[pos:pos + 4] != b"fLaC":
+        return None
+    pos += 4
+
+    # First metadata block must be STREAMINFO (type 0, 34 bytes)
+    if pos + 4 + 34 > len(data) or data[pos] & 0x7F != 0:
+        return None
+    info = data[pos + 4:pos + 4 + 34]
+    min_block_size = struct.unpack(">H", info[0:2])[0]
+    packed = int.from_bytes(info[10:18], "big")
+    sample_rate = packed >> 44
+    total_samples = packed & 0xFFFFFFFFF
+    if sample_rate == 0:
+        return None
+    if total_samples:
+        return total_samples, sample_rate
+
+    # Streamed encoders leave total_samples = 0: skip remaining metadata blocks
+    # and derive the length from the last frame header instead
+    while True:
+        if pos + 4 > len(data):
+            return None
+        last_block = data[pos] & 0x80
+        pos += 4 + int.from_bytes(data[pos + 1:pos + 4], "big")
+        if last_block:
+            break
+    audio_start = pos
+
+    search_end = len(data)
+    while True:
+        candidate = data.rfind(b"\xff", audio_start, search_end)
+        if candidate == -1:
+            return None
+        header = _parse_flac_frame_header(data, candidate)
+        if header:
+            if header["variable_blocksize"]:
+                first_sample = header["number"]
+            else:
+                first_sample = header["number"] * min_block_size
+            return first_sample + header["block_size"], sample_rate
+        search_end = candidate
+
+
+# =====================================================
+# AAC (ADTS)
+# =====================================================
+
+_ADTS_SAMPLE_RATES = [
+    96000, 88200, 64000, 48000, 44100, 32000, 24000,
+    22050, 16000, 12000, 11025, 8000, 7350,
+]
+
+
+def probe_adts_samples(data: bytes) -> Optional[tuple]:
+    """
+    Count samples in an ADTS AAC stream by walking frame headers
+
+    Returns:
+        Tuple of (samples, sample_rate), or None if the stream can't be parsed
+    """
+    pos = skip_id3v2(data)
+    samples = 0
+    sample_rate = None
+
+    while pos < len(data):
+        if pos + 7 > len(data) or data[pos] != 0xFF or (data[pos + 1] & 0xF6) != 0xF0:
+            if sample_rate and is_trailing_tag(data, pos):
+                break
+            return None
+
+        rate_index = (data[pos + 2] >> 2) & 0x0F
+        if rate_index >= len(_ADTS_SAMPLE_RATES):
+            return None
+        sample_rate = sample_rate or _ADTS_SAMPLE_RATES[rate_index]
+
+        frame_length = ((data[pos + 3] & 0x03) << 11) | (data[pos + 4] << 3) | (data[pos + 5] >> 5)
+        if frame_length < 7:
+            return None
+
+        samples += ((data[pos + 6] & 0x03) + 1) * 1024
+        pos += frame_length
+
+    if sample_rate is None:
+        return None
+    return samples, sample_rate
+
+
+# =====================================================
+# Public API
+# =====================================================
+
+_PROBES = {
+    "mp3": probe_mp3_samples,
+    "opus": probe_opus_samples,
+    "flac": probe_flac_samples,
+    "aac": probe_adts_samples,
+}
+
+
+def probe_duration_us(audio_data: bytes, format: str) -> Optional[int]:
+    """
+    Get audio duration from container/frame headers only
+
+    Args:
+        audio_data: Audio file bytes
+        format: Audio format (opus, mp3, aac, flac)
+
+    Returns:
+        Duration in microseconds, or None if headers could not be parsed
+    """
+    probe = _PROBES.get(format)
+    if probe is None:
+        return None
+    try:
+        result = probe(audio_data)
+    except (IndexError, struct.error):
+        return None
+    if result is None:
+        return None
+    samples, sample_rate = result
+    return _samples_to_us(samples, sample_rate)
+
+
+def get_audio_duration_us(audio_data: bytes, format: str) -> int:
+    """
+    Get audio duration, falling back to a full ffmpeg decode if probing fails
+
+    Args:
+        audio_data: Audio file bytes
+        format: Audio format (opus, mp3, aac, flac)
+
+    Returns:
+        Duration in microseconds
+    """
+    duration_us = probe_duration_us(audio_data, format)
+    if duration_us is not None:
+        return duration_us
+
+    print(f"[Audio Probe] Header parsing failed for {format}, falling back to ffmpeg decode")
+    _, duration = decode_audio(audio_data, format)
+    return round(duration * 1_000_000)
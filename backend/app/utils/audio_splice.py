@@ -0,0 +1,400 @@
+"""
+Compressed-domain splicing of per-sentence audio (no decode/re-encode)
+
+Supported formats:
+- mp3:  frames are copied as-is; the gap is filled with silent frames
+        (zeroed side info) using the same header, so CBR stays CBR
+- opus: Ogg packets are re-paged into one logical stream; the gap is filled
+        with 20ms SILK silence packets and granule positions are rewritten
+
+Sentence ranges are derived from frame/packet sample counts. They describe
+the decoded output of the spliced stream (no gapless trimming except the
+Opus pre-skip of the first sentence and end trim of the last one).
+"""
+import struct
+import zlib
+from typing import List, Optional, Tuple
+
+from app.utils.audio_probe import (
+    OPUS_SAMPLE_RATE,
+    find_first_mp3_frame,
+    is_trailing_tag,
+    parse_mp3_frame_header,
+    parse_mp3_xing_header,
+    parse_ogg_page_header,
+    skip_id3v2,
+)
+
+
+# (audio_data, [(start_sample, end_sample), ...], total_samples, sample_rate)
+SpliceResult = Tuple[bytes, List[Tuple[int, int]], int, int]
+
+SPLICEABLE_FORMATS = ("mp3", "opus")
+
+
+# =====================================================
+# MP3
+# =====================================================
+
+# Synthesis filterbank delay of Layer III decoders (LAME adds it to the
+# encoder delay when computing gapless trimming)
+MP3_DECODER_DELAY = 529
+
+
+def _read_mp3_stream(data: bytes) -> Optional[dict]:
+    """Split an MP3 stream into audio frames (summary header frame dropped)"""
+    pos = find_first_mp3_frame(data, skip_id3v2(data))
+    if pos is None:
+        return None
+
+    first = parse_mp3_frame_header(data, pos)
+    xing = parse_mp3_xing_header(data, pos, first)
+    if xing:
+        pos += first["length"]
+
+    frames = []
+    while pos < len(data):
+        header = parse_mp3_frame_header(data, pos)
+        if header is None:
+            if is_trailing_tag(data, pos):
+                break
+            return None
+        frames.append(data[pos:pos + header["length"]])
+        pos += header["length"]
+
+    if not frames:
+        return None
+
+    frame = frames[0]
+    header = parse_mp3_frame_header(frame, 0)
+    if header["layer"] != 3:
+        return None
+
+    # The first frame must not borrow from the bit reservoir: after splicing,
+    # the bytes before it belong to another sentence (or a silent frame)
+    side_info = 4 if frame[1] & 0x01 else 6
+    if header["version"] == "1":
+        main_data_begin = (frame[side_info] << 1) | (frame[side_info + 1] >> 7)
+    else:
+        main_data_begin = frame[side_info]
+    if main_data_begin != 0:
+        return None
+
+    return {
+        "frames": frames,
+        "header": header,
+        "xing": xing,
+        "delay": xing["delay"] if xing else None,
+        "padding": xing["padding"] if xing else None,
+    }
+
+
+def _mp3_silent_frame(template: bytes) -> bytes:
+    """Build a silent Layer III frame (all-zero side info) matching template"""
+    # Same version/layer/bitrate/sample rate/mode; no CRC, no padding
+    header = bytes([0xFF, template[1] | 0x01, template[2] & 0xFC, template[3]])
+    length = parse_mp3_frame_header(header, 0)["length"]
+    return header + bytes(length - 4)
+
+
+def _mp3_xing_frame(template: bytes, frame_count: int) -> bytes:
+    """Build a Xing header frame carrying only the total frame count"""
+    frame = bytearray(_mp3_silent_frame(template))
+    xing = 4 + parse_mp3_frame_header(template, 0)["side_info_size"]
+    frame[xing:xing + 12] = b"Xing" + struct.pack(">II", 0x1, frame_count)
+    return bytes(frame)
+
+
+def splice_mp3(audio_blobs: List[bytes], gap_ms: int) -> Optional[SpliceResult]:
+    """
+    Join MP3 streams frame by frame with silent frames in between
+
+    Args:
+        audio_blobs: MP3 data for each sentence
+        gap_ms: Silence between sentences (rounded to whole frames)
+
+    Returns:
+        SpliceResult, or None if the streams can't be spliced
+    """
+    streams = [_read_mp3_stream(blob) for blob in audio_blobs]
+    if not streams or any(stream is None for stream in streams):
+        return None
+
+    layout = {(s["header"]["version"], s["header"]["sample_rate"], s["header"]["channels"]) for s in streams}
+    if len(layout) != 1:
+        return None
+
+    spf = streams[0]["header"]["samples"]
+    sample_rate = streams[0]["header"]["sample_rate"]
+    template = streams[0]["frames"][0]
+    silent_frame = _mp3_silent_frame(template)
+    gap_frames = round(sample_rate * gap_ms / 1000 / spf)
+
+    parts = []
+    ranges = []
+    frame_count = 0
+
+    for i, stream in enumerate(streams):
+        if i > 0:
+            parts.append(silent_frame * gap_frames)
+            frame_count += gap_frames
+
+        offset = frame_count * spf
+        stream_samples = len(stream["frames"]) * spf
+        if stream["delay"] is not None:
+            start = offset + stream["delay"] + MP3_DECODER_DELAY
+            end = start + max(0, stream_samples - stream["delay"] - stream["padding"])
+        else:
+            start, end = offset, offset + stream_samples
+        ranges.append((start, end))
+
+        parts.extend(stream["frames"])
+        frame_count += len(stream["frames"])
+
+    total_samples = frame_count * spf
+    ranges = [(min(start, total_samples), min(end, total_samples)) for start, end in ranges]
+
+    # Keep a summary header if the sources had one (VBR seeking/duration)
+    if any(stream["xing"] for stream in streams):
+        parts.insert(0, _mp3_xing_frame(template, frame_count))
+
+    return b"".join(parts), ranges, total_samples, sample_rate
+
+
+# =====================================================
+# Ogg Opus
+# =====================================================
+
+# 20ms SILK-only narrowband frame of digital silence (libopus, steady state).
+# A SILK packet (rather than the usual CELT silence frame f8 ff fe) makes the
+# decoder reset its CELT state when the next sentence starts; otherwise CELT's
+# inter-frame energy prediction fades the sentence in over ~150ms.
+OPUS_SILENCE_PACKET = b"\x08\x08\xac\xb3\x0e\xc6"
+OPUS_SILENCE_SAMPLES = 960
+
+# Audio duration per output page (matches ffmpeg's default of 1s)
+OGG_PAGE_SAMPLES = OPUS_SAMPLE_RATE
+
+_BIT_REVERSE = bytes(int(f"{i:08b}"[::-1], 2) for i in range(256))
+
+
+def ogg_crc(data: bytes) -> int:
+    """
+    Ogg page checksum (CRC-32, poly 0x04C11DB7, MSB-first, no init/xorout)
+
+    zlib.crc32 is the bit-reflected variant with 0xFFFFFFFF init/xorout:
+    feeding it bit-reversed bytes and reversing the result gives the
+    MSB-first CRC, and XOR-ing the CRC of an equally long zero buffer
+    cancels the init/xorout terms.
+    """
+    reflected = zlib.crc32(data.translate(_BIT_REVERSE)) ^ zlib.crc32(bytes(len(data)))
+    return int(f"{reflected:032b}"[::-1], 2)
+
+
+def opus_packet_samples(packet: bytes) -> int:
+    """Number of 48kHz samples in an Opus packet (from its TOC byte)"""
+    config = packet[0] >> 3
+    if config < 12:
+        frame_size = (480, 960, 1920, 2880)[config % 4]  # SILK
+    elif config < 16:
+        frame_size = (480, 960)[config % 2]  # Hybrid
+    else:
+        frame_size = (120, 240, 480, 960)[config % 4]  # CELT
+
+    code = packet[0] & 0x03
+    if code == 0:
+        frame_count = 1
+    elif code in (1, 2):
+        frame_count = 2
+    else:
+        frame_count = packet[1] & 0x3F
+
+    return frame_size * frame_count
+
+
+def _read_ogg_packets(data: bytes) -> Optional[Tuple[List[bytes], int]]:
+    """Reassemble the packets of a single-stream Ogg file; returns (packets, final_granule)"""
+    packets = []
+    pending = b""
+    serial = None
+    final_granule = 0
+    pos = 0
+
+    while pos < len(data):
+        page = parse_ogg_page_header(data, pos)
+        if page is None:
+            return None
+        if serial is None:
+            serial = page["serial"]
+        elif page["serial"] != serial:
+            return None  # chained/multiplexed streams are not spliced
+
+        body = pos + page["header_size"]
+        for lacing in page["segment_table"]:
+            pending += data[body:body + lacing]
+            body += lacing
+            if lacing < 255:
+                packets.append(pending)
+                pending = b""
+
+        if page["granule"] >= 0:
+            final_granule = page["granule"]
+        pos += page["header_size"] + page["body_size"]
+
+    return packets, final_granule
+
+
+def _read_opus_stream(data: bytes) -> Optional[dict]:
+    """Parse an Ogg Opus stream into header packets and audio packets"""
+    result = _read_ogg_packets(data)
+    if result is None:
+        return None
+    packets, final_granule = result
+    if len(packets) < 3 or packets[0][:8] != b"OpusHead" or packets[1][:8] != b"OpusTags":
+        return None
+
+    head = packets[0]
+    if len(head) < 19 or head[18] != 0:
+        return None  # only mapping family 0 (mono/stereo)
+
+    audio_packets = [packet for packet in packets[2:] if packet]
+    return {
+        "head": head,
+        "tags": packets[1],
+        "channels": head[9],
+        "pre_skip": struct.unpack("<H", head[10:12])[0],
+        "packets": audio_packets,
+        "samples": [opus_packet_samples(packet) for packet in audio_packets],
+        "final_granule": final_granule,
+    }
+
+
+def _ogg_page(serial: int, sequence: int, granule: int, packets: List[bytes], header_type: int = 0) -> bytes:
+    """Build one Ogg page (packets must fit in 255 lacing values)"""
+    lacing = bytearray()
+    for packet in packets:
+        lacing.extend(b"\xff" * (len(packet) // 255))
+        lacing.append(len(packet) % 255)
+
+    page = bytearray(
+        b"OggS" + bytes([0, header_type]) + struct.pack("<qII", granule, serial, sequence)
+        + b"\x00\x00\x00\x00" + bytes([len(lacing)]) + lacing + b"".join(packets)
+    )
+    page[22:26] = struct.pack("<I", ogg_crc(bytes(page)))
+    return bytes(page)
+
+
+def _lacing_size(packet: bytes) -> int:
+    return len(packet) // 255 + 1
+
+
+def splice_ogg_opus(audio_blobs: List[bytes], gap_ms: int) -> Optional[SpliceResult]:
+    """
+    Join Ogg Opus streams packet by packet with silence packets in between
+
+    Args:
+        audio_blobs: Ogg Opus data for each sentence
+        gap_ms: Silence between sentences (rounded to whole 20ms packets,
+            at least one so the decoder resets its CELT state)
+
+    Returns:
+        SpliceResult, or None if the streams can't be spliced
+    """
+    streams = [_read_opus_stream(blob) for blob in audio_blobs]
+    if not streams or any(stream is None for stream in streams):
+        return None
+    if len({stream["channels"] for stream in streams}) != 1:
+        return None
+
+    first = streams[0]
+    gap_packets = max(1, round(OPUS_SAMPLE_RATE * gap_ms / 1000 / OPUS_SILENCE_SAMPLES))
+
+    # Flatten into one packet sequence on a single granule timeline
+    packets = []
+    packet_samples = []
+    ranges = []
+    position = 0
+
+    for i, stream in enumerate(streams):
+        if i > 0:
+            packets.extend([OPUS_SILENCE_PACKET] * gap_packets)
+            packet_samples.extend([OPUS_SILENCE_SAMPLES] * gap_packets)
+            position += OPUS_SILENCE_SAMPLES * gap_packets
+
+        # Decoded time = granule - pre-skip of the output (first sentence's)
+        ranges.append((
+            max(0, position + stream["pre_skip"] - first["pre_skip"]),
+            max(0, position + stream["final_granule"] - first["pre_skip"]),
+        ))
+
+        packets.extend(stream["packets"])
+        packet_samples.extend(stream["samples"])
+        position += sum(stream["samples"])
+
+    # End trimming is only expressible on the last page: keep the last sentence's
+    final_granule = position - sum(streams[-1]["samples"]) + streams[-1]["final_granule"]
+
+    serial = struct.unpack("<I", audio_blobs[0][14:18])[0]
+    pages = [
+        _ogg_page(serial, 0, 0, [first["head"]], header_type=0x02),
+        _ogg_page(serial, 1, 0, [first["tags"]]) if _lacing_size(first["tags"]) <= 255 else None,
+    ]
+    if pages[1] is None:
+        return None  # oversized tags (embedded art) would need continuation pages
+
+    page_packets = []
+    page_lacing = 0
+    page_samples = 0
+    granule = 0
+
+    for packet, samples in zip(packets, packet_samples):
+        if page_packets and (page_lacing + _lacing_size(packet) > 255 or page_samples >= OGG_PAGE_SAMPLES):
+            pages.append(_ogg_page(serial, len(pages), granule, page_packets))
+            page_packets, page_lacing, page_samples = [], 0, 0
+
+        page_packets.append(packet)
+        page_lacing += _lacing_size(packet)
+        page_samples += samples
+        granule += samples
+
+    # Granule positions may not go backwards: trimming can't reach past the last page
+    if final_granule < granule - page_samples:
+        return None
+    pages.append(_ogg_page(serial, len(pages), final_granule, page_packets, header_type=0x04))
+
+    total_samples = max(0, final_granule - first["pre_skip"])
+    ranges = [(min(start, total_samples), min(end, total_samples)) for start, end in ranges]
+
+    return b"".join(pages), ranges, total_samples, OPUS_SAMPLE_RATE
+
+
+# =====================================================
+# Public API
+# =====================================================
+
+_SPLICERS = {
+    "mp3": splice_mp3,
+    "opus": splice_ogg_opus,
+}
+
+
+def splice_audio(audio_blobs: List[bytes], format: str, gap_ms: int) -> Optional[SpliceResult]:
+    """
+    Join per-sentence audio without decoding, if the format allows it
+
+    Args:
+        audio_blobs: Audio data for each sentence, in playback order
+        format: Audio format (opus, mp3, aac, flac)
+        gap_ms: Silence between sentences in milliseconds
+
+    Returns:
+        Tuple of (audio_data, sample_ranges, total_samples, sample_rate), or
+        None if the format isn't supported or the streams can't be spliced
+    """
+    splicer = _SPLICERS.get(format)
+    if splicer is None:
+        return None
+    try:
+        return splicer(audio_blobs, gap_ms)
+    except (IndexError, struct.error):
+        return None
@@ -0,0 +1,62 @@
+"""Bloom filter for fast negative lookups"""
+import hashlib
+import math
+from typing import Any, Dict
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over string keys
+
+    "not in" is definite; "in" may be a false positive. Sized for
+    `capacity` keys at `error_rate`; past capacity the false-positive rate
+    rises (see estimated_false_positive_rate).
+
+    Args:
+        capacity: Expected number of keys
+        error_rate: Target false-positive rate at capacity
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # Optimal bit count and hash count for the target rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key: str):
+        # Double hashing: two 64-bit halves of one digest generate all k positions
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    @property
+    def memory_bytes(self) -> int:
+        """Size of the bit array"""
+        return len(self._bits)
+
+    def estimated_false_positive_rate(self) -> float:
+        """False-positive rate implied by the current fill (fraction of set bits ^ k)"""
+        set_bits = int.from_bytes(self._bits, "little").bit_count()
+        return (set_bits / self.num_bits) ** self.num_hashes
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "items": self.count,
+            "capacity": self.capacity,
+            "memory_bytes": self.memory_bytes,
+            "estimated_false_positive_rate": self.estimated_false_positive_rate(),
+        }
@@ -0,0 +1,166 @@
+"""
+Image normalization before OCR upload
+
+Phone photos of textbook pages are often 12MP JPEGs of several megabytes,
+far more than the model needs to read the text. normalize_image:
+
+1. rejects payloads over the size limit and bytes Pillow cannot decode
+2. applies the EXIF orientation (the model sees the page upright)
+3. downscales so the longer side fits max_dimension (JPEG is decoded at
+   reduced scale directly when possible)
+4. crops to the text region, if crop (see app.utils.page_crop)
+5. converts to grayscale when the page has no meaningful colour
+6. straightens small rotations of the text, if deskew
+7. re-encodes as JPEG at the configured quality
+
+An image that needed none of the geometric changes and would not get
+smaller is passed through unchanged (e.g. a small PNG screenshot).
+"""
+import io
+import math
+import time
+from typing import Tuple
+
+from PIL import Image, ImageChops, ImageOps, UnidentifiedImageError
+
+from app.core.constants import (
+    ERROR_IMAGE_TOO_LARGE,
+    ERROR_INVALID_IMAGE,
+    IMAGE_COMPRESSION_FORMAT,
+    IMAGE_GRAYSCALE_MAX_CHROMA,
+    IMAGE_GRAYSCALE_MAX_COLOR_RATIO,
+    IMAGE_GRAYSCALE_SAMPLE_SIZE,
+)
+from app.core.errors import ImageProcessingError
+from app.utils.page_crop import crop_page, deskew_page
+
+
+def strip_data_url(image_data: str) -> str:
+    """
+    Base64 payload of image data sent by the client
+
+    Args:
+        image_data: Base64 encoded image data (possibly with data URL prefix)
+
+    Returns:
+        Base64 data without the prefix (e.g. "data:image/jpeg;base64,")
+    """
+    if image_data.startswith("data:"):
+        return image_data.split(",", 1)[1]
+    return image_data
+
+
+def is_monochrome(image: Image.Image) -> bool:
+    """
+    Whether an RGB image is effectively grey (black text on white or tinted paper)
+
+    Judged on a small sample: a pixel is coloured when its max-min channel
+    spread exceeds IMAGE_GRAYSCALE_MAX_CHROMA, and the image is monochrome
+    when at most IMAGE_GRAYSCALE_MAX_COLOR_RATIO of pixels are coloured.
+    """
+    sample = image.convert("RGB")
+    sample.thumbnail((IMAGE_GRAYSCALE_SAMPLE_SIZE, IMAGE_GRAYSCALE_SAMPLE_SIZE))
+    r, g, b = sample.split()
+    highest = ImageChops.lighter(ImageChops.lighter(r, g), b)
+    lowest = ImageChops.darker(ImageChops.darker(r, g), b)
+    histogram = ImageChops.difference(highest, lowest).histogram()
+
+    colored = sum(histogram[IMAGE_GRAYSCALE_MAX_CHROMA + 1:])
+    return colored <= IMAGE_GRAYSCALE_MAX_COLOR_RATIO * sum(histogram)
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """Drop transparency (composited onto white, like a printed page)"""
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+        return Image.alpha_composite(background, image).convert("RGB")
+    if image.mode not in ("RGB", "L"):
+        return image.convert("RGB")
+    return image
+
+
+def normalize_image(
+    data: bytes,
+    max_dimension: int,
+    quality: int,
+    max_bytes: int,
+    crop: bool = False,
+    deskew: bool = False
+) -> Tuple[bytes, str]:
+    """
+    Normalize an uploaded page image for OCR
+
+    Args:
+        data: Image file bytes as uploaded
+        max_dimension: Longest side in pixels after downscaling
+        quality: JPEG quality for re-encoding (1-95)
+        max_bytes: Largest accepted upload
+        crop: Whether to crop to the text region (desk, fingers, blank margins removed)
+        deskew: Whether to straighten small rotations of the text
+
+    Returns:
+        Tuple of (image_bytes, media_type)
+
+    Raises:
+        ImageProcessingError: If the upload is too large or not a readable image
+    """
+    start_time = time.perf_counter()
+    if len(data) > max_bytes:
+        raise ImageProcessingError(
+            f"Image is {len(data) / (1024 * 1024):.1f}MB (max {max_bytes / (1024 * 1024):.0f}MB)",
+            error_code=ERROR_IMAGE_TOO_LARGE
+        )
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        original_format = image.format
+        original_size = image.size
+        scale = max_dimension / max(original_size)
+        if scale < 1:
+            # JPEG: the decoder scales down by 1/2, 1/4 or 1/8 directly (staying >= the target)
+            image.draft(None, (math.ceil(original_size[0] * scale), math.ceil(original_size[1] * scale)))
+        image.load()
+        orientation = image.getexif().get(0x0112, 1)
+        image = ImageOps.exif_transpose(image)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ImageProcessingError(f"Invalid image: {str(e)}", error_code=ERROR_INVALID_IMAGE) from e
+
+    resized = scale < 1
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    image = _flatten(image)
+    scaled_size = image.size
+    box = None
+    if crop:
+        # Before the colour check, so a coloured desk doesn't keep a black-and-white page in colour
+        image, box = crop_page(image)
+    if image.mode == "RGB" and is_monochrome(image):
+        image = image.convert("L")
+    angle = 0.0
+    if deskew:
+        image, angle = deskew_page(image)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format=IMAGE_COMPRESSION_FORMAT, quality=quality, optimize=True)
+    normalized = buffer.getvalue()
+    media_type = "image/jpeg"
+
+    changed = resized or orientation != 1 or box is not None or angle != 0.0
+    if not changed and len(normalized) >= len(data):
+        normalized = data
+        media_type = Image.MIME.get(original_format, media_type)
+
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+    saved = len(data) - len(normalized)
+    geometry = ""
+    if box is not None:
+        kept = image.size[0] * image.size[1] / (scaled_size[0] * scaled_size[1])
+        geometry += f", cropped to {kept:.0%} of the pixels"
+    if angle:
+        geometry += f", rotated {angle:+.1f}deg"
+    print(
+        f"[ImageNormalize] {original_size[0]}x{original_size[1]} {original_format} -> "
+        f"{image.size[0]}x{image.size[1]} {image.mode}: {len(data)} -> {len(normalized)} bytes "
+        f"(saved {saved}, {saved / len(data):.0%}{geometry}) in {elapsed_ms:.1f}ms"
+    )
+    return normalized, media_type
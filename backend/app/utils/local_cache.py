@@ -0,0 +1,381 @@
+"""Process-local cache tiers (in-memory LRU, on-disk store) and a tiered front"""
+import hashlib
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+class CacheTier(ABC):
+    """
+    Byte-valued key/value cache tier with hit/miss counters
+
+    Subclasses implement _get/_set/_delete; counters are kept here.
+    """
+
+    name = "tier"
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self._get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        self._set(key, value)
+
+    def delete(self, key: str) -> None:
+        self._delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def try_lease(self, key: str, ttl_seconds: float) -> bool:
+        """
+        Claim key for ttl_seconds so other processes sharing this tier wait
+
+        Process-local tiers have nobody to coordinate with, so they always grant.
+        """
+        return True
+
+    def release_lease(self, key: str) -> None:
+        pass
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[bytes]:
+        """Stored value (None on a miss)"""
+
+    @abstractmethod
+    def _set(self, key: str, value: bytes) -> None:
+        """Store value (a tier may decline, e.g. when it is too large)"""
+
+    @abstractmethod
+    def _delete(self, key: str) -> None:
+        """Remove key if present"""
+
+
+class MemoryLRUCache(CacheTier):
+    """
+    Size-bounded in-process LRU
+
+    Values larger than max_item_bytes are not stored, so the tier holds
+    metadata and short clips while long audio goes to the next tier.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_bytes: int, max_item_bytes: int):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.bytes = 0
+        self._items: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: bytes) -> None:
+        with self._lock:
+            self._pop(key)
+            if len(value) > self.max_item_bytes or len(value) > self.max_bytes:
+                return
+
+            self._items[key] = value
+            self.bytes += len(value)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.bytes -= len(evicted)
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def _pop(self, key: str) -> None:
+        value = self._items.pop(key, None)
+        if value is not None:
+            self.bytes -= len(value)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "items": len(self._items), "bytes": self.bytes}
+
+
+class DiskCache(CacheTier):
+    """
+    On-disk store with a byte budget and least-recently-used eviction
+
+    One file per key (named by the key's SHA-256, fanned out into 256
+    subdirectories). Writes go through a temp file + rename, so readers
+    never see partial files. The usage index is rebuilt from the directory
+    at startup; access order is approximated by file mtime, which is
+    bumped on every hit.
+
+    Several worker processes can share one directory: files written by
+    another process are picked up on read, and leases are lock files
+    created with O_EXCL. Each process enforces the budget on the files it
+    knows about, so the directory can briefly exceed it.
+    """
+
+    name = "disk"
+
+    LEASE_DIR = "leases"
+    # Temp files older than this at startup were left by an interrupted write
+    # (younger ones may belong to another worker that is writing right now)
+    STALE_TEMP_SECONDS = 3600
+
+    def __init__(self, directory: str, max_bytes: int):
+        super().__init__()
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_index()
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _load_index(self) -> None:
+        """Index existing files, oldest access first"""
+        entries = []
+        now = time.time()
+        if os.path.isdir(self.directory):
+            for root, dirs, files in os.walk(self.directory):
+                if root == self.directory and self.LEASE_DIR in dirs:
+                    dirs.remove(self.LEASE_DIR)
+                for file_name in files:
+                    path = os.path.join(root, file_name)
+                    # Another worker may rename, evict or remove the file meanwhile
+                    try:
+                        stat = os.stat(path)
+                        if file_name.endswith(".tmp"):
+                            if now - stat.st_mtime >= self.STALE_TEMP_SECONDS:
+                                os.remove(path)
+                            continue
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, path, stat.st_size))
+
+        for _, path, size in sorted(entries):
+            self._sizes[path] = size
+            self.bytes += size
+
+        self._evict()
+
+    def _get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        with self._lock:
+            if path in self._sizes:
+                self._sizes.move_to_end(path)
+
+        try:
+            with open(path, "rb") as f:
+                value = f.read()
+            os.utime(path)
+        except OSError:
+            # Never written, or removed by another worker's eviction
+            with self._lock:
+                self._forget(path)
+            return None
+
+        with self._lock:
+            if path not in self._sizes:
+                # Written by another worker sharing the directory
+                self._sizes[path] = len(value)
+                self.bytes += len(value)
+                self._evict()
+        return value
+
+    def _set(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(value)
+            os.replace(temp_path, path)
+        except OSError:
+            # e.g. disk full: don't leave the partial file behind
+            try:
+                os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        with self._lock:
+            self._forget(path)
+            self._sizes[path] = len(value)
+            self.bytes += len(value)
+            self._evict()
+
+    def _delete(self, key: str) -> None:
+        path = self._path(key)
+        with self._lock:
+            self._forget(path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _lease_path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, self.LEASE_DIR, f"{digest}.lease")
+
+    def try_lease(self, key: str, ttl_seconds: float) -> bool:
+        """Create the lease file; an expired one (crashed holder) is taken over"""
+        path = self._lease_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(path) < ttl_seconds:
+                        return False
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                continue
+
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            return True
+
+        return False
+
+    def release_lease(self, key: str) -> None:
+        try:
+            os.remove(self._lease_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _forget(self, path: str) -> None:
+        size = self._sizes.pop(path, None)
+        if size is not None:
+            self.bytes -= size
+
+    def _evict(self) -> None:
+        """Remove least recently used files until within budget (lock held)"""
+        while self.bytes > self.max_bytes and self._sizes:
+            path, size = self._sizes.popitem(last=False)
+            self.bytes -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "items": len(self._sizes), "bytes": self.bytes}
+
+
+class TieredCache:
+    """
+    Cache hierarchy: lookups go through the tiers in order, a hit is copied
+    into the faster tiers above it, and writes go to every tier
+
+    Best-effort: a tier that fails with an OS error (disk full, read-only or
+    unwritable directory) is logged and skipped, so a caller falls through to
+    the shared cache or generation instead of failing the request.
+
+    Args:
+        tiers: Tiers from fastest to slowest (may be empty)
+    """
+
+    def __init__(self, tiers: List[CacheTier]):
+        self.tiers = tiers
+
+    def get(self, key: str) -> Optional[bytes]:
+        for i, tier in enumerate(self.tiers):
+            try:
+                value = tier.get(key)
+            except OSError as e:
+                print(f"[LocalCache] {tier.name} read failed: {e}")
+                continue
+            if value is not None:
+                for upper in self.tiers[:i]:
+                    self._set_tier(upper, key, value)
+                return value
+        return None
+
+    def set(self, key: str, value: bytes) -> None:
+        for tier in self.tiers:
+            self._set_tier(tier, key, value)
+
+    def delete(self, key: str) -> None:
+        for tier in self.tiers:
+            try:
+                tier.delete(key)
+            except OSError as e:
+                print(f"[LocalCache] {tier.name} delete failed: {e}")
+
+    @staticmethod
+    def _set_tier(tier: CacheTier, key: str, value: bytes) -> None:
+        try:
+            tier.set(key, value)
+        except OSError as e:
+            print(f"[LocalCache] {tier.name} write failed: {e}")
+
+    def get_json(self, key: str) -> Optional[Any]:
+        value = self.get(key)
+        if value is None:
+            return None
+        try:
+            return json.loads(value)
+        except ValueError as e:
+            print(f"[LocalCache] Unreadable entry {key}: {e}")
+            return None
+
+    def set_json(self, key: str, value: Any) -> None:
+        self.set(key, json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+    def try_lease(self, key: str, ttl_seconds: float) -> bool:
+        """
+        Claim key in every tier (all must grant; no tiers means no contention)
+
+        A tier whose lease can't be taken because of an OS error grants, so
+        a broken cache directory never blocks work.
+        """
+        granted = []
+        for tier in self.tiers:
+            try:
+                taken = tier.try_lease(key, ttl_seconds)
+            except OSError as e:
+                print(f"[LocalCache] {tier.name} lease failed: {e}")
+                continue
+            if not taken:
+                self._release(granted, key)
+                return False
+            granted.append(tier)
+        return True
+
+    def release_lease(self, key: str) -> None:
+        self._release(self.tiers, key)
+
+    @staticmethod
+    def _release(tiers: List[CacheTier], key: str) -> None:
+        for tier in tiers:
+            try:
+                tier.release_lease(key)
+            except OSError as e:
+                print(f"[LocalCache] {tier.name} lease release failed: {e}")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {tier.name: tier.stats() for tier in self.tiers}
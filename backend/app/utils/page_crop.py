@@ -0,0 +1,187 @@
+"""
+Text-region cropping (and optional deskew) of page photos before OCR
+
+Photos of textbook pages include the desk, fingers and wide blank margins,
+all of which the vision model is billed for. The page is analysed on a
+downsampled grayscale NumPy array (PAGE_CROP_ANALYSIS_SIZE on the longer
+side, a few milliseconds):
+
+- Edge density: per block of PAGE_CROP_BLOCK_SIZE pixels, the mean
+  horizontal and the mean vertical intensity change. Printed text changes
+  in both directions, so a block is text-bearing when the smaller of the
+  two reaches PAGE_CROP_MIN_GRADIENT. Paper, desk and skin are smooth, and
+  the outline of the page or a finger changes mostly in one direction.
+- Projection profiles of the text blocks (rows, then columns within the
+  text rows) give the extent; rows and columns below PAGE_CROP_MIN_PROFILE
+  of the peak are ignored. The extent is padded and mapped back to the
+  full-size image.
+
+Deskew (optional, on the cropped region) rotates by the angle within
++-DESKEW_MAX_ANGLE that makes the row profile of dark pixels peakiest (text
+lines horizontal), then trims to the text again.
+
+The crop is skipped when it would remove less than PAGE_CROP_MIN_SAVING of
+the pixels, or when too little text was found to trust it.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from app.core.constants import (
+    DESKEW_ANGLE_STEP,
+    DESKEW_MAX_ANGLE,
+    DESKEW_MIN_ANGLE,
+    PAGE_CROP_ANALYSIS_SIZE,
+    PAGE_CROP_BLOCK_SIZE,
+    PAGE_CROP_MIN_GRADIENT,
+    PAGE_CROP_MIN_PROFILE,
+    PAGE_CROP_MIN_SAVING,
+    PAGE_CROP_MIN_TEXT_AREA,
+    PAGE_CROP_PADDING,
+)
+
+Box = Tuple[int, int, int, int]  # (left, top, right, bottom) as in PIL
+
+
+def analysis_array(image: Image.Image) -> Tuple[np.ndarray, float]:
+    """Downsampled grayscale copy as float32, and the factor back to full size"""
+    small = image.convert("L")
+    scale = max(small.size) / PAGE_CROP_ANALYSIS_SIZE
+    if scale > 1:
+        small = small.resize(
+            (max(1, round(small.width / scale)), max(1, round(small.height / scale))),
+            Image.BILINEAR,
+            reducing_gap=2.0
+        )
+    else:
+        scale = 1.0
+    return np.asarray(small, dtype=np.float32), scale
+
+
+def text_blocks(gray: np.ndarray) -> np.ndarray:
+    """
+    Boolean grid of text-bearing blocks
+
+    Args:
+        gray: Grayscale analysis array (height x width)
+
+    Returns:
+        (height // PAGE_CROP_BLOCK_SIZE) x (width // PAGE_CROP_BLOCK_SIZE) array
+    """
+    size = PAGE_CROP_BLOCK_SIZE
+    rows, cols = gray.shape[0] // size, gray.shape[1] // size
+    if rows == 0 or cols == 0:
+        return np.zeros((rows, cols), dtype=bool)
+
+    grad_x = np.zeros(gray.shape, dtype=np.float32)
+    grad_y = np.zeros(gray.shape, dtype=np.float32)
+    grad_x[:, :-1] = np.abs(np.diff(gray, axis=1))
+    grad_y[:-1, :] = np.abs(np.diff(gray, axis=0))
+
+    def block_mean(values: np.ndarray) -> np.ndarray:
+        return values[:rows * size, :cols * size].reshape(rows, size, cols, size).mean(axis=(1, 3))
+
+    # Text changes intensity in both directions; an outline mostly in one
+    return np.minimum(block_mean(grad_x), block_mean(grad_y)) >= PAGE_CROP_MIN_GRADIENT
+
+
+def _active(profile: np.ndarray) -> np.ndarray:
+    """Indices where a projection profile reaches PAGE_CROP_MIN_PROFILE of its peak"""
+    return np.flatnonzero(profile >= max(1.0, PAGE_CROP_MIN_PROFILE * profile.max()))
+
+
+def find_text_region(image: Image.Image) -> Optional[Box]:
+    """
+    Padded bounding box of the text in a page image
+
+    Args:
+        image: Page image (any mode)
+
+    Returns:
+        Box in image coordinates, or None if no text region could be found
+    """
+    gray, scale = analysis_array(image)
+    blocks = text_blocks(gray)
+    if blocks.sum() < max(1, PAGE_CROP_MIN_TEXT_AREA * blocks.size):
+        return None
+
+    # Rows first, then columns within those rows (stray blocks from fingers or
+    # the page outline are too few to reach the profile threshold)
+    rows = _active(blocks.sum(axis=1))
+    cols = _active(blocks[rows[0]:rows[-1] + 1].sum(axis=0))
+    size = PAGE_CROP_BLOCK_SIZE * scale
+    pad_x = PAGE_CROP_PADDING * image.width
+    pad_y = PAGE_CROP_PADDING * image.height
+    return (
+        max(0, int(cols[0] * size - pad_x)),
+        max(0, int(rows[0] * size - pad_y)),
+        min(image.width, int((cols[-1] + 1) * size + pad_x)),
+        min(image.height, int((rows[-1] + 1) * size + pad_y))
+    )
+
+
+def estimate_skew(image: Image.Image) -> float:
+    """
+    Rotation in degrees (counter-clockwise) that makes the text lines horizontal
+
+    Args:
+        image: Page image (any mode)
+
+    Returns:
+        Angle within +-DESKEW_MAX_ANGLE (0.0 if the page has no dark text)
+    """
+    gray, _ = analysis_array(image)
+    threshold = (np.percentile(gray, 5) + np.percentile(gray, 95)) / 2
+    ink = Image.fromarray(((gray < threshold) * 255).astype(np.uint8))
+
+    best_angle, best_score = 0.0, -1.0
+    for angle in np.arange(-DESKEW_MAX_ANGLE, DESKEW_MAX_ANGLE + DESKEW_ANGLE_STEP / 2, DESKEW_ANGLE_STEP):
+        profile = np.asarray(ink.rotate(float(angle), resample=Image.NEAREST), dtype=np.float32).sum(axis=1)
+        score = float(profile.var())
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+    return best_angle
+
+
+def crop_page(image: Image.Image) -> Tuple[Image.Image, Optional[Box]]:
+    """
+    Crop a page image to its text
+
+    Args:
+        image: Page image (any mode)
+
+    Returns:
+        Tuple of (image, crop_box in the input image or None if not cropped)
+    """
+    box = find_text_region(image)
+    if box is None:
+        return image, None
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    if area > (1 - PAGE_CROP_MIN_SAVING) * image.width * image.height:
+        return image, None
+    return image.crop(box), box
+
+
+def deskew_page(image: Image.Image) -> Tuple[Image.Image, float]:
+    """
+    Straighten the text of a (cropped) page image
+
+    Best on the output of crop_page: the desk around a page would dominate
+    the dark-pixel profile, and a smaller image is cheaper to rotate.
+
+    Args:
+        image: Page image (RGB or L)
+
+    Returns:
+        Tuple of (image, rotation_degrees); unchanged if the skew is below DESKEW_MIN_ANGLE
+    """
+    angle = estimate_skew(image)
+    if abs(angle) < DESKEW_MIN_ANGLE:
+        return image, 0.0
+
+    fill = 255 if image.mode == "L" else (255, 255, 255)
+    image = image.rotate(angle, resample=Image.BILINEAR, expand=True, fillcolor=fill)
+    # Trim the corners the rotation added
+    box = find_text_region(image)
+    return (image.crop(box) if box else image), angle
@@ -0,0 +1,139 @@
+"""
+Perceptual hash of page photos (near-duplicate detection)
+
+Two photos of the same page taken seconds apart have different bytes, so a
+content hash cannot match them. page_hash reduces a photo to the layout of
+its text, which survives a retake:
+
+1. grayscale at PAGE_HASH_WORKING_SIZE on the longer side
+2. crop to the text region (app.utils.page_crop: desk, fingers, margins)
+3. straighten the text lines (the same skew estimate as deskew)
+4. trim to the extent of the ink, so framing and zoom stop mattering
+5. blur by about half a line spacing
+6. dHash: resize to (hash_size + 1) squared and record whether each cell is
+   brighter than its left neighbour and than the one above it
+
+The hash has 2 * hash_size ** 2 bits; similar pages are a small Hamming
+distance apart. Steps 4 and 5 are what make the hash usable on text:
+without them, the blank space left around the text and where the lines
+fall in the grid differ between retakes by more than the text differs
+between pages (see benchmarks/near_duplicate.py).
+"""
+import io
+from typing import Optional
+
+import numpy as np
+from PIL import Image, ImageFilter, ImageOps, UnidentifiedImageError
+
+from app.core.constants import (
+    DESKEW_MIN_ANGLE,
+    PAGE_CROP_BLOCK_SIZE,
+    PAGE_HASH_BLUR_RADIUS,
+    PAGE_HASH_INK_CONTRAST,
+    PAGE_HASH_LINE_BLUR,
+    PAGE_HASH_MAX_INK,
+    PAGE_HASH_MIN_INK_PROFILE,
+    PAGE_HASH_WORKING_SIZE,
+)
+from app.utils.page_crop import analysis_array, estimate_skew, find_text_region, text_blocks
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits"""
+    return (a ^ b).bit_count()
+
+
+def hash_bits(hash_size: int) -> int:
+    """Length in bits of a page_hash of the given size"""
+    return 2 * hash_size * hash_size
+
+
+def _ink_extent(gray: Image.Image) -> Optional[tuple]:
+    """
+    Box of the rows and columns holding text
+
+    Ink is what is darker than its surroundings by PAGE_HASH_INK_CONTRAST
+    inside a text block (app.utils.page_crop.text_blocks), so a strip of
+    desk or the edge of the page left in the crop is not ink. Rows and
+    columns that are mostly ink (shadows) are not text either, and ones
+    with less than PAGE_HASH_MIN_INK_PROFILE of the peak are trimmed.
+    """
+    pixels = np.asarray(gray, dtype=np.int16)
+    background = np.asarray(gray.filter(ImageFilter.BoxBlur(PAGE_HASH_BLUR_RADIUS)), dtype=np.int16)
+    ink = pixels < background - PAGE_HASH_INK_CONTRAST
+
+    analysis, scale = analysis_array(gray)
+    blocks = text_blocks(analysis)
+    # Block grid back to pixels (the grid may stop short of the right and bottom edges)
+    rows_index = np.minimum((np.arange(gray.height) / (PAGE_CROP_BLOCK_SIZE * scale)).astype(int), blocks.shape[0])
+    cols_index = np.minimum((np.arange(gray.width) / (PAGE_CROP_BLOCK_SIZE * scale)).astype(int), blocks.shape[1])
+    padded = np.pad(blocks, ((0, 1), (0, 1)))
+    ink &= padded[rows_index][:, cols_index]
+
+    def text_lines(profile: np.ndarray, length: int) -> np.ndarray:
+        profile = np.where(profile > PAGE_HASH_MAX_INK * length, 0, profile)
+        return np.flatnonzero(profile >= max(1, PAGE_HASH_MIN_INK_PROFILE * profile.max()))
+
+    rows = text_lines(ink.sum(axis=1), ink.shape[1])
+    if rows.size == 0:
+        return None
+    cols = text_lines(ink[rows[0]:rows[-1] + 1].sum(axis=0), rows[-1] + 1 - rows[0])
+    if cols.size == 0:
+        return None
+    return int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
+
+
+def page_hash(image: Image.Image, hash_size: int = 16) -> int:
+    """
+    Perceptual hash of a page image
+
+    Args:
+        image: Page photo or scan (any mode, upright)
+        hash_size: Cells per side of the dHash grid
+
+    Returns:
+        Hash of hash_bits(hash_size) bits as an int
+    """
+    gray = image.convert("L")
+    gray.thumbnail((PAGE_HASH_WORKING_SIZE, PAGE_HASH_WORKING_SIZE), Image.BILINEAR)
+
+    box = find_text_region(gray)
+    if box is not None:
+        gray = gray.crop(box)
+    angle = estimate_skew(gray)
+    if abs(angle) >= DESKEW_MIN_ANGLE:
+        gray = gray.rotate(angle, resample=Image.BILINEAR, expand=True, fillcolor=255)
+    extent = _ink_extent(gray)
+    if extent is not None:
+        gray = gray.crop(extent)
+    # Blend neighbouring text lines, so the cells don't depend on where the lines fall
+    gray = gray.filter(ImageFilter.GaussianBlur(PAGE_HASH_LINE_BLUR * gray.height))
+
+    cells = np.asarray(gray.resize((hash_size + 1, hash_size + 1), Image.BOX), dtype=np.int16)
+    bits = np.concatenate([
+        (cells[:-1, 1:] > cells[:-1, :-1]).ravel(),  # brighter than the left neighbour
+        (cells[1:, :-1] > cells[:-1, :-1]).ravel()   # brighter than the neighbour above
+    ])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def image_page_hash(data: bytes, hash_size: int = 16) -> Optional[int]:
+    """
+    page_hash of encoded image bytes (EXIF orientation applied)
+
+    Args:
+        data: Image file bytes
+        hash_size: Cells per side of the dHash grid
+
+    Returns:
+        The hash, or None if the bytes are not a readable image
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+        # JPEG: decode at reduced scale, the hash only needs the working size
+        image.draft("L", (PAGE_HASH_WORKING_SIZE, PAGE_HASH_WORKING_SIZE))
+        image.load()
+        image = ImageOps.exif_transpose(image)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        return None
+    return page_hash(image, hash_size)
@@ -0,0 +1,182 @@
+"""Batch short sentences into one TTS call and split the result on silence"""
+from typing import List, Optional, Tuple
+
+from pydub import AudioSegment
+from pydub.silence import detect_silence
+
+from app.core.constants import (
+    TTS_SAMPLE_RATE,
+    TTS_CHANNELS,
+    TTS_SAMPLE_WIDTH,
+    TTS_BATCH_MIN_SILENCE_MS,
+    TTS_BATCH_SILENCE_THRESH_DB,
+    TTS_BATCH_EDGE_SILENCE_MS,
+    TTS_BATCH_DURATION_TOLERANCE,
+)
+
+
+# Fixed per-sentence cost (in characters) when estimating spoken length:
+# very short sentences still take a noticeable time to say
+_SENTENCE_OVERHEAD_CHARS = 10
+
+# Silence detection resolution
+_SEEK_STEP_MS = 10
+
+
+def plan_sentence_batches(sentences: List[str], max_chars: int, max_sentences: int) -> List[List[int]]:
+    """
+    Group consecutive short sentences for combined synthesis
+
+    Args:
+        sentences: Sentences in reading order
+        max_chars: Sentences up to this length may be batched
+        max_sentences: Maximum sentences per batch
+
+    Returns:
+        Lists of sentence indices covering every sentence in order;
+        single-element lists are synthesized on their own
+    """
+    groups: List[List[int]] = []
+    run: List[int] = []
+
+    for i, sentence in enumerate(sentences):
+        if len(sentence.strip()) <= max_chars:
+            run.append(i)
+            if len(run) == max_sentences:
+                groups.append(run)
+                run = []
+            continue
+
+        if run:
+            groups.append(run)
+            run = []
+        groups.append([i])
+
+    if run:
+        groups.append(run)
+
+    return groups
+
+
+def batch_input(sentences: List[str]) -> str:
+    """Text sent upstream for a batch of sentences"""
+    return " ".join(sentence.strip() for sentence in sentences)
+
+
+def _expected_weights(sentences: List[str]) -> List[int]:
+    return [len(sentence.strip()) + _SENTENCE_OVERHEAD_CHARS for sentence in sentences]
+
+
+def _choose_boundaries(
+    silences: List[Tuple[int, int]],
+    expected_cuts: List[float]
+) -> List[int]:
+    """
+    Pick one silence per expected cut, in order, minimising the squared
+    distance between each silence midpoint and its expected position
+
+    Returns:
+        Indices into silences (len(expected_cuts) of them, increasing)
+    """
+    midpoints = [(start + end) / 2 for start, end in silences]
+    cuts = len(expected_cuts)
+    count = len(midpoints)
+    inf = float("inf")
+
+    # cost[k][j]: best total cost with cut k placed at silence j
+    cost = [[inf] * count for _ in range(cuts)]
+    previous = [[-1] * count for _ in range(cuts)]
+
+    for j in range(count):
+        cost[0][j] = (midpoints[j] - expected_cuts[0]) ** 2
+
+    for k in range(1, cuts):
+        best, best_j = inf, -1
+        for j in range(k, count):
+            if cost[k - 1][j - 1] < best:
+                best, best_j = cost[k - 1][j - 1], j - 1
+            cost[k][j] = best + (midpoints[j] - expected_cuts[k]) ** 2
+            previous[k][j] = best_j
+
+    j = min(range(count), key=lambda index: cost[cuts - 1][index])
+    chosen = []
+    for k in range(cuts - 1, -1, -1):
+        chosen.append(j)
+        j = previous[k][j]
+
+    return chosen[::-1]
+
+
+def split_batch_pcm(pcm: bytes, sentences: List[str]) -> Optional[List[Tuple[int, int]]]:
+    """
+    Find each sentence's frame range in the decoded audio of a batch
+
+    Pauses are located with silence detection, then matched to the known
+    sentence boundaries by their expected positions (sentence length).
+    The split is rejected if there are too few pauses or a clip's length is
+    far from what its text suggests.
+
+    Args:
+        pcm: Decoded batch audio (TTS_SAMPLE_RATE / TTS_CHANNELS / 16-bit)
+        sentences: The sentences that were synthesized, in order
+
+    Returns:
+        [(start_frame, end_frame), ...] per sentence, or None if the split
+        looks unreliable
+    """
+    segment = AudioSegment(
+        data=bytes(pcm),
+        sample_width=TTS_SAMPLE_WIDTH,
+        frame_rate=TTS_SAMPLE_RATE,
+        channels=TTS_CHANNELS
+    )
+    total_ms = len(segment)
+    if len(sentences) < 2 or total_ms == 0 or segment.rms == 0:
+        return None
+
+    silences = [
+        (start, end)
+        for start, end in detect_silence(
+            segment,
+            min_silence_len=TTS_BATCH_MIN_SILENCE_MS,
+            silence_thresh=segment.dBFS - TTS_BATCH_SILENCE_THRESH_DB,
+            seek_step=_SEEK_STEP_MS
+        )
+        # Leading/trailing silence is not a boundary
+        if start > 0 and end < total_ms
+    ]
+    if len(silences) < len(sentences) - 1:
+        return None
+
+    weights = _expected_weights(sentences)
+    total_weight = sum(weights)
+    expected_cuts = []
+    cumulative = 0
+    for weight in weights[:-1]:
+        cumulative += weight
+        expected_cuts.append(total_ms * cumulative / total_weight)
+
+    boundaries = [silences[j] for j in _choose_boundaries(silences, expected_cuts)]
+
+    # Cut inside each pause, keeping a little silence on both sides
+    ranges_ms = []
+    start_ms = 0
+    for silence_start, silence_end in boundaries:
+        midpoint = (silence_start + silence_end) / 2
+        ranges_ms.append((start_ms, min(silence_start + TTS_BATCH_EDGE_SILENCE_MS, midpoint)))
+        start_ms = max(silence_end - TTS_BATCH_EDGE_SILENCE_MS, midpoint)
+    ranges_ms.append((start_ms, total_ms))
+
+    # Each clip should be roughly as long as its share of the text suggests
+    for (start, end), weight in zip(ranges_ms, weights):
+        ratio = ((end - start) / total_ms) / (weight / total_weight)
+        if not 1 / TTS_BATCH_DURATION_TOLERANCE <= ratio <= TTS_BATCH_DURATION_TOLERANCE:
+            return None
+
+    total_frames = len(pcm) // (TTS_SAMPLE_WIDTH * TTS_CHANNELS)
+    frame_ranges = [
+        (round(start * TTS_SAMPLE_RATE / 1000), round(end * TTS_SAMPLE_RATE / 1000))
+        for start, end in ranges_ms
+    ]
+    frame_ranges[-1] = (frame_ranges[-1][0], total_frames)
+    return frame_ranges
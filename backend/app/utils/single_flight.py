@@ -0,0 +1,57 @@
+"""Coalesce concurrent identical async work into one in-flight call"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time; concurrent callers share its result
+
+    The shared call runs as its own task. A caller that is cancelled (e.g. a
+    client disconnect) only stops waiting; the call itself is cancelled once
+    no caller is waiting for it any more.
+    """
+
+    def __init__(self):
+        # key -> [task, number of waiting callers]
+        self._calls: Dict[str, List[Any]] = {}
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+    async def run(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await func() for key, or the call already in flight for it
+
+        Args:
+            key: Identity of the work (e.g. a cache key)
+            func: Zero-argument coroutine function doing the work
+
+        Returns:
+            The call's result (exceptions propagate to every caller)
+        """
+        call = self._calls.get(key)
+        if call is None:
+            task = asyncio.ensure_future(func())
+            call = [task, 0]
+            self._calls[key] = call
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        task = call[0]
+        call[1] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if call[1] == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            call[1] -= 1
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        call = self._calls.get(key)
+        if call is not None and call[0] is task:
+            del self._calls[key]
+        # Nobody may be left to retrieve a failure
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,40 @@
+"""Text canonicalization for cache keys"""
+import re
+import unicodedata
+
+# Bump when canonicalize_text changes: keys built with another version never match
+CANONICALIZATION_VERSION = 2
+
+# Full-width ASCII (U+FF01-U+FF5E) and the ideographic space fold to ASCII.
+# Other compatibility characters (superscripts, subscripts, circled numbers,
+# fractions, ...) are read differently, so full NFKC is not used
+_WIDTH = str.maketrans(
+    {chr(code): chr(code - 0xFEE0) for code in range(0xFF01, 0xFF5F)} | {"\u3000": " "}
+)
+
+_QUOTES = str.maketrans({
+    "\u2018": "'", "\u2019": "'", "\u201a": "'", "\u201b": "'", "\u2032": "'",
+    "\u201c": '"', "\u201d": '"', "\u201e": '"', "\u201f": '"', "\u2033": '"',
+})
+
+# Zero-width characters OCR output sometimes carries (ZWSP, ZWNJ, ZWJ, word joiner, BOM)
+_ZERO_WIDTH = re.compile("[\u200b\u200c\u200d\u2060\ufeff]")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def canonicalize_text(text: str) -> str:
+    """
+    Canonical form of text for cache keys (not sent to TTS)
+
+    Inputs that differ only in ways TTS does not pronounce map to the same
+    string: Unicode composition (NFC, so NFD input matches), full-width
+    ASCII and punctuation and the ideographic space folded to ASCII, curly
+    quotes folded to straight ones, zero-width characters removed, and
+    whitespace runs collapsed to one space with the ends trimmed.
+    """
+    text = unicodedata.normalize("NFC", text)
+    text = text.translate(_WIDTH)
+    text = text.translate(_QUOTES)
+    text = _ZERO_WIDTH.sub("", text)
+    return _WHITESPACE.sub(" ", text).strip()
@@ -0,0 +1,70 @@
+"""Split long text into TTS-sized chunks at natural boundaries"""
+import re
+from typing import Iterator, List
+
+
+# Boundaries tried in order; each match ends a piece (text is never dropped)
+_SENTENCE_END = re.compile(r'[.!?]+["\'”’)\]]*(?:\s+|$)|[。！？]+[」』）]*\s*|\n\s*')
+_CLAUSE_END = re.compile(r'[,;:]\s+|[、，；：]\s*|\s+[-–—]+\s+')
+_WORD_END = re.compile(r'\s+')
+
+_BOUNDARIES = [_SENTENCE_END, _CLAUSE_END, _WORD_END]
+
+
+def _split_after(text: str, pattern: re.Pattern) -> List[str]:
+    """Split text after each boundary match, keeping all characters"""
+    pieces = []
+    start = 0
+    for match in pattern.finditer(text):
+        if match.end() > start:
+            pieces.append(text[start:match.end()])
+            start = match.end()
+    if start < len(text):
+        pieces.append(text[start:])
+    return pieces
+
+
+def _pieces(text: str, max_chars: int, level: int = 0) -> Iterator[str]:
+    """Yield boundary-delimited pieces of at most max_chars, using finer boundaries only when needed"""
+    if len(text) <= max_chars:
+        yield text
+        return
+
+    if level == len(_BOUNDARIES):
+        # No usable boundary (e.g. a very long URL): hard cut
+        for i in range(0, len(text), max_chars):
+            yield text[i:i + max_chars]
+        return
+
+    for piece in _split_after(text, _BOUNDARIES[level]):
+        yield from _pieces(piece, max_chars, level + 1)
+
+
+def plan_tts_chunks(text: str, max_chars: int) -> List[str]:
+    """
+    Split text into chunks of at most max_chars characters
+
+    Whole sentences are packed greedily; a sentence longer than the budget
+    is split at clause boundaries, then between words, then hard-cut.
+
+    Args:
+        text: Text to convert to speech
+        max_chars: Maximum characters per chunk (provider input limit)
+
+    Returns:
+        Non-empty chunks in reading order
+    """
+    text = text.strip()
+    if len(text) <= max_chars:
+        return [text] if text else []
+
+    chunks = []
+    current = ""
+    for piece in _pieces(text, max_chars):
+        if current and len(current) + len(piece) > max_chars:
+            chunks.append(current)
+            current = ""
+        current += piece
+
+    chunks.append(current)
+    return [chunk.strip() for chunk in chunks if chunk.strip()]
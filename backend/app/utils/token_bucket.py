@@ -0,0 +1,59 @@
+"""Token bucket rate limiting for background work"""
+import asyncio
+import time
+from typing import Callable, Optional
+
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens per second, up to `capacity` saved up
+
+    acquire() waits until enough tokens have accumulated. A request larger
+    than the capacity waits for a full bucket and then leaves it in debt,
+    so big items are allowed but the long-run rate still holds. Callers are
+    served in order.
+
+    Args:
+        rate: Tokens added per second
+        capacity: Most tokens that can be saved up (the largest burst)
+        clock: Monotonic time source (seconds)
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def available(self) -> float:
+        """Tokens that could be spent now (negative while in debt)"""
+        self._refill()
+        return self._tokens
+
+    async def acquire(self, amount: float) -> float:
+        """
+        Spend `amount` tokens, waiting for them if necessary
+
+        Returns:
+            Seconds waited
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self._refill()
+            needed = min(amount, self.capacity)
+            waited = 0.0
+            if self._tokens < needed:
+                waited = (needed - self._tokens) / self.rate
+                await asyncio.sleep(waited)
+                self._refill()
+            self._tokens -= amount
+            return waited
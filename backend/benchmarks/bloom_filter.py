@@ -0,0 +1,51 @@
+"""
+Benchmark: known-document Bloom filter false-positive rate, memory, and lookup cost
+
+Fills the filter with random SHA-256 hex keys (like audio_cache.text_hash),
+then probes keys that were never added. Past capacity the filter is
+overfilled, which is what happens between rebuilds if the table grows.
+
+Usage (from backend/):
+    python -m benchmarks.bloom_filter --items 10000 100000 200000 --capacity 100000
+"""
+import argparse
+import hashlib
+import os
+import time
+
+from app.utils.bloom_filter import BloomFilter
+
+
+def _keys(count: int, prefix: bytes):
+    return [hashlib.sha256(prefix + os.urandom(16)).hexdigest() for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, nargs="+", default=[10_000, 50_000, 100_000, 200_000])
+    parser.add_argument("--capacity", type=int, default=100_000)
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--probes", type=int, default=100_000, help="Absent keys looked up per run")
+    args = parser.parse_args()
+
+    bloom = BloomFilter(args.capacity, args.error_rate)
+    print(f"capacity {args.capacity}, target {args.error_rate:.2%}: "
+          f"{bloom.memory_bytes / 1024:.1f} KiB, {bloom.num_hashes} hashes")
+    print(f"{'items':>8} {'measured FP':>12} {'estimated FP':>13} {'lookup (us)':>12}")
+
+    probes = _keys(args.probes, b"absent")
+    for items in args.items:
+        bloom = BloomFilter(args.capacity, args.error_rate)
+        for key in _keys(items, b"known"):
+            bloom.add(key)
+
+        start = time.perf_counter()
+        false_positives = sum(key in bloom for key in probes)
+        lookup_us = (time.perf_counter() - start) / len(probes) * 1_000_000
+
+        print(f"{items:>8} {false_positives / len(probes):>12.3%} "
+              f"{bloom.estimated_false_positive_rate():>13.3%} {lookup_us:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark: overlapping POST /api/tts requests on a single worker
+
+Runs the FastAPI app in-process (one event loop, like one uvicorn worker)
+against a local fake OpenAI TTS server and fires N requests at once.
+With non-blocking routes the wall time is about ceil(N / TTS_MAX_CONCURRENCY)
+x latency; blocking routes would take roughly N x latency.
+
+Usage (from backend/):
+    python -m benchmarks.concurrent_requests --requests 50 --latency 0.3
+"""
+import argparse
+import asyncio
+import math
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-key")
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+
+import httpx  # noqa: E402
+from openai import AsyncOpenAI  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services import openai_service  # noqa: E402
+from benchmarks.fake_servers import server_url, start_fake_tts_server  # noqa: E402
+
+
+async def run(requests: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.post("/api/tts", json={"text": f"Request {i}", "format": "mp3"})
+            for i in range(requests)
+        ])
+        elapsed = time.perf_counter() - start
+
+    failed = [r.status_code for r in responses if r.status_code != 200]
+    if failed:
+        raise SystemExit(f"{len(failed)} requests failed: {failed[:5]}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake upstream latency (s)")
+    args = parser.parse_args()
+
+    server = start_fake_tts_server(args.latency)
+    openai_service.async_client = AsyncOpenAI(
+        api_key="benchmark-key", base_url=f"{server_url(server)}/v1", max_retries=0
+    )
+
+    elapsed = asyncio.run(run(args.requests))
+    serial = args.requests * args.latency
+    bounded = math.ceil(args.requests / settings.tts_max_concurrency) * args.latency
+    print(f"{args.requests} overlapping requests, {args.latency * 1000:.0f}ms fake upstream latency, "
+          f"TTS_MAX_CONCURRENCY={settings.tts_max_concurrency}")
+    print(f"wall time: {elapsed:.3f}s (expected ~{bounded:.1f}s, serial would be ~{serial:.1f}s)")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Local fake upstream servers used by the benchmarks"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # avoid listen-backlog stalls at high concurrency
+
+
+def _serve(handler_class) -> ThreadingHTTPServer:
+    server = _FakeServer(("127.0.0.1", 0), handler_class)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def server_url(server: ThreadingHTTPServer) -> str:
+    """Base URL of a running fake server"""
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def start_fake_tts_server(latency: float, body: bytes = b"\x00" * 4096) -> ThreadingHTTPServer:
+    """Start a fake OpenAI /v1/audio/speech endpoint that sleeps `latency` seconds per call"""
+
+    class FakeTTSHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "audio/mpeg")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return _serve(FakeTTSHandler)
+
+
+def start_fake_streaming_tts_server(
+    first_byte_latency: float,
+    chunks: int,
+    chunk_interval: float,
+    chunk: bytes = b"\x00" * 4096
+) -> ThreadingHTTPServer:
+    """Start a fake /v1/audio/speech endpoint that streams `chunks` chunks (chunked transfer)"""
+
+    class FakeStreamingTTSHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            time.sleep(first_byte_latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "audio/mpeg")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i in range(chunks):
+                if i > 0:
+                    time.sleep(chunk_interval)
+                self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+
+        def log_message(self, *args):
+            pass
+
+    return _serve(FakeStreamingTTSHandler)
+
+
+def start_fake_gemini_server(latency: float, sentences: int = 12) -> ThreadingHTTPServer:
+    """Start a fake Gemini REST generateContent endpoint that sleeps `latency` seconds per call"""
+    text = json.dumps({"sentences": [f"This is sentence number {i}." for i in range(sentences)]})
+    body = json.dumps({
+        "candidates": [{
+            "content": {"parts": [{"text": text}], "role": "model"},
+            "finishReason": "STOP"
+        }]
+    }).encode()
+
+    class FakeGeminiHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return _serve(FakeGeminiHandler)
@@ -0,0 +1,129 @@
+"""
+Benchmark: perceptual page hash, retakes vs. different pages
+
+Renders a corpus of distinct textbook pages (same fonts and layout style,
+different text: the hard case) and photographs each several times the way a
+student retakes a photo: different framing, zoom, rotation, blur, exposure,
+desk, a finger at the edge, JPEG re-encoding. Reports the Hamming distances
+between retakes of one page and between different pages, the true- and
+false-match rate per threshold, and how often the nearest indexed page (the
+one OCRCacheService would reuse) is the right one, with the scan time.
+
+Usage (from backend/):
+    python -m benchmarks.near_duplicate --pages 100 --takes 3 --hash-size 16
+"""
+import argparse
+import io
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-key")
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+
+from PIL import Image, ImageDraw, ImageEnhance, ImageFilter, ImageFont  # noqa: E402
+
+from app.utils.perceptual_hash import hamming_distance, hash_bits, image_page_hash  # noqa: E402
+from benchmarks.page_crop import DESK_COLORS, WORDS  # noqa: E402
+
+THRESHOLDS = [0.1, 0.15, 0.2, 0.25, 0.3]
+
+
+def printed_page(rng: random.Random, size=(1100, 1500)) -> Image.Image:
+    """A page of paragraphs (random text, font size and margins)"""
+    page = Image.new("RGB", size, (245, 242, 232))
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default(size=rng.randint(26, 36))
+    margin_x, margin_y = rng.uniform(0.08, 0.14), rng.uniform(0.06, 0.12)
+    width = size[0] * (1 - 2 * margin_x)
+    y = int(size[1] * margin_y)
+    if rng.random() < 0.5:
+        heading = ImageFont.load_default(size=font.size * 3 // 2)
+        draw.text((int(size[0] * margin_x), y), " ".join(rng.sample(WORDS, 3)).title(), fill=(25, 25, 25), font=heading)
+        y += int(heading.size * 2)
+    while y < size[1] * (1 - margin_y):
+        paragraph_end = rng.random() < 0.15
+        line = " ".join(rng.choice(WORDS) for _ in range(40))
+        limit = width * (rng.uniform(0.2, 0.9) if paragraph_end else 1)
+        while draw.textlength(line, font=font) > limit:
+            line = line.rsplit(" ", 1)[0]
+        draw.text((int(size[0] * margin_x), y), line, fill=(25, 25, 25), font=font)
+        y += int(font.size * (2.8 if paragraph_end else 1.5))
+    return page
+
+
+def retake(page: Image.Image, rng: random.Random, size=(1512, 2016)) -> bytes:
+    """One phone photo of the page as JPEG bytes"""
+    desk = rng.choice(DESK_COLORS)
+    photo = Image.new("RGB", size, desk)
+    scale = rng.uniform(0.75, 0.95) * size[1] / page.height
+    shot = page.resize((int(page.width * scale), int(page.height * scale)), Image.BILINEAR)
+    shot = shot.rotate(rng.uniform(-2.5, 2.5), resample=Image.BICUBIC, expand=True, fillcolor=desk)
+    photo.paste(shot, (rng.randint(0, max(0, size[0] - shot.width)), rng.randint(0, max(0, size[1] - shot.height))))
+    if rng.random() < 0.5:
+        x = rng.randint(0, size[0] - 200)
+        ImageDraw.Draw(photo).ellipse([x, size[1] - 250, x + 200, size[1] + 250], fill=(220, 170, 140))
+    photo = ImageEnhance.Brightness(photo).enhance(rng.uniform(0.8, 1.15))
+    photo = photo.filter(ImageFilter.GaussianBlur(rng.uniform(0.5, 2.0)))
+    buffer = io.BytesIO()
+    photo.save(buffer, format="JPEG", quality=rng.randint(70, 95))
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--takes", type=int, default=3, help="Photos per page")
+    parser.add_argument("--hash-size", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    bits = hash_bits(args.hash_size)
+    hashes, times = [], []
+    for page_id in range(args.pages):
+        page = printed_page(rng)
+        for _ in range(args.takes):
+            data = retake(page, rng)
+            start = time.perf_counter()
+            hashes.append((page_id, image_page_hash(data, args.hash_size)))
+            times.append((time.perf_counter() - start) * 1000)
+
+    same, different = [], []
+    for i, (page_a, hash_a) in enumerate(hashes):
+        for page_b, hash_b in hashes[i + 1:]:
+            (same if page_a == page_b else different).append(hamming_distance(hash_a, hash_b) / bits)
+
+    print(f"{args.pages} pages x {args.takes} photos, {bits}-bit hash: "
+          f"median {statistics.median(times):.0f}ms per photo (decode + hash)")
+    print(f"{'retakes:':<17} distance median {statistics.median(same):.3f}, max {max(same):.3f} ({len(same)} pairs)")
+    print(f"{'different pages:':<17} distance median {statistics.median(different):.3f}, "
+          f"min {min(different):.3f} ({len(different)} pairs)")
+    print(f"{'threshold':>9} {'true match':>11} {'false match':>12}")
+    for threshold in THRESHOLDS:
+        true_rate = sum(d <= threshold for d in same) / len(same)
+        false_rate = sum(d <= threshold for d in different) / len(different)
+        print(f"{threshold:>9.2f} {true_rate:>11.1%} {false_rate:>12.4%}")
+
+    # Index the first photo of every page, look up the others (nearest within the threshold)
+    index = hashes[::args.takes]
+    queries = [entry for i, entry in enumerate(hashes) if i % args.takes]
+    print(f"{'threshold':>9} {'found':>7} {'wrong page':>11} {'scan (us)':>10}")
+    for threshold in THRESHOLDS:
+        max_distance = int(threshold * bits)
+        start = time.perf_counter()
+        results = [
+            min(((hamming_distance(page_hash, indexed), page_id) for page_id, indexed in index
+                 if hamming_distance(page_hash, indexed) <= max_distance), default=None)
+            for _, page_hash in queries
+        ]
+        scan_us = (time.perf_counter() - start) / len(queries) * 1_000_000
+
+        found = sum(match is not None and match[1] == page_id for (page_id, _), match in zip(queries, results))
+        wrong = sum(match is not None and match[1] != page_id for (page_id, _), match in zip(queries, results))
+        print(f"{threshold:>9.2f} {found / len(queries):>7.1%} {wrong / len(queries):>11.2%} {scan_us:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
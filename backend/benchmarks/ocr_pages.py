@@ -0,0 +1,67 @@
+"""
+Benchmark: multi-page OCR wall time vs. per-request page concurrency
+
+Starts a local fake Gemini REST endpoint (fixed latency per page) and times
+GeminiService.extract_text_from_multiple_images(_async) for one request
+with different OCR_PAGE_CONCURRENCY values. google-generativeai has no
+async REST client, so the async path runs the REST call in a thread.
+
+Usage (from backend/):
+    python -m benchmarks.ocr_pages --pages 10 --latency 0.5
+"""
+import argparse
+import asyncio
+import base64
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-key")
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+
+import google.generativeai as genai  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.services.gemini_service import GeminiService  # noqa: E402
+from benchmarks.fake_servers import server_url, start_fake_gemini_server  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake upstream latency per page (s)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 10])
+    args = parser.parse_args()
+
+    server = start_fake_gemini_server(args.latency)
+    service = GeminiService()  # Configures genai itself, so the endpoint is set afterwards
+    genai.configure(api_key="benchmark-key", transport="rest", client_options={"api_endpoint": server_url(server)})
+    model = genai.GenerativeModel(service.model.model_name)
+    model.generate_content_async = lambda contents: asyncio.to_thread(model.generate_content, contents)
+    service.model = model
+    pages = [base64.b64encode(f"page {i}".encode()).decode() for i in range(args.pages)]
+
+    print(f"{args.pages} pages, {args.latency * 1000:.0f}ms fake upstream latency per page")
+    print(f"{'concurrency':>12} {'sync (s)':>9} {'async (s)':>10} {'speedup':>8}")
+
+    baseline = None
+    for concurrency in args.concurrency:
+        settings.ocr_page_concurrency = concurrency
+
+        start = time.perf_counter()
+        _, sentences, _, _ = service.extract_text_from_multiple_images(pages)
+        sync_elapsed = time.perf_counter() - start
+        if any(sentence.startswith("[Error") for sentence in sentences):
+            raise SystemExit(f"OCR failed: {sentences[0]}")
+
+        start = time.perf_counter()
+        asyncio.run(service.extract_text_from_multiple_images_async(pages))
+        async_elapsed = time.perf_counter() - start
+
+        baseline = baseline or async_elapsed
+        print(f"{concurrency:>12} {sync_elapsed:>9.3f} {async_elapsed:>10.3f} {baseline / async_elapsed:>7.1f}x")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark: text-region cropping of page photos before OCR
+
+Renders synthetic phone photos of textbook pages (page on a desk, random
+position, margins, skew, blur and a finger at the edge), downscales them to
+MAX_IMAGE_DIMENSION as normalization does, and reports the time of the crop
+(and optional deskew) stage and how much the pixel count and JPEG size drop.
+
+Usage (from backend/):
+    python -m benchmarks.page_crop --pages 20 --deskew
+"""
+import argparse
+import io
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-key")
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.utils.page_crop import crop_page, deskew_page  # noqa: E402
+
+WORDS = "the quick brown fox jumps over a lazy dog while students read every sentence aloud".split()
+DESK_COLORS = [(120, 85, 50), (60, 60, 65), (200, 195, 185), (150, 110, 80)]
+
+
+def page_photo(rng: random.Random, size=(4032, 3024)) -> Image.Image:
+    """A 12MP photo of a printed page lying on a desk"""
+    desk = rng.choice(DESK_COLORS)
+    photo = Image.new("RGB", size, desk)
+    page_w, page_h = int(size[0] * rng.uniform(0.5, 0.8)), int(size[1] * rng.uniform(0.8, 0.95))
+    page = Image.new("RGB", (page_w, page_h), (245, 242, 232))
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default(size=rng.randint(36, 52))
+    margin_x, margin_y = rng.uniform(0.08, 0.2), rng.uniform(0.08, 0.2)
+    for y in range(int(page_h * margin_y), int(page_h * (1 - margin_y)), int(font.size * 1.6)):
+        line = " ".join(rng.choice(WORDS) for _ in range(40))
+        while draw.textlength(line, font=font) > page_w * (1 - 2 * margin_x):
+            line = line.rsplit(" ", 1)[0]
+        draw.text((int(page_w * margin_x), y), line, fill=(25, 25, 25), font=font)
+    page = page.rotate(rng.uniform(-3, 3), resample=Image.BICUBIC, expand=True, fillcolor=desk)
+    photo.paste(page, (rng.randint(0, max(0, size[0] - page.width)), rng.randint(0, max(0, size[1] - page.height))))
+    if rng.random() < 0.7:
+        x = rng.randint(0, size[0] - 300)
+        ImageDraw.Draw(photo).ellipse([x, size[1] - 450, x + 300, size[1] + 300], fill=(220, 170, 140))
+    return photo.filter(ImageFilter.GaussianBlur(rng.uniform(0.5, 2.0)))
+
+
+def jpeg_size(image: Image.Image) -> int:
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=settings.image_quality, optimize=True)
+    return len(buffer.getvalue())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--deskew", action="store_true", help="Also time deskew of the cropped region")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    times, pixel_ratios, byte_ratios, cropped_pages = [], [], [], 0
+    for _ in range(args.pages):
+        image = page_photo(rng)
+        image.thumbnail((settings.max_image_dimension, settings.max_image_dimension), Image.LANCZOS)
+
+        start = time.perf_counter()
+        result, box = crop_page(image)
+        if args.deskew:
+            result, _ = deskew_page(result)
+        times.append((time.perf_counter() - start) * 1000)
+
+        cropped_pages += box is not None
+        pixel_ratios.append(result.width * result.height / (image.width * image.height))
+        byte_ratios.append(jpeg_size(result) / jpeg_size(image))
+
+    stage = "crop + deskew" if args.deskew else "crop"
+    print(f"{args.pages} synthetic page photos at {settings.max_image_dimension}px, {cropped_pages} cropped")
+    print(f"{stage + ' time:':<20} median {statistics.median(times):.1f}ms, max {max(times):.1f}ms")
+    print(f"{'pixel count:':<20} -{1 - statistics.mean(pixel_ratios):.0%} on average "
+          f"(range -{1 - max(pixel_ratios):.0%} to -{1 - min(pixel_ratios):.0%})")
+    print(f"{'JPEG size:':<20} -{1 - statistics.mean(byte_ratios):.0%} on average")
+
+
+if __name__ == "__main__":
+    main()
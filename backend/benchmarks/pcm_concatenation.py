@@ -0,0 +1,78 @@
+"""
+Benchmark: combining per-sentence PCM, AudioSegment "+" loop vs. preallocated buffer
+
+Uses synthetic PCM (no ffmpeg, no network) so only the concatenation stage
+is measured. Reports wall time and peak traced memory for each approach.
+
+Usage (from backend/):
+    python -m benchmarks.pcm_concatenation --sentences 10 100 500 1000
+"""
+import argparse
+import time
+import tracemalloc
+
+from pydub import AudioSegment
+
+from app.core.constants import TTS_SAMPLE_RATE, TTS_CHANNELS, TTS_SAMPLE_WIDTH, TTS_SENTENCE_GAP_MS
+from app.utils.audio import concatenate_pcm
+
+
+def _legacy_concatenate(chunks):
+    """Previous implementation: combined = combined + silence + segment"""
+    segments = [
+        AudioSegment(data=chunk, sample_width=TTS_SAMPLE_WIDTH, frame_rate=TTS_SAMPLE_RATE, channels=TTS_CHANNELS)
+        for chunk in chunks
+    ]
+    silence = AudioSegment.silent(duration=TTS_SENTENCE_GAP_MS, frame_rate=TTS_SAMPLE_RATE)
+
+    combined = segments[0]
+    for segment in segments[1:]:
+        combined = combined + silence + segment
+    return combined.raw_data
+
+
+def _buffer_concatenate(chunks):
+    gap_frames = TTS_SAMPLE_RATE * TTS_SENTENCE_GAP_MS // 1000
+    buffer, _ = concatenate_pcm(chunks, gap_frames)
+    return buffer
+
+
+def _measure(func, chunks):
+    """Return (wall seconds, peak traced MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(chunks)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sentences", type=int, nargs="+", default=[10, 50, 100, 250, 500, 1000])
+    parser.add_argument("--seconds", type=float, default=1.0, help="Audio length per sentence (s)")
+    parser.add_argument("--legacy-max", type=int, default=1000,
+                        help="Skip the quadratic legacy path above this many sentences")
+    args = parser.parse_args()
+
+    frames = int(TTS_SAMPLE_RATE * args.seconds)
+    chunk = b"\x01\x00" * frames * TTS_CHANNELS
+
+    print(f"{args.seconds:.1f}s of {TTS_SAMPLE_RATE}Hz PCM per sentence")
+    print(f"{'sentences':>10} {'legacy (s)':>11} {'legacy MB':>10} {'buffer (s)':>11} {'buffer MB':>10} {'speedup':>8}")
+
+    for count in args.sentences:
+        chunks = [chunk] * count
+        buffer_time, buffer_mb = _measure(_buffer_concatenate, chunks)
+
+        if count <= args.legacy_max:
+            legacy_time, legacy_mb = _measure(_legacy_concatenate, chunks)
+            print(f"{count:>10} {legacy_time:>11.3f} {legacy_mb:>10.1f} "
+                  f"{buffer_time:>11.3f} {buffer_mb:>10.1f} {legacy_time / buffer_time:>7.1f}x")
+        else:
+            print(f"{count:>10} {'-':>11} {'-':>10} {buffer_time:>11.3f} {buffer_mb:>10.1f} {'-':>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark: per-sentence TTS synthesis wall time vs. concurrency
+
+Starts a local fake OpenAI TTS server (fixed latency per request) and times
+OpenAIService.synthesize_sentences with different pool sizes.
+
+Usage (from backend/):
+    python -m benchmarks.tts_concurrency --sentences 60 --latency 0.3
+"""
+import argparse
+import importlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-key")
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+
+from openai import OpenAI  # noqa: E402
+
+from app.services.openai_service import OpenAIService  # noqa: E402
+from benchmarks.fake_servers import server_url, start_fake_tts_server  # noqa: E402
+
+# app.services re-exports the `openai_service` instance under the module's name
+openai_service_module = importlib.import_module("app.services.openai_service")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sentences", type=int, default=60)
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake upstream latency (s)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    server = start_fake_tts_server(args.latency)
+    base_url = f"{server_url(server)}/v1"
+
+    service = OpenAIService()
+    service.client = OpenAI(api_key="benchmark-key", base_url=base_url, max_retries=0)
+    sentences = [f"This is benchmark sentence number {i}." for i in range(args.sentences)]
+
+    print(f"{args.sentences} sentences, {args.latency * 1000:.0f}ms fake upstream latency")
+    print(f"{'concurrency':>12} {'wall time (s)':>14} {'speedup':>8}")
+
+    baseline = None
+    for concurrency in args.concurrency:
+        openai_service_module._synthesis_executor = ThreadPoolExecutor(max_workers=concurrency)
+        start = time.perf_counter()
+        service.synthesize_sentences(sentences, voice="nova", format="mp3")
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{concurrency:>12} {elapsed:>14.3f} {baseline / elapsed:>7.1f}x")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
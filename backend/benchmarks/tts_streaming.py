@@ -0,0 +1,83 @@
+"""
+Benchmark: time-to-first-byte of POST /api/tts, buffered vs. stream=true
+
+Serves the FastAPI app with uvicorn (real sockets, so chunked responses are
+observable) against a fake OpenAI TTS server that streams audio chunks over
+time, like synthesis of a long input.
+
+Usage (from backend/):
+    python -m benchmarks.tts_streaming --first-byte 0.2 --chunks 40 --interval 0.1
+"""
+import argparse
+import os
+import socket
+import threading
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-key")
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from openai import AsyncOpenAI  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.services import openai_service  # noqa: E402
+from benchmarks.fake_servers import server_url, start_fake_streaming_tts_server  # noqa: E402
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_app() -> str:
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def _measure(base_url: str, stream: bool) -> tuple:
+    """Return (time to first byte, total time, bytes received)"""
+    payload = {"text": "A long page of text.", "format": "mp3", "stream": stream}
+    start = time.perf_counter()
+    first_byte = None
+    received = 0
+    with httpx.stream("POST", f"{base_url}/api/tts", json=payload, timeout=120) as response:
+        response.raise_for_status()
+        for chunk in response.iter_raw():
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            received += len(chunk)
+    return first_byte, time.perf_counter() - start, received
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--first-byte", type=float, default=0.2, help="Fake upstream time to first chunk (s)")
+    parser.add_argument("--chunks", type=int, default=40)
+    parser.add_argument("--interval", type=float, default=0.1, help="Fake upstream delay between chunks (s)")
+    args = parser.parse_args()
+
+    upstream = start_fake_streaming_tts_server(args.first_byte, args.chunks, args.interval)
+    openai_service.async_client = AsyncOpenAI(
+        api_key="benchmark-key", base_url=f"{server_url(upstream)}/v1", max_retries=0
+    )
+    base_url = _start_app()
+
+    print(f"Fake upstream: first chunk after {args.first_byte * 1000:.0f}ms, "
+          f"{args.chunks} chunks every {args.interval * 1000:.0f}ms")
+    print(f"{'mode':>10} {'TTFB (s)':>9} {'total (s)':>10} {'bytes':>9}")
+    for stream in (False, True):
+        first_byte, total, received = _measure(base_url, stream)
+        print(f"{'stream' if stream else 'buffered':>10} {first_byte:>9.3f} {total:>10.3f} {received:>9}")
+
+    upstream.shutdown()
+
+
+if __name__ == "__main__":
+    main()
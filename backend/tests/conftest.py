@@ -1,13 +1,21 @@
 """Pytest configuration and fixtures"""
 import base64
+import io
+import random
 import pytest
 import os
 from fastapi.testclient import TestClient
 from unittest.mock import Mock, MagicMock
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
 
 # Set test environment variables before importing app
 os.environ["ANTHROPIC_API_KEY"] = "test-anthropic-key"
 os.environ["OPENAI_API_KEY"] = "test-openai-key"
+# Keep tests hermetic: no process-local audio or OCR cache unless a test builds one
+os.environ["LOCAL_CACHE_MEMORY_MB"] = "0"
+os.environ["LOCAL_CACHE_DISK_MB"] = "0"
+os.environ["OCR_CACHE_MEMORY_MB"] = "0"
+os.environ["OCR_CACHE_DISK_MB"] = "0"
 
 from app.main import app
 
@@ -78,3 +86,43 @@ def mock_openai_response():
     audio_data = b'\x00\x01\x02\x03' * 100  # Sample audio bytes
     mock_response.iter_bytes.return_value = [audio_data[i:i+50] for i in range(0, len(audio_data), 50)]
     return mock_response
+
+
+@pytest.fixture
+def text_page():
+    """Factory: paper with paragraphs of random words (same layout, text set by seed)"""
+    words = ["the", "quick", "brown", "fox", "jumps", "over", "lazy", "dog", "sentence", "students", "read"]
+
+    def make(seed, size=(900, 1200)):
+        rng = random.Random(seed)
+        page = Image.new("RGB", size, (245, 242, 232))
+        draw = ImageDraw.Draw(page)
+        font = ImageFont.load_default(size=26)
+        y = 100
+        while y < size[1] - 100:
+            line = " ".join(rng.choice(words) for _ in range(30))
+            limit = 700 * (rng.uniform(0.2, 0.9) if rng.random() < 0.15 else 1)
+            while draw.textlength(line, font=font) > limit:
+                line = line.rsplit(" ", 1)[0]
+            draw.text((100, y), line, fill=(25, 25, 25), font=font)
+            y += 40
+        return page
+
+    return make
+
+
+@pytest.fixture
+def page_photo():
+    """Factory: JPEG bytes of a page photographed on a desk"""
+    desk = (120, 85, 50)
+
+    def make(page, angle=0.0, offset=(150, 150), scale=1.0, blur=1.0):
+        photo = Image.new("RGB", (1300, 1700), desk)
+        shot = page.resize((int(page.width * scale), int(page.height * scale)), Image.BILINEAR)
+        shot = shot.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=desk)
+        photo.paste(shot, offset)
+        buffer = io.BytesIO()
+        photo.filter(ImageFilter.GaussianBlur(blur)).save(buffer, format="JPEG", quality=85)
+        return buffer.getvalue()
+
+    return make
@@ -0,0 +1,447 @@
+"""Tests for audio utilities (decode/encode, duration probing)"""
+import array
+import json
+import os
+import shutil
+import struct
+import subprocess
+import pytest
+from unittest.mock import patch, MagicMock
+
+from app.core.constants import TTS_SAMPLE_RATE
+from app.utils.audio import decode_audio, encode_audio, concatenate_pcm
+from app.utils.audio_probe import probe_duration_us, get_audio_duration_us, _crc8
+from app.utils.audio_splice import (
+    OPUS_SILENCE_PACKET,
+    ogg_crc,
+    opus_packet_samples,
+    splice_audio,
+)
+
+
+@pytest.mark.unit
+class TestAudioCodec:
+    """Test cases for in-memory ffmpeg decode/encode"""
+
+    def test_decode_audio_uses_pipes(self):
+        """Test decoding pipes bytes through ffmpeg and returns PCM + duration"""
+        pcm = b"\x00\x00" * TTS_SAMPLE_RATE  # 1 second of 16-bit mono silence
+
+        with patch('app.utils.audio.subprocess.run') as mock_run:
+            mock_run.return_value = MagicMock(returncode=0, stdout=pcm, stderr=b"")
+
+            segment, duration = decode_audio(b"compressed", "mp3")
+
+            assert duration == 1.0
+            assert segment.raw_data == pcm
+            assert segment.frame_rate == TTS_SAMPLE_RATE
+
+            command = mock_run.call_args[0][0]
+            assert "pipe:0" in command and "pipe:1" in command
+            assert mock_run.call_args[1]["input"] == b"compressed"
+
+    def test_decode_audio_ffmpeg_error(self):
+        """Test decoding raises when ffmpeg fails"""
+        with patch('app.utils.audio.subprocess.run') as mock_run:
+            mock_run.return_value = MagicMock(returncode=1, stdout=b"", stderr=b"Invalid data")
+
+            with pytest.raises(RuntimeError) as exc_info:
+                decode_audio(b"garbage", "opus")
+
+            assert "Invalid data" in str(exc_info.value)
+
+    def test_encode_audio_uses_container_format(self):
+        """Test encoding picks the muxer for the requested format"""
+        from pydub import AudioSegment
+        segment = AudioSegment.silent(duration=100, frame_rate=TTS_SAMPLE_RATE)
+
+        with patch('app.utils.audio.subprocess.run') as mock_run:
+            mock_run.return_value = MagicMock(returncode=0, stdout=b"encoded", stderr=b"")
+
+            assert encode_audio(segment, "aac") == b"encoded"
+
+            command = mock_run.call_args[0][0]
+            assert command[command.index("-f", command.index("pipe:0")) + 1] == "adts"
+            assert mock_run.call_args[1]["input"] == segment.raw_data
+
+
+    def test_concatenate_pcm_frame_ranges(self):
+        """Test chunks are joined with zeroed gaps and frame ranges are exact"""
+        buffer, ranges = concatenate_pcm([b"\x01\x00" * 3, b"\x02\x00" * 2, b"\x03\x00"], gap_frames=4)
+
+        assert bytes(buffer) == (
+            b"\x01\x00" * 3 + b"\x00" * 8 + b"\x02\x00" * 2 + b"\x00" * 8 + b"\x03\x00"
+        )
+        assert ranges == [(0, 3), (7, 9), (13, 14)]
+
+    def test_concatenate_pcm_single_and_empty(self):
+        """Test no gap is added around a single chunk, and empty input is empty"""
+        buffer, ranges = concatenate_pcm([b"\x05\x00" * 2], gap_frames=10)
+        assert bytes(buffer) == b"\x05\x00" * 2
+        assert ranges == [(0, 2)]
+
+        buffer, ranges = concatenate_pcm([], gap_frames=10)
+        assert len(buffer) == 0
+        assert ranges == []
+
+# =====================================================
+# Synthetic stream builders (header-only, payload zeroed)
+# =====================================================
+
+def _mp3_frame(first_payload: bytes = b"") -> bytes:
+    """MPEG-2 Layer III, 24kHz, 64kbps, mono, no padding: 192 bytes, 576 samples"""
+    header = bytes([0xFF, 0xF3, 0x84, 0xC0])
+    payload = first_payload.ljust(192 - 4, b"\x00")
+    return header + payload
+
+
+def _ogg_page(granule: int, payload: bytes, header_type: int = 0, sequence: int = 0) -> bytes:
+    """Ogg page (CRC left as zero; the probe does not verify it)"""
+    segments = []
+    remaining = len(payload)
+    while remaining >= 255:
+        segments.append(255)
+        remaining -= 255
+    segments.append(remaining)
+    return (
+        b"OggS" + bytes([0, header_type]) + struct.pack("<qII", granule, 1234, sequence)
+        + b"\x00" * 4 + bytes([len(segments)]) + bytes(segments) + payload
+    )
+
+
+def _flac_stream(total_samples: int, frame_number: int = None) -> bytes:
+    """FLAC with STREAMINFO (24kHz mono 16-bit, 4096-sample blocks) and optional last frame"""
+    packed = (24000 << 44) | (0 << 41) | (15 << 36) | total_samples
+    streaminfo = struct.pack(">HH", 4096, 4096) + b"\x00" * 6 + packed.to_bytes(8, "big") + b"\x00" * 16
+    data = b"fLaC" + bytes([0x80, 0, 0, 34]) + streaminfo
+    if frame_number is not None:
+        # Fixed blocksize, block size code 12 (4096), rate from STREAMINFO, mono 16-bit
+        header = bytes([0xFF, 0xF8, 0xC0, 0x08, frame_number])
+        data += header + bytes([_crc8(header)]) + b"\x00" * 32
+    return data
+
+
+def _adts_frame(blocks: int = 1) -> bytes:
+    """ADTS AAC-LC frame, 24kHz mono, 16 bytes"""
+    length = 16
+    header = bytes([
+        0xFF, 0xF1,
+        (1 << 6) | (6 << 2),
+        (1 << 6) | ((length >> 11) & 0x03),
+        (length >> 3) & 0xFF,
+        ((length & 0x07) << 5) | 0x1F,
+        0xFC | (blocks - 1),
+    ])
+    return header + b"\x00" * (length - 7)
+
+
+@pytest.mark.unit
+class TestAudioProbe:
+    """Test cases for header-based duration probing"""
+
+    def test_mp3_cbr_frame_walk(self):
+        """Test CBR MP3 without Xing header is measured by walking frames"""
+        data = _mp3_frame() * 10 + b"TAG" + b"\x00" * 125
+        assert probe_duration_us(data, "mp3") == 10 * 576 * 1_000_000 // 24000
+
+    def test_mp3_xing_with_lame_gapless_info(self):
+        """Test Xing frame count minus LAME encoder delay and padding"""
+        # Xing tag sits after 9 bytes of side info (MPEG-2 mono)
+        lame = b"LAME3.100".ljust(21, b"\x00") + ((576 << 12) | 1000).to_bytes(3, "big")
+        xing = b"\x00" * 9 + b"Xing" + struct.pack(">II", 0x1, 100) + lame
+        data = _mp3_frame(xing) + _mp3_frame() * 3
+        expected_samples = 100 * 576 - 576 - 1000
+        assert probe_duration_us(data, "mp3") == round(expected_samples * 1_000_000 / 24000)
+
+    def test_mp3_vbri_header(self):
+        """Test Fraunhofer VBRI frame count"""
+        vbri = b"\x00" * 32 + b"VBRI" + b"\x00" * 10 + struct.pack(">I", 50)
+        data = _mp3_frame(vbri) + _mp3_frame()
+        assert probe_duration_us(data, "mp3") == 50 * 576 * 1_000_000 // 24000
+
+    def test_mp3_skips_id3v2(self):
+        """Test a leading ID3v2 tag is skipped"""
+        id3 = b"ID3\x04\x00\x00\x00\x00\x00\x14" + b"\x00" * 20
+        data = id3 + _mp3_frame() * 5
+        assert probe_duration_us(data, "mp3") == 5 * 576 * 1_000_000 // 24000
+
+    def test_opus_final_granule_minus_pre_skip(self):
+        """Test Ogg Opus duration = last granule - pre-skip at 48kHz"""
+        opus_head = b"OpusHead" + bytes([1, 1]) + struct.pack("<HIhB", 312, 24000, 0, 0)
+        data = (
+            _ogg_page(0, opus_head, header_type=0x02)
+            + _ogg_page(0, b"OpusTags" + b"\x00" * 8, sequence=1)
+            + _ogg_page(24312, b"\x00" * 300, sequence=2)
+            + _ogg_page(48312, b"\x00" * 300, header_type=0x04, sequence=3)
+        )
+        assert probe_duration_us(data, "opus") == 1_000_000
+
+    def test_flac_streaminfo_total_samples(self):
+        """Test FLAC duration from STREAMINFO total samples"""
+        assert probe_duration_us(_flac_stream(total_samples=48000), "flac") == 2_000_000
+
+    def test_flac_streamed_uses_last_frame_header(self):
+        """Test FLAC without total samples falls back to the last frame number"""
+        data = _flac_stream(total_samples=0, frame_number=5)
+        assert probe_duration_us(data, "flac") == round(6 * 4096 * 1_000_000 / 24000)
+
+    def test_adts_frame_count(self):
+        """Test ADTS duration = raw data blocks x 1024 samples"""
+        data = _adts_frame() * 20 + _adts_frame(blocks=2)
+        assert probe_duration_us(data, "aac") == round(22 * 1024 * 1_000_000 / 24000)
+
+    def test_unparseable_returns_none(self):
+        """Test garbage input is reported as unparseable"""
+        for format_name in ["mp3", "opus", "flac", "aac"]:
+            assert probe_duration_us(b"not audio at all" * 10, format_name) is None
+
+    def test_fallback_to_ffmpeg_decode(self):
+        """Test get_audio_duration_us decodes only when probing fails"""
+        with patch('app.utils.audio_probe.decode_audio') as mock_decode:
+            mock_decode.return_value = (MagicMock(), 1.5)
+
+            assert get_audio_duration_us(b"garbage", "mp3") == 1_500_000
+            mock_decode.assert_called_once()
+
+            mock_decode.reset_mock()
+            assert get_audio_duration_us(_mp3_frame() * 4, "mp3") == 96000
+            mock_decode.assert_not_called()
+
+
+@pytest.mark.integration
+@pytest.mark.skipif(
+    not (shutil.which("ffmpeg") and shutil.which("ffprobe")),
+    reason="ffmpeg/ffprobe not installed"
+)
+class TestAudioProbeCorpus:
+    """Check probe durations against ffprobe on ffmpeg-generated files"""
+
+    ENCODE_ARGS = {
+        "mp3": ["-c:a", "libmp3lame", "-f", "mp3"],
+        "opus": ["-c:a", "libopus", "-f", "ogg"],
+        "aac": ["-c:a", "aac", "-f", "adts"],
+        "flac": ["-c:a", "flac", "-f", "flac"],
+    }
+
+    def _ffprobe_samples(self, path):
+        """Playable samples as decoded by ffprobe (encoder delay/padding trimmed)"""
+        output = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "a:0",
+             "-show_entries", "frame=nb_samples:stream=sample_rate", "-of", "json", str(path)],
+            capture_output=True, check=True
+        ).stdout
+        info = json.loads(output)
+        samples = sum(int(frame["nb_samples"]) for frame in info["frames"])
+        return samples, int(info["streams"][0]["sample_rate"])
+
+    @pytest.mark.parametrize("format_name", ["mp3", "opus", "aac", "flac"])
+    @pytest.mark.parametrize("sample_rate,channels", [(24000, 1), (44100, 2), (22050, 1)])
+    @pytest.mark.parametrize("seconds", [0.37, 4.05])
+    @pytest.mark.parametrize("piped", [False, True])
+    def test_matches_ffprobe(self, tmp_path, format_name, sample_rate, channels, seconds, piped):
+        """Test probe duration equals ffprobe's decoded duration"""
+        path = tmp_path / f"sample.{format_name}"
+        source = ["-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}:sample_rate={sample_rate}",
+                  "-ac", str(channels)]
+        if piped:
+            # Non-seekable output, like streamed API responses (no header rewrite)
+            data = subprocess.run(
+                ["ffmpeg", "-v", "error"] + source + self.ENCODE_ARGS[format_name] + ["pipe:1"],
+                capture_output=True, check=True
+            ).stdout
+            path.write_bytes(data)
+        else:
+            subprocess.run(
+                ["ffmpeg", "-v", "error", "-y"] + source + self.ENCODE_ARGS[format_name] + [str(path)],
+                capture_output=True, check=True
+            )
+            data = path.read_bytes()
+
+        samples, probed_rate = self._ffprobe_samples(path)
+        expected_us = samples * 1_000_000 / probed_rate
+
+        assert probe_duration_us(data, format_name) == pytest.approx(expected_us, abs=1)
+
+
+def _reference_ogg_crc(data: bytes) -> int:
+    """Bitwise Ogg CRC-32 (poly 0x04C11DB7, MSB-first)"""
+    crc = 0
+    for byte in data:
+        crc ^= byte << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) & 0xFFFFFFFF if crc & 0x80000000 else (crc << 1) & 0xFFFFFFFF
+    return crc
+
+
+def _opus_stream(packet_count: int, pre_skip: int = 312, end_trim: int = 0) -> bytes:
+    """Ogg Opus stream of 20ms CELT packets, one packet per page"""
+    opus_head = b"OpusHead" + bytes([1, 1]) + struct.pack("<HIhB", pre_skip, 24000, 0, 0)
+    pages = [
+        _ogg_page(0, opus_head, header_type=0x02),
+        _ogg_page(0, b"OpusTags" + b"\x00" * 8, sequence=1),
+    ]
+    for i in range(packet_count):
+        last = i == packet_count - 1
+        granule = (i + 1) * 960 - (end_trim if last else 0)
+        pages.append(_ogg_page(granule, b"\xfc" + bytes([i]) * 40, header_type=0x04 if last else 0, sequence=i + 2))
+    return b"".join(pages)
+
+
+def _read_ogg_pages(data: bytes) -> list:
+    """Split an Ogg stream into (header_type, granule, page_bytes)"""
+    pages = []
+    pos = 0
+    while pos < len(data):
+        segments = data[pos + 26]
+        size = 27 + segments + sum(data[pos + 27:pos + 27 + segments])
+        granule = struct.unpack("<q", data[pos + 6:pos + 14])[0]
+        pages.append((data[pos + 5], granule, data[pos:pos + size]))
+        pos += size
+    return pages
+
+
+@pytest.mark.unit
+class TestAudioSplice:
+    """Test cases for compressed-domain splicing"""
+
+    def test_ogg_crc_matches_reference(self):
+        """Test the zlib-based Ogg CRC against a bitwise implementation"""
+        for data in [b"", b"OggS", os.urandom(1), os.urandom(4096)]:
+            assert ogg_crc(data) == _reference_ogg_crc(data)
+
+    def test_opus_packet_samples(self):
+        """Test packet durations from the TOC byte"""
+        assert opus_packet_samples(b"\xf8\xff\xfe") == 960          # CELT 20ms, 1 frame
+        assert opus_packet_samples(OPUS_SILENCE_PACKET) == 960        # SILK 20ms
+        assert opus_packet_samples(b"\x18\x00") == 2880               # SILK 60ms
+        assert opus_packet_samples(b"\xe9\x00") == 480                # CELT 5ms, 2 frames
+        assert opus_packet_samples(b"\xe3\x04") == 120 * 4            # CELT 2.5ms, code 3 x4
+
+    def test_splice_mp3_inserts_silent_frames(self):
+        """Test MP3 frames are copied and the gap is whole silent frames"""
+        first = _mp3_frame() * 5
+        second = _mp3_frame() * 3 + b"TAG" + b"\x00" * 125
+
+        data, ranges, total, rate = splice_audio([first, second], "mp3", 200)
+
+        # 4800 samples of gap at 24kHz = 8.33 frames -> 8 frames
+        assert rate == 24000
+        assert total == (5 + 8 + 3) * 576
+        assert ranges == [(0, 5 * 576), (13 * 576, 16 * 576)]
+        assert data[:len(first)] == first
+        assert len(data) == 16 * 192
+        assert data[len(first):len(first) + 192] == bytes([0xFF, 0xF3, 0x84, 0xC0]) + bytes(188)
+        assert probe_duration_us(data, "mp3") == total * 1_000_000 // 24000
+
+    def test_splice_mp3_without_gap(self):
+        """Test a zero gap appends the frames back to back"""
+        first = _mp3_frame() * 5
+        second = _mp3_frame() * 3
+
+        data, ranges, total, rate = splice_audio([first, second], "mp3", 0)
+
+        assert data == first + second
+        assert ranges == [(0, 5 * 576), (5 * 576, 8 * 576)]
+        assert total == 8 * 576
+
+    def test_splice_mp3_uses_lame_gapless_info(self):
+        """Test ranges skip encoder delay/padding and a Xing header is kept"""
+        lame = b"LAME3.100".ljust(21, b"\x00") + ((576 << 12) | 500).to_bytes(3, "big")
+        xing = b"\x00" * 9 + b"Xing" + struct.pack(">II", 0x1, 4) + lame
+        stream = _mp3_frame(xing) + _mp3_frame() * 4
+
+        data, ranges, total, rate = splice_audio([stream, stream], "mp3", 200)
+
+        assert total == (4 + 8 + 4) * 576
+        assert ranges[0] == (576 + 529, 576 + 529 + 4 * 576 - 576 - 500)
+        assert ranges[1][0] == 12 * 576 + 576 + 529
+        # New Xing frame with the spliced frame count (no LAME trimming)
+        assert data[13:17] == b"Xing"
+        assert probe_duration_us(data, "mp3") == total * 1_000_000 // 24000
+
+    def test_splice_mp3_rejects_incompatible_streams(self):
+        """Test streams that can't be joined frame by frame fall back"""
+        # 22.05kHz vs 24kHz
+        other_rate = bytes([0xFF, 0xF3, 0x80, 0xC0]) + bytes(205)
+        assert splice_audio([_mp3_frame() * 2, other_rate * 2], "mp3", 200) is None
+
+        # First frame borrows from the bit reservoir (main_data_begin != 0)
+        borrowing = _mp3_frame(b"\x10") + _mp3_frame()
+        assert splice_audio([_mp3_frame() * 2, borrowing], "mp3", 200) is None
+
+    def test_splice_ogg_opus_rewrites_granules(self):
+        """Test packets are re-paged with silence packets and exact granules"""
+        first = _opus_stream(10, pre_skip=312)
+        second = _opus_stream(5, pre_skip=200, end_trim=100)
+
+        data, ranges, total, rate = splice_audio([first, second], "opus", 200)
+
+        assert rate == 48000
+        # Timeline: 10 packets, 10 silence packets, 5 packets (960 samples each)
+        assert ranges == [(0, 9600 - 312), (19200 + 200 - 312, 19200 + 4800 - 100 - 312)]
+        assert total == 24000 - 100 - 312
+
+        pages = _read_ogg_pages(data)
+        assert pages[0][0] == 0x02 and b"OpusHead" in pages[0][2]
+        assert pages[-1][0] == 0x04
+        assert pages[-1][1] == 24000 - 100
+        assert data.count(OPUS_SILENCE_PACKET) == 10
+        for _, _, page in pages:
+            zeroed = page[:22] + b"\x00" * 4 + page[26:]
+            assert struct.unpack("<I", page[22:26])[0] == ogg_crc(zeroed)
+
+        assert probe_duration_us(data, "opus") == round(total * 1_000_000 / 48000)
+
+    def test_splice_ogg_opus_rejects_channel_mismatch(self):
+        """Test mono and stereo streams are not spliced"""
+        stereo = _opus_stream(3).replace(b"OpusHead\x01\x01", b"OpusHead\x01\x02")
+        assert splice_audio([_opus_stream(3), stereo], "opus", 200) is None
+
+    def test_unsupported_or_invalid_input(self):
+        """Test formats without a splicer and garbage input return None"""
+        assert splice_audio([_adts_frame()] * 2, "aac", 200) is None
+        assert splice_audio([b"garbage" * 10] * 2, "mp3", 200) is None
+        assert splice_audio([b"garbage" * 10] * 2, "opus", 200) is None
+
+
+@pytest.mark.integration
+@pytest.mark.skipif(not shutil.which("ffmpeg"), reason="ffmpeg not installed")
+class TestAudioSpliceDecode:
+    """Decode spliced ffmpeg-encoded streams and check gaps and sentence ranges"""
+
+    ENCODE_ARGS = {
+        "mp3": ["-c:a", "libmp3lame", "-f", "mp3"],
+        "opus": ["-c:a", "libopus", "-f", "ogg"],
+    }
+
+    def _encode(self, format_name, frequency, seconds):
+        return subprocess.run(
+            ["ffmpeg", "-v", "error", "-f", "lavfi",
+             "-i", f"sine=frequency={frequency}:duration={seconds}:sample_rate=24000"]
+            + self.ENCODE_ARGS[format_name] + ["pipe:1"],
+            capture_output=True, check=True
+        ).stdout
+
+    def _decode(self, data, sample_rate):
+        pcm = subprocess.run(
+            ["ffmpeg", "-v", "error", "-i", "pipe:0", "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "pipe:1"],
+            input=data, capture_output=True, check=True
+        ).stdout
+        return array.array("h", pcm)
+
+    @pytest.mark.parametrize("format_name", ["mp3", "opus"])
+    def test_spliced_stream_decodes(self, format_name):
+        """Test decoded length, silent gap and full-level sentence onset"""
+        blobs = [self._encode(format_name, 440, 1.3), self._encode(format_name, 660, 0.77)]
+
+        data, ranges, total, rate = splice_audio(blobs, format_name, 200)
+        pcm = self._decode(data, rate)
+
+        assert len(pcm) == total
+        gap = pcm[ranges[0][1] + rate // 20:ranges[1][0] - rate // 50]
+        assert max(abs(x) for x in gap) < 50
+
+        # Piped mp3 has no LAME tag, so ranges are frame-accurate only (< 1 frame + delay)
+        tolerance = rate // 20 if format_name == "mp3" else rate // 200
+        onset = pcm[ranges[1][0] + tolerance:ranges[1][0] + tolerance + rate // 100]
+        assert max(abs(x) for x in onset) > 3000
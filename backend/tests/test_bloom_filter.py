@@ -0,0 +1,39 @@
+"""Tests for the Bloom filter"""
+import pytest
+
+from app.utils.bloom_filter import BloomFilter
+
+
+@pytest.mark.unit
+class TestBloomFilter:
+    """Test cases for BloomFilter"""
+
+    def test_no_false_negatives(self):
+        """Test every added key is reported present"""
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        keys = [f"hash-{i}" for i in range(1000)]
+        for key in keys:
+            bloom.add(key)
+
+        assert all(key in bloom for key in keys)
+        assert bloom.count == 1000
+
+    def test_false_positive_rate_near_target(self):
+        """Test the measured false-positive rate at capacity is close to the target"""
+        bloom = BloomFilter(capacity=5000, error_rate=0.01)
+        for i in range(5000):
+            bloom.add(f"known-{i}")
+
+        false_positives = sum(f"unknown-{i}" in bloom for i in range(20000))
+
+        assert false_positives / 20000 < 0.02
+        assert 0.005 < bloom.estimated_false_positive_rate() < 0.02
+
+    def test_memory_footprint(self):
+        """Test the bit array is about 9.6 bits per key at 1%"""
+        bloom = BloomFilter(capacity=100_000, error_rate=0.01)
+
+        assert bloom.num_hashes == 7
+        assert 115_000 < bloom.memory_bytes < 125_000
+        assert bloom.stats()["items"] == 0
+        assert "anything" not in bloom
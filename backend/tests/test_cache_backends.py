@@ -0,0 +1,313 @@
+"""Tests for the shared audio cache backends"""
+import asyncio
+import os
+import threading
+import uuid
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services.cache_backends import (
+    CacheBackend,
+    MemoryCacheBackend,
+    SqliteCacheBackend,
+    SupabaseCacheBackend,
+    build_cache_backend,
+)
+from app.core.supabase import is_supabase_configured
+from app.utils.local_cache import TieredCache
+
+
+BASE_URL = "http://localhost:8000/api/tts-cache-files"
+
+
+def _make_backend(kind, tmp_path):
+    if kind == "memory":
+        return MemoryCacheBackend(BASE_URL)
+    if kind == "sqlite":
+        return SqliteCacheBackend(str(tmp_path), BASE_URL)
+    # Writes to the real project: opt in with CACHE_BACKEND_TEST_SUPABASE=1
+    if not (os.environ.get("CACHE_BACKEND_TEST_SUPABASE") and is_supabase_configured()):
+        pytest.skip("Supabase contract tests need CACHE_BACKEND_TEST_SUPABASE=1 and a configured project")
+    return SupabaseCacheBackend()
+
+
+@pytest.fixture(params=["memory", "sqlite", "supabase"])
+def backend(request, tmp_path):
+    return _make_backend(request.param, tmp_path)
+
+
+def _key():
+    # Unique per test run, so the Supabase backend can share a project
+    return f"test-{uuid.uuid4().hex}"
+
+
+def _document(text_hash, urls=("u0", "u1"), size=10):
+    return {
+        'text_hash': text_hash,
+        'segment_urls': list(urls),
+        'durations': [1.0] * len(urls),
+        'sentences': [f"S{i}." for i in range(len(urls))],
+        'format': "mp3",
+        'voice': "nova",
+        'total_duration': float(len(urls)),
+        'file_size_bytes': size,
+        'access_count': 1,
+        'created_at': "2025-01-01T00:00:00",
+        'last_accessed_at': "2025-01-01T00:00:00"
+    }
+
+
+def _sentence(sentence_hash, url="u"):
+    return {
+        'sentence_hash': sentence_hash,
+        'sentence': "S.",
+        'voice': "nova",
+        'format': "mp3",
+        'audio_url': url,
+        'duration': 0.5,
+        'file_size_bytes': 5,
+        'created_at': "2025-01-01T00:00:00"
+    }
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestCacheBackendContract:
+    """The same behaviour from every backend"""
+
+    async def test_documents(self, backend):
+        """Test insert-if-absent, lookup, rename and access counting"""
+        key, renamed = _key(), _key()
+        assert await backend.get_document(key) is None
+
+        await backend.insert_document(_document(key, urls=["first"]))
+        await backend.insert_document(_document(key, urls=["second"]))
+        row = await backend.get_document(key)
+        assert row['segment_urls'] == ["first"]
+        assert row['durations'] == [1.0] and row['sentences'] == ["S0."]
+        assert key in await backend.list_document_hashes()
+
+        await backend.rename_document(key, renamed)
+        assert await backend.get_document(key) is None
+        await backend.increment_access([renamed], [3], ["2025-02-01T00:00:00"])
+        row = await backend.get_document(renamed)
+        assert row['access_count'] == 4
+        assert row['last_accessed_at'].startswith("2025-02-01")
+
+        await backend.delete_documents([row['id']])
+        assert await backend.get_document(renamed) is None
+
+    async def test_sentences(self, backend):
+        """Test batched lookup returns only existing rows and the first insert wins"""
+        first, second, renamed = _key(), _key(), _key()
+        await backend.insert_sentence(_sentence(first, url="a"))
+        await backend.insert_sentence(_sentence(first, url="b"))
+        await backend.insert_sentence(_sentence(second))
+
+        rows = await backend.get_sentences([first, _key()])
+        assert rows == [{'sentence_hash': first, 'audio_url': "a", 'duration': 0.5, 'file_size_bytes': 5}]
+
+        await backend.rename_sentence(second, renamed)
+        assert [row['sentence_hash'] for row in await backend.get_sentences([second, renamed])] == [renamed]
+        listed = {row['sentence_hash'] for row in await backend.list_sentences()}
+        assert {first, renamed} <= listed
+
+        await backend.delete_sentences([first, renamed])
+        assert await backend.get_sentences([first, renamed]) == []
+
+    async def test_blobs(self, backend):
+        """Test stored files get a URL that maps back to their path"""
+        path = f"cache/sentences/{_key()}.mp3"
+        url = await backend.put_blob(path, b"audio", "audio/mp3")
+        await backend.put_blob(path, b"audio2", "audio/mp3")
+
+        assert backend.object_path(url) == path
+        assert backend.object_path("https://elsewhere.example/a.mp3") is None
+        if not isinstance(backend, SupabaseCacheBackend):
+            assert await backend.get_blob(path) == b"audio2"
+
+        await backend.delete_objects([path])
+        if not isinstance(backend, SupabaseCacheBackend):
+            assert await backend.get_blob(path) is None
+
+    async def test_leases(self, backend):
+        """Test a held lease is refused, released ones are free and expired ones are taken over"""
+        key = _key()
+        assert await backend.try_lease(key, "a", 60) is True
+        assert await backend.try_lease(key, "b", 60) is False
+
+        await backend.release_lease(key, "b")  # Not the holder: no effect
+        assert await backend.try_lease(key, "b", 60) is False
+        await backend.release_lease(key, "a")
+        assert await backend.try_lease(key, "b", -1) is True  # Already expired
+        assert await backend.try_lease(key, "c", 60) is True
+        await backend.release_lease(key, "c")
+
+    async def test_ocr_results(self, backend):
+        """Test OCR results round-trip and the first insert wins"""
+        key = _key()
+        assert await backend.get_ocr_result(key) is None
+
+        row = {'cache_key': key, 'text': "A. B.", 'sentences': ["A.", "B."], 'confidence': "high",
+               'created_at': "2025-01-01T00:00:00"}
+        await backend.insert_ocr_result(row)
+        await backend.insert_ocr_result({**row, 'text': "other"})
+        assert await backend.get_ocr_result(key) == {'text': "A. B.", 'sentences': ["A.", "B."], 'confidence': "high"}
+
+
+@pytest.mark.unit
+class TestSqliteCacheBackend:
+    """Test cases for the SQLite backend's multi-worker behaviour"""
+
+    def test_wal_mode(self, tmp_path):
+        """Test the database is switched to WAL so readers don't block the writer"""
+        backend = SqliteCacheBackend(str(tmp_path), BASE_URL)
+        assert backend._connection().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def test_concurrent_workers(self, tmp_path):
+        """Test workers with their own connections race safely for leases and inserts"""
+        workers = 8
+        barrier = threading.Barrier(workers)
+        leases = []
+        backends = [SqliteCacheBackend(str(tmp_path), BASE_URL) for _ in range(workers)]
+
+        def worker(index):
+            async def run():
+                barrier.wait()
+                leases.append(await backends[index].try_lease("doc", f"w{index}", 60))
+                for n in range(20):
+                    await backends[index].insert_sentence(_sentence(f"s{n}", url=f"w{index}"))
+                    await backends[index].insert_document(_document(f"d{n}"))
+            asyncio.run(run())
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(leases) == [False] * (workers - 1) + [True]
+        rows = asyncio.run(backends[0].get_sentences([f"s{n}" for n in range(20)]))
+        assert len(rows) == 20
+        assert len(asyncio.run(backends[0].list_document_hashes())) == 20
+
+    def test_rejects_paths_outside_store(self, tmp_path):
+        """Test object paths cannot escape the files directory"""
+        backend = SqliteCacheBackend(str(tmp_path), BASE_URL)
+        for path in ["../cache.db", "/etc/passwd", "cache//a.mp3"]:
+            with pytest.raises(ValueError):
+                asyncio.run(backend.put_blob(path, b"x", "audio/mp3"))
+
+
+@pytest.mark.unit
+class TestBuildCacheBackend:
+    """Test cases for choosing the backend from settings"""
+
+    def test_choice(self, tmp_path):
+        with patch('app.services.cache_backends.settings') as mock_settings:
+            mock_settings.cache_store_dir = str(tmp_path)
+            mock_settings.cache_files_base_url = BASE_URL
+
+            mock_settings.cache_backend = "sqlite"
+            assert isinstance(build_cache_backend(), SqliteCacheBackend)
+            mock_settings.cache_backend = "memory"
+            assert isinstance(build_cache_backend(), MemoryCacheBackend)
+            mock_settings.cache_backend = "none"
+            assert build_cache_backend() is None
+            mock_settings.cache_backend = "supabase"
+            with patch('app.services.cache_backends.is_supabase_configured', return_value=False):
+                assert build_cache_backend() is None
+            mock_settings.cache_backend = "redis"
+            with pytest.raises(ValueError):
+                build_cache_backend()
+
+    def test_incomplete_backend_fails_at_construction(self):
+        """Test a backend missing part of the interface fails when built, not on the first call"""
+        methods = {
+            name: getattr(MemoryCacheBackend, name)
+            for name in CacheBackend.__abstractmethods__ if name != "release_lease"
+        }
+        incomplete = type("Incomplete", (CacheBackend,), methods)
+
+        with pytest.raises(TypeError, match="release_lease"):
+            incomplete()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestAudioCacheServiceOnBackends:
+    """AudioCacheService end to end on the local backends"""
+
+    @pytest.fixture(params=["memory", "sqlite"])
+    def shared_backend(self, request, tmp_path):
+        return _make_backend(request.param, tmp_path)
+
+    def _service(self, backend):
+        from app.services.audio_cache_service import AudioCacheService
+
+        service = AudioCacheService()
+        service.backend = backend
+        service.local_cache = TieredCache([])  # Every lookup goes to the backend
+        service.openai_service.synthesize_sentences_batched_async = AsyncMock(
+            side_effect=lambda sentences, voice, format: ([s.encode() for s in sentences], len(sentences))
+        )
+        return service
+
+    async def test_second_worker_hits_shared_cache(self, shared_backend):
+        """Test a document generated by one worker is served to another from the backend"""
+        first, second = self._service(shared_backend), self._service(shared_backend)
+
+        with patch('app.services.audio_cache_service.get_audio_duration_us', return_value=500_000):
+            generated = await first.generate_or_get_cached("A. B.", ["A.", "B."], "nova", "mp3")
+            cached = await second.generate_or_get_cached("A. B.", ["A.", "B."], "nova", "mp3")
+            partial = await second.generate_or_get_cached("A. C.", ["A.", "C."], "nova", "mp3")
+
+        assert generated['from_cache'] is False
+        assert cached['from_cache'] is True
+        assert cached['audio_urls'] == generated['audio_urls']
+        assert all(url.startswith(BASE_URL) for url in cached['audio_urls'])
+        path = shared_backend.object_path(cached['audio_urls'][1])
+        assert await shared_backend.get_blob(path) == b"B."
+
+        # Sentence-level reuse across documents
+        second.openai_service.synthesize_sentences_batched_async.assert_awaited_once_with(["C."], "nova", "mp3")
+        assert partial['audio_urls'][0] == generated['audio_urls'][0]
+
+        assert await second.flush_access_stats() == 1
+        row = await shared_backend.get_document(second.generate_cache_key("A. B.", ["A.", "B."], "nova", "mp3"))
+        assert row['access_count'] == 2
+        assert second.cache_stats()[shared_backend.name]['hits'] >= 1
+
+    async def test_local_copies_expire_after_eviction_elsewhere(self, shared_backend):
+        """Test a worker's local URLs expire, so another worker's eviction doesn't leave it serving them"""
+        from app.core.config import settings
+        from app.services.cache_eviction_service import CacheEvictionService
+        from app.utils.local_cache import MemoryLRUCache
+
+        first, second = self._service(shared_backend), self._service(shared_backend)
+        second.local_cache = TieredCache([MemoryLRUCache(max_bytes=64 * 1024, max_item_bytes=64 * 1024)])
+        sentence_keys = [second.generate_sentence_cache_key(s, "nova", "mp3") for s in ["A.", "B."]]
+
+        with patch('app.services.audio_cache_service.get_audio_duration_us', return_value=500_000):
+            await first.generate_or_get_cached("A. B.", ["A.", "B."], "nova", "mp3")
+            assert await second.get_cached_audio("A. B.", ["A.", "B."], "nova", "mp3") is not None
+            assert set(await second.get_cached_sentences(sentence_keys)) == set(sentence_keys)
+
+        await CacheEvictionService(shared_backend, budget_bytes=0, gc_grace_seconds=0).run()
+
+        with patch.object(settings, 'local_cache_metadata_ttl_seconds', 0):
+            assert await second.get_cached_audio("A. B.", ["A.", "B."], "nova", "mp3") is None
+            assert await second.get_cached_sentences(sentence_keys) == {}
+
+    async def test_stream_segments_registers_document(self, shared_backend):
+        """Test streamed segments are stored and the document is registered"""
+        service = self._service(shared_backend)
+        service.openai_service.generate_speech_async = AsyncMock(side_effect=lambda text, voice, format: text.encode())
+
+        with patch('app.services.audio_cache_service.get_audio_duration_us', return_value=500_000):
+            events = [event async for event in service.stream_segments("A. B.", ["A.", "B."], "nova", "mp3")]
+            cached = await service.get_cached_audio("A. B.", ["A.", "B."], "nova", "mp3")
+
+        urls = {event['index']: event['audio_url'] for event in events[:2]}
+        assert cached['segment_urls'] == [urls[0], urls[1]]
@@ -0,0 +1,212 @@
+"""Tests for shared audio cache eviction"""
+import asyncio
+import json
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services.cache_backends import object_path
+from app.services.cache_eviction_service import (
+    CacheEvictionService,
+    InMemoryEvictionBackend,
+    eviction_score,
+)
+from app.utils.local_cache import MemoryLRUCache, TieredCache
+
+
+NOW = datetime(2025, 1, 10, 12, 0, 0)
+BASE_URL = "https://example.supabase.co/storage/v1/object/public/audio-files"
+
+
+def _document(doc_id, size, access_count, hours_ago, sentences):
+    return {
+        "id": doc_id,
+        "text_hash": f"hash-{doc_id}",
+        "segment_urls": [f"{BASE_URL}/cache/sentences/{name}.mp3" for name in sentences],
+        "file_size_bytes": size,
+        "access_count": access_count,
+        "last_accessed_at": (NOW - timedelta(hours=hours_ago)).isoformat(),
+    }
+
+
+def _sentence(name, hours_ago=48):
+    return {
+        "sentence_hash": name,
+        "audio_url": f"{BASE_URL}/cache/sentences/{name}.mp3",
+        "created_at": (NOW - timedelta(hours=hours_ago)).isoformat(),
+    }
+
+
+def _backend(materials=None):
+    return InMemoryEvictionBackend(
+        documents=[
+            _document("hot", 100, access_count=50, hours_ago=1, sentences=["s1", "shared"]),
+            _document("stale", 100, access_count=50, hours_ago=24 * 30, sentences=["s2", "shared"]),
+            _document("fresh", 100, access_count=1, hours_ago=2, sentences=["s3"]),
+        ],
+        materials=materials or [],
+        sentences=[_sentence(name) for name in ["s1", "s2", "s3", "shared"]],
+        objects=[f"cache/sentences/{name}.mp3" for name in ["s1", "s2", "s3", "shared"]],
+    )
+
+
+@pytest.mark.unit
+class TestEvictionHelpers:
+    """Test cases for the scoring and URL helpers"""
+
+    def test_score_decays_with_age(self):
+        """Test frequency counts for less the longer an entry goes unused"""
+        recent = eviction_score(2, NOW - timedelta(hours=1), NOW, half_life_seconds=3600 * 72)
+        old_popular = eviction_score(50, NOW - timedelta(days=30), NOW, half_life_seconds=3600 * 72)
+        assert old_popular < recent
+        assert eviction_score(1, NOW, NOW, half_life_seconds=3600) == 2
+
+    def test_object_path(self):
+        """Test bucket paths are recovered from public URLs (with or without a query string)"""
+        assert object_path(f"{BASE_URL}/cache/sentences/a.mp3") == "cache/sentences/a.mp3"
+        assert object_path(f"{BASE_URL}/cache/old_segment_0.mp3?") == "cache/old_segment_0.mp3"
+        assert object_path("https://elsewhere.example/a.mp3") is None
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestCacheEvictionService:
+    """Test cases for CacheEvictionService"""
+
+    async def test_evicts_lowest_score_until_within_budget(self):
+        """Test the stale entry goes first and shared sentence files are kept"""
+        backend = _backend()
+        service = CacheEvictionService(backend, budget_bytes=200, gc_grace_seconds=3600)
+
+        plan = await service.plan(now=NOW)
+
+        assert [row["id"] for row in plan["documents"]] == ["stale"]
+        assert plan["remaining_bytes"] == 200
+        assert plan["sentences"] == ["s2"]
+        assert plan["objects"] == ["cache/sentences/s2.mp3"]
+
+    async def test_never_evicts_documents_used_by_materials(self):
+        """Test pinned documents are skipped even if they score lowest"""
+        backend = _backend(materials=[{"audio_cache_id": "stale"}])
+        service = CacheEvictionService(backend, budget_bytes=200)
+
+        plan = await service.plan(now=NOW)
+
+        assert [row["id"] for row in plan["documents"]] == ["fresh"]
+        assert plan["pinned"] == 1
+
+    async def test_within_budget_only_collects_old_orphans(self):
+        """Test unreferenced sentences are collected only after the grace period"""
+        backend = _backend()
+        backend.sentences["orphan-old"] = _sentence("orphan-old", hours_ago=5)
+        backend.sentences["orphan-new"] = _sentence("orphan-new", hours_ago=0.1)
+        service = CacheEvictionService(backend, budget_bytes=1000, gc_grace_seconds=3600)
+
+        plan = await service.plan(now=NOW)
+
+        assert plan["documents"] == []
+        assert plan["sentences"] == ["orphan-old"]
+        assert plan["objects"] == ["cache/sentences/orphan-old.mp3"]
+
+    async def test_recent_sentences_of_evicted_documents_are_kept(self):
+        """Test the grace period applies to sentences an evicted document used (a generation may have just reused them)"""
+        backend = _backend()
+        backend.sentences["s2"] = _sentence("s2", hours_ago=0.1)
+        service = CacheEvictionService(backend, budget_bytes=200, gc_grace_seconds=3600)
+
+        plan = await service.plan(now=NOW)
+
+        assert [row["id"] for row in plan["documents"]] == ["stale"]
+        assert plan["sentences"] == []
+        assert plan["objects"] == []
+
+    async def test_dry_run_deletes_nothing(self):
+        """Test a dry run only reports"""
+        backend = _backend()
+        service = CacheEvictionService(backend, budget_bytes=0)
+
+        plan = await service.run(dry_run=True)
+
+        assert len(plan["documents"]) == 3
+        assert backend.delete_calls == []
+        assert len(backend.documents) == 3
+
+    async def test_run_deletes_rows_before_objects_in_batches(self):
+        """Test deletions are batched, rows first, and local entries are dropped"""
+        backend = _backend()
+        local_cache = TieredCache([MemoryLRUCache(max_bytes=1000, max_item_bytes=1000)])
+        local_cache.set_json("doc:hash-stale", {"segment_urls": []})
+        service = CacheEvictionService(backend, budget_bytes=0, batch_size=2, local_cache=local_cache)
+
+        await service.run()
+
+        kinds = [kind for kind, _ in backend.delete_calls]
+        assert kinds == ["documents", "documents", "sentences", "sentences", "objects", "objects"]
+        assert all(len(batch) <= 2 for _, batch in backend.delete_calls)
+        assert backend.documents == {} and backend.sentences == {} and backend.objects == set()
+        assert local_cache.get("doc:hash-stale") is None
+
+    async def test_snapshot_backend(self, tmp_path):
+        """Test the stand-in backend loads a JSON snapshot"""
+        snapshot = tmp_path / "cache.json"
+        snapshot.write_text(json.dumps({
+            "documents": [_document("a", 10, 1, 1, ["s1"])],
+            "materials": [{"audio_cache_id": "a"}],
+        }))
+
+        backend = InMemoryEvictionBackend.from_snapshot(str(snapshot))
+        plan = await CacheEvictionService(backend, budget_bytes=0).plan(now=NOW)
+
+        assert plan["documents"] == [] and plan["pinned"] == 1
+
+    async def test_sqlite_backend(self, tmp_path):
+        """Test eviction maps the SQLite backend's own file URLs back to paths and deletes the files"""
+        from app.services.cache_backends import SqliteCacheBackend
+
+        backend = SqliteCacheBackend(str(tmp_path), "/api/tts-cache-files")
+        url = await backend.put_blob("cache/sentences/s1.mp3", b"audio", "audio/mp3")
+        await backend.insert_sentence({'sentence_hash': "s1", 'audio_url': url, 'created_at': NOW.isoformat()})
+        await backend.insert_document({
+            'text_hash': "doc", 'segment_urls': [url], 'durations': [1.0], 'sentences': ["S."],
+            'file_size_bytes': 5, 'access_count': 1, 'last_accessed_at': NOW.isoformat()
+        })
+
+        plan = await CacheEvictionService(backend, budget_bytes=0).run()
+
+        assert plan["objects"] == ["cache/sentences/s1.mp3"]
+        assert await backend.get_document("doc") is None
+        assert await backend.get_blob("cache/sentences/s1.mp3") is None
+
+    async def test_files_a_new_row_points_to_are_kept(self):
+        """Test files are deleted after the delay, except those a row registered meanwhile uses"""
+        backend = _backend()
+        service = CacheEvictionService(backend, budget_bytes=0, object_delay_seconds=300)
+
+        async def register_during_wait(seconds):
+            assert backend.documents == {}
+            # A generation that reused sentence s1 registers its document
+            backend.documents["new"] = _document("new", 10, 1, 0, ["s1"])
+
+        with patch("app.services.cache_eviction_service.asyncio.sleep", AsyncMock(side_effect=register_during_wait)) as sleep:
+            plan = await service.run()
+
+        sleep.assert_awaited_once_with(300)
+        assert "cache/sentences/s1.mp3" not in plan["objects"]
+        assert backend.objects == {"cache/sentences/s1.mp3"}
+
+    async def test_one_worker_evicts_per_interval(self):
+        """Test workers sharing a backend take turns through the eviction lease"""
+        backend = _backend()
+        workers = [CacheEvictionService(backend, budget_bytes=200) for _ in range(2)]
+        workers[1]._lease_owner = "other-host:1"
+
+        for worker in workers:
+            with patch(
+                "app.services.cache_eviction_service.asyncio.sleep",
+                AsyncMock(side_effect=[None, asyncio.CancelledError()])
+            ):
+                with pytest.raises(asyncio.CancelledError):
+                    await worker.run_periodically(3600)
+
+        assert [kind for kind, _ in backend.delete_calls].count("documents") == 1
@@ -0,0 +1,174 @@
+"""Tests for pre-warming the shared audio cache from materials"""
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.core.constants import PREWARM_LEASE_KEY
+from app.services.audio_cache_service import AudioCacheService
+from app.services.cache_backends import MemoryCacheBackend
+from app.services.cache_prewarm_service import CachePrewarmService
+from app.utils.local_cache import TieredCache
+from app.utils.token_bucket import TokenBucket
+
+
+def _material(material_id, day, sentences):
+    return {
+        "id": material_id,
+        "ocr_text": " ".join(sentences),
+        "sentences": sentences,
+        "created_at": f"2025-01-{day:02d}T00:00:00",
+        "audio_cache_id": None,
+    }
+
+
+def _materials():
+    return [
+        _material("m-old", 1, ["Old one."]),
+        _material("m-new", 3, ["New one.", "Second."]),
+        _material("m-mid", 2, ["Middle."]),
+        _material("m-empty", 2, []),
+    ]
+
+
+def _audio_cache(backend):
+    service = AudioCacheService()
+    service.backend = backend
+    service.local_cache = TieredCache([])
+    service.openai_service.synthesize_sentences_batched_async = AsyncMock(
+        side_effect=lambda sentences, voice, format: ([s.encode() for s in sentences], len(sentences))
+    )
+    return service
+
+
+def _prewarm(backend, tmp_path, audio_cache=None):
+    return CachePrewarmService(
+        audio_cache or _audio_cache(backend),
+        backend,
+        TokenBucket(rate=1_000_000, capacity=1_000_000),
+        batch_size=2,
+        checkpoint_path=str(tmp_path / "checkpoint.json")
+    )
+
+
+def _generated(audio_cache):
+    mock = audio_cache.openai_service.synthesize_sentences_batched_async
+    return [call.args[0] for call in mock.await_args_list]
+
+
+@pytest.fixture(autouse=True)
+def audio_duration():
+    with patch('app.services.audio_cache_service.get_audio_duration_us', return_value=500_000):
+        yield
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestCachePrewarmService:
+    """Test cases for CachePrewarmService"""
+
+    async def test_pass_generates_newest_first_and_links(self, tmp_path):
+        """Test every material gets audio, newest first, and is linked to its cache row"""
+        backend = MemoryCacheBackend(materials=_materials())
+        service = _prewarm(backend, tmp_path)
+
+        result = await service.run_pass()
+
+        assert result["complete"] is True
+        assert (result["generated"], result["skipped"], result["failed"]) == (3, 1, 0)
+        assert _generated(service.audio_cache) == [["New one.", "Second."], ["Middle."], ["Old one."]]
+        for row in backend.materials:
+            if row["sentences"]:
+                document = await backend.get_document(service.audio_cache.generate_cache_key(
+                    row["ocr_text"], row["sentences"], "nova", "mp3"
+                ))
+                assert row["audio_cache_id"] == document["id"]
+        assert not (tmp_path / "checkpoint.json").exists()
+        assert PREWARM_LEASE_KEY not in backend.leases
+
+    async def test_already_cached_is_linked_without_generation(self, tmp_path):
+        """Test a material whose audio exists is only linked (no TTS, no budget spent)"""
+        backend = MemoryCacheBackend(materials=[_material("m1", 1, ["Cached."])])
+        audio_cache = _audio_cache(backend)
+        await audio_cache.generate_or_get_cached("Cached.", ["Cached."], "nova", "mp3")
+        audio_cache.openai_service.synthesize_sentences_batched_async.reset_mock()
+        service = _prewarm(backend, tmp_path, audio_cache)
+
+        result = await service.run_pass()
+
+        assert result["already_cached"] == 1
+        assert service.characters == 0
+        assert _generated(audio_cache) == []
+        assert backend.materials[0]["audio_cache_id"] is not None
+
+    async def test_resumes_from_checkpoint(self, tmp_path):
+        """Test a restarted pass continues after the last material handled"""
+        backend = MemoryCacheBackend(materials=_materials())
+        first = _prewarm(backend, tmp_path)
+        result = await first.run_pass(limit=1)
+        assert result["complete"] is False
+        assert (await first.stats())["checkpoint"] == {"created_at": "2025-01-03T00:00:00", "id": "m-new"}
+
+        # Unlink the first material: a resumed pass must not go back to it
+        backend.materials[1]["audio_cache_id"] = None
+        second = _prewarm(backend, tmp_path)
+        await second.run_pass()
+
+        assert _generated(second.audio_cache) == [["Middle."], ["Old one."]]
+
+    async def test_failures_are_retried_next_pass(self, tmp_path):
+        """Test a failed material is counted, skipped, and retried on the next pass"""
+        backend = MemoryCacheBackend(materials=_materials())
+        service = _prewarm(backend, tmp_path)
+        synthesize = service.audio_cache.openai_service.synthesize_sentences_batched_async
+        fallback = synthesize.side_effect
+
+        def fail_middle(sentences, voice, format):
+            if sentences == ["Middle."]:
+                raise RuntimeError("TTS down")
+            return fallback(sentences, voice, format)
+
+        synthesize.side_effect = fail_middle
+        result = await service.run_pass()
+        assert (result["generated"], result["failed"]) == (2, 1)
+        assert await backend.count_unlinked_materials() == 2  # m-mid and the empty one
+
+        synthesize.side_effect = fallback
+        result = await service.run_pass()
+        assert result["generated"] == 1
+        assert await backend.count_unlinked_materials() == 1
+
+    async def test_skips_while_another_worker_prewarms(self, tmp_path):
+        """Test only the lease holder pre-warms, so the budget is shared by all workers"""
+        backend = MemoryCacheBackend(materials=_materials())
+        await backend.try_lease(PREWARM_LEASE_KEY, "other-worker", 60)
+        service = _prewarm(backend, tmp_path)
+
+        result = await service.run_pass()
+
+        assert result["leased"] is False
+        assert _generated(service.audio_cache) == []
+
+    async def test_budget_is_charged_per_character(self, tmp_path):
+        """Test generation waits on the budget for the material's characters"""
+        backend = MemoryCacheBackend(materials=[_material("m1", 1, ["Hello.", "World."])])
+        service = _prewarm(backend, tmp_path)
+        service.budget = AsyncMock(spec=TokenBucket)
+
+        await service.run_pass()
+
+        service.budget.acquire.assert_awaited_once_with(12)
+        assert service.characters == 12
+
+    async def test_stats(self, tmp_path):
+        """Test stats report the backlog and throughput"""
+        backend = MemoryCacheBackend(materials=_materials())
+        service = _prewarm(backend, tmp_path)
+        assert (await service.stats())["backlog"] == 4
+
+        await service.run_pass()
+        stats = await service.stats()
+
+        assert stats["backlog"] == 1
+        assert stats["generated"] == 3 and stats["passes_completed"] == 1
+        assert stats["running"] is False and stats["checkpoint"] is None
+        assert stats["materials_per_minute"] > 0 and stats["characters_per_minute"] > 0
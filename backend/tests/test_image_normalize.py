@@ -0,0 +1,113 @@
+"""Tests for image normalization before OCR"""
+import io
+
+import pytest
+from PIL import Image, ImageDraw
+
+from app.core.constants import ERROR_IMAGE_TOO_LARGE, ERROR_INVALID_IMAGE
+from app.core.errors import ImageProcessingError
+from app.utils.image_normalize import is_monochrome, normalize_image, strip_data_url
+
+
+MB = 1024 * 1024
+
+
+def _page(size, color=False, paper=(250, 246, 236)):
+    """A page of 'text' lines on tinted paper (with a red heading when color)"""
+    image = Image.new("RGB", size, paper)
+    draw = ImageDraw.Draw(image)
+    for y in range(size[1] // 10, size[1], size[1] // 20):
+        draw.rectangle([size[0] // 10, y, size[0] * 9 // 10, y + size[1] // 80], fill=(20, 20, 20))
+    if color:
+        draw.rectangle([0, 0, size[0], size[1] // 8], fill=(200, 30, 30))
+    return image
+
+
+def _encode(image, format="JPEG", **params):
+    buffer = io.BytesIO()
+    image.save(buffer, format=format, **params)
+    return buffer.getvalue()
+
+
+def _open(data):
+    return Image.open(io.BytesIO(data))
+
+
+@pytest.mark.unit
+class TestNormalizeImage:
+    """Test cases for normalize_image"""
+
+    def test_downscales_and_converts_monochrome_page(self):
+        """Test a large photo of a black-and-white page is shrunk to grayscale JPEG"""
+        data = _encode(_page((4000, 3000)), quality=95)
+
+        normalized, media_type = normalize_image(data, max_dimension=2000, quality=85, max_bytes=10 * MB)
+
+        image = _open(normalized)
+        assert media_type == "image/jpeg"
+        assert image.size == (2000, 1500)
+        assert image.mode == "L"
+        assert len(normalized) < len(data)
+
+    def test_keeps_color_pages_in_color(self):
+        """Test pages with coloured content stay RGB"""
+        data = _encode(_page((1200, 1600), color=True))
+
+        normalized, _ = normalize_image(data, max_dimension=800, quality=85, max_bytes=10 * MB)
+
+        image = _open(normalized)
+        assert image.size == (600, 800)
+        assert image.mode == "RGB"
+
+    def test_applies_exif_orientation(self):
+        """Test a sideways photo (EXIF orientation 6) is sent upright"""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        data = _encode(_page((400, 300)), exif=exif)
+
+        normalized, _ = normalize_image(data, max_dimension=2000, quality=85, max_bytes=10 * MB)
+
+        image = _open(normalized)
+        assert image.size == (300, 400)
+        assert image.getexif().get(0x0112, 1) == 1
+
+    def test_transparent_png_is_flattened_onto_white(self):
+        """Test transparency becomes white paper rather than black"""
+        image = Image.new("RGBA", (3000, 100), (0, 0, 0, 0))
+        data = _encode(image, format="PNG")
+
+        normalized, media_type = normalize_image(data, max_dimension=1000, quality=85, max_bytes=10 * MB)
+
+        assert media_type == "image/jpeg"
+        assert _open(normalized).convert("L").getextrema()[0] > 240
+
+    def test_small_image_passes_through_when_not_smaller(self):
+        """Test an image needing no changes is not re-encoded into something larger"""
+        data = _encode(Image.new("L", (20, 20), 255), format="PNG")
+
+        normalized, media_type = normalize_image(data, max_dimension=2000, quality=85, max_bytes=10 * MB)
+
+        assert normalized == data
+        assert media_type == "image/png"
+
+    def test_rejects_oversized_upload(self):
+        """Test uploads over the size limit are refused before decoding"""
+        with pytest.raises(ImageProcessingError) as excinfo:
+            normalize_image(b"\x00" * (MB + 1), max_dimension=2000, quality=85, max_bytes=MB)
+        assert excinfo.value.error_code == ERROR_IMAGE_TOO_LARGE
+
+    def test_rejects_invalid_image(self):
+        """Test bytes that are not an image are refused"""
+        with pytest.raises(ImageProcessingError) as excinfo:
+            normalize_image(b"not an image", max_dimension=2000, quality=85, max_bytes=MB)
+        assert excinfo.value.error_code == ERROR_INVALID_IMAGE
+
+    def test_is_monochrome(self):
+        """Test tinted paper with JPEG noise counts as grey, a coloured heading does not"""
+        assert is_monochrome(_open(_encode(_page((600, 800)), quality=60))) is True
+        assert is_monochrome(_page((600, 800), color=True)) is False
+
+    def test_strip_data_url(self):
+        """Test the data URL prefix is removed and plain base64 is kept"""
+        assert strip_data_url("data:image/png;base64,ABC123DEF456") == "ABC123DEF456"
+        assert strip_data_url("ABC123DEF456") == "ABC123DEF456"
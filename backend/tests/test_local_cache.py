@@ -0,0 +1,239 @@
+"""Tests for the process-local cache tiers"""
+import errno
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.utils.local_cache import CacheTier, DiskCache, MemoryLRUCache, TieredCache
+
+
+class _BrokenTier(MemoryLRUCache):
+    """Tier on a full or read-only disk"""
+
+    name = "broken"
+
+    def _get(self, key):
+        raise PermissionError("permission denied")
+
+    def _set(self, key, value):
+        raise OSError(28, "No space left on device")
+
+    def try_lease(self, key, ttl_seconds):
+        raise PermissionError("permission denied")
+
+
+@pytest.mark.unit
+class TestMemoryLRUCache:
+    """Test cases for MemoryLRUCache"""
+
+    def test_evicts_least_recently_used(self):
+        """Test the byte budget evicts the least recently used entry"""
+        cache = MemoryLRUCache(max_bytes=10, max_item_bytes=10)
+        cache.set("a", b"aaaa")
+        cache.set("b", b"bbbb")
+        assert cache.get("a") == b"aaaa"  # "b" is now least recently used
+
+        cache.set("c", b"cccc")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == b"aaaa"
+        assert cache.bytes == 8
+        assert cache.stats() == {"hits": 2, "misses": 1, "items": 2, "bytes": 8}
+
+    def test_skips_large_items(self):
+        """Test values over max_item_bytes are left to the next tier"""
+        cache = MemoryLRUCache(max_bytes=100, max_item_bytes=4)
+        cache.set("big", b"12345")
+        assert cache.get("big") is None
+        assert cache.bytes == 0
+
+    def test_overwrite_updates_size(self):
+        """Test replacing a value accounts for the new size only"""
+        cache = MemoryLRUCache(max_bytes=100, max_item_bytes=100)
+        cache.set("a", b"1234")
+        cache.set("a", b"12")
+        assert cache.bytes == 2
+
+
+@pytest.mark.unit
+class TestDiskCache:
+    """Test cases for DiskCache"""
+
+    def test_round_trip_and_delete(self, tmp_path):
+        """Test values survive a reload of the index and can be deleted"""
+        cache = DiskCache(str(tmp_path), max_bytes=1000)
+        cache.set("sentence:abc", b"audio")
+
+        reloaded = DiskCache(str(tmp_path), max_bytes=1000)
+        assert reloaded.get("sentence:abc") == b"audio"
+        assert reloaded.bytes == 5
+
+        reloaded.delete("sentence:abc")
+        assert reloaded.get("sentence:abc") is None
+        assert reloaded.bytes == 0
+
+    def test_evicts_oldest_over_budget(self, tmp_path):
+        """Test the byte budget removes least recently used files"""
+        cache = DiskCache(str(tmp_path), max_bytes=10)
+        cache.set("a", b"aaaa")
+        cache.set("b", b"bbbb")
+        cache.get("a")
+        cache.set("c", b"cccc")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == b"aaaa"
+        assert cache.get("c") == b"cccc"
+        files = [name for _, _, names in os.walk(tmp_path) for name in names]
+        assert len(files) == 2
+
+    def test_reload_orders_by_access_time(self, tmp_path):
+        """Test the rebuilt index evicts files not accessed for the longest time"""
+        cache = DiskCache(str(tmp_path), max_bytes=100)
+        cache.set("old", b"1111")
+        cache.set("new", b"2222")
+        old_path = cache._path("old")
+        past = time.time() - 60
+        os.utime(old_path, (past, past))
+
+        smaller = DiskCache(str(tmp_path), max_bytes=4)
+
+        assert smaller.get("old") is None
+        assert smaller.get("new") == b"2222"
+        assert not os.path.exists(old_path)
+
+    def test_removes_stale_temp_files(self, tmp_path):
+        """Test old temp files from interrupted writes are cleaned up on load, recent ones are left alone"""
+        stale = tmp_path / "ab" / "deadbeef.1.2.tmp"
+        stale.parent.mkdir()
+        stale.write_bytes(b"partial")
+        old = time.time() - DiskCache.STALE_TEMP_SECONDS - 60
+        os.utime(stale, (old, old))
+        # Another worker's write in progress
+        in_progress = tmp_path / "ab" / "cafebabe.3.4.tmp"
+        in_progress.write_bytes(b"writing")
+
+        cache = DiskCache(str(tmp_path), max_bytes=100)
+
+        assert not stale.exists()
+        assert in_progress.exists()
+        assert cache.bytes == 0
+
+    def test_failed_write_removes_temp_file(self, tmp_path):
+        """Test a write that fails (e.g. disk full) raises and leaves no temp file behind"""
+        cache = DiskCache(str(tmp_path), max_bytes=100)
+
+        with patch("app.utils.local_cache.os.replace", side_effect=OSError(errno.ENOSPC, "No space left on device")):
+            with pytest.raises(OSError):
+                cache.set("k", b"value")
+
+        assert list(tmp_path.rglob("*.tmp")) == []
+        assert cache.get("k") is None
+        assert cache.bytes == 0
+
+    def test_reads_files_written_by_another_instance(self, tmp_path):
+        """Test a worker sharing the directory sees the other's writes"""
+        first = DiskCache(str(tmp_path), max_bytes=100)
+        second = DiskCache(str(tmp_path), max_bytes=100)
+
+        first.set("k", b"value")
+
+        assert second.get("k") == b"value"
+        assert second.bytes == 5
+
+    def test_lease_is_exclusive_until_released(self, tmp_path):
+        """Test only one instance holds a lease at a time"""
+        first = DiskCache(str(tmp_path), max_bytes=100)
+        second = DiskCache(str(tmp_path), max_bytes=100)
+
+        assert first.try_lease("doc:1", ttl_seconds=60)
+        assert not second.try_lease("doc:1", ttl_seconds=60)
+        assert second.try_lease("doc:2", ttl_seconds=60)
+
+        first.release_lease("doc:1")
+        assert second.try_lease("doc:1", ttl_seconds=60)
+        # Lease files are not cache entries
+        assert DiskCache(str(tmp_path), max_bytes=100).bytes == 0
+
+    def test_expired_lease_is_taken_over(self, tmp_path):
+        """Test a lease left by a crashed holder expires"""
+        cache = DiskCache(str(tmp_path), max_bytes=100)
+        assert cache.try_lease("doc:1", ttl_seconds=60)
+
+        old = time.time() - 120
+        os.utime(cache._lease_path("doc:1"), (old, old))
+
+        assert cache.try_lease("doc:1", ttl_seconds=60)
+
+
+@pytest.mark.unit
+class TestTieredCache:
+    """Test cases for TieredCache"""
+
+    def test_promotes_hits_to_faster_tiers(self, tmp_path):
+        """Test a disk hit is copied into memory and counted per tier"""
+        memory = MemoryLRUCache(max_bytes=100, max_item_bytes=100)
+        disk = DiskCache(str(tmp_path), max_bytes=100)
+        disk.set("k", b"value")
+        cache = TieredCache([memory, disk])
+
+        assert cache.get("k") == b"value"
+        assert cache.get("k") == b"value"
+
+        stats = cache.stats()
+        assert stats["memory"]["hits"] == 1 and stats["memory"]["misses"] == 1
+        assert stats["disk"]["hits"] == 1
+
+    def test_json_helpers(self):
+        """Test JSON values round-trip (including non-ASCII text)"""
+        cache = TieredCache([MemoryLRUCache(max_bytes=1000, max_item_bytes=1000)])
+        cache.set_json("doc:1", {"sentences": ["こんにちは。"], "total_duration": 1.5})
+        assert cache.get_json("doc:1") == {"sentences": ["こんにちは。"], "total_duration": 1.5}
+        assert cache.get_json("doc:2") is None
+
+    def test_incomplete_tier_fails_at_construction(self):
+        """Test a tier missing _get/_set/_delete can't be built"""
+        class GetOnly(CacheTier):
+            def _get(self, key):
+                return None
+
+        with pytest.raises(TypeError, match="_delete"):
+            GetOnly()
+
+    def test_no_tiers(self):
+        """Test an empty hierarchy always misses"""
+        cache = TieredCache([])
+        cache.set("k", b"v")
+        assert cache.get("k") is None
+        assert cache.stats() == {}
+        assert cache.try_lease("k", ttl_seconds=60)
+
+    def test_lease_needs_every_tier(self, tmp_path):
+        """Test a refused lease releases the tiers that granted it"""
+        memory = MemoryLRUCache(max_bytes=100, max_item_bytes=100)
+        holder = DiskCache(str(tmp_path), max_bytes=100)
+        assert holder.try_lease("k", ttl_seconds=60)
+
+        cache = TieredCache([memory, DiskCache(str(tmp_path), max_bytes=100)])
+        assert not cache.try_lease("k", ttl_seconds=60)
+
+        holder.release_lease("k")
+        assert cache.try_lease("k", ttl_seconds=60)
+
+    def test_failing_tier_is_skipped(self):
+        """Test OS errors in one tier are logged and the other tiers still serve"""
+        memory = MemoryLRUCache(max_bytes=100, max_item_bytes=100)
+        cache = TieredCache([_BrokenTier(max_bytes=100, max_item_bytes=100), memory])
+
+        cache.set_json("k", {"v": 1})
+
+        assert cache.get_json("k") == {"v": 1}
+        assert memory.hits == 1
+        assert cache.try_lease("k", ttl_seconds=60)
+
+    def test_unreadable_json_is_a_miss(self):
+        """Test a corrupt entry reads as a miss"""
+        cache = TieredCache([MemoryLRUCache(max_bytes=100, max_item_bytes=100)])
+        cache.set("k", b"{not json")
+        assert cache.get_json("k") is None
@@ -1,6 +1,8 @@
 """Tests for OCR API endpoint"""
+import base64
+
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, AsyncMock, MagicMock
 from fastapi.testclient import TestClient
 
 from app.core.constants import ERROR_OCR_FAILED, ERROR_INTERNAL
@@ -218,20 +220,27 @@ class TestOCRRateLimit:
             assert "X-RateLimit-Limit" in response.headers or response.status_code == 200
 
 
+def _pages(count):
+    """Distinct page images (their content is only hashed: Gemini is mocked)"""
+    return [base64.b64encode(f"Page {i}".encode()).decode() for i in range(1, count + 1)]
+
+
+async def _extract_page(image_data, exclude_annotations=True, language="en"):
+    """Per-page Gemini OCR stand-in: the text is the decoded page name plus "text"."""
+    text = f"{base64.b64decode(image_data).decode()} text"
+    return text, [text], "high", 0.1
+
+
 @pytest.mark.unit
 class TestOCRMultipleImages:
     """Test cases for multiple images OCR"""
 
-    def test_ocr_multiple_images_success(self, client, sample_base64_image):
+    def test_ocr_multiple_images_success(self, client):
         """Test successful OCR with multiple images"""
-        with patch('app.api.routes.ocr.gemini_service') as mock_service:
-            mock_service.extract_text_from_multiple_images.return_value = (
-                "Page 1 text\n\nPage 2 text\n\nPage 3 text",
-                "high",
-                5.67
-            )
+        images = _pages(3)
+        with patch('app.api.routes.ocr.ocr_cache_service.gemini.extract_text_async', new_callable=AsyncMock) as mock_extract:
+            mock_extract.side_effect = _extract_page
 
-            images = [sample_base64_image, sample_base64_image, sample_base64_image]
             response = client.post(
                 "/api/ocr",
                 json={
@@ -246,31 +255,26 @@ class TestOCRMultipleImages:
             assert response.status_code == 200
             data = response.json()
             assert data["text"] == "Page 1 text\n\nPage 2 text\n\nPage 3 text"
+            assert data["sentences"] == ["Page 1 text", "Page 2 text", "Page 3 text"]
             assert data["confidence"] == "high"
-            assert data["processing_time"] == 5.67
+            assert data["processing_time"] >= 0
             assert data["page_count"] == 3
+            assert data["from_cache"] is False and data["cached_pages"] == 0
 
-            # Verify the service was called correctly
-            mock_service.extract_text_from_multiple_images.assert_called_once_with(
-                images_data=images,
-                exclude_annotations=True,
-                language="en",
-                page_separator="\n\n"
-            )
+            # Verify each page was sent to Gemini once (concurrently, in any order) with the request options
+            calls = mock_extract.await_args_list
+            assert sorted(call.kwargs["image_data"] for call in calls) == images
+            assert all(call.kwargs["exclude_annotations"] is True and call.kwargs["language"] == "en" for call in calls)
 
-    def test_ocr_multiple_images_custom_separator(self, client, sample_base64_image):
+    def test_ocr_multiple_images_custom_separator(self, client):
         """Test OCR with multiple images and custom separator"""
-        with patch('app.api.routes.ocr.gemini_service') as mock_service:
-            mock_service.extract_text_from_multiple_images.return_value = (
-                "Page 1 text --- Page 2 text",
-                "high",
-                3.5
-            )
+        with patch('app.api.routes.ocr.ocr_cache_service.gemini.extract_text_async', new_callable=AsyncMock) as mock_extract:
+            mock_extract.side_effect = _extract_page
 
             response = client.post(
                 "/api/ocr",
                 json={
-                    "images": [sample_base64_image, sample_base64_image],
+                    "images": _pages(2),
                     "options": {
                         "page_separator": " --- "
                     }
@@ -281,9 +285,8 @@ class TestOCRMultipleImages:
             data = response.json()
             assert data["page_count"] == 2
 
-            # Verify custom separator was passed
-            call_kwargs = mock_service.extract_text_from_multiple_images.call_args[1]
-            assert call_kwargs["page_separator"] == " --- "
+            # Verify custom separator was used to join the pages
+            assert data["text"] == "Page 1 text --- Page 2 text"
 
     def test_ocr_too_many_images(self, client, sample_base64_image):
         """Test OCR with more than 10 images (should fail validation)"""
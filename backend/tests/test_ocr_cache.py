@@ -0,0 +1,148 @@
+"""Tests for the OCR result cache"""
+import asyncio
+import base64
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services.cache_backends import MemoryCacheBackend, SqliteCacheBackend
+from app.services.gemini_service import GeminiService
+from app.services.ocr_cache_service import OCRCacheService
+from app.utils.image_normalize import strip_data_url
+from app.utils.local_cache import MemoryLRUCache, TieredCache
+
+
+PAGE_A = base64.b64encode(b"page-a").decode()
+PAGE_B = base64.b64encode(b"page-b").decode()
+
+
+def _gemini(confidence="high", delay=0.0):
+    """GeminiService whose per-page OCR returns the decoded image bytes as the text"""
+    gemini = GeminiService()
+
+    async def extract_text_async(image_data, exclude_annotations=True, language="en"):
+        await asyncio.sleep(delay)
+        text = base64.b64decode(strip_data_url(image_data)).decode()
+        return text, [text], confidence, 0.1
+
+    gemini.extract_text_async = AsyncMock(side_effect=extract_text_async)
+    return gemini
+
+
+def _service(gemini, backend=None):
+    return OCRCacheService(gemini, backend, TieredCache([MemoryLRUCache(1024 * 1024, 64 * 1024)]))
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestOCRCacheService:
+    """Test cases for OCRCacheService"""
+
+    async def test_second_request_is_cached(self):
+        """Test the same image (also as a data URL) is only sent to Gemini once"""
+        gemini = _gemini()
+        service = _service(gemini)
+
+        first = await service.extract_text(PAGE_A)
+        second = await service.extract_text(f"data:image/jpeg;base64,{PAGE_A}")
+
+        assert first[:3] == second[:3] == ("page-a", ["page-a"], "high")
+        assert first[4] is False and second[4] is True
+        assert gemini.extract_text_async.await_count == 1
+
+    async def test_key_includes_options(self):
+        """Test a different image, language or annotation option is a different entry"""
+        service = _service(_gemini())
+        key = service.cache_key(PAGE_A, True, "en")
+
+        assert service.cache_key(PAGE_A, True, "en") == key
+        assert service.cache_key(PAGE_B, True, "en") != key
+        assert service.cache_key(PAGE_A, False, "en") != key
+        assert service.cache_key(PAGE_A, True, "ja") != key
+        with patch('app.services.ocr_cache_service.OCR_PROMPT_VERSION', 99):
+            assert service.cache_key(PAGE_A, True, "en") != key
+        assert service.cache_key("not base64!", True, "en") is None
+
+    async def test_multiple_images_cache_each_page(self):
+        """Test pages seen before are reused inside a new multi-page request"""
+        gemini = _gemini()
+        service = _service(gemini)
+        await service.extract_text(PAGE_A)
+
+        text, sentences, confidence, _, cached_pages = await service.extract_text_from_multiple_images(
+            [PAGE_A, PAGE_B, PAGE_A]
+        )
+
+        assert text == "page-a\n\npage-b\n\npage-a"
+        assert sentences == ["page-a", "page-b", "page-a"]
+        assert confidence == "high"
+        assert cached_pages == 2
+        assert gemini.extract_text_async.await_count == 2
+
+    async def test_concurrent_identical_requests_coalesce(self):
+        """Test identical pages in flight at the same time make one Gemini call"""
+        gemini = _gemini(delay=0.05)
+        service = _service(gemini)
+
+        results = await asyncio.gather(*(service.extract_text(PAGE_A) for _ in range(5)))
+
+        assert gemini.extract_text_async.await_count == 1
+        assert {result[0] for result in results} == {"page-a"}
+        assert sum(result[4] for result in results) == 4
+        assert service.stats()["coalesced"] == 4
+
+    async def test_shared_hit_fills_local_tiers(self, tmp_path):
+        """Test a result stored by another worker is served and copied locally"""
+        backend = SqliteCacheBackend(str(tmp_path), "/api/tts-cache-files")
+        await _service(_gemini(), backend).extract_text(PAGE_A)
+
+        gemini = _gemini()
+        service = _service(gemini, backend)
+        assert (await service.extract_text(PAGE_A))[4] is True
+        await service.extract_text(PAGE_A)
+
+        assert gemini.extract_text_async.await_count == 0
+        stats = service.stats()
+        assert stats["memory"]["hits"] == 1
+        assert stats["sqlite"] == {"hits": 1, "misses": 0}
+
+    async def test_fallback_results_not_cached(self):
+        """Test the plain-text fallback for non-JSON responses is not cached"""
+        gemini = _gemini(confidence="medium")
+        backend = MemoryCacheBackend()
+        service = _service(gemini, backend)
+
+        await service.extract_text(PAGE_A)
+        assert (await service.extract_text(PAGE_A))[4] is False
+        assert gemini.extract_text_async.await_count == 2
+        assert backend.ocr_results == {}
+
+    async def test_near_duplicate_retake_reuses_result(self, text_page, page_photo):
+        """Test a retake of an OCR'd page reuses its result (then cached under its own key), and a different page does not"""
+        gemini = GeminiService()
+        gemini.extract_text_async = AsyncMock(side_effect=[
+            ("Page one.", ["Page one."], "high", 0.1),
+            ("Page two.", ["Page two."], "high", 0.1),
+        ])
+        service = OCRCacheService(
+            gemini, local_cache=TieredCache([MemoryLRUCache(1024 * 1024, 64 * 1024)]), near_duplicate_threshold=0.2
+        )
+        page = text_page(1)
+        photo, retake = (
+            base64.b64encode(page_photo(page)).decode(),
+            base64.b64encode(page_photo(page, angle=1.5, offset=(80, 200), scale=1.05)).decode()
+        )
+
+        assert (await service.extract_text(photo))[4] is False
+        reused = await service.extract_text(retake)
+        with patch.object(service, "page_hash", wraps=service.page_hash) as page_hash:
+            reuploaded = await service.extract_text(retake)
+        other = await service.extract_text(base64.b64encode(page_photo(text_page(2))).decode())
+
+        assert reused[1] == ["Page one."] and reused[4] is True
+        # The retake was stored under its own key: a re-upload is an exact hit
+        assert reuploaded[1] == ["Page one."] and reuploaded[4] is True
+        page_hash.assert_not_called()
+        assert other[1] == ["Page two."] and other[4] is False
+        assert gemini.extract_text_async.await_count == 2
+        assert service.stats()["near_duplicates"] == {"hits": 1, "indexed_pages": 3}
@@ -0,0 +1,103 @@
+"""Tests for text-region cropping and deskew of page photos"""
+import io
+import time
+
+import pytest
+from PIL import Image, ImageDraw, ImageFilter, ImageFont, ImageOps
+
+from app.utils.image_normalize import normalize_image
+from app.utils.page_crop import crop_page, deskew_page, estimate_skew, find_text_region
+
+
+DESK = (120, 85, 50)
+WORDS = ["the", "quick", "brown", "fox", "jumps", "over", "lazy", "dog", "sentence"]
+
+
+PAGE_OFFSET = (300, 75)
+
+
+def _page(size=(1400, 1350), lines=12):
+    """Paper with lines of text in its middle"""
+    page = Image.new("RGB", size, (245, 242, 232))
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default(size=28)
+    step = int(size[1] * 0.65 / lines)
+    for n, y in enumerate(range(int(size[1] * 0.15), int(size[1] * 0.8), step)):
+        words = " ".join(WORDS[(n + i) % len(WORDS)] for i in range(11))
+        draw.text((int(size[0] * 0.15), y), words, fill=(25, 25, 25), font=font)
+    return page
+
+
+def _text_box(image):
+    """Bounding box of the dark pixels"""
+    return ImageOps.invert(image.convert("L")).point(lambda v: 255 if v > 100 else 0).getbbox()
+
+
+def _photo(angle=0.0, finger=True):
+    """The page on a desk, optionally rotated, with a finger at the bottom edge"""
+    photo = Image.new("RGB", (2000, 1500), DESK)
+    page = _page()
+    if angle:
+        page = page.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=DESK)
+    photo.paste(page, PAGE_OFFSET)
+    if finger:
+        ImageDraw.Draw(photo).ellipse([400, 1280, 600, 1700], fill=(220, 170, 140))
+    return photo.filter(ImageFilter.GaussianBlur(1))
+
+
+@pytest.mark.unit
+class TestPageCrop:
+    """Test cases for crop_page and deskew_page"""
+
+    def test_crops_to_text(self):
+        """Test desk, finger and blank margins are removed but the text is kept"""
+        photo = _photo()
+
+        start = time.perf_counter()
+        cropped, box = crop_page(photo)
+        elapsed = time.perf_counter() - start
+
+        text = _text_box(_page())
+        text = (text[0] + PAGE_OFFSET[0], text[1] + PAGE_OFFSET[1], text[2] + PAGE_OFFSET[0], text[3] + PAGE_OFFSET[1])
+        # Contains the text, with at most about padding + one block around it
+        assert all(0 <= text[i] - box[i] <= 100 for i in (0, 1))
+        assert all(0 <= box[i] - text[i] <= 100 for i in (2, 3))
+        assert cropped.size == (box[2] - box[0], box[3] - box[1])
+        assert cropped.width * cropped.height < 0.45 * photo.width * photo.height
+        assert elapsed < 0.5  # Tens of milliseconds in practice; generous for slow CI
+
+    def test_no_text_is_not_cropped(self):
+        """Test blank pages and small savings leave the image alone"""
+        blank = Image.new("RGB", (1200, 900), (250, 250, 250))
+        assert find_text_region(blank) is None
+        assert crop_page(blank) == (blank, None)
+
+        full = _page().crop((180, 180, 1060, 1140))  # Text almost to the edges
+        assert crop_page(full) == (full, None)
+
+    def test_deskew(self):
+        """Test small rotations of the text are measured and undone"""
+        cropped, _ = crop_page(_photo(angle=3))
+        assert estimate_skew(cropped) == pytest.approx(-3, abs=0.5)
+
+        straightened, angle = deskew_page(cropped)
+        assert angle == pytest.approx(-3, abs=0.5)
+        assert abs(estimate_skew(straightened)) < 0.5
+
+        level, _ = crop_page(_photo())
+        assert deskew_page(level) == (level, 0.0)
+
+    def test_normalize_crops_before_grayscale(self):
+        """Test the brown desk doesn't keep a black-and-white page in colour once cropped"""
+        buffer = io.BytesIO()
+        _photo().save(buffer, format="JPEG", quality=90)
+        data = buffer.getvalue()
+
+        uncropped, _ = normalize_image(data, max_dimension=2000, quality=85, max_bytes=10 * 1024 * 1024)
+        cropped, _ = normalize_image(data, max_dimension=2000, quality=85, max_bytes=10 * 1024 * 1024, crop=True)
+
+        assert Image.open(io.BytesIO(uncropped)).mode == "RGB"
+        image = Image.open(io.BytesIO(cropped))
+        assert image.mode == "L"
+        assert image.width * image.height < 0.45 * 2000 * 1500
+        assert len(cropped) < 0.75 * len(uncropped)
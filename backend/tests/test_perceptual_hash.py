@@ -0,0 +1,35 @@
+"""Tests for the perceptual page hash"""
+import pytest
+
+from app.utils.perceptual_hash import hamming_distance, hash_bits, image_page_hash, page_hash
+
+
+@pytest.mark.unit
+class TestPageHash:
+    """Test cases for page_hash and image_page_hash"""
+
+    def test_retake_is_near(self, text_page, page_photo):
+        """Test a reframed, zoomed, rotated and blurred retake stays within the default threshold"""
+        page = text_page(1)
+        first = image_page_hash(page_photo(page))
+        retake = image_page_hash(page_photo(page, angle=2.0, offset=(60, 240), scale=1.1, blur=1.8))
+
+        assert hamming_distance(first, retake) <= 0.2 * hash_bits(16)
+
+    def test_different_pages_are_far(self, text_page, page_photo):
+        """Test pages with the same layout but different text are well apart"""
+        first = image_page_hash(page_photo(text_page(1)))
+        other = image_page_hash(page_photo(text_page(2)))
+
+        assert hamming_distance(first, other) > 0.25 * hash_bits(16)
+
+    def test_hash_size(self, text_page):
+        """Test the hash has 2 * hash_size ** 2 bits"""
+        page = text_page(1)
+        assert hash_bits(8) == 128
+        assert page_hash(page, hash_size=8) < 2 ** 128
+        assert page_hash(page) == page_hash(page)
+
+    def test_unreadable_bytes(self):
+        """Test bytes that are not an image give no hash"""
+        assert image_page_hash(b"not an image") is None
@@ -0,0 +1,82 @@
+"""Tests for short-sentence batching and silence-based splitting"""
+import array
+import math
+
+import pytest
+
+from app.core.constants import TTS_SAMPLE_RATE
+from app.utils.sentence_batching import plan_sentence_batches, batch_input, split_batch_pcm
+
+
+def _tone(ms: int) -> bytes:
+    frames = TTS_SAMPLE_RATE * ms // 1000
+    return array.array("h", (
+        int(8000 * math.sin(2 * math.pi * 220 * i / TTS_SAMPLE_RATE)) for i in range(frames)
+    )).tobytes()
+
+
+def _silence(ms: int) -> bytes:
+    return bytes(2 * TTS_SAMPLE_RATE * ms // 1000)
+
+
+def _seconds(frame_ranges):
+    return [(start / TTS_SAMPLE_RATE, end / TTS_SAMPLE_RATE) for start, end in frame_ranges]
+
+
+@pytest.mark.unit
+class TestPlanSentenceBatches:
+    """Test cases for plan_sentence_batches"""
+
+    def test_groups_consecutive_short_sentences(self):
+        """Test runs of short sentences are grouped and long ones stay alone"""
+        sentences = ["Hi.", "Hello.", "This sentence is clearly too long to batch.", "Yes.", "No.", "OK."]
+        assert plan_sentence_batches(sentences, 20, 6) == [[0, 1], [2], [3, 4, 5]]
+
+    def test_respects_max_sentences(self):
+        """Test long runs are split into batches of at most max_sentences"""
+        assert plan_sentence_batches(["A."] * 5, 20, 2) == [[0, 1], [2, 3], [4]]
+
+    def test_batch_input_joins_sentences(self):
+        """Test the upstream text is the sentences joined by spaces"""
+        assert batch_input([" Hi. ", "How are you?"]) == "Hi. How are you?"
+
+
+@pytest.mark.unit
+class TestSplitBatchPCM:
+    """Test cases for split_batch_pcm"""
+
+    SENTENCES = ["Hi.", "How are you?", "Fine, thanks.", "Good."]
+
+    def test_splits_at_sentence_pauses(self):
+        """Test clips are cut inside the pauses and short pauses are ignored"""
+        # "Fine, thanks." contains a short comma pause that must not become a boundary
+        pcm = (
+            _silence(30) + _tone(400) + _silence(300) + _tone(900) + _silence(300)
+            + _tone(500) + _silence(80) + _tone(500) + _silence(300) + _tone(450)
+        )
+
+        ranges = _seconds(split_batch_pcm(pcm, self.SENTENCES))
+
+        assert len(ranges) == 4
+        assert ranges[0][0] == 0
+        assert ranges[0][1] == pytest.approx(0.48, abs=0.02)
+        assert ranges[1][0] == pytest.approx(0.68, abs=0.02)
+        assert ranges[2][1] == pytest.approx(3.06, abs=0.02)
+        assert ranges[3][0] == pytest.approx(3.26, abs=0.02)
+        assert split_batch_pcm(pcm, self.SENTENCES)[-1][1] == len(pcm) // 2
+
+    def test_too_few_pauses(self):
+        """Test a batch without enough pauses is rejected"""
+        pcm = _tone(800) + _silence(300) + _tone(1500)
+        assert split_batch_pcm(pcm, self.SENTENCES) is None
+
+    def test_implausible_clip_lengths(self):
+        """Test a split far from the expected sentence lengths is rejected"""
+        # The only pause is at the very start: the short first sentence would be 5s long
+        pcm = _tone(100) + _silence(300) + _tone(5000)
+        assert split_batch_pcm(pcm, ["A very long sentence that takes ages to say.", "Ok."]) is None
+
+    def test_silent_audio(self):
+        """Test silent or empty audio is rejected"""
+        assert split_batch_pcm(_silence(1000), self.SENTENCES) is None
+        assert split_batch_pcm(b"", self.SENTENCES) is None
@@ -1,9 +1,10 @@
-"""Tests for service layer (Claude and OpenAI services)"""
+"""Tests for service layer (Claude, Gemini and OpenAI services)"""
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import base64
 
 from app.services.claude_service import ClaudeService
+from app.services.gemini_service import GeminiService
 from app.services.openai_service import OpenAIService
 from app.core.errors import OCRError, TTSGenerationError
 from app.core.constants import (
@@ -175,6 +176,129 @@ class TestClaudeService:
             assert "API Error" in str(exc_info.value)
 
 
+@pytest.mark.unit
+class TestGeminiService:
+    """Test cases for Gemini multi-page OCR"""
+
+    @staticmethod
+    def _page_response(image_data):
+        """Fake Gemini response echoing the page name ("fail" pages raise)"""
+        if image_data == "fail":
+            raise RuntimeError("quota exceeded")
+        return MagicMock(text=f'{{"sentences": ["{image_data} one.", "{image_data} two."]}}')
+
+    def test_multiple_images_parallel_in_order(self):
+        """Test pages run concurrently up to the cap, keep page order and isolate failures"""
+        import threading
+        import time
+
+        service = GeminiService()
+        lock = threading.Lock()
+        in_flight = [0, 0]  # current, max
+
+        def fake_generate(contents):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight[1], in_flight[0])
+            time.sleep(0.02)
+            with lock:
+                in_flight[0] -= 1
+            return self._page_response(contents[0]['data'].decode())
+
+        pages = ["p1", "fail", "p3", "p4", "p5"]
+        with patch.object(service, 'model') as mock_model, \
+                patch.object(service, '_build_contents', side_effect=lambda image, *_: [{'data': image.encode()}]), \
+                patch('app.services.gemini_service.settings') as mock_settings:
+            mock_settings.ocr_page_concurrency = 3
+            mock_model.generate_content.side_effect = fake_generate
+            text, sentences, confidence, _ = service.extract_text_from_multiple_images(pages)
+
+        assert 1 < in_flight[1] <= 3
+        assert sentences[:2] == ["p1 one.", "p1 two."]
+        assert sentences[2].startswith("[Error processing page 2: Gemini OCR failed: quota exceeded")
+        assert sentences[3:] == [f"{page} {n}." for page in ["p3", "p4", "p5"] for n in ["one", "two"]]
+        assert text.split("\n\n")[0] == "p1 one. p1 two."
+        assert confidence == "high"
+
+    async def test_multiple_images_async_parallel_in_order(self):
+        """Test the async variant bounds in-flight pages and keeps page order"""
+        import asyncio
+
+        service = GeminiService()
+        in_flight = [0, 0]  # current, max
+        delays = {"p1": 0.05, "p2": 0.0, "p3": 0.02}
+
+        async def fake_generate(contents):
+            page = contents[0]['data'].decode()
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight[1], in_flight[0])
+            await asyncio.sleep(delays.get(page, 0.01))
+            in_flight[0] -= 1
+            return self._page_response(page)
+
+        pages = ["p1", "p2", "p3", "fail"]
+        with patch.object(service, 'model') as mock_model, \
+                patch.object(service, '_build_contents', side_effect=lambda image, *_: [{'data': image.encode()}]), \
+                patch('app.services.gemini_service.settings') as mock_settings:
+            mock_settings.ocr_page_concurrency = 2
+            mock_model.generate_content_async = AsyncMock(side_effect=fake_generate)
+            text, sentences, confidence, _ = await service.extract_text_from_multiple_images_async(
+                pages, page_separator=" | "
+            )
+
+        assert in_flight[1] == 2
+        assert sentences[:6] == [f"{page} {n}." for page in ["p1", "p2", "p3"] for n in ["one", "two"]]
+        assert sentences[6].startswith("[Error processing page 4:")
+        assert text.split(" | ")[:3] == ["p1 one. p1 two.", "p2 one. p2 two.", "p3 one. p3 two."]
+        assert confidence == "high"
+
+    def test_build_contents_normalizes_image(self):
+        """Test the uploaded image is downscaled and re-encoded before it is sent"""
+        import io
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (3000, 1000), (255, 255, 255)).save(buffer, format="PNG")
+        data_url = "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+        service = GeminiService()
+        image_part, prompt = service._build_contents(data_url, True, "en")
+
+        assert image_part['mime_type'] == "image/jpeg"
+        assert Image.open(io.BytesIO(image_part['data'])).size == (2000, 667)
+        assert "JSON" in prompt
+
+    async def test_multiple_images_invalid_page_isolated(self):
+        """Test an unreadable page becomes an error entry instead of failing the request"""
+        import io
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new("L", (10, 10), 255).save(buffer, format="PNG")
+        valid = base64.b64encode(buffer.getvalue()).decode()
+        invalid = base64.b64encode(b"not an image").decode()
+
+        service = GeminiService()
+        with patch.object(service, 'model') as mock_model:
+            mock_model.generate_content_async = AsyncMock(return_value=MagicMock(text='{"sentences": ["Hi."]}'))
+            _, sentences, confidence, _ = await service.extract_text_from_multiple_images_async([invalid, valid])
+
+        assert sentences[0].startswith("[Error processing page 1: Invalid image")
+        assert sentences[1:] == ["Hi."]
+        assert confidence == "high"
+        mock_model.generate_content_async.assert_awaited_once()
+
+    async def test_multiple_images_async_all_failed(self):
+        """Test confidence is low when every page fails"""
+        service = GeminiService()
+
+        with patch.object(service, 'extract_text_async', AsyncMock(side_effect=OCRError("down", error_code=ERROR_OCR_FAILED))):
+            text, sentences, confidence, _ = await service.extract_text_from_multiple_images_async(["a", "b"])
+
+        assert sentences == ["[Error processing page 1: down]", "[Error processing page 2: down]"]
+        assert confidence == "low"
+
+
 @pytest.mark.unit
 class TestOpenAIService:
     """Test cases for OpenAI service"""
@@ -308,3 +432,843 @@ class TestOpenAIService:
 
             # Should return empty bytes but not crash
             assert audio_data == b''
+
+    def test_synthesize_sentences_preserves_order(self):
+        """Test concurrent synthesis returns audio in sentence order"""
+        import random
+        import time
+
+        def fake_create(**kwargs):
+            # Finish out of order
+            time.sleep(random.uniform(0, 0.02))
+            response = MagicMock()
+            response.iter_bytes.return_value = [kwargs["input"].encode()]
+            return response
+
+        with patch('app.services.openai_service.OpenAI') as mock_openai:
+            mock_client = MagicMock()
+            mock_openai.return_value = mock_client
+            mock_client.audio.speech.create.side_effect = fake_create
+
+            service = OpenAIService()
+            sentences = [f"Sentence {i}." for i in range(20)]
+            audio_blobs = service.synthesize_sentences(sentences, voice="nova", format="mp3")
+
+            assert audio_blobs == [s.encode() for s in sentences]
+
+    def test_synthesize_sentences_bounded_concurrency(self):
+        """Test in-flight requests never exceed the configured limit"""
+        import threading
+        import time
+        from app.core.config import settings
+
+        lock = threading.Lock()
+        in_flight = {"current": 0, "max": 0}
+
+        def fake_create(**kwargs):
+            with lock:
+                in_flight["current"] += 1
+                in_flight["max"] = max(in_flight["max"], in_flight["current"])
+            time.sleep(0.01)
+            with lock:
+                in_flight["current"] -= 1
+            response = MagicMock()
+            response.iter_bytes.return_value = [b"audio"]
+            return response
+
+        with patch('app.services.openai_service.OpenAI') as mock_openai:
+            mock_client = MagicMock()
+            mock_openai.return_value = mock_client
+            mock_client.audio.speech.create.side_effect = fake_create
+
+            service = OpenAIService()
+            service.synthesize_sentences([f"S{i}" for i in range(20)], voice="nova", format="mp3")
+
+            assert 1 < in_flight["max"] <= settings.tts_max_concurrency
+
+    def test_synthesize_sentences_cancels_on_failure(self):
+        """Test the first failure cancels sentences that have not started"""
+        import time
+
+        def fake_create(**kwargs):
+            if kwargs["input"] == "S0":
+                raise Exception("API Error")
+            time.sleep(0.05)
+            response = MagicMock()
+            response.iter_bytes.return_value = [b"audio"]
+            return response
+
+        with patch('app.services.openai_service.OpenAI') as mock_openai:
+            mock_client = MagicMock()
+            mock_openai.return_value = mock_client
+            mock_client.audio.speech.create.side_effect = fake_create
+
+            service = OpenAIService()
+
+            with pytest.raises(TTSGenerationError) as exc_info:
+                service.synthesize_sentences([f"S{i}" for i in range(40)], voice="nova", format="mp3")
+
+            assert "API Error" in str(exc_info.value)
+            assert mock_client.audio.speech.create.call_count < 40
+
+    async def test_generate_speech_async_success(self):
+        """Test async speech generation uses the AsyncOpenAI client"""
+        with patch('app.services.openai_service.AsyncOpenAI') as mock_async_openai:
+            mock_client = MagicMock()
+            mock_async_openai.return_value = mock_client
+            mock_response = MagicMock()
+            mock_response.aread = AsyncMock(return_value=b"async audio")
+            mock_client.audio.speech.create = AsyncMock(return_value=mock_response)
+
+            service = OpenAIService()
+            audio_data = await service.generate_speech_async(
+                text="Hello, world!",
+                voice="nova",
+                format="mp3"
+            )
+
+            assert audio_data == b"async audio"
+            call_kwargs = mock_client.audio.speech.create.call_args[1]
+            assert call_kwargs["model"] == OPENAI_TTS_MODEL
+            assert call_kwargs["input"] == "Hello, world!"
+
+    async def test_stream_speech_async_yields_chunks(self):
+        """Test streaming uses the streaming response and yields upstream chunks"""
+        with patch('app.services.openai_service.AsyncOpenAI') as mock_async_openai:
+            mock_client = MagicMock()
+            mock_async_openai.return_value = mock_client
+
+            async def iter_bytes():
+                for chunk in [b"one", b"two"]:
+                    yield chunk
+
+            mock_response = MagicMock()
+            mock_response.iter_bytes = iter_bytes
+            stream_context = MagicMock()
+            stream_context.__aenter__ = AsyncMock(return_value=mock_response)
+            stream_context.__aexit__ = AsyncMock(return_value=False)
+            mock_client.audio.speech.with_streaming_response.create.return_value = stream_context
+
+            service = OpenAIService()
+            chunks = [chunk async for chunk in service.stream_speech_async("Hello", voice="nova", format="mp3")]
+
+            assert chunks == [b"one", b"two"]
+            stream_context.__aexit__.assert_awaited_once()
+            call_kwargs = mock_client.audio.speech.with_streaming_response.create.call_args[1]
+            assert call_kwargs["response_format"] == "mp3"
+
+    async def test_stream_speech_async_invalid_voice(self):
+        """Test validation errors surface on the first iteration"""
+        service = OpenAIService()
+
+        with pytest.raises(TTSGenerationError) as exc_info:
+            await service.stream_speech_async("Hello", voice="robot").__anext__()
+
+        assert "Invalid voice" in exc_info.value.message
+
+    async def test_synthesize_sentences_async_overlaps_requests(self):
+        """Test async synthesis overlaps upstream calls and preserves order"""
+        import asyncio
+        import time
+
+        async def fake_create(**kwargs):
+            await asyncio.sleep(0.05)
+            response = MagicMock()
+            response.aread = AsyncMock(return_value=kwargs["input"].encode())
+            return response
+
+        with patch('app.services.openai_service.AsyncOpenAI') as mock_async_openai:
+            mock_client = MagicMock()
+            mock_async_openai.return_value = mock_client
+            mock_client.audio.speech.create = AsyncMock(side_effect=fake_create)
+
+            service = OpenAIService()
+            sentences = [f"S{i}" for i in range(8)]
+            start = time.perf_counter()
+            audio_blobs = await service.synthesize_sentences_async(sentences, voice="nova", format="mp3")
+            elapsed = time.perf_counter() - start
+
+            assert audio_blobs == [s.encode() for s in sentences]
+            # 8 serial calls would take >= 0.4s
+            assert elapsed < 0.3
+
+    async def test_synthesize_sentences_async_failure(self):
+        """Test async synthesis raises TTSGenerationError on first failure"""
+        with patch('app.services.openai_service.AsyncOpenAI') as mock_async_openai:
+            mock_client = MagicMock()
+            mock_async_openai.return_value = mock_client
+            mock_client.audio.speech.create = AsyncMock(side_effect=Exception("API Error"))
+
+            service = OpenAIService()
+
+            with pytest.raises(TTSGenerationError) as exc_info:
+                await service.synthesize_sentences_async(["S0", "S1"], voice="nova", format="mp3")
+
+            assert exc_info.value.error_code == ERROR_TTS_FAILED
+            assert "API Error" in str(exc_info.value)
+
+    async def test_generate_speech_async_chunks_long_text(self):
+        """Test text over the chunk budget is synthesized per chunk and joined without a gap"""
+        text = "First sentence here. Second sentence here. Third one."
+
+        with patch('app.services.openai_service.settings') as mock_settings, \
+                patch('app.services.openai_service.AsyncOpenAI') as mock_async_openai, \
+                patch('app.services.openai_service.splice_audio') as mock_splice, \
+                patch('app.services.openai_service.decode_pcm', side_effect=lambda data, fmt: data) as mock_decode, \
+                patch('app.services.openai_service.encode_pcm', side_effect=lambda pcm, fmt: bytes(pcm)):
+            mock_settings.tts_chunk_max_chars = 25
+            mock_settings.tts_max_concurrency = 4
+            mock_settings.tts_compressed_splicing = False
+            mock_client = MagicMock()
+            mock_async_openai.return_value = mock_client
+
+            async def fake_create(**kwargs):
+                response = MagicMock()
+                response.aread = AsyncMock(return_value=kwargs["input"][:2].encode())
+                return response
+
+            mock_client.audio.speech.create = AsyncMock(side_effect=fake_create)
+
+            service = OpenAIService()
+            audio_data = await service.generate_speech_async(text, voice="nova", format="mp3")
+
+            inputs = [call[1]["input"] for call in mock_client.audio.speech.create.call_args_list]
+            assert inputs == ["First sentence here.", "Second sentence here.", "Third one."]
+            assert mock_decode.call_count == 3
+            mock_splice.assert_not_called()
+            # Chunks are joined back to back (no sentence gap)
+            assert audio_data == b"FiSeTh"
+
+    async def test_stream_speech_async_chunks_long_text(self):
+        """Test the first chunk streams live and later chunks follow in order"""
+        import asyncio
+
+        with patch('app.services.openai_service.settings') as mock_settings, \
+                patch('app.services.openai_service.AsyncOpenAI') as mock_async_openai:
+            mock_settings.tts_chunk_max_chars = 25
+            mock_settings.tts_max_concurrency = 4
+            mock_client = MagicMock()
+            mock_async_openai.return_value = mock_client
+
+            async def iter_bytes():
+                for chunk in [b"first-a", b"first-b"]:
+                    yield chunk
+
+            mock_response = MagicMock()
+            mock_response.iter_bytes = iter_bytes
+            stream_context = MagicMock()
+            stream_context.__aenter__ = AsyncMock(return_value=mock_response)
+            stream_context.__aexit__ = AsyncMock(return_value=False)
+            mock_client.audio.speech.with_streaming_response.create.return_value = stream_context
+
+            async def fake_create(**kwargs):
+                # Later chunks finish in reverse order
+                await asyncio.sleep(0.05 if kwargs["input"].startswith("Second") else 0)
+                response = MagicMock()
+                response.aread = AsyncMock(return_value=kwargs["input"][:5].encode())
+                return response
+
+            mock_client.audio.speech.create = AsyncMock(side_effect=fake_create)
+
+            service = OpenAIService()
+            text = "First sentence here. Second sentence here. Third one."
+            chunks = [chunk async for chunk in service.stream_speech_async(text, voice="nova", format="mp3")]
+
+            assert chunks == [b"first-a", b"first-b", b"Secon", b"Third"]
+            call_kwargs = mock_client.audio.speech.with_streaming_response.create.call_args[1]
+            assert call_kwargs["input"] == "First sentence here."
+
+    async def test_stream_speech_async_long_text_container_format(self):
+        """Test Ogg streams of long text are joined and sent as one chunk"""
+        with patch('app.services.openai_service.settings') as mock_settings, \
+                patch.object(OpenAIService, 'generate_speech_async', new_callable=AsyncMock) as mock_generate, \
+                patch('app.services.openai_service.AsyncOpenAI') as mock_async_openai:
+            mock_settings.tts_chunk_max_chars = 25
+            mock_generate.return_value = b"joined ogg"
+            mock_client = MagicMock()
+            mock_async_openai.return_value = mock_client
+
+            service = OpenAIService()
+            text = "First sentence here. Second sentence here."
+            chunks = [chunk async for chunk in service.stream_speech_async(text, voice="nova", format="opus")]
+
+            assert chunks == [b"joined ogg"]
+            mock_generate.assert_awaited_once_with(text, "nova", "opus")
+            mock_client.audio.speech.with_streaming_response.create.assert_not_called()
+
+    async def test_synthesize_sentences_batched_async(self):
+        """Test short sentences share one upstream call and are split back per sentence"""
+        sentences = ["Hi.", "Yes.", "This one is far too long to be batched with others.", "No."]
+        frame_ranges = [(0, 100), (150, 300)]
+
+        with patch('app.services.openai_service.settings') as mock_settings, \
+                patch('app.services.openai_service.decode_pcm', return_value=b"\x01\x00" * 300), \
+                patch('app.services.openai_service.split_batch_pcm', return_value=frame_ranges) as mock_split, \
+                patch('app.services.openai_service.encode_pcm', side_effect=lambda pcm, fmt: f"clip{len(pcm)}".encode()):
+            mock_settings.tts_sentence_batching = True
+            mock_settings.tts_batch_max_chars = 20
+            mock_settings.tts_batch_max_sentences = 6
+
+            service = OpenAIService()
+            service.synthesize_sentences_async = AsyncMock(
+                side_effect=lambda texts, voice, format: [text.encode() for text in texts]
+            )
+            audio_blobs, upstream_calls = await service.synthesize_sentences_batched_async(sentences, "nova", "mp3")
+
+            service.synthesize_sentences_async.assert_awaited_once_with(
+                ["Hi. Yes.", sentences[2], "No."], "nova", "mp3"
+            )
+            mock_split.assert_called_once_with(b"\x01\x00" * 300, ["Hi.", "Yes."])
+            assert audio_blobs == [b"clip200", b"clip300", sentences[2].encode(), b"No."]
+            assert upstream_calls == 3
+
+    async def test_synthesize_sentences_batched_async_fallback(self):
+        """Test batches that can't be split are re-synthesized one sentence per call"""
+        with patch('app.services.openai_service.settings') as mock_settings, \
+                patch('app.services.openai_service.decode_pcm', return_value=b"\x00\x00"), \
+                patch('app.services.openai_service.split_batch_pcm', return_value=None):
+            mock_settings.tts_sentence_batching = True
+            mock_settings.tts_batch_max_chars = 20
+            mock_settings.tts_batch_max_sentences = 6
+
+            service = OpenAIService()
+            service.synthesize_sentences_async = AsyncMock(
+                side_effect=lambda texts, voice, format: [text.encode() for text in texts]
+            )
+            audio_blobs, upstream_calls = await service.synthesize_sentences_batched_async(["A.", "B."], "nova", "mp3")
+
+            assert service.synthesize_sentences_async.await_args_list[1][0][0] == ["A.", "B."]
+            assert audio_blobs == [b"A.", b"B."]
+            assert upstream_calls == 3
+
+    async def test_synthesize_sentences_batched_async_disabled(self):
+        """Test batching off keeps one call per sentence"""
+        with patch('app.services.openai_service.settings') as mock_settings:
+            mock_settings.tts_sentence_batching = False
+
+            service = OpenAIService()
+            service.synthesize_sentences_async = AsyncMock(return_value=[b"a", b"b"])
+            audio_blobs, upstream_calls = await service.synthesize_sentences_batched_async(["A.", "B."], "nova", "mp3")
+
+            service.synthesize_sentences_async.assert_awaited_once_with(["A.", "B."], "nova", "mp3")
+            assert upstream_calls == 2
+
+    def test_combine_with_timings_decodes_each_sentence_once(self):
+        """Test combining decodes each sentence once and derives timings from sample counts"""
+        from app.core.constants import TTS_SAMPLE_RATE, TTS_SAMPLE_WIDTH
+
+        pcm = {
+            b"one": b"\x01\x00" * TTS_SAMPLE_RATE,          # 1.0s
+            b"two": b"\x02\x00" * (TTS_SAMPLE_RATE // 2),   # 0.5s
+        }
+
+        with patch('app.services.openai_service.decode_pcm', side_effect=lambda data, fmt: pcm[data]) as mock_decode, \
+                patch('app.services.openai_service.encode_pcm', return_value=b"combined") as mock_encode:
+            service = OpenAIService()
+            audio, timings, total = service._combine_with_timings(
+                ["One.", "Two."], [b"one", b"two"], "mp3"
+            )
+
+            assert mock_decode.call_count == 2
+            assert audio == b"combined"
+            assert timings[0].start_time == 0.0
+            assert timings[0].end_time == 1.0
+            assert timings[1].start_time == pytest.approx(1.2)
+            assert timings[1].end_time == pytest.approx(1.7)
+            assert total == pytest.approx(1.7)
+
+            # Encoded PCM = sentence, 200ms silence, sentence
+            combined_pcm = mock_encode.call_args[0][0]
+            gap = b"\x00" * (TTS_SAMPLE_RATE // 5 * TTS_SAMPLE_WIDTH)
+            assert bytes(combined_pcm) == pcm[b"one"] + gap + pcm[b"two"]
+
+    def test_combine_with_timings_compressed_splicing(self):
+        """Test spliced audio skips decoding and timings use the splice sample rate"""
+        spliced = (b"spliced", [(0, 48000), (57600, 72000)], 72000, 48000)
+
+        with patch('app.services.openai_service.settings') as mock_settings, \
+                patch('app.services.openai_service.splice_audio', return_value=spliced) as mock_splice, \
+                patch('app.services.openai_service.decode_pcm') as mock_decode:
+            mock_settings.tts_compressed_splicing = True
+            service = OpenAIService()
+            audio, timings, total = service._combine_with_timings(
+                ["One.", "Two."], [b"one", b"two"], "opus"
+            )
+
+            mock_splice.assert_called_once_with([b"one", b"two"], "opus", 200)
+            mock_decode.assert_not_called()
+            assert audio == b"spliced"
+            assert timings[1].start_time == pytest.approx(1.2)
+            assert timings[1].end_time == pytest.approx(1.5)
+            assert total == pytest.approx(1.5)
+
+    def test_combine_with_timings_splicing_fallback(self):
+        """Test formats that can't be spliced go through decode/re-encode"""
+        with patch('app.services.openai_service.settings') as mock_settings, \
+                patch('app.services.openai_service.splice_audio', return_value=None), \
+                patch('app.services.openai_service.decode_pcm', return_value=b"\x00\x00" * 2400) as mock_decode, \
+                patch('app.services.openai_service.encode_pcm', return_value=b"combined"):
+            mock_settings.tts_compressed_splicing = True
+            service = OpenAIService()
+            audio, timings, total = service._combine_with_timings(["One."], [b"one"], "aac")
+
+            assert mock_decode.call_count == 1
+            assert audio == b"combined"
+            assert total == pytest.approx(0.1)
+
+
+@pytest.mark.unit
+class TestAudioCacheService:
+    """Test cases for AudioCacheService"""
+
+    def _service(self, supabase_configured=False):
+        from app.services.audio_cache_service import AudioCacheService
+        from app.services.cache_backends import SupabaseCacheBackend
+
+        service = AudioCacheService()
+        service.backend = SupabaseCacheBackend() if supabase_configured else None
+        return service
+
+    async def test_stream_segments_completion_order(self):
+        """Test segments are yielded as they finish, followed by a summary"""
+        import asyncio
+
+        service = self._service()
+        delays = {"Slow.": 0.05, "Fast.": 0.0}
+
+        async def fake_generate(text, voice, format):
+            await asyncio.sleep(delays[text])
+            return text.encode()
+
+        service.openai_service.generate_speech_async = AsyncMock(side_effect=fake_generate)
+
+        with patch('app.services.audio_cache_service.get_audio_duration_us', side_effect=lambda data, fmt: len(data) * 100_000):
+            events = [event async for event in service.stream_segments("Slow. Fast.", ["Slow.", "Fast."], "nova", "mp3")]
+
+        assert [event["event"] for event in events] == ["segment", "segment", "done"]
+        assert [event["index"] for event in events[:2]] == [1, 0]
+        assert base64.b64decode(events[0]["audio_data"]) == b"Fast."
+        assert events[2]["durations"] == [0.5, 0.5]
+        assert events[2]["total_duration"] == pytest.approx(1.0)
+        assert events[2]["from_cache"] is False
+        assert events[2]["format"] == "mp3"
+
+    async def test_stream_segments_cache_hit(self):
+        """Test cache hits stream the stored URLs in order without generating"""
+        service = self._service()
+        service.get_cached_audio = AsyncMock(return_value={
+            'segment_urls': ["https://cdn/0.mp3", "https://cdn/1.mp3"],
+            'durations': [1.0, 2.0],
+            'total_duration': 3.0,
+            'sentences': ["A.", "B."]
+        })
+        service.openai_service.generate_speech_async = AsyncMock()
+
+        events = [event async for event in service.stream_segments("A. B.", ["A.", "B."], "nova", "mp3")]
+
+        assert [event.get("audio_url") for event in events[:2]] == ["https://cdn/0.mp3", "https://cdn/1.mp3"]
+        assert events[2]["from_cache"] is True
+        service.openai_service.generate_speech_async.assert_not_called()
+
+    async def test_stream_segments_uploads_and_caches(self):
+        """Test each segment is saved to the sentence cache when ready and the document row is written at the end"""
+        service = self._service(supabase_configured=True)
+        service.get_cached_audio = AsyncMock(return_value=None)
+        service.get_cached_sentences = AsyncMock(return_value={})
+        service.openai_service.generate_speech_async = AsyncMock(side_effect=lambda text, voice, format: text.encode())
+        service._save_sentence = AsyncMock(
+            side_effect=lambda key, sentence, blob, duration, voice, fmt: f"https://cdn/{sentence}mp3"
+        )
+        service._insert_cache_row = AsyncMock()
+
+        with patch('app.services.audio_cache_service.get_audio_duration_us', return_value=1_000_000):
+            events = [event async for event in service.stream_segments("A. B.", ["A.", "B."], "nova", "mp3")]
+
+        assert sorted(event["audio_url"] for event in events[:2]) == ["https://cdn/A.mp3", "https://cdn/B.mp3"]
+        assert service._save_sentence.await_count == 2
+        service._insert_cache_row.assert_awaited_once()
+        segment_urls = service._insert_cache_row.call_args[0][4]
+        assert segment_urls == ["https://cdn/A.mp3", "https://cdn/B.mp3"]
+
+    async def test_stream_segments_sentence_cache(self):
+        """Test sentence-level hits stream immediately and duplicate sentences are synthesized once"""
+        service = self._service()
+        hit_key = service.generate_sentence_cache_key("Hello.", "nova", "mp3")
+        service.get_cached_sentences = AsyncMock(return_value={
+            hit_key: {'audio_url': "https://cdn/hello.mp3", 'duration': 0.8, 'size': 100}
+        })
+        service.openai_service.generate_speech_async = AsyncMock(side_effect=lambda text, voice, format: text.encode())
+
+        with patch('app.services.audio_cache_service.get_audio_duration_us', return_value=500_000):
+            events = [
+                event async for event in service.stream_segments(
+                    "Hello. Again. Again.", ["Hello.", "Again.", "Again."], "nova", "mp3"
+                )
+            ]
+
+        assert events[0] == {'event': 'segment', 'index': 0, 'duration': 0.8, 'audio_url': "https://cdn/hello.mp3"}
+        assert sorted(event["index"] for event in events[1:3]) == [1, 2]
+        service.openai_service.generate_speech_async.assert_awaited_once_with("Again.", "nova", "mp3")
+        assert events[3]["durations"] == [0.8, 0.5, 0.5]
+        assert events[3]["sentence_hit_ratio"] == pytest.approx(1 / 3)
+
+    async def test_generate_or_get_cached_sentence_cache(self):
+        """Test a document miss reuses sentence-level hits and only synthesizes new sentences once"""
+        service = self._service(supabase_configured=True)
+        service.get_cached_audio = AsyncMock(return_value=None)
+        hit_key = service.generate_sentence_cache_key("Hello.", "nova", "mp3")
+        service.get_cached_sentences = AsyncMock(return_value={
+            hit_key: {'audio_url': "https://cdn/hello.mp3", 'duration': 0.8, 'size': 100}
+        })
+        service.openai_service.synthesize_sentences_batched_async = AsyncMock(
+            side_effect=lambda sentences, voice, format: ([s.encode() for s in sentences], len(sentences))
+        )
+        service._save_sentence = AsyncMock(
+            side_effect=lambda key, sentence, blob, duration, voice, fmt: f"https://cdn/{sentence}mp3"
+        )
+        service._insert_cache_row = AsyncMock()
+        service._acquire_lease = AsyncMock(return_value=True)
+        service._release_lease = AsyncMock()
+
+        with patch('app.services.audio_cache_service.get_audio_duration_us', return_value=500_000):
+            result = await service.generate_or_get_cached(
+                "Hello. Typo fixed. Typo fixed.", ["Hello.", "Typo fixed.", "Typo fixed."], "nova", "mp3"
+            )
+
+        service.openai_service.synthesize_sentences_batched_async.assert_awaited_once_with(["Typo fixed."], "nova", "mp3")
+        assert service._save_sentence.await_count == 1
+        assert result['audio_urls'] == ["https://cdn/hello.mp3", "https://cdn/Typo fixed.mp3", "https://cdn/Typo fixed.mp3"]
+        assert result['durations'] == [0.8, 0.5, 0.5]
+        assert result['sentence_hit_ratio'] == pytest.approx(1 / 3)
+        assert result['upstream_calls_saved'] == 2
+        # Document row: total size counts cached and new sentences
+        assert service._insert_cache_row.call_args[0][7] == 100 + 2 * len(b"Typo fixed.")
+
+    async def test_generate_or_get_cached_without_supabase(self):
+        """Test blobs are returned without Supabase and duplicates are synthesized once"""
+        service = self._service()
+        service.openai_service.synthesize_sentences_batched_async = AsyncMock(
+            side_effect=lambda sentences, voice, format: ([s.encode() for s in sentences], len(sentences))
+        )
+
+        with patch('app.services.audio_cache_service.get_audio_duration_us', return_value=500_000):
+            result = await service.generate_or_get_cached("A. A. B.", ["A.", "A.", "B."], "nova", "mp3")
+
+        assert result['audio_blobs'] == [b"A.", b"A.", b"B."]
+        assert result['sentence_hit_ratio'] == 0.0
+        assert result['upstream_calls_saved'] == 1
+
+    async def test_generate_or_get_cached_unmeasurable_audio(self):
+        """Test a duration probe failure gives 0.0 instead of failing the synthesized request"""
+        service = self._service()
+        service.openai_service.synthesize_sentences_batched_async = AsyncMock(
+            side_effect=lambda sentences, voice, format: ([s.encode() for s in sentences], len(sentences))
+        )
+
+        with patch('app.services.audio_cache_service.get_audio_duration_us', side_effect=RuntimeError("ffmpeg failed")):
+            result = await service.generate_or_get_cached("A. B.", ["A.", "B."], "nova", "mp3")
+
+        assert result['audio_blobs'] == [b"A.", b"B."]
+        assert result['durations'] == [0.0, 0.0]
+
+    async def test_local_cache_without_supabase(self, tmp_path):
+        """Test the local tiers serve repeat requests when Supabase is not configured"""
+        from app.utils.local_cache import DiskCache, MemoryLRUCache, TieredCache
+
+        service = self._service()
+        service.local_cache = TieredCache([
+            MemoryLRUCache(max_bytes=1024, max_item_bytes=4),
+            DiskCache(str(tmp_path), max_bytes=1024)
+        ])
+        service.openai_service.synthesize_sentences_batched_async = AsyncMock(
+            side_effect=lambda sentences, voice, format: ([s.encode() for s in sentences], len(sentences))
+        )
+
+        with patch('app.services.audio_cache_service.get_audio_duration_us', return_value=500_000):
+            first = await service.generate_or_get_cached("A. Long one.", ["A.", "Long one."], "nova", "mp3")
+            second = await service.generate_or_get_cached("A. Long one.", ["A.", "Long one."], "nova", "mp3")
+            events = [event async for event in service.stream_segments("A.", ["A."], "nova", "mp3")]
+
+        service.openai_service.synthesize_sentences_batched_async.assert_awaited_once()
+        assert first['from_cache'] is False
+        assert second['from_cache'] is True
+        assert second['audio_blobs'] == [b"A.", b"Long one."]
+        assert second['durations'] == [0.5, 0.5]
+        assert second['upstream_calls_saved'] == 2
+        assert base64.b64decode(events[0]['audio_data']) == b"A."
+
+        stats = service.cache_stats()
+        assert set(stats) == {"memory", "disk", "keys"}
+        # "Long one." is too big for the memory tier: served from disk once, then promoted
+        assert stats["disk"]["hits"] >= 1
+
+    async def test_local_document_hit_skips_supabase(self):
+        """Test a document cached locally is returned without a network lookup"""
+        from app.utils.local_cache import MemoryLRUCache, TieredCache
+
+        service = self._service(supabase_configured=True)
+        service.local_cache = TieredCache([MemoryLRUCache(max_bytes=4096, max_item_bytes=4096)])
+        cache_key = service.generate_cache_key("A.", ["A."], "nova", "mp3")
+        await service._cache_document_locally(cache_key, ["https://cdn/a.mp3"], [1.0], 1.0, ["A."])
+
+        with patch('app.services.cache_backends.get_supabase_admin_async', new_callable=AsyncMock) as mock_admin:
+            cached = await service.get_cached_audio("A.", ["A."], "nova", "mp3")
+
+        mock_admin.assert_not_called()
+        assert cached['segment_urls'] == ["https://cdn/a.mp3"]
+        assert service.cache_stats()["supabase"] == {"hits": 0, "misses": 0}
+
+    async def test_concurrent_identical_requests_generate_once(self):
+        """Test simultaneous requests for the same material share one generation"""
+        import asyncio
+
+        service = self._service()
+
+        async def fake_synthesize(sentences, voice, format):
+            await asyncio.sleep(0.01)
+            return [s.encode() for s in sentences], len(sentences)
+
+        service.openai_service.synthesize_sentences_batched_async = AsyncMock(side_effect=fake_synthesize)
+
+        with patch('app.services.audio_cache_service.get_audio_duration_us', return_value=500_000):
+            results = await asyncio.gather(*(
+                service.generate_or_get_cached("A. B.", ["A.", "B."], "nova", "mp3")
+                for _ in range(20)
+            ))
+
+        service.openai_service.synthesize_sentences_batched_async.assert_awaited_once()
+        assert all(result['audio_blobs'] == [b"A.", b"B."] for result in results)
+
+    async def test_waits_for_lease_held_by_another_worker(self):
+        """Test a worker waits for another worker's generation instead of repeating it"""
+        service = self._service()
+        service.openai_service.synthesize_sentences_batched_async = AsyncMock()
+        cached = {
+            'segment_urls': ["https://cdn/a.mp3"],
+            'durations': [1.0],
+            'total_duration': 1.0,
+            'sentences': ["A."]
+        }
+
+        with patch.object(service, '_acquire_lease', AsyncMock(return_value=False)), \
+             patch.object(service, 'get_cached_audio', AsyncMock(side_effect=[None, None, cached])), \
+             patch('app.services.audio_cache_service.CACHE_LEASE_POLL_SECONDS', 0):
+            result = await service.generate_or_get_cached("A.", ["A."], "nova", "mp3")
+
+        service.openai_service.synthesize_sentences_batched_async.assert_not_awaited()
+        assert result['from_cache'] is True
+        assert result['audio_urls'] == ["https://cdn/a.mp3"]
+
+    async def test_acquire_lease_takes_over_expired_lease(self):
+        """Test a held lease is refused and an expired one is taken over"""
+        from postgrest.exceptions import APIError
+
+        service = self._service(supabase_configured=True)
+        table = MagicMock()
+        table.insert.return_value.execute = AsyncMock(side_effect=APIError({'code': '23505', 'message': 'duplicate key'}))
+        update_query = table.update.return_value.eq.return_value.lt.return_value
+        update_query.execute = AsyncMock(side_effect=[MagicMock(data=[]), MagicMock(data=[{'text_hash': 'k'}])])
+        supabase = MagicMock()
+        supabase.table.return_value = table
+
+        with patch('app.services.cache_backends.get_supabase_admin_async', AsyncMock(return_value=supabase)):
+            assert await service._acquire_lease("k") is False
+            assert await service._acquire_lease("k") is True
+
+        supabase.table.assert_called_with('audio_cache_leases')
+
+    async def test_save_sentences_uploads_in_parallel(self):
+        """Test uploads overlap up to the concurrency limit and URLs are built locally"""
+        import asyncio
+
+        service = self._service(supabase_configured=True)
+        in_flight = []
+        peak = []
+
+        async def fake_upload(path, data, file_options):
+            in_flight.append(path)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.remove(path)
+
+        bucket = MagicMock()
+        bucket.upload = AsyncMock(side_effect=fake_upload)
+        supabase = MagicMock()
+        supabase.table.return_value.upsert.return_value.execute = AsyncMock()
+        new_sentences = {f"key{i}": (f"S{i}.", b"audio", 0.5) for i in range(5)}
+
+        with patch('app.services.audio_cache_service.settings.storage_upload_concurrency', 3), \
+                patch('app.services.cache_backends.get_storage_bucket_async', AsyncMock(return_value=bucket)), \
+                patch('app.services.cache_backends.get_supabase_admin_async', AsyncMock(return_value=supabase)), \
+                patch('app.core.supabase.SUPABASE_URL', "https://example.supabase.co/"):
+            urls = await service._save_sentences(new_sentences, "nova", "mp3")
+
+        assert bucket.upload.await_count == 5
+        assert max(peak) == 3
+        bucket.get_public_url.assert_not_called()
+        assert urls["key0"] == "https://example.supabase.co/storage/v1/object/public/audio-files/cache/sentences/key0.mp3"
+
+    async def test_supabase_hit_buffers_access_stats(self):
+        """Test a hit is answered without writing stats, which are flushed in one batched call"""
+        service = self._service(supabase_configured=True)
+        row = {
+            'segment_urls': ["https://cdn/a.mp3"], 'durations': [1.0], 'total_duration': 1.0,
+            'sentences': ["A."], 'access_count': 1, 'id': "row-1"
+        }
+        table = MagicMock()
+        table.select.return_value.eq.return_value.single.return_value.execute = AsyncMock(return_value=MagicMock(data=row))
+        supabase = MagicMock()
+        supabase.table.return_value = table
+        supabase.rpc.return_value.execute = AsyncMock()
+
+        with patch('app.services.cache_backends.get_supabase_admin_async', AsyncMock(return_value=supabase)):
+            await service.get_cached_audio("A.", ["A."], "nova", "mp3")
+            await service.get_cached_audio("A.", ["A."], "nova", "mp3")
+            table.update.assert_not_called()
+
+            assert await service.flush_access_stats() == 1
+            assert await service.flush_access_stats() == 0
+
+        supabase.rpc.assert_called_once()
+        name, params = supabase.rpc.call_args[0]
+        assert name == 'increment_audio_cache_access'
+        assert params['hashes'] == [service.generate_cache_key("A.", ["A."], "nova", "mp3")]
+        assert params['counts'] == [2]
+
+    async def test_failed_flush_keeps_access_stats(self):
+        """Test counts are carried over to the next flush when the write fails"""
+        service = self._service(supabase_configured=True)
+        service._record_access("k")
+        supabase = MagicMock()
+        supabase.rpc.return_value.execute = AsyncMock(side_effect=[Exception("timeout"), None])
+
+        with patch('app.services.cache_backends.get_supabase_admin_async', AsyncMock(return_value=supabase)):
+            assert await service.flush_access_stats() == 0
+            service._record_access("k")
+            assert await service.flush_access_stats() == 1
+
+        assert supabase.rpc.call_args[0][1]['counts'] == [2]
+
+    async def test_known_documents_filter_skips_definite_misses(self):
+        """Test documents absent from the filter are not looked up, and inserts are added"""
+        from app.utils.bloom_filter import BloomFilter
+
+        service = self._service(supabase_configured=True)
+        service._known_documents = BloomFilter(capacity=100)
+        supabase = MagicMock()
+        supabase.table.return_value.upsert.return_value.execute = AsyncMock()
+
+        with patch('app.services.cache_backends.get_supabase_admin_async', AsyncMock(return_value=supabase)):
+            assert await service.get_cached_audio("New.", ["New."], "nova", "mp3") is None
+            supabase.table.assert_not_called()
+
+            cache_key = service.generate_cache_key("New.", ["New."], "nova", "mp3")
+            await service._insert_cache_row(cache_key, ["New."], "nova", "mp3", ["u"], [1.0], 1.0, 10)
+
+        assert cache_key in service._known_documents
+        stats = service.cache_stats()["filter"]
+        assert stats["skips"] == 1 and stats["items"] == 1
+        assert stats["measured_false_positive_rate"] == 0.0
+
+    async def test_load_known_documents_paginates(self):
+        """Test the filter is built from a paginated scan of text_hash"""
+        service = self._service(supabase_configured=True)
+        query = MagicMock()
+        query.execute = AsyncMock(side_effect=[
+            MagicMock(data=[{'text_hash': "a"}, {'text_hash': "b"}]),
+            MagicMock(data=[{'text_hash': "c"}]),
+        ])
+        supabase = MagicMock()
+        supabase.table.return_value.select.return_value.order.return_value.range.return_value = query
+
+        with patch('app.services.cache_backends.get_supabase_admin_async', AsyncMock(return_value=supabase)), \
+                patch('app.services.cache_backends.CACHE_SCAN_PAGE_SIZE', 2):
+            assert await service.load_known_documents() == 3
+
+        ranges = [c.args for c in supabase.table.return_value.select.return_value.order.return_value.range.call_args_list]
+        assert ranges == [(0, 1), (2, 3)]
+        assert all(key in service._known_documents for key in ["a", "b", "c"])
+
+    def test_cache_keys_ignore_unpronounced_differences(self):
+        """Test trivially different inputs share keys, and keys include the TTS settings"""
+        service = self._service()
+        plain = service.generate_cache_key('He said "hi".', ['He said "hi".'], "nova", "mp3")
+        curly = service.generate_cache_key("He said \u201chi\u201d. ", ["He said \u201chi\u201d."], "nova", "mp3")
+        assert plain == curly
+        assert service.generate_sentence_cache_key("Ｏｋ．", "nova", "mp3") == service.generate_sentence_cache_key("Ok.", "nova", "mp3")
+
+        with patch('app.services.audio_cache_service.OPENAI_TTS_SPEED', 1.25):
+            assert service.generate_cache_key('He said "hi".', ['He said "hi".'], "nova", "mp3") != plain
+
+    async def test_legacy_document_key_is_migrated(self):
+        """Test a document stored under the old key is found and renamed to the new key"""
+        service = self._service(supabase_configured=True)
+        row = {'segment_urls': ["https://cdn/a.mp3"], 'durations': [1.0], 'total_duration': 1.0, 'sentences': ["A ."]}
+        legacy_key = service._legacy_cache_key("A .", ["A ."], "nova", "mp3")
+        cache_key = service.generate_cache_key("A .", ["A ."], "nova", "mp3")
+
+        async def lookup(key, use_filter, count_misses=True):
+            return dict(row) if key == legacy_key else None
+
+        table = MagicMock()
+        table.update.return_value.eq.return_value.execute = AsyncMock()
+        supabase = MagicMock()
+        supabase.table.return_value = table
+
+        with patch.object(service, '_lookup_document', AsyncMock(side_effect=lookup)), \
+                patch('app.services.cache_backends.get_supabase_admin_async', AsyncMock(return_value=supabase)):
+            cached = await service.get_cached_audio("A .", ["A ."], "nova", "mp3")
+
+        assert cached['segment_urls'] == ["https://cdn/a.mp3"]
+        table.update.assert_called_once_with({'text_hash': cache_key})
+        table.update.return_value.eq.assert_called_once_with('text_hash', legacy_key)
+        assert service.cache_stats()['keys']['legacy_hits'] == 1
+        assert service._pending_access == {cache_key: [1, service._pending_access[cache_key][1]]}
+
+    async def test_legacy_sentence_keys_in_same_query(self):
+        """Test old sentence keys are looked up with the new ones and renamed on a hit"""
+        service = self._service(supabase_configured=True)
+        sentences = ["Old one.", "New one."]
+        keys = [service.generate_sentence_cache_key(s, "nova", "mp3") for s in sentences]
+        legacy_keys = service._legacy_sentence_keys(sentences, "nova", "mp3")
+
+        table = MagicMock()
+        table.select.return_value.in_.return_value.execute = AsyncMock(return_value=MagicMock(data=[
+            {'sentence_hash': legacy_keys[keys[0]], 'audio_url': "https://cdn/old.mp3", 'duration': 1.0, 'file_size_bytes': 10}
+        ]))
+        table.update.return_value.eq.return_value.execute = AsyncMock()
+        supabase = MagicMock()
+        supabase.table.return_value = table
+
+        with patch('app.services.cache_backends.get_supabase_admin_async', AsyncMock(return_value=supabase)):
+            cached = await service.get_cached_sentences(keys, legacy_keys)
+
+        assert set(table.select.return_value.in_.call_args[0][1]) == set(keys) | set(legacy_keys.values())
+        assert cached == {keys[0]: {'audio_url': "https://cdn/old.mp3", 'duration': 1.0, 'size': 10}}
+        table.update.assert_called_once_with({'sentence_hash': keys[0]})
+
+    async def test_stream_segments_failure_cancels_remaining(self):
+        """Test a failed sentence stops the stream and cancels pending work"""
+        import asyncio
+
+        service = self._service()
+        cancelled = []
+
+        async def fake_generate(text, voice, format):
+            if text == "Bad.":
+                raise TTSGenerationError("OpenAI TTS failed: boom", error_code=ERROR_TTS_FAILED)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(text)
+                raise
+
+        service.openai_service.generate_speech_async = AsyncMock(side_effect=fake_generate)
+
+        with pytest.raises(TTSGenerationError):
+            async for _ in service.stream_segments("Bad. Slow.", ["Bad.", "Slow."], "nova", "mp3"):
+                pass
+
+        # Cancellation reaches the shared per-sentence call on the next loop turns
+        await asyncio.sleep(0.01)
+        assert cancelled == ["Slow."]
@@ -0,0 +1,80 @@
+"""Tests for single-flight call coalescing"""
+import asyncio
+
+import pytest
+
+from app.utils.single_flight import SingleFlight
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestSingleFlight:
+    """Test cases for SingleFlight"""
+
+    async def test_coalesces_concurrent_calls(self):
+        """Test concurrent callers with the same key share one call"""
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*(flight.run("k", work) for _ in range(20)))
+
+        assert results == ["result"] * 20
+        assert len(calls) == 1
+        assert not flight.in_flight("k")
+
+    async def test_distinct_keys_run_separately(self):
+        """Test different keys are not coalesced, and a finished key runs again"""
+        flight = SingleFlight()
+        calls = []
+
+        async def work(key):
+            calls.append(key)
+            return key
+
+        assert await asyncio.gather(flight.run("a", lambda: work("a")), flight.run("b", lambda: work("b"))) == ["a", "b"]
+        assert await flight.run("a", lambda: work("a")) == "a"
+        assert calls == ["a", "b", "a"]
+
+    async def test_exception_reaches_every_caller(self):
+        """Test a failure is raised to all waiters"""
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(*(flight.run("k", work) for _ in range(3)), return_exceptions=True)
+
+        assert all(isinstance(result, ValueError) for result in results)
+        assert not flight.in_flight("k")
+
+    async def test_call_survives_until_last_waiter_cancels(self):
+        """Test cancelling one waiter keeps the call running for the others"""
+        flight = SingleFlight()
+        cancelled = []
+
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        first = asyncio.create_task(flight.run("k", work))
+        second = asyncio.create_task(flight.run("k", work))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        await asyncio.sleep(0.01)
+        assert cancelled == []
+        assert flight.in_flight("k")
+
+        second.cancel()
+        await asyncio.sleep(0.01)
+        assert cancelled == [True]
+        assert not flight.in_flight("k")
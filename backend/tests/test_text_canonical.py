@@ -0,0 +1,51 @@
+"""Tests for cache-key text canonicalization"""
+import unicodedata
+
+import pytest
+
+from app.utils.text_canonical import canonicalize_text
+
+
+@pytest.mark.unit
+class TestCanonicalizeText:
+    """Test cases for canonicalize_text"""
+
+    def test_unicode_normalization_forms_match(self):
+        """Test NFC and NFD spellings canonicalize identically"""
+        text = "Café résumé"
+        assert canonicalize_text(unicodedata.normalize("NFD", text)) == canonicalize_text(text)
+
+    def test_full_width_folded_to_half_width(self):
+        """Test full-width letters, digits and punctuation fold to ASCII"""
+        assert canonicalize_text("Ｈｅｌｌｏ，　ｗｏｒｌｄ！１２３") == "Hello, world!123"
+
+    def test_quotes_folded(self):
+        """Test curly quotes become straight quotes"""
+        assert canonicalize_text("“It’s fine,” she said.") == "\"It's fine,\" she said."
+
+    def test_whitespace_and_zero_width(self):
+        """Test whitespace runs collapse, ends are trimmed, and zero-width characters vanish"""
+        assert canonicalize_text("  Hello\u200b \n\t world.  ") == "Hello world."
+
+    def test_distinct_text_stays_distinct(self):
+        """Test changes that are pronounced differently are kept"""
+        assert canonicalize_text("Hello.") != canonicalize_text("Hello?")
+        assert canonicalize_text("read") != canonicalize_text("Read")
+
+    def test_compatibility_characters_stay_distinct(self):
+        """Test superscripts, subscripts and circled numbers are not folded to plain digits"""
+        assert canonicalize_text("10⁶ cells") != canonicalize_text("106 cells")
+        assert canonicalize_text("x² + y²") != canonicalize_text("x2 + y2")
+        assert canonicalize_text("H₂O") != canonicalize_text("H2O")
+        assert canonicalize_text("①") != canonicalize_text("1")
+
+    def test_compatibility_characters_get_distinct_keys(self):
+        """Test texts read differently never share a document or sentence cache key"""
+        from app.services.audio_cache_service import AudioCacheService
+
+        service = AudioCacheService()
+        for text, other in [("10⁶", "106"), ("x²", "x2")]:
+            assert service.generate_sentence_cache_key(text, "nova", "mp3") != \
+                service.generate_sentence_cache_key(other, "nova", "mp3")
+            assert service.generate_cache_key(text, [text], "nova", "mp3") != \
+                service.generate_cache_key(other, [other], "nova", "mp3")
@@ -0,0 +1,49 @@
+"""Tests for the long-text chunking planner"""
+import pytest
+
+from app.utils.text_chunking import plan_tts_chunks
+
+
+@pytest.mark.unit
+class TestPlanTTSChunks:
+    """Test cases for plan_tts_chunks"""
+
+    def test_short_text_is_one_chunk(self):
+        """Test text within the budget is returned unchanged"""
+        assert plan_tts_chunks("  Hello, world!  ", 100) == ["Hello, world!"]
+        assert plan_tts_chunks("   ", 100) == []
+
+    def test_packs_whole_sentences(self):
+        """Test sentences are packed greedily and never split when they fit"""
+        text = "One two three. Four five six! Seven eight nine? Ten."
+        chunks = plan_tts_chunks(text, 30)
+
+        assert chunks == ["One two three. Four five six!", "Seven eight nine? Ten."]
+        assert all(len(chunk) <= 30 for chunk in chunks)
+
+    def test_long_sentence_splits_at_clauses_then_words(self):
+        """Test an oversized sentence falls back to clause, then word boundaries"""
+        text = "first clause here, second clause here, third clause that is quite long indeed."
+        chunks = plan_tts_chunks(text, 30)
+
+        assert chunks[0] == "first clause here,"
+        assert all(len(chunk) <= 30 for chunk in chunks)
+        assert " ".join(chunks).split() == text.split()
+
+    def test_japanese_boundaries(self):
+        """Test Japanese sentence and clause punctuation are boundaries"""
+        text = "今日は晴れです。明日は雨でしょう、たぶん。"
+        assert plan_tts_chunks(text, 10) == ["今日は晴れです。", "明日は雨でしょう、", "たぶん。"]
+
+    def test_hard_cut_without_boundaries(self):
+        """Test text with no boundary at all is cut at the budget"""
+        chunks = plan_tts_chunks("a" * 25, 10)
+        assert chunks == ["a" * 10, "a" * 10, "a" * 5]
+
+    def test_no_text_is_lost(self):
+        """Test chunks cover the input in order"""
+        text = ("Sentence number one is here. " * 50) + "x" * 120 + " The end."
+        chunks = plan_tts_chunks(text, 100)
+
+        assert all(0 < len(chunk) <= 100 for chunk in chunks)
+        assert "".join(chunks).replace(" ", "") == text.replace(" ", "")
@@ -0,0 +1,48 @@
+"""Tests for the token bucket rate limiter"""
+from unittest.mock import patch
+
+import pytest
+
+from app.utils.token_bucket import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestTokenBucket:
+    """Test cases for TokenBucket"""
+
+    async def test_burst_then_rate(self):
+        """Test the saved-up burst is free and later requests wait for the rate"""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, capacity=50, clock=clock)
+
+        async def sleep(seconds):
+            clock.now += seconds
+
+        with patch('app.utils.token_bucket.asyncio.sleep', side_effect=sleep):
+            assert await bucket.acquire(50) == 0
+            assert await bucket.acquire(20) == pytest.approx(2.0)
+            clock.now += 1
+            assert bucket.available == pytest.approx(10)
+
+    async def test_large_request_goes_into_debt(self):
+        """Test a request above the capacity waits for a full bucket and leaves a debt"""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, capacity=50, clock=clock)
+
+        async def sleep(seconds):
+            clock.now += seconds
+
+        with patch('app.utils.token_bucket.asyncio.sleep', side_effect=sleep):
+            assert await bucket.acquire(200) == 0
+            assert bucket.available == pytest.approx(-150)
+            # The debt is paid back at the rate before the next request is served
+            assert await bucket.acquire(10) == pytest.approx(16.0)
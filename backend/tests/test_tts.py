@@ -1,6 +1,6 @@
 """Tests for TTS API endpoint"""
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from fastapi.testclient import TestClient
 
 from app.core.constants import ERROR_TTS_FAILED, ERROR_INTERNAL
@@ -13,9 +13,9 @@ class TestTTSEndpoint:
 
     def test_tts_success_default_options(self, client):
         """Test successful TTS request with default options"""
-        with patch('app.api.routes.tts.openai_service') as mock_service:
+        with patch('app.api.routes.tts.openai_service', new_callable=AsyncMock) as mock_service:
             audio_data = b'\x00\x01\x02\x03' * 100
-            mock_service.generate_speech.return_value = audio_data
+            mock_service.generate_speech_async.return_value = audio_data
 
             response = client.post(
                 "/api/tts",
@@ -27,7 +27,7 @@ class TestTTSEndpoint:
             assert response.content == audio_data
 
             # Verify the service was called with defaults
-            mock_service.generate_speech.assert_called_once_with(
+            mock_service.generate_speech_async.assert_called_once_with(
                 text="Hello, world!",
                 voice="nova",
                 format="opus"
@@ -35,9 +35,9 @@ class TestTTSEndpoint:
 
     def test_tts_with_custom_voice(self, client):
         """Test TTS with custom voice option"""
-        with patch('app.api.routes.tts.openai_service') as mock_service:
+        with patch('app.api.routes.tts.openai_service', new_callable=AsyncMock) as mock_service:
             audio_data = b'\x00\x01\x02\x03' * 50
-            mock_service.generate_speech.return_value = audio_data
+            mock_service.generate_speech_async.return_value = audio_data
 
             response = client.post(
                 "/api/tts",
@@ -48,14 +48,14 @@ class TestTTSEndpoint:
             )
 
             assert response.status_code == 200
-            call_kwargs = mock_service.generate_speech.call_args[1]
+            call_kwargs = mock_service.generate_speech_async.call_args[1]
             assert call_kwargs["voice"] == "alloy"
 
     def test_tts_with_mp3_format(self, client):
         """Test TTS with MP3 format"""
-        with patch('app.api.routes.tts.openai_service') as mock_service:
+        with patch('app.api.routes.tts.openai_service', new_callable=AsyncMock) as mock_service:
             audio_data = b'mp3_audio_data' * 20
-            mock_service.generate_speech.return_value = audio_data
+            mock_service.generate_speech_async.return_value = audio_data
 
             response = client.post(
                 "/api/tts",
@@ -71,9 +71,9 @@ class TestTTSEndpoint:
 
     def test_tts_with_aac_format(self, client):
         """Test TTS with AAC format"""
-        with patch('app.api.routes.tts.openai_service') as mock_service:
+        with patch('app.api.routes.tts.openai_service', new_callable=AsyncMock) as mock_service:
             audio_data = b'aac_audio_data' * 20
-            mock_service.generate_speech.return_value = audio_data
+            mock_service.generate_speech_async.return_value = audio_data
 
             response = client.post(
                 "/api/tts",
@@ -88,9 +88,9 @@ class TestTTSEndpoint:
 
     def test_tts_with_flac_format(self, client):
         """Test TTS with FLAC format"""
-        with patch('app.api.routes.tts.openai_service') as mock_service:
+        with patch('app.api.routes.tts.openai_service', new_callable=AsyncMock) as mock_service:
             audio_data = b'flac_audio_data' * 20
-            mock_service.generate_speech.return_value = audio_data
+            mock_service.generate_speech_async.return_value = audio_data
 
             response = client.post(
                 "/api/tts",
@@ -108,9 +108,9 @@ class TestTTSEndpoint:
         voices = ["alloy", "echo", "fable", "onyx", "nova", "shimmer"]
 
         for voice in voices:
-            with patch('app.api.routes.tts.openai_service') as mock_service:
+            with patch('app.api.routes.tts.openai_service', new_callable=AsyncMock) as mock_service:
                 audio_data = b'audio' * 10
-                mock_service.generate_speech.return_value = audio_data
+                mock_service.generate_speech_async.return_value = audio_data
 
                 response = client.post(
                     "/api/tts",
@@ -121,14 +121,14 @@ class TestTTSEndpoint:
                 )
 
                 assert response.status_code == 200
-                call_kwargs = mock_service.generate_speech.call_args[1]
+                call_kwargs = mock_service.generate_speech_async.call_args[1]
                 assert call_kwargs["voice"] == voice
 
     def test_tts_long_text(self, client):
         """Test TTS with longer text"""
-        with patch('app.api.routes.tts.openai_service') as mock_service:
+        with patch('app.api.routes.tts.openai_service', new_callable=AsyncMock) as mock_service:
             audio_data = b'long_audio' * 100
-            mock_service.generate_speech.return_value = audio_data
+            mock_service.generate_speech_async.return_value = audio_data
 
             long_text = "This is a much longer text. " * 50  # ~1400 characters
             response = client.post(
@@ -141,9 +141,9 @@ class TestTTSEndpoint:
 
     def test_tts_japanese_text(self, client):
         """Test TTS with Japanese text"""
-        with patch('app.api.routes.tts.openai_service') as mock_service:
+        with patch('app.api.routes.tts.openai_service', new_callable=AsyncMock) as mock_service:
             audio_data = b'japanese_audio' * 30
-            mock_service.generate_speech.return_value = audio_data
+            mock_service.generate_speech_async.return_value = audio_data
 
             response = client.post(
                 "/api/tts",
@@ -157,8 +157,8 @@ class TestTTSEndpoint:
 
     def test_tts_service_error_invalid_voice(self, client):
         """Test TTS when service returns invalid voice error"""
-        with patch('app.api.routes.tts.openai_service') as mock_service:
-            mock_service.generate_speech.side_effect = TTSGenerationError(
+        with patch('app.api.routes.tts.openai_service', new_callable=AsyncMock) as mock_service:
+            mock_service.generate_speech_async.side_effect = TTSGenerationError(
                 "Invalid voice: unknown_voice",
                 error_code=ERROR_TTS_FAILED
             )
@@ -178,8 +178,8 @@ class TestTTSEndpoint:
 
     def test_tts_service_error_generation_failed(self, client):
         """Test TTS when generation fails"""
-        with patch('app.api.routes.tts.openai_service') as mock_service:
-            mock_service.generate_speech.side_effect = TTSGenerationError(
+        with patch('app.api.routes.tts.openai_service', new_callable=AsyncMock) as mock_service:
+            mock_service.generate_speech_async.side_effect = TTSGenerationError(
                 "OpenAI TTS failed",
                 error_code=ERROR_TTS_FAILED
             )
@@ -195,8 +195,8 @@ class TestTTSEndpoint:
 
     def test_tts_internal_error(self, client):
         """Test TTS with unexpected internal error"""
-        with patch('app.api.routes.tts.openai_service') as mock_service:
-            mock_service.generate_speech.side_effect = Exception("Unexpected error")
+        with patch('app.api.routes.tts.openai_service', new_callable=AsyncMock) as mock_service:
+            mock_service.generate_speech_async.side_effect = Exception("Unexpected error")
 
             response = client.post(
                 "/api/tts",
@@ -242,9 +242,9 @@ class TestTTSEndpoint:
 
     def test_tts_text_at_max_length(self, client):
         """Test TTS with text at exactly max length"""
-        with patch('app.api.routes.tts.openai_service') as mock_service:
+        with patch('app.api.routes.tts.openai_service', new_callable=AsyncMock) as mock_service:
             audio_data = b'max_length_audio' * 50
-            mock_service.generate_speech.return_value = audio_data
+            mock_service.generate_speech_async.return_value = audio_data
 
             # Exactly 4096 characters (should be valid)
             max_text = "a" * 4096
@@ -257,15 +257,280 @@ class TestTTSEndpoint:
             assert response.status_code == 200
 
 
+@pytest.mark.unit
+class TestTTSStreaming:
+    """Test cases for stream=true on /api/tts"""
+
+    @staticmethod
+    def _stream(*chunks, error=None):
+        """Build a stream_speech_async replacement yielding chunks, then optionally failing"""
+        async def fake_stream(**kwargs):
+            for chunk in chunks:
+                yield chunk
+            if error is not None:
+                raise error
+        return fake_stream
+
+    def test_stream_sends_chunks(self, client):
+        """Test upstream chunks are forwarded with the format's media type"""
+        with patch('app.api.routes.tts.openai_service') as mock_service:
+            mock_service.stream_speech_async = MagicMock(side_effect=self._stream(b"ID3", b"chunk1", b"chunk2"))
+
+            response = client.post(
+                "/api/tts",
+                json={"text": "Stream me", "format": "mp3", "stream": True}
+            )
+
+            assert response.status_code == 200
+            assert response.headers["content-type"] == "audio/mpeg"
+            assert "content-length" not in response.headers
+            assert response.content == b"ID3chunk1chunk2"
+            mock_service.stream_speech_async.assert_called_once_with(
+                text="Stream me", voice="nova", format="mp3"
+            )
+
+    def test_stream_error_before_first_chunk(self, client):
+        """Test failures before any audio is sent return a normal error response"""
+        error = TTSGenerationError("Invalid voice: robot", error_code=ERROR_TTS_FAILED)
+        with patch('app.api.routes.tts.openai_service') as mock_service:
+            mock_service.stream_speech_async = MagicMock(side_effect=self._stream(error=error))
+
+            response = client.post(
+                "/api/tts",
+                json={"text": "Stream me", "voice": "robot", "stream": True}
+            )
+
+            assert response.status_code == 400
+            assert response.json()["detail"]["error"] == ERROR_TTS_FAILED
+
+    def test_stream_empty_upstream(self, client):
+        """Test an upstream stream without audio is an error"""
+        with patch('app.api.routes.tts.openai_service') as mock_service:
+            mock_service.stream_speech_async = MagicMock(side_effect=self._stream())
+
+            response = client.post("/api/tts", json={"text": "Stream me", "stream": True})
+
+            assert response.status_code == 500
+            assert "no audio" in response.json()["detail"]["message"]
+
+    async def test_stream_error_after_first_chunk_aborts(self):
+        """Test failures mid-stream abort the transfer instead of ending it cleanly"""
+        import asyncio
+        import json
+        from app.main import app
+
+        error = TTSGenerationError("OpenAI TTS stream failed: reset", error_code=ERROR_TTS_FAILED)
+        body = json.dumps({"text": "Stream me", "stream": True}).encode()
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "POST", "scheme": "http", "path": "/api/tts", "raw_path": b"/api/tts",
+            "root_path": "", "query_string": b"",
+            "headers": [(b"content-type", b"application/json"), (b"host", b"test")],
+            "client": ("127.0.0.1", 1234), "server": ("test", 80),
+        }
+        sent = []
+        requests = [{"type": "http.request", "body": body, "more_body": False}]
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            await asyncio.Event().wait()  # client stays connected
+
+        async def send(message):
+            sent.append(message)
+
+        with patch('app.api.routes.tts.openai_service') as mock_service:
+            mock_service.stream_speech_async = MagicMock(side_effect=self._stream(b"chunk1", error=error))
+
+            with pytest.raises(BaseException):
+                await app(scope, receive, send)
+
+        assert sent[0]["type"] == "http.response.start"
+        assert sent[0]["status"] == 200
+        bodies = [message for message in sent if message["type"] == "http.response.body"]
+        assert bodies[0]["body"] == b"chunk1"
+        # No terminating (more_body=False) message: the server drops the connection
+        assert all(message.get("more_body") for message in bodies)
+
+@pytest.mark.unit
+class TestTTSSeparatedStreaming:
+    """Test cases for per-sentence events on /api/tts-with-timings-separated"""
+
+    REQUEST = {"text": "One. Two.", "sentences": ["One.", "Two."], "format": "mp3"}
+
+    @staticmethod
+    def _events(*events, error=None):
+        async def fake_stream_segments(**kwargs):
+            for event in events:
+                yield event
+            if error is not None:
+                raise error
+        return fake_stream_segments
+
+    SEGMENTS = (
+        {"event": "segment", "index": 1, "duration": 0.5, "audio_url": "https://cdn/1.mp3"},
+        {"event": "segment", "index": 0, "duration": 1.0, "audio_url": "https://cdn/0.mp3"},
+        {"event": "done", "from_cache": False, "durations": [1.0, 0.5], "total_duration": 1.5,
+         "count": 2, "format": "mp3"},
+    )
+
+    def test_event_stream(self, client):
+        """Test SSE delivery of segment events in completion order plus a summary"""
+        with patch('app.api.routes.tts.audio_cache_service') as mock_cache:
+            mock_cache.stream_segments = MagicMock(side_effect=self._events(*self.SEGMENTS))
+
+            response = client.post(
+                "/api/tts-with-timings-separated",
+                json=self.REQUEST,
+                headers={"Accept": "text/event-stream"}
+            )
+
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/event-stream")
+            messages = response.text.strip().split("\n\n")
+            assert messages[0] == 'event: segment\ndata: {"index": 1, "duration": 0.5, "audio_url": "https://cdn/1.mp3"}'
+            assert messages[1].startswith("event: segment\n")
+            assert messages[2].startswith("event: done\n")
+            mock_cache.generate_or_get_cached.assert_not_called()
+
+    def test_ndjson_stream(self, client):
+        """Test NDJSON delivery, one JSON object per line"""
+        import json
+
+        with patch('app.api.routes.tts.audio_cache_service') as mock_cache:
+            mock_cache.stream_segments = MagicMock(side_effect=self._events(*self.SEGMENTS))
+
+            response = client.post(
+                "/api/tts-with-timings-separated",
+                json=self.REQUEST,
+                headers={"Accept": "application/x-ndjson"}
+            )
+
+            assert response.status_code == 200
+            lines = [json.loads(line) for line in response.text.strip().split("\n")]
+            assert [line["event"] for line in lines] == ["segment", "segment", "done"]
+            assert lines[-1]["total_duration"] == 1.5
+
+    def test_json_stays_default(self, client):
+        """Test clients without a streaming Accept header get the JSON body"""
+        with patch('app.api.routes.tts.audio_cache_service') as mock_cache:
+            mock_cache.generate_or_get_cached = AsyncMock(return_value={
+                'from_cache': True,
+                'audio_urls': ["https://cdn/0.mp3", "https://cdn/1.mp3"],
+                'durations': [1.0, 0.5],
+                'total_duration': 1.5,
+                'sentences': ["One.", "Two."]
+            })
+
+            response = client.post("/api/tts-with-timings-separated", json=self.REQUEST)
+
+            assert response.status_code == 200
+            assert response.json()["audio_urls"] == ["https://cdn/0.mp3", "https://cdn/1.mp3"]
+            mock_cache.stream_segments.assert_not_called()
+
+    def test_json_reports_upstream_calls_saved(self, client):
+        """Test freshly generated responses report the calls saved by batching"""
+        with patch('app.api.routes.tts.audio_cache_service') as mock_cache:
+            mock_cache.generate_or_get_cached = AsyncMock(return_value={
+                'from_cache': False,
+                'audio_blobs': [b"one", b"two"],
+                'durations': [1.0, 0.5],
+                'total_duration': 1.5,
+                'sentences': ["One.", "Two."],
+                'upstream_calls_saved': 1
+            })
+
+            response = client.post("/api/tts-with-timings-separated", json=self.REQUEST)
+
+            assert response.status_code == 200
+            assert response.json()["upstream_calls_saved"] == 1
+            assert len(response.json()["audio_segments"]) == 2
+
+    def test_cache_stats(self, client):
+        """Test the cache stats endpoint returns per-tier counters"""
+        with patch('app.api.routes.tts.audio_cache_service') as mock_cache:
+            mock_cache.cache_stats.return_value = {"memory": {"hits": 3, "misses": 1, "items": 2, "bytes": 10}}
+
+            response = client.get("/api/tts-cache-stats")
+
+            assert response.status_code == 200
+            assert response.json()["memory"]["hits"] == 3
+
+    def test_cache_file(self, client):
+        """Test audio of the local cache backends is served, and missing files are 404"""
+        import asyncio
+        from app.services.cache_backends import MemoryCacheBackend
+
+        backend = MemoryCacheBackend()
+        asyncio.run(backend.put_blob("cache/sentences/abc.mp3", b"audio", "audio/mp3"))
+        with patch('app.api.routes.tts.audio_cache_service') as mock_cache:
+            mock_cache.backend = backend
+
+            response = client.get("/api/tts-cache-files/cache/sentences/abc.mp3")
+            missing = client.get("/api/tts-cache-files/cache/sentences/other.mp3")
+
+        assert response.status_code == 200
+        assert response.content == b"audio"
+        assert response.headers["content-type"] == "audio/mpeg"
+        assert missing.status_code == 404
+
+    def test_access_stats_flushed_on_shutdown(self):
+        """Test buffered cache access stats are written when the app shuts down"""
+        from app.main import app
+
+        with patch('app.api.routes.tts.audio_cache_service') as mock_cache:
+            mock_cache.backend = None
+            mock_cache.run_access_stats_flusher = AsyncMock()
+            mock_cache.flush_access_stats = AsyncMock(return_value=0)
+
+            with TestClient(app):
+                mock_cache.flush_access_stats.assert_not_awaited()
+
+            mock_cache.flush_access_stats.assert_awaited_once()
+
+    def test_error_before_first_event(self, client):
+        """Test failures before any event return a regular error response"""
+        error = TTSGenerationError("Invalid voice: robot", error_code=ERROR_TTS_FAILED)
+        with patch('app.api.routes.tts.audio_cache_service') as mock_cache:
+            mock_cache.stream_segments = MagicMock(side_effect=self._events(error=error))
+
+            response = client.post(
+                "/api/tts-with-timings-separated",
+                json=self.REQUEST,
+                headers={"Accept": "text/event-stream"}
+            )
+
+            assert response.status_code == 400
+            assert response.json()["detail"]["error"] == ERROR_TTS_FAILED
+
+    def test_error_after_first_event(self, client):
+        """Test failures midway end the stream with an error event"""
+        error = TTSGenerationError("OpenAI TTS failed: timeout", error_code=ERROR_TTS_FAILED)
+        with patch('app.api.routes.tts.audio_cache_service') as mock_cache:
+            mock_cache.stream_segments = MagicMock(side_effect=self._events(self.SEGMENTS[0], error=error))
+
+            response = client.post(
+                "/api/tts-with-timings-separated",
+                json=self.REQUEST,
+                headers={"Accept": "text/event-stream"}
+            )
+
+            assert response.status_code == 200
+            messages = response.text.strip().split("\n\n")
+            assert len(messages) == 2
+            assert messages[1] == (
+                'event: error\ndata: {"error": "tts_failed", "message": "OpenAI TTS failed: timeout"}'
+            )
+
 @pytest.mark.unit
 class TestTTSRateLimit:
     """Test rate limiting for TTS endpoint"""
 
     def test_rate_limit_not_exceeded_on_first_request(self, client):
         """Test that first request succeeds"""
-        with patch('app.api.routes.tts.openai_service') as mock_service:
+        with patch('app.api.routes.tts.openai_service', new_callable=AsyncMock) as mock_service:
             audio_data = b'audio_data' * 20
-            mock_service.generate_speech.return_value = audio_data
+            mock_service.generate_speech_async.return_value = audio_data
 
             response = client.post(
                 "/api/tts",
@@ -291,9 +556,9 @@ class TestTTSMediaTypes:
         }
 
         for format_name, expected_media_type in format_media_type_map.items():
-            with patch('app.api.routes.tts.openai_service') as mock_service:
+            with patch('app.api.routes.tts.openai_service', new_callable=AsyncMock) as mock_service:
                 audio_data = b'audio' * 10
-                mock_service.generate_speech.return_value = audio_data
+                mock_service.generate_speech_async.return_value = audio_data
 
                 response = client.post(
                     "/api/tts",
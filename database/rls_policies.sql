@@ -149,6 +149,59 @@ CREATE POLICY "Service role can delete audio cache"
   ON audio_cache FOR DELETE
   USING (auth.role() = 'service_role');
 
+-- =====================================================
+-- 6. sentence_audio_cache テーブルのRLS（全ユーザー共有）
+-- =====================================================
+
+-- audio_cacheと同じく、全員が閲覧可能、バックエンドのみが書き込み可能
+
+-- RLS有効化
+ALTER TABLE sentence_audio_cache ENABLE ROW LEVEL SECURITY;
+
+-- SELECT: 全認証済みユーザーが閲覧可能
+CREATE POLICY "Authenticated users can view sentence audio cache"
+  ON sentence_audio_cache FOR SELECT
+  USING (auth.role() = 'authenticated');
+
+-- INSERT: サービスロール（バックエンド）のみ挿入可能
+CREATE POLICY "Service role can insert sentence audio cache"
+  ON sentence_audio_cache FOR INSERT
+  WITH CHECK (auth.role() = 'service_role');
+
+-- UPDATE: サービスロール（バックエンド）のみ更新可能
+CREATE POLICY "Service role can update sentence audio cache"
+  ON sentence_audio_cache FOR UPDATE
+  USING (auth.role() = 'service_role');
+
+-- DELETE: サービスロール（バックエンド）のみ削除可能
+CREATE POLICY "Service role can delete sentence audio cache"
+  ON sentence_audio_cache FOR DELETE
+  USING (auth.role() = 'service_role');
+
+-- =====================================================
+-- 7. audio_cache_leases テーブルのRLS（バックエンド専用）
+-- =====================================================
+
+-- バックエンド（service_role）のみが読み書き可能
+ALTER TABLE audio_cache_leases ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role can manage audio cache leases"
+  ON audio_cache_leases FOR ALL
+  USING (auth.role() = 'service_role')
+  WITH CHECK (auth.role() = 'service_role');
+
+-- =====================================================
+-- 8. ocr_cache テーブルのRLS（バックエンド専用）
+-- =====================================================
+
+-- OCR結果はアップロード画像の内容を含むため、バックエンド（service_role）のみが読み書き可能
+ALTER TABLE ocr_cache ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role can manage OCR cache"
+  ON ocr_cache FOR ALL
+  USING (auth.role() = 'service_role')
+  WITH CHECK (auth.role() = 'service_role');
+
 -- =====================================================
 -- 完了メッセージ
 -- =====================================================
@@ -163,6 +216,9 @@ BEGIN
   RAISE NOTICE '  - learning_sessions: ユーザーごとに分離';
   RAISE NOTICE '  - vocabulary: ユーザーごとに分離';
   RAISE NOTICE '  - audio_cache: 全ユーザー共有（バックエンドのみ書き込み）';
+  RAISE NOTICE '  - sentence_audio_cache: 全ユーザー共有（バックエンドのみ書き込み）';
+  RAISE NOTICE '  - audio_cache_leases: バックエンドのみ';
+  RAISE NOTICE '  - ocr_cache: バックエンドのみ';
   RAISE NOTICE '';
   RAISE NOTICE '次のステップ: Supabase Storageバケット作成';
 END $$;
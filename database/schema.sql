@@ -164,6 +164,84 @@ COMMENT ON COLUMN vocabulary.cefr_level IS 'CEFRレベル（A1-C2）';
 COMMENT ON COLUMN vocabulary.in_wordlists IS '単語帳掲載情報（TOEIC、英検等）';
 COMMENT ON COLUMN vocabulary.next_review_date IS '次回復習日（間隔反復学習用）';
 
+-- =====================================================
+-- 7. sentence_audio_cache テーブル（文単位の音声キャッシュ、全ユーザー共有）
+-- =====================================================
+
+CREATE TABLE sentence_audio_cache (
+  id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+  sentence_hash TEXT UNIQUE NOT NULL,          -- SHA-256(sentence + voice + format + model + speed)
+  sentence TEXT NOT NULL,                      -- 文
+  audio_url TEXT NOT NULL,                     -- 文の音声URL（Supabase Storage）
+  duration FLOAT NOT NULL,                     -- 長さ（秒）
+  format TEXT DEFAULT 'mp3' NOT NULL,
+  voice TEXT DEFAULT 'alloy' NOT NULL,
+  file_size_bytes BIGINT NOT NULL,
+  created_at TIMESTAMP DEFAULT NOW()
+);
+
+-- インデックス（sentence_hashはUNIQUE制約のインデックスを使用）
+CREATE INDEX idx_sentence_audio_cache_created_at ON sentence_audio_cache(created_at DESC);
+
+COMMENT ON TABLE sentence_audio_cache IS '文単位の音声キャッシュ（教材をまたいで同じ文を再利用）';
+COMMENT ON COLUMN sentence_audio_cache.sentence_hash IS '文+音声設定+TTSモデル・速度のハッシュ値（SHA-256）';
+COMMENT ON COLUMN sentence_audio_cache.audio_url IS 'audio_cache.segment_urlsからも参照される';
+
+-- =====================================================
+-- 8. audio_cache_leases テーブル（教材生成のリース、ワーカー間の重複生成防止）
+-- =====================================================
+
+CREATE TABLE audio_cache_leases (
+  text_hash TEXT PRIMARY KEY,                  -- audio_cache.text_hashと同じキー（キャッシュ削除は 'cache-eviction'）
+  owner TEXT NOT NULL,                         -- 生成中のワーカー（ホスト名:PID）
+  expires_at TIMESTAMP NOT NULL                -- 期限切れのリースは他ワーカーが引き継ぐ
+);
+
+COMMENT ON TABLE audio_cache_leases IS '生成中の教材（同じ教材を複数ワーカーが同時に生成しないためのリース）と実行中のキャッシュ削除';
+
+-- =====================================================
+-- 9. increment_audio_cache_access 関数（アクセス統計のまとめ書き）
+-- =====================================================
+
+-- バックエンドがメモリに溜めたヒット数を1回の呼び出しで加算する
+-- （access_count = access_count + n なので並行ワーカーでも取りこぼさない）
+CREATE OR REPLACE FUNCTION increment_audio_cache_access(
+  hashes TEXT[],
+  counts INT[],
+  accessed_times TIMESTAMP[]
+) RETURNS VOID AS $$
+  UPDATE audio_cache AS a
+  SET access_count = a.access_count + d.hit_count,
+      last_accessed_at = GREATEST(a.last_accessed_at, d.accessed_at)
+  FROM unnest(hashes, counts, accessed_times) AS d(text_hash, hit_count, accessed_at)
+  WHERE a.text_hash = d.text_hash;
+$$ LANGUAGE sql;
+
+-- バックエンド（service_role）のみ実行可能
+REVOKE EXECUTE ON FUNCTION increment_audio_cache_access(TEXT[], INT[], TIMESTAMP[]) FROM PUBLIC, anon, authenticated;
+
+-- =====================================================
+-- 10. 音声未生成の教材インデックス（キャッシュの事前生成用）
+-- =====================================================
+
+-- audio_cache_idがNULLの教材を新しい順にたどる（created_at, idのキーセットページング）
+CREATE INDEX idx_materials_prewarm ON materials(created_at DESC, id DESC) WHERE audio_cache_id IS NULL;
+
+-- =====================================================
+-- 11. ocr_cache テーブル（ページ単位のOCR結果キャッシュ、全ユーザー共有）
+-- =====================================================
+
+CREATE TABLE ocr_cache (
+  cache_key TEXT PRIMARY KEY,                  -- SHA-256(画像バイト列 + OCRオプション + プロンプト版 + モデル)
+  text TEXT NOT NULL,                          -- 抽出テキスト
+  sentences JSONB NOT NULL,                    -- 文の配列
+  confidence TEXT NOT NULL,
+  created_at TIMESTAMP DEFAULT NOW()
+);
+
+COMMENT ON TABLE ocr_cache IS 'ページ単位のOCR結果（同じページの再アップロードでGeminiを呼ばない）';
+COMMENT ON COLUMN ocr_cache.cache_key IS '画像の内容とOCRオプション・プロンプト版・画像正規化設定のハッシュ値';
+
 -- =====================================================
 -- 完了メッセージ
 -- =====================================================
@@ -21,6 +21,8 @@ export interface OCRResponse {
   confidence: 'high' | 'medium' | 'low'
   processing_time: number
   page_count: number
+  from_cache?: boolean // every page served from the OCR cache
+  cached_pages?: number
 }
 
 // TTS Types